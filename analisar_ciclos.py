@@ -0,0 +1,211 @@
+"""
+Analisador das contagens de ciclos enviadas pelo Arduino (calculadora gerada com --ciclos)
+
+Lê a saída serial da calculadora (de um arquivo capturado ou direto da porta
+serial) e o arquivo de expressões usado na geração, associa cada contagem de
+ciclos à sua linha e monta as tabelas de tempo por linha e por operador.
+
+Uso:
+    python analisar_ciclos.py teste1.txt saida_serial.txt
+    python analisar_ciclos.py teste1.txt --porta COM3 [--json]
+"""
+import re       # Para interpretar as linhas recebidas
+import sys      # Para mensagens de erro e código de saída
+import json     # Para exportar as tabelas em JSON
+import argparse # Para interpretar as opções da linha de comando
+from collections import defaultdict # Para agrupar as medições por operador
+
+from rpn_final import read_expressions_file, texto_eco
+
+try:
+    import serial  # pyserial (opcional, apenas para ler direto da porta)
+except ImportError:
+    serial = None
+
+# "<eco da expressão>= <resultado> c=XXXX" com '!' opcional quando o Timer1 estourou
+PADRAO_RESULTADO = re.compile(r'^(?P<eco>.*?)= (?P<resultado>\S+) c=(?P<ciclos>[0-9A-Fa-f]{4})(?P<estouro>!?)\s*$')
+PADRAO_CALIBRACAO = re.compile(r'^cal c=(?P<ciclos>[0-9A-Fa-f]{4})')
+
+FREQUENCIA_CPU = 16_000_000  # Clock do ATmega328P no Arduino Uno (Hz)
+
+def operadores_da_expressao(expressao):
+    """
+    Lista os operadores de uma expressão RPN, na ordem em que aparecem
+
+    Args:
+        expressao (str): Expressão RPN
+
+    Returns:
+        list: Operadores encontrados ('+', '-', '*', '|', '/', '%', '^')
+    """
+    elementos = re.findall(r'-?[\d.]+|[()+\-*^/%|]', expressao)
+    return [e for e in elementos if e in {'+', '-', '*', '|', '/', '^', '%'}]
+
+def interpretar_saida(linhas_serial, expressoes):
+    """
+    Associa cada contagem recebida à expressão de origem
+
+    As linhas que falharam na geração não aparecem na saída do Arduino, então a
+    associação é feita comparando o eco da expressão com o texto do arquivo.
+
+    Args:
+        linhas_serial (iterable): Linhas de texto recebidas pela serial
+        expressoes (list): Expressões do arquivo de entrada
+
+    Returns:
+        tuple: (calibração em ciclos, lista de medições por linha)
+    """
+    calibracao = 0
+    medicoes = []
+    proxima = 0
+    for linha in linhas_serial:
+        linha = linha.strip('\r\n')
+        achou_cal = PADRAO_CALIBRACAO.match(linha)
+        if achou_cal:
+            calibracao = int(achou_cal.group('ciclos'), 16)
+            continue
+        achou = PADRAO_RESULTADO.match(linha)
+        if not achou:
+            continue
+        eco = achou.group('eco')
+        # Avançar até a expressão cujo eco corresponde à linha recebida (o eco de
+        # uma linha que falhou fica grudado no começo da linha seguinte)
+        indice = proxima
+        while indice < len(expressoes) and not eco.endswith(texto_eco(expressoes[indice])):
+            indice += 1
+        if indice == len(expressoes):
+            print(f"Aviso: linha recebida sem expressão correspondente: {linha}", file=sys.stderr)
+            continue
+        proxima = indice + 1
+        medicoes.append({
+            'linha': indice + 1,
+            'expressao': expressoes[indice],
+            'resultado': achou.group('resultado'),
+            'ciclos_brutos': int(achou.group('ciclos'), 16),
+            'estouro': achou.group('estouro') == '!',
+            'operadores': operadores_da_expressao(expressoes[indice]),
+        })
+    for medicao in medicoes:
+        medicao['ciclos'] = max(medicao['ciclos_brutos'] - calibracao, 0)
+    return calibracao, medicoes
+
+def tabela_por_operador(medicoes):
+    """
+    Agrega as medições por operador
+
+    O custo de um operador isolado vem das linhas com um único operador; as
+    linhas com vários operadores entram apenas na contagem de ocorrências.
+
+    Args:
+        medicoes (list): Medições retornadas por interpretar_saida
+
+    Returns:
+        dict: Estatísticas (n, mínimo, média, máximo) por operador
+    """
+    isolados = defaultdict(list)
+    ocorrencias = defaultdict(int)
+    for medicao in medicoes:
+        if medicao['estouro']:
+            continue  # Contagem inválida, o Timer1 deu a volta
+        for operador in medicao['operadores']:
+            ocorrencias[operador] += 1
+        if len(medicao['operadores']) == 1:
+            isolados[medicao['operadores'][0]].append(medicao['ciclos'])
+    tabela = {}
+    for operador in sorted(ocorrencias):
+        valores = isolados.get(operador, [])
+        tabela[operador] = {
+            'ocorrencias': ocorrencias[operador],
+            'n': len(valores),
+            'min': min(valores) if valores else None,
+            'media': sum(valores) / len(valores) if valores else None,
+            'max': max(valores) if valores else None,
+        }
+    return tabela
+
+def formatar_tabelas(calibracao, medicoes, por_operador):
+    """
+    Formata as tabelas por linha e por operador em texto
+
+    Args:
+        calibracao (int): Ciclos gastos pela própria medição
+        medicoes (list): Medições por linha
+        por_operador (dict): Estatísticas por operador
+
+    Returns:
+        str: Tabelas prontas para impressão
+    """
+    saida = [f"Calibração: {calibracao} ciclos descontados de cada medição", ""]
+    saida.append("Linha  Ciclos     us  Expressão")
+    for medicao in medicoes:
+        micro = medicao['ciclos'] / FREQUENCIA_CPU * 1e6
+        marca = " (estouro)" if medicao['estouro'] else ""
+        saida.append(f"{medicao['linha']:>5} {medicao['ciclos']:>7} {micro:>6.1f}  {medicao['expressao']}{marca}")
+    saida.append("")
+    saida.append("Operador  Ocorrências  Isolados     Mín    Média     Máx")
+    for operador, dados in por_operador.items():
+        if dados['n']:
+            saida.append(f"{operador:<9} {dados['ocorrencias']:>11} {dados['n']:>9} {dados['min']:>7} "
+                         f"{dados['media']:>8.1f} {dados['max']:>7}")
+        else:
+            saida.append(f"{operador:<9} {dados['ocorrencias']:>11} {0:>9} {'-':>7} {'-':>8} {'-':>7}")
+    return "\n".join(saida)
+
+def ler_porta(porta, baud, n_linhas):
+    """
+    Lê da porta serial até receber um resultado para cada expressão
+
+    Args:
+        porta (str): Nome da porta serial (ex.: COM3, /dev/ttyACM0)
+        baud (int): Taxa de transmissão
+        n_linhas (int): Quantidade de expressões esperadas
+
+    Returns:
+        list: Linhas recebidas
+    """
+    if serial is None:
+        print("Erro: a leitura direta da porta requer o pacote pyserial (pip install pyserial).")
+        sys.exit(1)
+    recebidas = []
+    resultados = 0
+    with serial.Serial(porta, baud, timeout=10) as conexao:
+        while resultados < n_linhas:
+            linha = conexao.readline().decode('ascii', errors='replace')
+            if not linha:
+                break  # Tempo esgotado
+            recebidas.append(linha)
+            if PADRAO_RESULTADO.match(linha.strip('\r\n')):
+                resultados += 1
+    return recebidas
+
+def main():
+    """
+    Função principal: lê a saída do Arduino e imprime as tabelas de ciclos
+    """
+    parser = argparse.ArgumentParser(description="Agrega as contagens de ciclos enviadas pela calculadora (--ciclos)")
+    parser.add_argument('expressoes', help="arquivo de expressões usado para gerar o calculadora.asm")
+    parser.add_argument('saida', nargs='?', help="arquivo com a saída serial capturada")
+    parser.add_argument('--porta', help="lê direto da porta serial em vez de um arquivo")
+    parser.add_argument('--baud', type=int, default=9600, help="taxa de transmissão (padrão 9600)")
+    parser.add_argument('--json', action='store_true', help="exporta as tabelas em JSON")
+    args = parser.parse_args()
+
+    expressoes = read_expressions_file(args.expressoes)
+    if args.porta:
+        linhas_serial = ler_porta(args.porta, args.baud, len(expressoes))
+    elif args.saida:
+        with open(args.saida, 'r', errors='replace') as arquivo:
+            linhas_serial = arquivo.readlines()
+    else:
+        parser.error("informe o arquivo com a saída serial ou --porta")
+
+    calibracao, medicoes = interpretar_saida(linhas_serial, expressoes)
+    por_operador = tabela_por_operador(medicoes)
+    if args.json:
+        print(json.dumps({'calibracao': calibracao, 'linhas': medicoes, 'operadores': por_operador},
+                         indent=2, ensure_ascii=False))
+    else:
+        print(formatar_tabelas(calibracao, medicoes, por_operador))
+
+if __name__ == "__main__":
+    main()
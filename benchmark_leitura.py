@@ -0,0 +1,213 @@
+"""
+Comparação entre a leitura atual das expressões e a leitura por mmap
+
+- texto: read_expressions_file (arquivo decodificado, uma str por linha numa
+  lista) e separação dos elementos com a expressão regular de resolve().
+- mmap: ArquivoMapeado (arquivo mapeado e separado em elementos por blocos,
+  com os números convertidos direto dos bytes).
+
+Cada leitura roda em um processo novo, para medir o pico de memória de cada
+uma separadamente. Sem --arquivo, uma entrada do tamanho pedido é gerada em um
+arquivo temporário. Com --avaliar, compara também o cálculo completo
+(evaluate_many sobre a lista contra evaluate_file), bem mais lento.
+
+Uso:
+    python benchmark_leitura.py [--tamanho 1G] [--arquivo entrada.txt] [--semente 1] [--avaliar] [--json]
+"""
+import os       # Para o tamanho e a remoção do arquivo gerado
+import re       # Para o tokenizador atual (sobre str)
+import sys      # Para a unidade do pico de memória (macOS)
+import json     # Para exportar as medições em JSON
+import time     # Para medir o tempo de cada leitura
+import random   # Para sortear as expressões da entrada gerada
+import argparse # Para interpretar as opções da linha de comando
+import tempfile # Para a entrada gerada
+from concurrent.futures import ProcessPoolExecutor # Para medir cada leitura em um processo novo
+
+try:
+    import resource # Pico de memória do processo (ausente no Windows)
+except ImportError:
+    resource = None
+
+import rpn_final
+
+def interpretar_tamanho(texto):
+    """
+    Converte um tamanho como '1G', '200M' ou '4096' em bytes
+
+    Args:
+        texto (str): Tamanho com sufixo opcional K, M ou G
+
+    Returns:
+        int: Bytes
+    """
+    multiplicadores = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    texto = texto.strip().upper()
+    if texto and texto[-1] in multiplicadores:
+        return int(float(texto[:-1]) * multiplicadores[texto[-1]])
+    return int(texto)
+
+def gerar_entrada(nome, tamanho, semente=1):
+    """
+    Gera um arquivo de expressões com (pelo menos) o tamanho pedido
+
+    As linhas são sorteadas de um conjunto de expressões aninhadas com números
+    inteiros e decimais; MEM e RES ficam de fora para que as duas leituras
+    façam o mesmo trabalho.
+
+    Args:
+        nome (str): Arquivo a ser gerado
+        tamanho (int): Tamanho mínimo em bytes
+        semente (int): Semente do sorteio
+    """
+    gerador = random.Random(semente)
+    numero = lambda: str(gerador.randint(0, 999)) if gerador.random() < 0.6 else f"{gerador.uniform(0, 100):.2f}"
+    modelo = [f"(({numero()} {numero()} {gerador.choice('+-*|')}) ({numero()} {numero()} "
+              f"{gerador.choice('+-*')}) {gerador.choice('+-*')})" for _ in range(4096)]
+    bloco = ("\n".join(gerador.choice(modelo) for _ in range(16384)) + "\n").encode()
+    with open(nome, 'wb') as arquivo:
+        for _ in range(-(-tamanho // len(bloco))):
+            arquivo.write(bloco)
+
+def _pico_memoria():
+    """
+    Pico de memória do processo em MB (None sem o módulo resource)
+    """
+    if resource is None: return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 ** 2 if sys.platform == 'darwin' else pico / 1024  # bytes no macOS, KB no Linux
+
+def ler_texto(nome):
+    """
+    Leitura atual: lista de str e elementos separados com a expressão regular de resolve()
+
+    Os números são convertidos como resolve_elementos() faria, para que as duas
+    leituras entreguem os mesmos elementos prontos para o cálculo.
+
+    Args:
+        nome (str): Arquivo de expressões
+
+    Returns:
+        dict: Linhas, conferência (total de elementos), tempo e pico de memória
+    """
+    inicio = time.perf_counter()
+    linhas = rpn_final.read_expressions_file(nome)
+    elementos = 0
+    padrao = re.compile(r'-?[\d.]+|[()+\-*^/%|]')
+    for linha in linhas:
+        elementos += len([float(e) if e[-1].isdigit() else e for e in padrao.findall(linha.replace(',', '.'))])
+    return {'linhas': len(linhas), 'conferencia': elementos,
+            'tempo': time.perf_counter() - inicio, 'memoria_mb': _pico_memoria()}
+
+def ler_mmap(nome):
+    """
+    Leitura por mmap: arquivo separado em blocos e números convertidos dos bytes
+
+    Args:
+        nome (str): Arquivo de expressões
+
+    Returns:
+        dict: Linhas, conferência (total de elementos), tempo e pico de memória
+    """
+    inicio = time.perf_counter()
+    linhas = elementos = 0
+    with rpn_final.ArquivoMapeado(nome) as arquivo:
+        for _, linha in arquivo.linhas():
+            linhas += 1
+            elementos += len(linha)
+    return {'linhas': linhas, 'conferencia': elementos,
+            'tempo': time.perf_counter() - inicio, 'memoria_mb': _pico_memoria()}
+
+def avaliar_texto(nome):
+    """
+    Cálculo completo pela leitura atual (evaluate_many sobre a lista de linhas)
+    """
+    inicio = time.perf_counter()
+    resultados = rpn_final.Calculadora().evaluate_many(rpn_final.read_expressions_file(nome))
+    return {'linhas': len(resultados), 'conferencia': sum(r for r in resultados if r is not None),
+            'tempo': time.perf_counter() - inicio, 'memoria_mb': _pico_memoria()}
+
+def avaliar_mmap(nome):
+    """
+    Cálculo completo pela leitura por mmap (evaluate_file)
+    """
+    inicio = time.perf_counter()
+    linhas, soma = 0, 0.0
+    for resultado in rpn_final.Calculadora().evaluate_file(nome):
+        linhas += 1
+        if resultado is not None: soma += resultado
+    return {'linhas': linhas, 'conferencia': soma, 'tempo': time.perf_counter() - inicio, 'memoria_mb': _pico_memoria()}
+
+def medir(nome, avaliar=False):
+    """
+    Executa cada leitura em um processo novo e reúne as medições
+
+    Args:
+        nome (str): Arquivo de expressões
+        avaliar (bool): Mede também o cálculo completo das expressões
+
+    Returns:
+        dict: Tamanho do arquivo e medições de cada leitura
+    """
+    funcoes = {'texto': ler_texto, 'mmap': ler_mmap}
+    if avaliar: funcoes.update({'avaliar_texto': avaliar_texto, 'avaliar_mmap': avaliar_mmap})
+    medicoes = {}
+    for modo, funcao in funcoes.items():
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            medicoes[modo] = executor.submit(funcao, nome).result()
+    return {'arquivo': nome, 'bytes': os.path.getsize(nome), 'medicoes': medicoes}
+
+def formatar_medicoes(resultado):
+    """
+    Formata as medições como tabela
+
+    Args:
+        resultado (dict): Retorno de medir()
+
+    Returns:
+        str: Tabela pronta para impressão
+    """
+    megabytes = resultado['bytes'] / 1024 ** 2
+    saida = [f"{resultado['arquivo']}: {megabytes:.0f} MB", "",
+             f"{'Leitura':<14} {'Linhas':>11} {'Tempo (s)':>10} {'MB/s':>8} {'Pico (MB)':>10}  Conferência"]
+    for modo, medicao in resultado['medicoes'].items():
+        memoria = f"{medicao['memoria_mb']:.0f}" if medicao['memoria_mb'] is not None else "-"
+        saida.append(f"{modo:<14} {medicao['linhas']:>11} {medicao['tempo']:>10.2f} "
+                     f"{megabytes / medicao['tempo']:>8.1f} {memoria:>10}  {medicao['conferencia']:.6g}")
+    medicoes = resultado['medicoes']
+    saida.append("")
+    saida.append(f"mmap: {medicoes['texto']['tempo'] / medicoes['mmap']['tempo']:.2f}x mais rápido na leitura")
+    if 'avaliar_mmap' in medicoes:
+        saida.append(f"evaluate_file: {medicoes['avaliar_texto']['tempo'] / medicoes['avaliar_mmap']['tempo']:.2f}x "
+                     f"mais rápido no cálculo completo")
+    return "\n".join(saida)
+
+def main():
+    """
+    Função principal: gera (ou usa) a entrada, mede as leituras e imprime a tabela
+    """
+    parser = argparse.ArgumentParser(description="Compara a leitura atual das expressões com a leitura por mmap")
+    parser.add_argument('--tamanho', default='1G', help="tamanho da entrada gerada (ex.: 200M, 1G; padrão 1G)")
+    parser.add_argument('--arquivo', help="usa um arquivo de expressões existente em vez de gerar um")
+    parser.add_argument('--semente', type=int, default=1, help="semente da entrada gerada (padrão 1)")
+    parser.add_argument('--avaliar', action='store_true',
+                        help="mede também o cálculo completo (evaluate_many x evaluate_file; lento)")
+    parser.add_argument('--json', action='store_true', help="exporta as medições em JSON")
+    args = parser.parse_args()
+
+    nome = args.arquivo
+    if nome is None:
+        descritor, nome = tempfile.mkstemp(suffix='.txt', prefix='rpn_')
+        os.close(descritor)
+        gerar_entrada(nome, interpretar_tamanho(args.tamanho), args.semente)
+    try:
+        resultado = medir(nome, args.avaliar)
+    finally:
+        if args.arquivo is None: os.remove(nome)
+    if args.json:
+        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    else:
+        print(formatar_medicoes(resultado))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+Coletor assíncrono dos resultados enviados pelo Arduino pela serial
+
+Lê a saída da calculadora gerada (os bytes enviados por uart_envia_byte),
+separa os resultados "= valor" de cada linha, associa cada um à expressão do
+arquivo de origem e confere com o valor calculado no Python. Para cada linha
+registra o instante de chegada e a latência (intervalo desde o resultado
+anterior); no fim mostra a vazão em linhas/s e bytes/s.
+
+Sem o Arduino, um pseudo-terminal (pty) faz o papel da porta serial: o lado
+mestre é alimentado pelo simulador (simulador_avr.py, executando o
+calculadora.asm) ou por uma captura gravada, no ritmo da velocidade da UART,
+e o coletor lê o outro lado como se fosse o dispositivo real (Linux/macOS).
+
+Uso:
+    python coletor_serial.py teste1.txt --porta /dev/ttyACM0 [--baud 9600] [--gravar captura.bin]
+    python coletor_serial.py teste1.txt --simular calculadora.asm
+    python coletor_serial.py teste1.txt --replay captura.bin [--escala 0]
+"""
+import os       # Para o pseudo-terminal e a leitura do dispositivo
+import re       # Para interpretar as linhas recebidas
+import sys      # Para mensagens de erro e código de saída
+import json     # Para exportar o relatório em JSON
+import time     # Para os instantes de chegada
+import asyncio  # Para ler a serial sem bloquear
+import argparse # Para interpretar as opções da linha de comando
+
+try:
+    import tty     # Para colocar o terminal em modo bruto (apenas Unix)
+    import termios # Para configurar a velocidade do terminal
+except ImportError:
+    tty = termios = None
+
+import rpn_final
+
+# "<eco da expressão>= <resultado>", com " c=XXXX" (e '!' no estouro) quando gerado com --ciclos
+PADRAO_RESULTADO = re.compile(r'^(?P<eco>.*?)= (?P<resultado>\S+)(?: c=(?P<ciclos>[0-9A-Fa-f]{4})(?P<estouro>!?))?$')
+
+FREQUENCIA_CPU = 16_000_000  # Clock do ATmega328P no Arduino Uno (Hz)
+BITS_POR_BYTE = 10           # Start + 8 bits + stop
+
+def resultados_esperados(expressoes, numerico='half'):
+    """
+    Calcula no Python o texto que o Arduino deve enviar para cada linha
+
+    Args:
+        expressoes (list): Expressões do arquivo usado na geração
+        numerico (str): Formato numérico usado na geração (--numerico)
+
+    Returns:
+        list: Um dicionário por linha (por valor, nas expressões paramétricas): linha,
+              expressao, eco e esperado (None se a linha falha)
+    """
+    calculadora = rpn_final.Calculadora(numerico=numerico)
+    esperados = []
+    for indice, linha in enumerate(expressoes):
+        try:
+            expandidas = rpn_final.expandir_parametrica(linha) or [linha]
+        except ValueError:
+            expandidas = [linha]  # Declaração inválida: a linha falha também na geração
+        for expressao, resultado in zip(expandidas, calculadora.evaluate_many([linha])):
+            esperados.append({
+                'linha': indice + 1,
+                'expressao': expressao,
+                'eco': rpn_final.texto_eco(expressao),
+                'esperado': None if resultado is None else rpn_final.formatar_resultado(resultado, numerico),
+            })
+    return esperados
+
+class ColetorResultados:
+    """
+    Interpreta o fluxo de bytes da calculadora à medida que ele chega
+
+    As linhas que falharam na geração não têm resultado (e podem ou não deixar
+    o eco grudado no começo da linha seguinte), então cada resultado recebido
+    é associado à próxima linha esperada cujo eco termina a linha recebida.
+    """
+    def __init__(self, esperados):
+        """
+        Args:
+            esperados (list): Retorno de resultados_esperados()
+        """
+        self.esperados = esperados
+        self.pendentes = [e for e in esperados if e['esperado'] is not None]
+        self.proxima = 0        # Índice em pendentes
+        self.buffer = b''
+        self.registros = []
+        self.bytes = 0
+        self.inicio = None      # Instante do primeiro byte
+        self.anterior = None    # Instante do resultado anterior
+        self.ignoradas = []     # Linhas recebidas sem expressão correspondente
+
+    @property
+    def completo(self):
+        return self.proxima == len(self.pendentes)
+
+    def alimentar(self, dados, instante):
+        """
+        Processa os bytes recebidos
+
+        Args:
+            dados (bytes): Bytes lidos da serial
+            instante (float): time.perf_counter() da leitura
+
+        Returns:
+            list: Registros das linhas completadas por estes bytes
+        """
+        if self.inicio is None:
+            self.inicio = self.anterior = instante
+        self.bytes += len(dados)
+        self.buffer += dados
+        novos = []
+        *linhas, self.buffer = self.buffer.split(b'\r\n')
+        for linha in linhas:
+            registro = self._interpretar(linha.decode('latin-1'), instante)
+            if registro is not None:
+                novos.append(registro)
+        self.registros.extend(novos)
+        return novos
+
+    def _interpretar(self, linha, instante):
+        """
+        Associa uma linha recebida à sua expressão e confere o resultado
+        """
+        achou = PADRAO_RESULTADO.match(linha)
+        if not achou:
+            return None  # Cabeçalho, linha em branco ou calibração (cal c=XXXX)
+        eco = achou.group('eco')
+        indice = self.proxima
+        while indice < len(self.pendentes) and not eco.endswith(self.pendentes[indice]['eco']):
+            indice += 1
+        if indice == len(self.pendentes):
+            self.ignoradas.append(linha)
+            return None
+        esperado = self.pendentes[indice]
+        self.proxima = indice + 1
+        registro = {
+            'linha': esperado['linha'],
+            'expressao': esperado['expressao'],
+            'recebido': achou.group('resultado'),
+            'esperado': esperado['esperado'],
+            'confere': achou.group('resultado') == esperado['esperado'],
+            'ciclos': int(achou.group('ciclos'), 16) if achou.group('ciclos') else None,
+            'instante_ms': (instante - self.inicio) * 1000,
+            'latencia_ms': (instante - self.anterior) * 1000,
+        }
+        self.anterior = instante
+        return registro
+
+    def relatorio(self):
+        """
+        Resumo da coleta (serializável em JSON)
+
+        Returns:
+            dict: Registros por linha, linhas sem resposta, divergências, latência e vazão
+        """
+        recebidas = {r['linha'] for r in self.registros}
+        duracao = (self.anterior - self.inicio) if self.registros else 0.0
+        latencias = [r['latencia_ms'] for r in self.registros]
+        return {
+            'linhas': self.registros,
+            'faltando': [e['linha'] for e in self.pendentes if e['linha'] not in recebidas],
+            'erros_geracao': [e['linha'] for e in self.esperados if e['esperado'] is None],
+            'divergentes': [r['linha'] for r in self.registros if not r['confere']],
+            'ignoradas': self.ignoradas,
+            'bytes': self.bytes,
+            'duracao_s': duracao,
+            'linhas_por_s': len(self.registros) / duracao if duracao else None,
+            'bytes_por_s': self.bytes / duracao if duracao else None,
+            'latencia_media_ms': sum(latencias) / len(latencias) if latencias else None,
+            'latencia_max_ms': max(latencias) if latencias else None,
+        }
+
+def configurar_terminal(fd, baud):
+    """
+    Coloca o terminal em modo bruto (sem eco nem tradução de CR/LF) na velocidade indicada
+
+    Raises:
+        ValueError: Se a velocidade não for suportada pelo termios
+    """
+    tty.setraw(fd)
+    velocidade = getattr(termios, f"B{baud}", None)
+    if velocidade is None:
+        raise ValueError(f"velocidade não suportada: {baud}")
+    atributos = termios.tcgetattr(fd)
+    atributos[4] = atributos[5] = velocidade
+    termios.tcsetattr(fd, termios.TCSANOW, atributos)
+
+async def abrir_serial(caminho, baud):
+    """
+    Abre a porta serial (ou o pseudo-terminal) como um StreamReader do asyncio
+
+    Args:
+        caminho (str): Dispositivo (ex.: /dev/ttyACM0)
+        baud (int): Velocidade
+
+    Returns:
+        tuple: (asyncio.StreamReader, transporte do asyncio)
+    """
+    if termios is None:
+        raise RuntimeError("o coletor requer um sistema Unix (termios)")
+    fd = os.open(caminho, os.O_RDONLY | os.O_NOCTTY | os.O_NONBLOCK)
+    configurar_terminal(fd, baud)
+    leitor = asyncio.StreamReader()
+    laco = asyncio.get_running_loop()
+    transporte, _ = await laco.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(leitor),
+                                                 os.fdopen(fd, 'rb', buffering=0))
+    return leitor, transporte
+
+async def coletar(leitor, coletor, tempo_limite=10.0, captura=None, ao_receber=None):
+    """
+    Lê a serial até receber todos os resultados esperados
+
+    Args:
+        leitor (asyncio.StreamReader): Serial aberta por abrir_serial()
+        coletor (ColetorResultados): Interpretador do fluxo
+        tempo_limite (float): Segundos sem dados antes de desistir
+        captura (file): Arquivo binário opcional que recebe os bytes brutos (para --replay)
+        ao_receber (callable): Chamada com cada registro completado (exibição ao vivo)
+
+    Returns:
+        dict: coletor.relatorio()
+    """
+    while not coletor.completo:
+        try:
+            dados = await asyncio.wait_for(leitor.read(4096), tempo_limite)
+        except asyncio.TimeoutError:
+            break
+        except OSError:
+            break  # Lado mestre do pseudo-terminal fechado (EIO)
+        if not dados:
+            break
+        if captura is not None:
+            captura.write(dados)
+        for registro in coletor.alimentar(dados, time.perf_counter()):
+            if ao_receber is not None:
+                ao_receber(registro)
+    return coletor.relatorio()
+
+class PseudoTerminal:
+    """
+    Par de pseudo-terminal: o coletor lê `caminho` como se fosse a porta do Arduino
+    e o alimentador escreve no lado mestre
+    """
+    def __init__(self):
+        if termios is None:
+            raise RuntimeError("o pseudo-terminal requer um sistema Unix")
+        self.mestre, self.escravo = os.openpty()
+        tty.setraw(self.escravo)  # Sem tradução de CR/LF antes mesmo de o coletor abrir
+        self.caminho = os.ttyname(self.escravo)
+
+    def fechar(self):
+        for fd in (self.mestre, self.escravo):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+def bytes_do_simulador(asm, baud):
+    """
+    Executa o programa no simulador e calcula o instante em que cada byte chega ao host
+
+    O simulador não modela a duração da transmissão (UDRE sempre livre), então
+    cada byte sai no ciclo em que foi escrito em UDR0 ou quando a UART termina
+    o byte anterior, o que vier depois.
+
+    Args:
+        asm (str): Código Assembly (calculadora.asm)
+        baud (int): Velocidade da UART
+
+    Returns:
+        list: Pares (instante em segundos, byte)
+    """
+    from simulador_avr import simular
+    simulador = simular(asm)
+    duracao_byte = BITS_POR_BYTE / baud
+    instantes, livre = [], 0.0
+    for ciclo, byte in zip(simulador.ciclos_uart, simulador.saida_uart):
+        livre = max(ciclo / FREQUENCIA_CPU, livre) + duracao_byte
+        instantes.append((livre, byte))
+    return instantes
+
+def bytes_da_captura(dados, baud):
+    """
+    Instantes de chegada de uma captura bruta, transmitida sem pausas na velocidade indicada
+
+    Returns:
+        list: Pares (instante em segundos, byte)
+    """
+    duracao_byte = BITS_POR_BYTE / baud
+    return [((i + 1) * duracao_byte, byte) for i, byte in enumerate(dados)]
+
+async def alimentar_pty(mestre, instantes, escala=1.0):
+    """
+    Escreve os bytes no lado mestre do pseudo-terminal, respeitando os instantes
+
+    Args:
+        mestre (int): Descritor do lado mestre
+        instantes (list): Pares (instante em segundos, byte)
+        escala (float): Multiplica os instantes (0: tudo de uma vez, 1: tempo real)
+    """
+    inicio = time.perf_counter()
+    lote = bytearray()
+    for instante, byte in instantes:
+        espera = inicio + instante * escala - time.perf_counter()
+        if espera > 0.001 and lote:
+            os.write(mestre, lote)
+            lote.clear()
+        if espera > 0.001:
+            await asyncio.sleep(espera)
+        lote.append(byte)
+    if lote:
+        os.write(mestre, lote)
+
+def formatar_relatorio(relatorio):
+    """
+    Formata o relatório da coleta em texto
+
+    Args:
+        relatorio (dict): Retorno de ColetorResultados.relatorio()
+
+    Returns:
+        str: Tabela pronta para impressão
+    """
+    saida = ["Linha  Chegada(ms)  Latência(ms)  Recebido      Esperado      Expressão"]
+    for registro in relatorio['linhas']:
+        marca = "" if registro['confere'] else "  <- DIVERGE"
+        saida.append(f"{registro['linha']:>5} {registro['instante_ms']:>12.1f} {registro['latencia_ms']:>13.1f}  "
+                     f"{registro['recebido']:<13} {registro['esperado']:<13} {registro['expressao']}{marca}")
+    saida.append("")
+    saida.append(f"{len(relatorio['linhas'])} resultados, {len(relatorio['divergentes'])} divergentes, "
+                 f"{len(relatorio['faltando'])} sem resposta, {len(relatorio['erros_geracao'])} linhas com erro na geração")
+    if relatorio['linhas_por_s']:
+        saida.append(f"{relatorio['bytes']} bytes em {relatorio['duracao_s'] * 1000:.1f} ms: "
+                     f"{relatorio['linhas_por_s']:.1f} linhas/s, {relatorio['bytes_por_s']:.0f} bytes/s, "
+                     f"latência média {relatorio['latencia_media_ms']:.1f} ms (máx. {relatorio['latencia_max_ms']:.1f} ms)")
+    if relatorio['faltando']:
+        saida.append(f"Sem resposta: linhas {', '.join(map(str, relatorio['faltando']))}")
+    for linha in relatorio['ignoradas']:
+        saida.append(f"Aviso: linha recebida sem expressão correspondente: {linha}")
+    return "\n".join(saida)
+
+async def executar(args, esperados):
+    """
+    Abre a fonte escolhida (porta, simulador ou captura) e coleta os resultados
+
+    Returns:
+        dict: Relatório da coleta
+    """
+    pty, alimentador, captura = None, None, None
+    if args.porta:
+        caminho = args.porta
+    else:
+        if args.simular:
+            with open(args.simular, 'r') as arquivo:
+                instantes = bytes_do_simulador(arquivo.read(), args.baud)
+        else:
+            with open(args.replay, 'rb') as arquivo:
+                instantes = bytes_da_captura(arquivo.read(), args.baud)
+        pty = PseudoTerminal()
+        caminho = pty.caminho
+    leitor, transporte = await abrir_serial(caminho, args.baud)
+    try:
+        if pty is not None:
+            alimentador = asyncio.create_task(alimentar_pty(pty.mestre, instantes, args.escala))
+        if args.gravar:
+            captura = open(args.gravar, 'wb')
+        ao_receber = None if args.json else lambda r: print(
+            f"{r['linha']:>5} {r['expressao']} = {r['recebido']}" + ("" if r['confere'] else "  <- DIVERGE"))
+        coletor = ColetorResultados(esperados)
+        return await coletar(leitor, coletor, args.timeout, captura, ao_receber)
+    finally:
+        transporte.close()
+        if alimentador is not None:
+            alimentador.cancel()
+        if captura is not None:
+            captura.close()
+        if pty is not None:
+            pty.fechar()
+
+def main():
+    """
+    Função principal: coleta os resultados e imprime o relatório
+    """
+    parser = argparse.ArgumentParser(description="Coleta e confere os resultados enviados pela calculadora")
+    parser.add_argument('expressoes', help="arquivo de expressões usado para gerar o calculadora.asm")
+    fonte = parser.add_mutually_exclusive_group(required=True)
+    fonte.add_argument('--porta', help="porta serial do Arduino (ex.: /dev/ttyACM0)")
+    fonte.add_argument('--simular', metavar='ASM', help="executa o Assembly no simulador, via pseudo-terminal")
+    fonte.add_argument('--replay', metavar='CAPTURA', help="reenvia uma captura bruta, via pseudo-terminal")
+    parser.add_argument('--baud', type=int, default=9600, help="velocidade da UART (padrão 9600)")
+    parser.add_argument('--numerico', default='half', choices=['half'] + list(rpn_final.FORMATOS_PONTO_FIXO),
+                        help="formato usado na geração (padrão half)")
+    parser.add_argument('--escala', type=float, default=1.0,
+                        help="ritmo do pseudo-terminal: 1 = tempo real, 0 = sem pausas (padrão 1)")
+    parser.add_argument('--timeout', type=float, default=10.0, help="segundos sem dados antes de desistir")
+    parser.add_argument('--gravar', metavar='CAPTURA', help="grava os bytes recebidos (para --replay)")
+    parser.add_argument('--json', action='store_true', help="exporta o relatório em JSON")
+    args = parser.parse_args()
+
+    esperados = resultados_esperados(rpn_final.read_expressions_file(args.expressoes), args.numerico)
+    relatorio = asyncio.run(executar(args, esperados))
+    if args.json:
+        print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+    else:
+        print()
+        print(formatar_relatorio(relatorio))
+    if relatorio['divergentes'] or relatorio['faltando']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Comparação de velocidade e precisão entre os formatos numéricos da calculadora
+
+Para cada operador, sorteia pares de operandos e compara os backends
+half-precision (IEEE 754) e ponto fixo (Q8.8 e Q16.16):
+
+- Precisão: resultado do avaliador Python de cada formato (o mesmo que a
+  geração usa para imprimir os resultados) contra o cálculo exato em float64.
+- Velocidade: ciclos gastos pela rotina Assembly de cada formato, medidos no
+  simulador (simulador_avr.py), e se o valor calculado pelo Arduino confere
+  com o avaliador Python.
+
+Com --texto-half, confere a rotina uart_envia_half (impressão de um
+half-precision no Arduino) com a tabela de textos usada pelo gerador.
+
+Uso:
+    python comparar_numericos.py [-n 200] [--intervalo 100] [--semente 1] [-Os|-O2] [--json]
+    python comparar_numericos.py --texto-half [PASSO]
+"""
+import io       # Para gerar as rotinas Assembly em memória
+import json     # Para exportar a comparação em JSON
+import math     # Para descartar resultados não finitos
+import random   # Para sortear os operandos
+import argparse # Para interpretar as opções da linha de comando
+
+import rpn_final
+from simulador_avr import montar, Simulador, ErroSimulacao
+
+OPERADORES = ['+', '-', '*', '|', '%', '^']
+
+# Cálculo exato (float64) de cada operador
+EXATO = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '|': lambda a, b: a / b,
+    '%': lambda a, b: a % b,
+    '^': lambda a, b: a ** b,
+}
+
+# Avaliador Python e rotina Assembly do formato half-precision
+HALF = {
+    '+': (rpn_final.add_half_precision, 'half_add'),
+    '-': (rpn_final.sub_half_precision, 'half_subtract'),
+    '*': (rpn_final.mul_half_precision, 'half_multiply'),
+    '|': (rpn_final.div_half_precision, 'half_divide'),
+    '%': (rpn_final.mod_half_precision, 'half_modulo'),
+    '^': (rpn_final.power_half_precision, 'half_power'),
+}
+
+# Avaliador Python e sufixo da rotina Assembly dos formatos de ponto fixo
+PONTO_FIXO = {
+    '+': (rpn_final.add_fixed_point, 'add'),
+    '-': (rpn_final.sub_fixed_point, 'subtract'),
+    '*': (rpn_final.mul_fixed_point, 'multiply'),
+    '|': (rpn_final.div_fixed_point, 'divide'),
+    '%': (rpn_final.mod_fixed_point, 'modulo'),
+    '^': (rpn_final.power_fixed_point, 'power'),
+}
+
+def sortear_operandos(operador, n, intervalo, gerador):
+    """
+    Sorteia pares de operandos com duas casas decimais
+
+    Na potenciação o expoente é um inteiro de 0 a 4 e a base fica limitada a
+    um décimo do intervalo, para que a maioria dos resultados seja representável.
+
+    Args:
+        operador (str): Operador
+        n (int): Quantidade de pares
+        intervalo (float): Os operandos ficam entre -intervalo e +intervalo
+        gerador (random.Random): Gerador de números aleatórios
+
+    Returns:
+        list: Pares (a, b)
+    """
+    pares = []
+    while len(pares) < n:
+        if operador == '^':
+            a = round(gerador.uniform(-intervalo / 10, intervalo / 10), 2)
+            b = float(gerador.randint(0, 4))
+        else:
+            a = round(gerador.uniform(-intervalo, intervalo), 2)
+            b = round(gerador.uniform(-intervalo, intervalo), 2)
+        if b == 0 and operador in '|%':
+            continue
+        pares.append((a, b))
+    return pares
+
+def montar_rotinas(numerico, otimizacao='Os'):
+    """
+    Monta no simulador as rotinas Assembly de um formato numérico
+
+    Args:
+        numerico (str): 'half', 'q8.8' ou 'q16.16'
+        otimizacao (str): Variante das rotinas: 'Os' ou 'O2'
+
+    Returns:
+        Simulador: Simulador com as rotinas carregadas
+    """
+    if numerico == 'half':
+        rotinas = [rotina for _, rotina in HALF.values()]
+    else:
+        bits = sum(rpn_final.FORMATOS_PONTO_FIXO[numerico])
+        rotinas = [f"fixed{bits}_{sufixo}" for _, sufixo in PONTO_FIXO.values()]
+    texto = io.StringIO()
+    rpn_final.adicionar_cabecalho(texto, numerico=numerico)  # Definições dos registradores de I/O
+    rpn_final.ligar_rotinas(texto, rotinas + ['uart_envia_byte'], otimizacao)  # uart_envia_byte: usada pelo cabeçalho
+    return Simulador(montar(texto.getvalue()))
+
+def avaliar_half(operador, a, b, simulador):
+    """
+    Calcula uma operação em half-precision no Python e no simulador
+
+    Returns:
+        tuple: (resultado Python, ciclos, resultado do Arduino confere)
+    """
+    func, rotina = HALF[operador]
+    ha, hb = rpn_final.float_to_half_ieee754(a), rpn_final.float_to_half_ieee754(b)
+    esperado = func(ha, hb)
+    ciclos = simulador.chamar(rotina, {16: ha, 17: ha >> 8, 18: hb, 19: hb >> 8})
+    obtido = simulador.r[16] | (simulador.r[17] << 8)
+    return rpn_final.half_ieee754_to_float(esperado), ciclos, obtido == esperado
+
+def avaliar_ponto_fixo(operador, a, b, formato, simulador):
+    """
+    Calcula uma operação em ponto fixo no Python e no simulador
+
+    Returns:
+        tuple: (resultado Python, ciclos, resultado do Arduino confere)
+
+    Raises:
+        OverflowError: Se um operando ou o resultado estiver fora do intervalo
+        ValueError: Se o expoente não for um inteiro não negativo
+    """
+    func, sufixo = PONTO_FIXO[operador]
+    bits = sum(rpn_final.FORMATOS_PONTO_FIXO[formato])
+    fa = rpn_final.float_to_fixed_point(a, formato)
+    fb = rpn_final.float_to_fixed_point(b, formato)
+    esperado = func(fa, fb, formato)
+    registradores = {16 + i: fa >> (8 * i) for i in range(bits // 8)}
+    registradores.update({(18 if bits == 16 else 20) + i: fb >> (8 * i) for i in range(bits // 8)})
+    ciclos = simulador.chamar(f"fixed{bits}_{sufixo}", registradores)
+    obtido = sum(simulador.r[16 + i] << (8 * i) for i in range(bits // 8))
+    return rpn_final.fixed_point_to_float(esperado, formato), ciclos, obtido == esperado & ((1 << bits) - 1)
+
+def comparar(n=200, intervalo=100.0, semente=1, otimizacao='Os'):
+    """
+    Compara os formatos numéricos para cada operador
+
+    Args:
+        n (int): Pares de operandos por operador
+        intervalo (float): Os operandos ficam entre -intervalo e +intervalo
+        semente (int): Semente do sorteio (resultados reproduzíveis)
+        otimizacao (str): Variante das rotinas: 'Os' ou 'O2'
+
+    Returns:
+        dict: {operador: {formato: estatísticas}}
+    """
+    gerador = random.Random(semente)
+    formatos = ['half'] + list(rpn_final.FORMATOS_PONTO_FIXO)
+    simuladores = {formato: montar_rotinas(formato, otimizacao) for formato in formatos}
+    comparacao = {}
+    for operador in OPERADORES:
+        pares = sortear_operandos(operador, n, intervalo, gerador)
+        comparacao[operador] = {}
+        for formato in formatos:
+            erros_abs, erros_rel, ciclos, fora, divergentes, falhas = [], [], [], 0, 0, 0
+            for a, b in pares:
+                try:
+                    exato = EXATO[operador](a, b)
+                except (OverflowError, ZeroDivisionError):
+                    continue
+                try:
+                    if formato == 'half':
+                        valor, gastos, confere = avaliar_half(operador, a, b, simuladores[formato])
+                    else:
+                        valor, gastos, confere = avaliar_ponto_fixo(operador, a, b, formato, simuladores[formato])
+                except (OverflowError, ValueError):
+                    fora += 1  # A geração recusaria esta operação
+                    continue
+                except ErroSimulacao:
+                    falhas += 1  # Rotina não terminou (laço ou acesso inválido)
+                    simuladores[formato] = montar_rotinas(formato, otimizacao)
+                    continue
+                ciclos.append(gastos)
+                divergentes += not confere
+                if not math.isfinite(valor):
+                    fora += 1
+                    continue
+                erros_abs.append(abs(valor - exato))
+                if exato != 0:
+                    erros_rel.append(abs(valor - exato) / abs(exato))
+            comparacao[operador][formato] = {
+                'n': len(pares),
+                'fora_do_intervalo': fora,
+                'erro_abs_medio': sum(erros_abs) / len(erros_abs) if erros_abs else None,
+                'erro_abs_max': max(erros_abs) if erros_abs else None,
+                'erro_rel_medio': sum(erros_rel) / len(erros_rel) if erros_rel else None,
+                'ciclos_medio': sum(ciclos) / len(ciclos) if ciclos else None,
+                'ciclos_max': max(ciclos) if ciclos else None,
+                'arduino_diverge': divergentes,
+                'rotina_falhou': falhas,
+            }
+    return comparacao
+
+def verificar_texto_half(passo=1):
+    """
+    Confere o texto enviado pela rotina uart_envia_half com a tabela do gerador
+
+    Args:
+        passo (int): Intervalo entre os padrões de bits testados (1: todos os 65.536)
+
+    Returns:
+        dict: Quantidade testada, ciclos médio e máximo e os padrões divergentes
+    """
+    texto = io.StringIO()
+    rpn_final.adicionar_cabecalho(texto)
+    rpn_final.ligar_rotinas(texto, ['uart_envia_half', 'uart_envia_byte'])
+    simulador = Simulador(montar(texto.getvalue()))
+    tabela = rpn_final.tabela_texto_half()
+    ciclos, divergentes = [], []
+    for h in range(0, 0x10000, passo):
+        simulador.saida_uart.clear()
+        ciclos.append(simulador.chamar('uart_envia_half', {16: h, 17: h >> 8}))
+        enviado = simulador.saida_uart.decode('latin-1')
+        if enviado != tabela[h]:
+            divergentes.append({'half': f"0x{h:04X}", 'arduino': enviado, 'tabela': tabela[h]})
+    return {'testados': len(ciclos), 'ciclos_medio': sum(ciclos) / len(ciclos), 'ciclos_max': max(ciclos),
+            'divergentes': divergentes}
+
+def formatar_comparacao(comparacao):
+    """
+    Formata a comparação em tabela
+
+    Args:
+        comparacao (dict): Resultado de comparar()
+
+    Returns:
+        str: Tabela pronta para impressão
+    """
+    def numero(valor, formato):
+        return '-' if valor is None else format(valor, formato)
+
+    saida = [f"{'Op':<3} {'Formato':<8} {'Fora':>5} {'Erro abs médio':>15} {'Erro abs máx':>13} "
+             f"{'Erro rel médio':>15} {'Ciclos médio':>13} {'Ciclos máx':>11} {'Diverge':>8}"]
+    for operador, formatos in comparacao.items():
+        for formato, dados in formatos.items():
+            diverge = dados['arduino_diverge'] + dados['rotina_falhou']
+            saida.append(f"{operador:<3} {formato:<8} {dados['fora_do_intervalo']:>5} "
+                         f"{numero(dados['erro_abs_medio'], '.3g'):>15} {numero(dados['erro_abs_max'], '.3g'):>13} "
+                         f"{numero(dados['erro_rel_medio'], '.3g'):>15} {numero(dados['ciclos_medio'], '.1f'):>13} "
+                         f"{numero(dados['ciclos_max'], 'd'):>11} {diverge:>8}")
+    saida.append("")
+    saida.append("Fora: operações recusadas na geração (operando ou resultado fora do intervalo do formato)")
+    saida.append("Diverge: operações em que a rotina do Arduino (simulada) não reproduz o avaliador Python")
+    return "\n".join(saida)
+
+def main():
+    """
+    Função principal: compara os formatos e imprime a tabela
+    """
+    parser = argparse.ArgumentParser(description="Compara velocidade e precisão dos formatos half, Q8.8 e Q16.16")
+    parser.add_argument('-n', type=int, default=200, help="pares de operandos por operador (padrão 200)")
+    parser.add_argument('--intervalo', type=float, default=100.0,
+                        help="operandos entre -INTERVALO e +INTERVALO (padrão 100)")
+    parser.add_argument('--semente', type=int, default=1, help="semente do sorteio (padrão 1)")
+    parser.add_argument('-O', dest='otimizacao', choices=['s', '2'], default='s',
+                        help="variante das rotinas: -Os (padrão) ou -O2")
+    parser.add_argument('--json', action='store_true', help="exporta a comparação em JSON")
+    parser.add_argument('--texto-half', type=int, nargs='?', const=1, metavar='PASSO',
+                        help="confere a impressão de half-precision no Arduino (todos os valores ou um a cada PASSO)")
+    args = parser.parse_args()
+
+    if args.texto_half:
+        verificacao = verificar_texto_half(args.texto_half)
+        if args.json:
+            print(json.dumps(verificacao, indent=2, ensure_ascii=False))
+            return
+        print(f"{verificacao['testados']} valores, {len(verificacao['divergentes'])} divergentes, "
+              f"{verificacao['ciclos_medio']:.0f} ciclos em média ({verificacao['ciclos_max']} no máximo)")
+        for divergente in verificacao['divergentes'][:20]:
+            print(f"{divergente['half']}: Arduino '{divergente['arduino']}', tabela '{divergente['tabela']}'")
+        return
+
+    comparacao = comparar(args.n, args.intervalo, args.semente, 'O' + args.otimizacao)
+    if args.json:
+        print(json.dumps(comparacao, indent=2, ensure_ascii=False))
+    else:
+        print(formatar_comparacao(comparacao))
+
+if __name__ == "__main__":
+    main()
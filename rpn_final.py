@@ -15,6 +15,17 @@ Grupo 04
 import sys  # Para acessar argumentos da linha de comando
 import re   # Para usar expressões regulares
 import math # Para operações matemáticas
+import time # Para medir o tempo de cada fase (--profile)
+import json # Para exportar o relatório de perfil
+import argparse # Para interpretar as opções da linha de comando
+import os   # Para caminhos e arquivos do modo em lote
+import hashlib # Para detectar entradas inalteradas (hash do conteúdo)
+import io   # Para capturar o fragmento Assembly de cada linha
+import sqlite3 # Para o cache de fragmentos em disco
+import mmap   # Para ler arquivos grandes sem copiá-los para a memória
+from concurrent.futures import ProcessPoolExecutor # Para gerar vários arquivos em paralelo
+from collections import Counter # Para contar operações por operador/rotina
+from decimal import Decimal # Para os valores exatos dos intervalos paramétricos
 
 def float_to_half_ieee754(f):
     """
@@ -131,6 +142,49 @@ def mul_half_precision(a, b):
     fa, fb = half_ieee754_to_float(a), half_ieee754_to_float(b)
     return float_to_half_ieee754(fa * fb)
 
+def fma_half_precision(a, b, c):
+    """
+    Multiplicação seguida de soma (a * b + c) com um único arredondamento
+
+    Referência da rotina half_fma: o produto exato (até 22 bits de mantissa) é
+    somado a c sem ser arredondado, e só a soma é arredondada para
+    half-precision, para o mais próximo com empates longe do zero (a regra de
+    float_to_half_ieee754). Resultado exatamente zero é +0; abaixo do menor
+    desnormalizado o resultado é zero com o sinal da soma; acima do maior
+    número finito, infinito. Com infinito ou NaN nos operandos, o resultado é
+    o da conta em float (NaN sempre 0x7E00).
+
+    Args:
+        a (int): Primeiro fator em formato half-precision
+        b (int): Segundo fator em formato half-precision
+        c (int): Parcela somada ao produto em formato half-precision
+
+    Returns:
+        int: Resultado em formato half-precision
+    """
+    if any((h >> 10) & 0x1F == 31 for h in (a, b, c)):
+        fa, fb, fc = half_ieee754_to_float(a), half_ieee754_to_float(b), half_ieee754_to_float(c)
+        return float_to_half_ieee754(fa * fb + fc)
+
+    # Mantissa inteira e expoente de cada operando: valor = sinal * mantissa * 2^(expoente - 25)
+    def componentes(h):
+        expoente, mantissa = (h >> 10) & 0x1F, h & 0x3FF
+        if expoente: mantissa |= 0x400  # Bit implícito dos normalizados
+        return -mantissa if h & 0x8000 else mantissa, max(expoente, 1)
+    (ma, ea), (mb, eb), (mc, ec) = componentes(a), componentes(b), componentes(c)
+
+    # Soma exata em unidades de 2^-48 (o menor produto de desnormalizados)
+    soma = ma * mb * 2 ** (ea + eb - 2) + mc * 2 ** (ec + 23)
+    if soma == 0: return 0x0000
+    sinal, soma = (0x8000, -soma) if soma < 0 else (0, soma)
+
+    # Arredondar na posição do último bit da mantissa (2^-24 nos desnormalizados)
+    deslocamento = max(soma.bit_length() - 11, 24)
+    mantissa = (soma + (1 << (deslocamento - 1))) >> deslocamento
+    # Expoente e mantissa somados: o vai-um do arredondamento passa para o expoente
+    resultado = ((deslocamento - 23) << 10) + mantissa - 0x400
+    return sinal | min(resultado, 0x7C00)
+
 def div_half_precision(a, b):
     """
     Divisão de dois números em formato IEEE 754 half-precision
@@ -180,6 +234,386 @@ def mod_half_precision(a, b):
     if fb == 0: return 0x7E00  # NaN
     return float_to_half_ieee754(fa % fb)
 
+def texto_half_ieee754(h):
+    """
+    Texto decimal mais curto que volta ao mesmo valor half-precision
+    
+    Os inteiros são escritos por extenso (como antes); nos demais valores os
+    dígitos da fração são gerados um a um até que o texto identifique o valor,
+    isto é, fique a menos de meio passo (ULP) dele (algoritmo de Steele e White).
+    Usa apenas inteiros de 32 bits, como a rotina uart_envia_half do Arduino,
+    que produz exatamente o mesmo texto.
+    
+    Args:
+        h (int): Valor de 16 bits em formato IEEE 754 half-precision
+        
+    Returns:
+        str: Texto do valor (sem expoente; 'inf', '-inf' ou 'nan' nos casos especiais)
+    """
+    sinal = '-' if h & 0x8000 else ''
+    expoente = (h >> 10) & 0x1F
+    mantissa = h & 0x3FF
+    if expoente == 31: return 'nan' if mantissa else sinal + 'inf'
+    if expoente == 0 and mantissa == 0: return '0'
+    
+    # Valor = significando * 2^(e - 25), com e >= 1 (desnormalizados: e = 1, sem o bit implícito)
+    significando = mantissa | 0x400 if expoente else mantissa
+    e = max(expoente, 1)
+    if e >= 25: return sinal + str(significando << (e - 25))
+    inteiro = significando >> (25 - e)
+    
+    # Fração e margens em unidades de 2^-25: a margem é meio ULP (ULP = 2^e),
+    # e abaixo de uma potência de 2 o ULP é a metade
+    escala = 1 << 25
+    fracao = (significando << e) & (escala - 1)
+    if fracao == 0: return sinal + str(inteiro)
+    margem_acima = 1 << (e - 1)
+    margem_abaixo = margem_acima >> 1 if mantissa == 0 and expoente > 1 else margem_acima
+    par = significando % 2 == 0  # Empate na fronteira arredonda para a mantissa par
+    digitos = ''
+    while True:
+        fracao, margem_acima, margem_abaixo = fracao * 10, margem_acima * 10, margem_abaixo * 10
+        digito, fracao = fracao >> 25, fracao & (escala - 1)
+        baixo = fracao < margem_abaixo + par
+        alto = fracao + margem_acima - (not par) >= escala
+        if not baixo and not alto:
+            digitos += str(digito)
+            continue
+        # Último dígito: o mais próximo do valor (no empate, o dígito par)
+        if alto and (not baixo or 2 * fracao > escala or (2 * fracao == escala and digito % 2)):
+            digito += 1
+        return f"{sinal}{inteiro}.{digitos}{digito}"
+
+def tabela_texto_half():
+    """
+    Tabela com o texto de cada um dos 65.536 padrões de bits half-precision
+    
+    Construída na primeira chamada e reaproveitada depois; a impressão de um
+    resultado passa a ser apenas uma consulta pelo padrão de bits.
+    
+    Returns:
+        tuple: texto_half_ieee754(h) para h de 0 a 0xFFFF
+    """
+    global _TABELA_TEXTO_HALF
+    if _TABELA_TEXTO_HALF is None:
+        _TABELA_TEXTO_HALF = tuple(texto_half_ieee754(h) for h in range(0x10000))
+    return _TABELA_TEXTO_HALF
+
+_TABELA_TEXTO_HALF = None
+
+# Formatos de ponto fixo disponíveis (--numerico): (bits da parte inteira com sinal, bits da fração)
+FORMATOS_PONTO_FIXO = {
+    'q8.8': (8, 8),     # 16 bits: -128 a 127.99609375, passo 1/256
+    'q16.16': (16, 16), # 32 bits: -32768 a 32767.99998, passo 1/65536
+}
+
+def _limites_ponto_fixo(formato):
+    """
+    Retorna os bits da fração e o intervalo dos valores brutos de um formato de ponto fixo
+    
+    Args:
+        formato (str): 'q8.8' ou 'q16.16'
+        
+    Returns:
+        tuple: (bits da fração, menor valor bruto, maior valor bruto)
+    """
+    inteiros, fracao = FORMATOS_PONTO_FIXO[formato]
+    total = inteiros + fracao
+    return fracao, -(1 << (total - 1)), (1 << (total - 1)) - 1
+
+def _verificar_ponto_fixo(valor, formato):
+    """
+    Verifica se um valor bruto cabe no formato de ponto fixo
+    
+    Args:
+        valor (int): Valor bruto (inteiro com sinal)
+        formato (str): 'q8.8' ou 'q16.16'
+        
+    Returns:
+        int: O próprio valor
+        
+    Raises:
+        OverflowError: Se o valor estiver fora do intervalo do formato
+    """
+    _, minimo, maximo = _limites_ponto_fixo(formato)
+    if not minimo <= valor <= maximo:
+        raise OverflowError(f"estouro do formato {formato.upper()}")
+    return valor
+
+def float_to_fixed_point(f, formato):
+    """
+    Converte um número float para ponto fixo (arredondando para o valor mais próximo)
+    
+    Args:
+        f (float): Número a ser convertido
+        formato (str): 'q8.8' ou 'q16.16'
+        
+    Returns:
+        int: Valor bruto em ponto fixo (inteiro com sinal)
+        
+    Raises:
+        OverflowError: Se o número estiver fora do intervalo do formato
+    """
+    fracao, _, _ = _limites_ponto_fixo(formato)
+    if math.isnan(f) or math.isinf(f):
+        raise OverflowError(f"{f} não é representável em {formato.upper()}")
+    return _verificar_ponto_fixo(math.floor(f * (1 << fracao) + 0.5), formato)
+
+def fixed_point_to_float(valor, formato):
+    """
+    Converte um valor bruto em ponto fixo para float
+    
+    Args:
+        valor (int): Valor bruto em ponto fixo
+        formato (str): 'q8.8' ou 'q16.16'
+        
+    Returns:
+        float: Número convertido (exato)
+    """
+    fracao, _, _ = _limites_ponto_fixo(formato)
+    return valor / (1 << fracao)
+
+def add_fixed_point(a, b, formato):
+    """
+    Soma dois números em ponto fixo
+    
+    Args:
+        a (int): Primeiro operando (valor bruto)
+        b (int): Segundo operando (valor bruto)
+        formato (str): 'q8.8' ou 'q16.16'
+        
+    Returns:
+        int: Resultado da soma (valor bruto)
+    """
+    return _verificar_ponto_fixo(a + b, formato)
+
+def sub_fixed_point(a, b, formato):
+    """
+    Subtração de dois números em ponto fixo
+    
+    Args:
+        a (int): Primeiro operando (valor bruto)
+        b (int): Segundo operando (valor bruto)
+        formato (str): 'q8.8' ou 'q16.16'
+        
+    Returns:
+        int: Resultado da subtração (valor bruto)
+    """
+    return _verificar_ponto_fixo(a - b, formato)
+
+def mul_fixed_point(a, b, formato):
+    """
+    Multiplicação em ponto fixo (produto completo deslocado, arredondado para baixo)
+    
+    Args:
+        a (int): Primeiro operando (valor bruto)
+        b (int): Segundo operando (valor bruto)
+        formato (str): 'q8.8' ou 'q16.16'
+        
+    Returns:
+        int: Resultado da multiplicação (valor bruto)
+    """
+    fracao, _, _ = _limites_ponto_fixo(formato)
+    return _verificar_ponto_fixo((a * b) >> fracao, formato)
+
+def div_fixed_point(a, b, formato):
+    """
+    Divisão real em ponto fixo (truncada em direção a zero)
+    
+    Args:
+        a (int): Dividendo (valor bruto)
+        b (int): Divisor (valor bruto)
+        formato (str): 'q8.8' ou 'q16.16'
+        
+    Returns:
+        int: Resultado da divisão (valor bruto)
+        
+    Raises:
+        ZeroDivisionError: Se o divisor for zero
+    """
+    fracao, _, _ = _limites_ponto_fixo(formato)
+    quociente = (abs(a) << fracao) // abs(b)
+    return _verificar_ponto_fixo(-quociente if (a < 0) != (b < 0) else quociente, formato)
+
+def power_fixed_point(a, b, formato):
+    """
+    Potenciação em ponto fixo por multiplicações sucessivas
+    
+    Args:
+        a (int): Base (valor bruto)
+        b (int): Expoente (valor bruto; deve ser um inteiro não negativo)
+        formato (str): 'q8.8' ou 'q16.16'
+        
+    Returns:
+        int: Resultado da potenciação (valor bruto)
+        
+    Raises:
+        ValueError: Se o expoente não for um inteiro não negativo
+    """
+    fracao, _, _ = _limites_ponto_fixo(formato)
+    if b < 0 or b & ((1 << fracao) - 1):
+        raise ValueError("o expoente deve ser um inteiro não negativo")
+    resultado = 1 << fracao
+    for _ in range(b >> fracao):
+        resultado = mul_fixed_point(resultado, a, formato)
+    return resultado
+
+def mod_fixed_point(a, b, formato):
+    """
+    Operação de módulo em ponto fixo (resto com o sinal do divisor)
+    
+    Args:
+        a (int): Primeiro operando (valor bruto)
+        b (int): Segundo operando (valor bruto)
+        formato (str): 'q8.8' ou 'q16.16'
+        
+    Returns:
+        int: Resultado do módulo (valor bruto)
+        
+    Raises:
+        ZeroDivisionError: Se o divisor for zero
+    """
+    return a % b
+
+def floordiv_fixed_point(a, b, formato):
+    """
+    Divisão inteira em ponto fixo (operador /): os operandos são truncados
+    para inteiros e o quociente é arredondado para baixo, como int(a) // int(b)
+    
+    Args:
+        a (int): Dividendo (valor bruto)
+        b (int): Divisor (valor bruto)
+        formato (str): 'q8.8' ou 'q16.16'
+        
+    Returns:
+        int: Resultado da divisão inteira (valor bruto)
+        
+    Raises:
+        ZeroDivisionError: Se a parte inteira do divisor for zero
+    """
+    fracao, _, _ = _limites_ponto_fixo(formato)
+    inteiro_a = abs(a) >> fracao if a >= 0 else -(abs(a) >> fracao)
+    inteiro_b = abs(b) >> fracao if b >= 0 else -(abs(b) >> fracao)
+    return _verificar_ponto_fixo((inteiro_a // inteiro_b) << fracao, formato)
+
+class Perfilador:
+    """
+    Instrumentação da geração de código (opção --profile)
+
+    Registra o tempo de parede de cada fase (leitura do arquivo, parse das
+    expressões, conversões float/half e escrita do Assembly), conta as operações
+    por operador e por rotina half_* e guarda quantos bytes foram emitidos por linha.
+
+    As funções recebem o perfilador como parâmetro opcional (perfil=None) e só
+    chamam os ganchos quando ele existe, então o custo com a opção desligada é
+    apenas um teste `perfil is not None`.
+    """
+    FASES = ('leitura', 'parse', 'conversao', 'escrita')
+
+    def __init__(self):
+        self.tempos = dict.fromkeys(self.FASES, 0.0)  # Segundos acumulados por fase
+        self.operadores = Counter()  # Operações por operador ('+', '-', ...)
+        self.rotinas = Counter()     # Chamadas geradas por rotina (half_add, ...)
+        self.bytes_por_linha = []    # Lista de (expressão, bytes emitidos)
+
+    def acumula(self, fase, inicio):
+        """
+        Soma à fase o tempo decorrido desde `inicio`
+
+        Args:
+            fase (str): Nome da fase (uma de Perfilador.FASES)
+            inicio (float): Valor de time.perf_counter() no começo do trecho
+        """
+        self.tempos[fase] += time.perf_counter() - inicio
+
+    def conta_operacao(self, operador, rotina):
+        """
+        Conta uma operação gerada
+
+        Args:
+            operador (str): Operador RPN
+            rotina (str): Rotina Assembly chamada para o operador
+        """
+        self.operadores[operador] += 1
+        self.rotinas[rotina] += 1
+
+    def registra_linha(self, expressao, n_bytes):
+        """
+        Registra quantos bytes de Assembly foram emitidos para uma linha
+
+        Args:
+            expressao (str): Expressão original da linha
+            n_bytes (int): Bytes escritos no arquivo para a linha
+        """
+        self.bytes_por_linha.append((expressao, n_bytes))
+
+    def resumo(self):
+        """
+        Retorna os dados coletados em um dicionário (serializável em JSON)
+
+        Returns:
+            dict: Tempos por fase, contadores e bytes por linha
+        """
+        total_bytes = sum(n for _, n in self.bytes_por_linha)
+        return {
+            'tempos_s': dict(self.tempos),
+            'operadores': dict(self.operadores),
+            'rotinas': dict(self.rotinas),
+            'linhas': len(self.bytes_por_linha),
+            'bytes_total': total_bytes,
+            'bytes_por_linha': [{'expressao': e, 'bytes': n} for e, n in self.bytes_por_linha],
+        }
+
+    def relatorio(self, formato='tabela'):
+        """
+        Formata o resumo como tabela de texto ou JSON
+
+        Args:
+            formato (str): 'tabela' ou 'json'
+
+        Returns:
+            str: Relatório pronto para impressão
+        """
+        if formato == 'json':
+            return json.dumps(self.resumo(), indent=2, ensure_ascii=False)
+
+        total = sum(self.tempos.values()) or 1.0
+        saida = ["Fase         Tempo (ms)      %"]
+        for fase in self.FASES:
+            saida.append(f"{fase:<12} {self.tempos[fase] * 1000:>10.3f} {self.tempos[fase] / total * 100:>6.1f}")
+        saida.append("")
+        saida.append("Operador     Operações")
+        for operador, n in self.operadores.most_common():
+            saida.append(f"{operador:<12} {n:>9}")
+        saida.append("")
+        saida.append("Rotina           Chamadas")
+        for rotina, n in self.rotinas.most_common():
+            saida.append(f"{rotina:<16} {n:>8}")
+        saida.append("")
+        n_linhas = len(self.bytes_por_linha)
+        total_bytes = sum(n for _, n in self.bytes_por_linha)
+        maior = max((n for _, n in self.bytes_por_linha), default=0)
+        media = total_bytes / n_linhas if n_linhas else 0
+        saida.append(f"Bytes emitidos: {total_bytes} em {n_linhas} linhas (média {media:.1f}, máximo {maior})")
+        return "\n".join(saida)
+
+class _SaidaMedida:
+    """
+    Envolve o arquivo de saída contando bytes e tempo gasto em write()
+
+    Usada apenas quando o perfilador está ativo.
+    """
+    def __init__(self, destino, perfil):
+        self.destino = destino
+        self.perfil = perfil
+        self.bytes = 0
+
+    def write(self, texto):
+        inicio = time.perf_counter()
+        self.destino.write(texto)
+        self.perfil.acumula('escrita', inicio)
+        self.bytes += len(texto.encode('utf-8'))
+
 def read_expressions_file(filename):
     """
     Lê expressões RPN de um arquivo de texto.
@@ -200,7 +634,292 @@ def read_expressions_file(filename):
         print(f"Erro: Arquivo '{filename}' não encontrado.")
         sys.exit(1)  # Encerra o programa com código de erro
 
-def resolve(expressao, memoria, ultimo_resultado, file, k):
+# Padrões da leitura por mmap (sobre bytes, aplicados direto no arquivo mapeado).
+# Cada fim de linha vira um elemento, para que um bloco inteiro do arquivo seja
+# separado de uma vez; qualquer outro texto (MEM, RES, letras) vira um elemento
+# próprio, que manda a linha pelo caminho comum de evaluate()
+PADRAO_ELEMENTO_BYTES = re.compile(rb'-?[\d.,]+|[()+\-*^/%|\r\n]|[^\s\d.,()+\-*^/%|]+')
+PADRAO_FIM_LINHA_BYTES = re.compile(rb'[\r\n]')
+TAMANHO_BLOCO = 1 << 20  # Bytes separados por chamada (o bloco termina sempre em um fim de linha)
+
+FIM_LINHA = None          # Elemento de fim de linha
+ELEMENTO_ESPECIAL = 'especial'  # Elemento de texto que não é número nem operador
+
+class _TabelaElementos(dict):
+    """
+    Elemento (bytes) -> número (float), operador (str) ou marcador, preenchida conforme aparecem
+    
+    Os números de um arquivo grande se repetem muito; guardando a conversão,
+    a troca de cada elemento pelo seu valor é só uma consulta ao dicionário
+    (feita em C por map()).
+    """
+    LIMITE = 1 << 16  # Elementos guardados; os demais são convertidos a cada vez
+
+    def __missing__(self, elemento):
+        if elemento[:1] not in b'-0123456789.,':
+            valor = ELEMENTO_ESPECIAL
+        else:
+            try:
+                valor = float(elemento.replace(b',', b'.'))
+            except ValueError:
+                valor = elemento.decode()  # Mesmo elemento inválido que resolve() produziria
+        if len(self) < self.LIMITE: self[elemento] = valor
+        return valor
+
+class ArquivoMapeado:
+    """
+    Arquivo de expressões lido por mmap, sem copiar o conteúdo nem criar uma str por linha
+    
+    O arquivo é separado em elementos em blocos de TAMANHO_BLOCO bytes, com os
+    números convertidos direto do buffer; o texto de uma linha só é criado
+    quando necessário. Pode ser usado como iterável de linhas (str) onde as
+    funções esperam uma lista de expressões.
+    """
+    def __init__(self, filename):
+        """
+        Args:
+            filename (str): Arquivo de expressões
+            
+        Raises:
+            OSError: Se o arquivo não puder ser aberto
+        """
+        self.arquivo = open(filename, 'rb')
+        self.elementos = _TabelaElementos({c.encode(): c for c in "()+-*^/%|"})
+        self.elementos.update({b'\r': FIM_LINHA, b'\n': FIM_LINHA})
+        # Arquivo vazio não pode ser mapeado
+        self.buffer = mmap.mmap(self.arquivo.fileno(), 0, access=mmap.ACCESS_READ) \
+            if os.fstat(self.arquivo.fileno()).st_size else b''
+        if hasattr(mmap, 'MADV_SEQUENTIAL') and self.buffer: self.buffer.madvise(mmap.MADV_SEQUENTIAL)
+        self.posicao = (0, 0)  # (número, início) da última linha localizada por texto()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+    def fechar(self):
+        """
+        Libera o mapeamento e fecha o arquivo
+        """
+        if isinstance(self.buffer, mmap.mmap): self.buffer.close()
+        self.arquivo.close()
+
+    def blocos(self):
+        """
+        Divide o arquivo em blocos terminados em fim de linha
+        
+        Yields:
+            tuple: (início, fim) de cada bloco no arquivo
+        """
+        inicio, tamanho = 0, len(self.buffer)
+        while inicio < tamanho:
+            fim_linha = PADRAO_FIM_LINHA_BYTES.search(self.buffer, min(inicio + TAMANHO_BLOCO, tamanho) - 1)
+            fim = fim_linha.end() if fim_linha else tamanho
+            yield inicio, fim
+            inicio = fim
+
+    def liberar(self, fim):
+        """
+        Tira da memória do processo as páginas já lidas (até fim), quando o sistema permite
+        
+        O arquivo continua mapeado: uma página liberada volta a ser lida do
+        disco (ou do cache do sistema) se for acessada de novo.
+        """
+        fim -= fim % mmap.PAGESIZE
+        if hasattr(mmap, 'MADV_DONTNEED') and fim: self.buffer.madvise(mmap.MADV_DONTNEED, 0, fim)
+
+    def linhas(self):
+        """
+        Percorre as linhas não vazias do arquivo, já separadas em elementos
+        
+        Yields:
+            tuple: (número da linha no arquivo, a partir de 0; lista de elementos
+            como os de resolve(), com os números já convertidos). Linhas com
+            ELEMENTO_ESPECIAL precisam do texto (texto()) para serem calculadas
+        """
+        numero = 0
+        for inicio, fim in self.blocos():
+            elementos = list(map(self.elementos.__getitem__, PADRAO_ELEMENTO_BYTES.findall(self.buffer, inicio, fim)))
+            if not elementos or elementos[-1] is not FIM_LINHA: elementos.append(FIM_LINHA)
+            procurar, comeco = elementos.index, 0
+            while comeco < len(elementos):
+                final = procurar(FIM_LINHA, comeco)  # Sempre encontrado: o bloco termina em FIM_LINHA
+                if final > comeco: yield numero, elementos[comeco:final]
+                numero, comeco = numero + 1, final + 1
+            self.liberar(fim)
+
+    def texto(self, numero):
+        """
+        Texto de uma linha, sem os espaços das pontas (os números devem ser crescentes)
+        
+        Args:
+            numero (int): Número da linha no arquivo, como em linhas()
+            
+        Returns:
+            str: Texto da linha
+        """
+        atual, inicio = self.posicao
+        while atual < numero:
+            inicio, atual = PADRAO_FIM_LINHA_BYTES.search(self.buffer, inicio).end(), atual + 1
+        self.posicao = (atual, inicio)
+        fim_linha = PADRAO_FIM_LINHA_BYTES.search(self.buffer, inicio)
+        return self.buffer[inicio:fim_linha.start() if fim_linha else len(self.buffer)].decode('utf-8', 'replace').strip()
+
+    def __iter__(self):
+        for numero, _ in self.linhas():
+            linha = self.texto(numero)
+            if linha: yield linha
+
+def texto_eco(expressao):
+    """
+    Retorna os caracteres da expressão que são enviados (eco) pela UART
+    
+    Args:
+        expressao (str): Expressão original da linha
+        
+    Returns:
+        str: Apenas os caracteres aceitos no eco (números, operadores, espaço, RES/MEM)
+    """
+    return ''.join(char for char in expressao
+                   if char in "()+-*/^%|" or char.isdigit() or char == '.' or char == ' ' or char in "RESM")
+
+# Expressões paramétricas: a mesma expressão calculada para cada valor de uma
+# variável, declarada no fim da linha. Na geração, os valores viram uma tabela na
+# flash lida por um único corpo em laço (ver Calculadora._gerar_laco)
+NUMERO_PARAMETRICA = r'-?(?:\d+(?:[.,]\d*)?|[.,]\d+)'
+PADRAO_PARAMETRICA = re.compile(
+    rf'(?P<expressao>.*?)\s+para\s+(?P<variavel>[a-z_]\w*)\s*'
+    rf'(?:=\s*(?P<inicio>{NUMERO_PARAMETRICA})\s*\.\.\s*(?P<fim>{NUMERO_PARAMETRICA})'
+    rf'(?:\s+passo\s+(?P<passo>{NUMERO_PARAMETRICA}))?'
+    rf'|\s+em\s+(?P<valores>{NUMERO_PARAMETRICA}(?:\s+{NUMERO_PARAMETRICA})*))')
+MAXIMO_VALORES_PARAMETRICA = 65535  # Voltas contadas em 16 bits (Y)
+
+def _texto_decimal(valor):
+    """
+    Texto de um Decimal sem zeros à direita nem expoente ('2.50' -> '2.5', '-0' -> '0')
+    """
+    texto = format(valor, 'f')
+    if '.' in texto: texto = texto.rstrip('0').rstrip('.')
+    return '0' if texto == '-0' else texto
+
+def interpretar_parametrica(linha):
+    """
+    Separa uma expressão paramétrica na expressão, na variável e nos valores
+    
+    A declaração fica no fim da linha:
+    - `(x 3 * 1 +) para x = 1..100`: de 1 a 100, de 1 em 1 (de -1 em -1 se o fim for menor)
+    - `(x 3 * 1 +) para x = 0..10 passo 0,5`: com o passo indicado
+    - `(x 3 * 1 +) para x em 1 2,5 7`: lista de valores
+    Os valores do intervalo são somados em decimal, então o passo não acumula erro.
+    
+    Args:
+        linha (str): Linha do arquivo de expressões
+        
+    Returns:
+        tuple: (expressão, variável, texto de cada valor), ou None se a linha não for paramétrica
+        
+    Raises:
+        ValueError: Se a declaração for inválida (passo nulo ou no sentido contrário, valores demais)
+    """
+    if not re.search(r'\bpara\b', linha): return None
+    match = PADRAO_PARAMETRICA.fullmatch(linha.strip())
+    if not match:
+        raise ValueError(f"declaração paramétrica inválida: {linha.strip()}")
+    if match['valores'] is not None:
+        valores = [valor.replace(',', '.') for valor in match['valores'].split()]
+    else:
+        inicio, fim = (Decimal(match[grupo].replace(',', '.')) for grupo in ('inicio', 'fim'))
+        passo = Decimal(match['passo'].replace(',', '.')) if match['passo'] else Decimal(1 if fim >= inicio else -1)
+        if passo == 0 or (fim - inicio) * passo < 0:
+            raise ValueError(f"o passo {_texto_decimal(passo)} não vai de {_texto_decimal(inicio)} "
+                             f"a {_texto_decimal(fim)}")
+        n = int((fim - inicio) / passo) + 1
+        if n > MAXIMO_VALORES_PARAMETRICA:
+            raise ValueError(f"{n} valores para {match['variavel']} (máximo {MAXIMO_VALORES_PARAMETRICA})")
+        valores = [_texto_decimal(inicio + i * passo) for i in range(n)]
+    if len(valores) > MAXIMO_VALORES_PARAMETRICA:
+        raise ValueError(f"{len(valores)} valores para {match['variavel']} (máximo {MAXIMO_VALORES_PARAMETRICA})")
+    return match['expressao'], match['variavel'], valores
+
+def _padrao_variavel(variavel):
+    """
+    Expressão regular das ocorrências da variável como elemento da expressão
+    """
+    return rf'(?<![\w.]){re.escape(variavel)}(?![\w.])'
+
+def expandir_parametrica(linha):
+    """
+    Escreve uma expressão paramétrica como uma expressão por valor da variável
+    
+    Args:
+        linha (str): Linha do arquivo de expressões
+        
+    Returns:
+        list: Expressões com cada valor no lugar da variável, ou None se a linha não for paramétrica
+        
+    Raises:
+        ValueError: Se a declaração for inválida (ver interpretar_parametrica)
+    """
+    parametrica = interpretar_parametrica(linha)
+    if parametrica is None: return None
+    expressao, variavel, valores = parametrica
+    padrao = re.compile(_padrao_variavel(variavel))
+    return [padrao.sub(lambda _: valor, expressao) for valor in valores]
+
+# Trechos usados pela contagem de ciclos com o Timer1 (--ciclos).
+# O contador é zerado antes do cálculo da linha e lido logo depois, antes do envio
+# do resultado pela UART; o valor fica em R3:R2 e o flag de estouro (TOV1) em R4.
+INICIO_CICLOS = """
+    ; Iniciar contagem de ciclos (Timer1)
+    LDI R16, 1
+    OUT TIFR1, R16       ; Limpar flag de estouro (TOV1)
+    CLR R16
+    STS TCNT1H, R16      ; Escrever byte alto primeiro (registrador temporário)
+    STS TCNT1L, R16
+"""
+
+FIM_CICLOS = """
+    ; Encerrar contagem de ciclos
+    LDS R2, TCNT1L       ; Ler byte baixo primeiro (trava o byte alto)
+    LDS R3, TCNT1H
+    IN R4, TIFR1         ; Bit 0 = estouro do contador
+"""
+
+def reportar_erro(mensagem, erros=None):
+    """
+    Reporta um erro de processamento
+    
+    Args:
+        mensagem (str): Mensagem de erro
+        erros (list): Lista que recebe a mensagem; se None, a mensagem é impressa
+    """
+    if erros is None:
+        print(mensagem)
+    else:
+        erros.append(mensagem)
+
+def formatar_resultado(resultado, numerico='half'):
+    """
+    Texto do resultado de uma linha, como enviado pelo Arduino depois de "= "
+    
+    Args:
+        resultado (float): Resultado da expressão
+        numerico (str): Formato numérico: 'half', 'q8.8' ou 'q16.16' (--numerico)
+        
+    Returns:
+        str: Texto do resultado
+    """
+    resultado_half = float_to_half_ieee754(resultado) if numerico == 'half' else None
+    if resultado_half is not None and half_ieee754_to_float(resultado_half) == resultado:
+        # Valor exato em half-precision: texto mais curto que volta ao mesmo valor
+        return tabela_texto_half()[resultado_half]
+    if isinstance(resultado, float) and resultado.is_integer():
+        return str(int(resultado))
+    return f"{resultado:.1f}".rstrip('0').rstrip('.')
+
+def resolve(expressao, memoria, ultimo_resultado, file, k, perfil=None, ciclos=False, erros=None, numerico='half',
+            laco=False, historico=None, fma=False, guardar=None):
     """
     Resolve uma expressão RPN e escreve o código assembly correspondente
     
@@ -208,12 +927,22 @@ def resolve(expressao, memoria, ultimo_resultado, file, k):
         expressao (str): Expressão RPN a ser resolvida
         memoria (float): Valor atual armazenado na memória
         ultimo_resultado (float): Último resultado calculado
-        file (file): Arquivo de saída para código assembly
+        file (file): Arquivo de saída para código assembly (None: apenas calcula)
         k (list): Contador para rótulos únicos
+        perfil (Perfilador): Perfilador opcional (--profile)
+        ciclos (bool): Mede com o Timer1 os ciclos gastos no cálculo (--ciclos)
+        erros (list): Lista que recebe as mensagens de erro (None: imprime)
+        numerico (str): Formato numérico: 'half', 'q8.8' ou 'q16.16' (--numerico)
+        laco (bool): Gera o corpo de um laço paramétrico (ver resolve_elementos)
+        historico (tuple): Endereços de MEM e RES na SRAM e o apontado por Y (--historico, ver
+                           HistoricoSram): os operandos MEM e RES são lidos da SRAM em vez de virarem constantes
+        fma (bool): Funde multiplicações seguidas de + ou - em half_fma (--fma, ver resolve_elementos)
+        guardar (callable): Guarda o resultado no histórico em SRAM (ver resolve_elementos)
         
     Returns:
         float: Resultado da expressão calculada
     """
+    if perfil is not None: inicio = time.perf_counter()
     # Verificar e tratar caso especial (MEM RES) sem operador
     if re.search(r'\(\s*MEM\s+RES\s*\)', expressao):
         expressao = expressao.replace('(MEM RES)', f'(MEM RES +)')
@@ -221,21 +950,66 @@ def resolve(expressao, memoria, ultimo_resultado, file, k):
     # Substituir vírgulas por pontos (para números decimais)
     expressao = expressao.replace(',', '.')
     
-    # Substituir MEM pelo valor armazenado na memória
-    expressao = re.sub(r'\bMEM\b', str(memoria), expressao)
-    
-    # Substituir RES pelo último resultado calculado
-    expressao = re.sub(r'\bRES\b', str(ultimo_resultado), expressao)
+    if historico is None:
+        # Substituir MEM pelo valor armazenado na memória
+        expressao = re.sub(r'\bMEM\b', str(memoria), expressao)
+        
+        # Substituir RES pelo último resultado calculado
+        expressao = re.sub(r'\bRES\b', str(ultimo_resultado), expressao)
+        
+        # Extrair elementos da expressão
+        elementos = re.findall(r'-?[\d.]+|[()+\-*^/%|]', expressao)
+    else:
+        # MEM e RES viram valores marcados com o seu endereço na SRAM
+        endereco_mem, endereco_res, base = historico
+        sram = {'MEM': _ValorSram(memoria, endereco_mem, base), 'RES': _ValorSram(ultimo_resultado, endereco_res, base)}
+        elementos = [sram.get(elemento, elemento)
+                     for elemento in re.findall(r'-?[\d.]+|[()+\-*^/%|]|\b(?:MEM|RES)\b', expressao)]
+    if perfil is not None: perfil.acumula('parse', inicio)
+    return resolve_elementos(elementos, memoria, file, k, perfil, ciclos, erros, numerico, laco, fma, guardar)
+
+def resolve_elementos(elementos, memoria, file, k, perfil=None, ciclos=False, erros=None, numerico='half',
+                      laco=False, fma=False, guardar=None):
+    """
+    Resolve os elementos de uma expressão RPN e escreve o código assembly correspondente
     
-    # Extrair elementos da expressão
-    elementos = re.findall(r'-?[\d.]+|[()+\-*^/%|]', expressao)
+    Args:
+        elementos (iterable): Números (str ou float), parênteses e operadores, com MEM e RES já substituídos
+                              (por _ValorSram no modo --historico)
+        memoria (float): Valor atual armazenado na memória
+        file (file): Arquivo de saída para código assembly (None: apenas calcula)
+        k (list): Contador para rótulos únicos
+        perfil (Perfilador): Perfilador opcional (--profile)
+        ciclos (bool): Mede com o Timer1 os ciclos gastos no cálculo (--ciclos)
+        erros (list): Lista que recebe as mensagens de erro (None: imprime)
+        numerico (str): Formato numérico: 'half', 'q8.8' ou 'q16.16' (--numerico)
+        laco (bool): Gera o corpo de um laço paramétrico: sem as reduções que dependem
+                     dos valores dos operandos e sem o envio do resultado (feito pelo laço)
+        fma (bool): Calcula as multiplicações seguidas de + ou - (half-precision) com um só
+                    arredondamento, em half_fma (--fma); o resultado pode diferir do padrão
+        guardar (callable): Chamada como guardar(file, resultado) logo depois do cálculo, com o
+                            resultado ainda em R17:R16 (_ResultadoNoRegistrador se o código o
+                            calculou lá), para guardá-lo no histórico em SRAM (--historico)
+        
+    Returns:
+        float: Resultado da expressão calculada
+    """
+    if ciclos and file is not None: file.write(INICIO_CICLOS)
+    # Multiplicações seguidas de + ou - (half-precision, --fma): um só arredondamento
+    if fma and numerico == 'half': elementos = marcar_fusoes(elementos)
     
     # Processar a expressão
     pilha = []
     for elemento in elementos:
         # Números: empilhar diretamente
-        if elemento.isdigit() or re.match(r'-?\d*\.\d+', elemento) or re.match(r'-?\d+', elemento):
-            pilha.append(float(elemento))
+        if isinstance(elemento, float) or elemento.isdigit() or re.match(r'-?\d*\.\d+', elemento) \
+                or re.match(r'-?\d+', elemento):
+            try:
+                pilha.append(elemento if isinstance(elemento, _ValorSram) else float(elemento))
+            # Números malformados (como 1.2.3 ou .): erro da linha, não exceção
+            except ValueError:
+                reportar_erro(f"Erro: Número inválido ({elemento})", erros)
+                return None
         # Parêntese de abertura: empilhar diretamente
         elif elemento == '(':
             pilha.append('(')
@@ -247,14 +1021,15 @@ def resolve(expressao, memoria, ultimo_resultado, file, k):
                 subexpressao.insert(0, pilha.pop())
             # Verificar parênteses desbalanceados
             if not pilha:
-                print("Erro: Parênteses desbalanceados")
+                reportar_erro("Erro: Parênteses desbalanceados", erros)
                 return None
             # Remover o parêntese de abertura
             pilha.pop()
             # Incrementar k para rótulos únicos
             k[0] += 1
             # Resolver a subexpressão
-            resultado_subexpressao = resolve_subexpressao_ieee754(subexpressao, file, k, memoria)
+            resultado_subexpressao = resolve_subexpressao_ieee754(subexpressao, file, k, memoria, perfil, erros,
+                                                                  numerico, laco)
             # Verificar erro na subexpressão
             if resultado_subexpressao is None: return None
             # Empilhar o resultado
@@ -263,19 +1038,55 @@ def resolve(expressao, memoria, ultimo_resultado, file, k):
         else:
             pilha.append(elemento)
     
+    # Parêntese de abertura sem o de fechamento
+    if '(' in pilha:
+        reportar_erro("Erro: Parênteses desbalanceados", erros)
+        return None
+    
     # Incrementar k para rótulos únicos
     k[0] += 1
     # Processar a pilha final
-    resultado_final = resolve_subexpressao_ieee754(pilha, file, k, memoria)
+    resultado_final = resolve_subexpressao_ieee754(pilha, file, k, memoria, perfil, erros, numerico, laco)
     # Verificar erro no processamento
     if resultado_final is None: return None
     
+    # Sem arquivo de saída: apenas o valor é necessário
+    if file is None: return float(resultado_final)
+    
+    # Inteiro de uma redução nativa em R17:R16: convertido antes de ser guardado ou impresso
+    if isinstance(resultado_final, _InteiroNativo):
+        file.write("""
+    ; Inteiro de 16 bits para half-precision
+    RCALL int16_para_half
+""")
+        resultado_final = _ResultadoNoRegistrador(resultado_final)
+    
+    if ciclos: file.write(FIM_CICLOS)
+    # Histórico em SRAM: guardado antes do envio do texto, que usa R16
+    if guardar is not None: guardar(file, resultado_final)
+    resultado_final = float(resultado_final)
+    # Corpo de um laço paramétrico: o texto do resultado vem da tabela do laço
+    if laco: return resultado_final
+    
     # Formatar resultado para output
-    if isinstance(resultado_final, float) and resultado_final.is_integer():
-        resultado_str = str(int(resultado_final))
-    else:
-        resultado_str = f"{resultado_final:.1f}".rstrip('0').rstrip('.')
+    resultado_str = formatar_resultado(resultado_final, numerico)
+    
+    # Enviar cada dígito do resultado
+    escrever_envio_resultado(file, ''.join(f"""
+    LDI R16, '{char}'
+    RCALL uart_envia_byte
+    """ for char in resultado_str), ciclos)
+    return resultado_final
+
+def escrever_envio_resultado(file, codigo_texto, ciclos=False):
+    """
+    Escreve o envio do resultado de uma linha: "= ", o texto, os ciclos, nova linha e delay
     
+    Args:
+        file (file): Arquivo de saída para código assembly
+        codigo_texto (str): Código que envia o texto do resultado
+        ciclos (bool): Envia a contagem de ciclos junto com o resultado (--ciclos)
+    """
     # Escrever código para enviar o resultado
     file.write("""
     ; Enviar resultado
@@ -284,13 +1095,13 @@ def resolve(expressao, memoria, ultimo_resultado, file, k):
     LDI R16, ' '
     RCALL uart_envia_byte
     """)
+    file.write(codigo_texto)
     
-    # Enviar cada dígito do resultado
-    for char in resultado_str:
-        file.write(f"""
-    LDI R16, '{char}'
-    RCALL uart_envia_byte
-    """)
+    # Enviar a contagem de ciclos junto com o resultado
+    if ciclos:
+        file.write("""
+    RCALL uart_envia_ciclos
+""")
     
     # Enviar nova linha e delay
     file.write(f"""
@@ -303,17 +1114,425 @@ def resolve(expressao, memoria, ultimo_resultado, file, k):
     ; Delay para visualização
     RCALL delay_ms
 """)
-    return resultado_final
 
-def resolve_subexpressao_ieee754(subexpressao, file, k, memoria):
+# Operações feitas com instruções nativas de 16 bits quando operandos e resultado
+# são inteiros: função de referência, nome (para o perfil) e código (a em R17:R16,
+# b em R19:R18, resultado em R17:R16)
+OPERACOES_INT16 = {
+    '+': (lambda a, b: a + b, 'int16_add', """    ADD R16, R18
+    ADC R17, R19
+"""),
+    '-': (lambda a, b: a - b, 'int16_subtract', """    SUB R16, R18
+    SBC R17, R19
+"""),
+    # Os 16 bits baixos do produto não dependem do sinal: MUL basta (sem MULS)
+    '*': (lambda a, b: a * b, 'int16_multiply', """    MUL R16, R18         ; a_baixo * b_baixo
+    MOVW R20, R0
+    MUL R16, R19         ; a_baixo * b_alto (só o byte baixo interessa)
+    ADD R21, R0
+    MUL R17, R18         ; a_alto * b_baixo
+    ADD R21, R0
+    CLR R1
+    MOVW R16, R20
+"""),
+}
+
+def inteiro_16_bits(valor):
+    """
+    Indica se um valor é inteiro e cabe em 16 bits com sinal
+    
+    Args:
+        valor (float): Valor
+        
+    Returns:
+        bool: True se o valor é inteiro entre -32768 e 32767
+    """
+    return float(valor).is_integer() and -32768 <= valor <= 32767
+
+def operacao_int16(operador, operando1, operando2, resultado):
+    """
+    Verifica se uma operação half-precision pode ser feita com inteiros de 16 bits
+    
+    A operação é trocada pelas instruções nativas só quando os operandos são
+    inteiros de 16 bits e o resultado inteiro é exatamente o que a rotina
+    half-precision produziria (sem estouro de 16 bits nem arredondamento do half).
+    
+    Args:
+        operador (str): Operador RPN
+        operando1 (float): Primeiro operando
+        operando2 (float): Segundo operando
+        resultado (float): Resultado da operação em half-precision
+        
+    Returns:
+        str: Nome da operação nativa (chave de perfil), ou None se ela não se aplica
+    """
+    if operador not in OPERACOES_INT16 or not (inteiro_16_bits(operando1) and inteiro_16_bits(operando2)):
+        return None
+    func, nome, _ = OPERACOES_INT16[operador]
+    inteiro = func(int(operando1), int(operando2))
+    return nome if -32768 <= inteiro <= 32767 and inteiro == resultado else None
+
+# Maior expoente inteiro trocado por uma cadeia de multiplicações (quadrado e multiplicação)
+MAIOR_EXPOENTE_CADEIA = 16
+
+# Reduções que deixam em R17:R16 o inteiro de 16 bits (complemento de dois), não o half-precision
+REDUCOES_INTEIRAS = {nome for _, nome, _ in OPERACOES_INT16.values()} | {'cadeia_int16'}
+# Reduções e rotinas que deixam em R17:R16 o mesmo resultado do host (conferidas no simulador);
+# as demais rotinas half-precision ainda não o calculam no Arduino, onde o texto impresso vem do host
+CALCULADAS_NO_ARDUINO = {'identidade', 'ajuste_expoente', 'half_fma'} | REDUCOES_INTEIRAS
+
+class _ResultadoNoRegistrador(float):
+    """
+    Resultado que o código gerado deixa calculado em R17:R16 (CALCULADAS_NO_ARDUINO)
+
+    O histórico em SRAM (--historico) guarda o próprio registrador em vez de
+    carregar o valor do host como constante (ver HistoricoSram.guardar_valor).
+    """
+
+class _InteiroNativo(_ResultadoNoRegistrador):
+    """
+    Resultado de uma redução com inteiros nativos de 16 bits (REDUCOES_INTEIRAS)
+
+    O valor (float) é o resultado; o código gerado deixa em R17:R16 o inteiro.
+    As operações seguintes carregam os operandos como constantes, então só o
+    resultado final da linha é convertido para half-precision (int16_para_half,
+    ver resolve_elementos).
+    """
+
+def _carga(registrador, valor):
+    """
+    Código que carrega um valor de 16 bits em um par de registradores
+    
+    Args:
+        registrador (int): Registrador do byte baixo (o alto é o seguinte)
+        valor (int): Valor de 16 bits
+        
+    Returns:
+        str: Instruções LDI
+    """
+    return f"    LDI R{registrador}, {valor & 0xFF}\n    LDI R{registrador + 1}, {(valor >> 8) & 0xFF}\n"
+
+class _ValorSram(float):
+    """
+    Valor de MEM ou RES guardado no histórico em SRAM (--historico)
+
+    O valor (float) é o calculado no host; o código gerado lê o operando do
+    endereço da SRAM, então as reduções que dependem do valor não se aplicam.
+    """
+    def __new__(cls, valor, endereco, base=None):
+        marcado = super().__new__(cls, valor)
+        marcado.endereco, marcado.base = endereco, base
+        return marcado
+
+# Maior deslocamento q de LDD/STD Rd, Y+q
+MAIOR_DESLOCAMENTO_Y = 63
+
+def _carga_sram(registrador, endereco, base=None):
+    """
+    Código que lê um valor de 16 bits da SRAM para um par de registradores
+
+    Perto do endereço em Y, usa LDD (Y+q); senão, ou sem Y (laços
+    paramétricos, onde Y conta as voltas), aponta X para o endereço.
+
+    Args:
+        registrador (int): Registrador do byte baixo (o alto é o seguinte)
+        endereco (int): Endereço do byte baixo na SRAM
+        base (int): Endereço apontado por Y (None: Y tem outro uso)
+
+    Returns:
+        str: Instruções
+    """
+    if base is not None and 0 <= endereco - base < MAIOR_DESLOCAMENTO_Y:
+        return f"    LDD R{registrador}, Y+{endereco - base}\n    LDD R{registrador + 1}, Y+{endereco - base + 1}\n"
+    return f"""    LDI R26, {endereco & 0xFF}
+    LDI R27, {endereco >> 8}
+    LD R{registrador}, X+
+    LD R{registrador + 1}, X
+"""
+
+def _guarda_sram(endereco, base=None):
+    """
+    Código que guarda R17:R16 na SRAM (STD Y+q, ou via X como em _carga_sram)
+    """
+    if base is not None and 0 <= endereco - base < MAIOR_DESLOCAMENTO_Y:
+        return f"    STD Y+{endereco - base}, R16\n    STD Y+{endereco - base + 1}, R17\n"
+    return f"""    LDI R26, {endereco & 0xFF}
+    LDI R27, {endereco >> 8}
+    ST X+, R16
+    ST X, R17
+"""
+
+def _carga_operando(registrador, valor, valor_half, negado=False):
+    """
+    Código que carrega um operando half-precision: imediato, ou lido da SRAM se for MEM/RES (--historico)
+
+    Args:
+        registrador (int): Registrador do byte baixo (o alto é o seguinte)
+        valor (float): Operando (_ValorSram se vier do histórico)
+        valor_half (int): Operando em half-precision (já com o sinal trocado, se negado)
+        negado (bool): Troca o sinal do valor lido da SRAM
+
+    Returns:
+        str: Instruções
+    """
+    if not isinstance(valor, _ValorSram):
+        return _carga(registrador, valor_half)
+    sinal = f"    SUBI R{registrador + 1}, 0x80   ; Trocar o sinal\n" if negado else ""
+    return _carga_sram(registrador, valor.endereco, valor.base) + sinal
+
+def _potencia_de_dois(h):
+    """
+    Expoente k de um half positivo normalizado igual a 2^k (None se não for potência de dois)
+    """
+    expoente = (h >> 10) & 0x1F
+    if h & 0x83FF or not 1 <= expoente <= 30: return None
+    return expoente - 15
+
+def _passos_cadeia(n):
+    """
+    Passos da potência x^n por quadrado e multiplicação (bits de n do mais alto para o mais baixo)
+    
+    Returns:
+        list: 'quadrado' ou 'multiplica' (por x) para cada passo
+    """
+    passos = []
+    for bit in bin(n)[3:]:
+        passos.append('quadrado')
+        if bit == '1': passos.append('multiplica')
+    return passos
+
+def otimizar_operacao_half(operador, operando1, operando2, operando1_half, operando2_half, resultado_half):
+    """
+    Procura um código mais barato que a rotina half-precision para uma operação
+    
+    Como os operandos são conhecidos na geração, cada redução só é usada se o
+    resultado dela for bit a bit o da função *_half_precision correspondente.
+    Em ordem de preferência:
+    - identidade (x+0, 0+x, x-0, x*1, 1*x, x|1, x^1): o resultado é o próprio x
+    - multiplicação/divisão por 2^k: soma de k ao expoente (um SUBI no byte alto)
+    - operandos e resultado inteiros de 16 bits: ADD/SUB/MUL nativos
+    - x^n com n inteiro pequeno: cadeia de quadrados e multiplicações
+      (inteiros de 16 bits nativos quando possível, senão half_multiply)
+    
+    Args:
+        operador (str): Operador RPN
+        operando1 (float): Primeiro operando
+        operando2 (float): Segundo operando
+        operando1_half (int): Primeiro operando em half-precision
+        operando2_half (int): Segundo operando em half-precision
+        resultado_half (int): Resultado da rotina half-precision
+        
+    Returns:
+        tuple: (nome para o perfil, descrição, código com resultado em R17:R16; nas
+            REDUCOES_INTEIRAS, o inteiro de 16 bits), ou None
+    """
+    um, zero = 0x3C00, 0x0000
+    # Identidades: o resultado é um dos operandos, sem nenhuma conta
+    neutros = {'+': (zero, zero), '-': (None, zero), '*': (um, um), '|': (None, um), '^': (None, um)}
+    if operador in neutros:
+        neutro_esquerda, neutro_direita = neutros[operador]
+        if operando2_half == neutro_direita and resultado_half == operando1_half:
+            return 'identidade', 'identidade, sem operação', _carga(16, operando1_half)
+        if operando1_half == neutro_esquerda and resultado_half == operando2_half:
+            return 'identidade', 'identidade, sem operação', _carga(16, operando2_half)
+    
+    # Multiplicação ou divisão por potência de dois: só o expoente muda
+    if operador in ('*', '|'):
+        candidatos = [(operando1_half, operando2_half)] + ([(operando2_half, operando1_half)] if operador == '*' else [])
+        for x, potencia in candidatos:
+            k = _potencia_de_dois(potencia)
+            if k is None: continue
+            if operador == '|': k = -k
+            if (x + (k << 10)) & 0xFFFF == resultado_half and 1 <= (x >> 10) & 0x1F <= 30 \
+                    and 1 <= (resultado_half >> 10) & 0x1F <= 30:
+                return 'ajuste_expoente', f"expoente {k:+d}", _carga(16, x) + \
+                    f"    SUBI R17, {(-(k << 2)) & 0xFF}      ; Expoente (bits 6-2 do byte alto) {k:+d}\n"
+    
+    # Operandos e resultado inteiros de 16 bits: instruções nativas
+    resultado = half_ieee754_to_float(resultado_half)
+    nativa = operacao_int16(operador, operando1, operando2, resultado)
+    if nativa is not None:
+        return nativa, 'inteiros de 16 bits', \
+            _carga(16, int(operando1)) + _carga(18, int(operando2)) + OPERACOES_INT16[operador][2]
+    
+    # Potência inteira pequena: quadrado e multiplicação
+    if operador == '^' and float(operando2).is_integer() and 2 <= operando2 <= MAIOR_EXPOENTE_CADEIA:
+        passos = _passos_cadeia(int(operando2))
+        valor_half, valores = operando1_half, []
+        for passo in passos:
+            valor_half = mul_half_precision(valor_half, valor_half if passo == 'quadrado' else operando1_half)
+            valores.append(valor_half)
+        if valor_half != resultado_half: return None
+        carga_x = {'quadrado': "    MOVW R18, R16\n"}
+        # Inteiros nativos se cada passo der o mesmo valor que em half-precision
+        valor_int, inteira = int(operando1) if inteiro_16_bits(operando1) else None, inteiro_16_bits(operando1)
+        for passo, v in zip(passos, valores):
+            if not inteira: break
+            valor_int *= valor_int if passo == 'quadrado' else int(operando1)
+            inteira = -32768 <= valor_int <= 32767 and valor_int == half_ieee754_to_float(v)
+        if inteira:
+            carga_x['multiplica'] = _carga(18, int(operando1))
+            codigo = _carga(16, int(operando1)) + ''.join(carga_x[p] + OPERACOES_INT16['*'][2] for p in passos)
+            return 'cadeia_int16', 'quadrado e multiplicação, inteiros de 16 bits', codigo
+        carga_x['multiplica'] = _carga(18, operando1_half)
+        codigo = _carga(16, operando1_half) + ''.join(carga_x[p] + "    RCALL half_multiply\n" for p in passos)
+        return 'cadeia_half', 'quadrado e multiplicação', codigo
+    return None
+
+# Multiplicação em half-precision cujo resultado vai direto para um + ou - (marcada
+# por marcar_fusoes): as duas operações são calculadas juntas, em half_fma
+MULTIPLICACAO_FUNDIDA = '*+'
+
+def marcar_fusoes(elementos):
+    """
+    Marca as multiplicações seguidas de soma ou subtração, como ((a b *) c +)
+    
+    Percorre a expressão com a mesma estrutura de resolve_elementos() (cada
+    parêntese resolvido como uma subexpressão em RPN), acompanhando só qual
+    multiplicação produziu cada valor. Quando um + ou - recebe o resultado de
+    uma multiplicação (o primeiro operando, se forem os dois), ela é trocada
+    por MULTIPLICACAO_FUNDIDA. Expressões inválidas voltam sem marcas (o erro
+    é reportado no cálculo).
+    
+    Args:
+        elementos (iterable): Elementos da expressão, como em resolve_elementos()
+        
+    Returns:
+        list: Os mesmos elementos, com as multiplicações fundidas marcadas
+    """
+    elementos = list(elementos)
+    if '*' not in elementos or ('+' not in elementos and '-' not in elementos): return elementos
+    operadores = {'+', '-', '*', '|', '/', '^', '%'}
+    fundidas = set()
+    
+    def resolver(subexpressao):
+        # Origem de cada valor: índice da multiplicação que o produziu (None: outra)
+        origens = []
+        for indice, elemento in subexpressao:
+            if elemento not in operadores:
+                origens.append(indice)
+                continue
+            if len(origens) < 2: return False
+            origem2, origem1 = origens.pop(), origens.pop()
+            if elemento in ('+', '-'):
+                origem = origem1 if origem1 is not None else origem2
+                if origem is not None: fundidas.add(origem)
+            origens.append(indice if elemento == '*' else None)
+        return origens[0] if len(origens) == 1 else False
+    
+    # Parênteses e operadores como (índice, elemento); valores como (origem, None)
+    pilha = []
+    for indice, elemento in enumerate(elementos):
+        if elemento == ')':
+            subexpressao = []
+            while pilha and pilha[-1][1] != '(':
+                subexpressao.insert(0, pilha.pop())
+            if not pilha: return elementos
+            pilha.pop()
+            origem = resolver(subexpressao)
+            if origem is False: return elementos
+            pilha.append((origem, None))
+        elif elemento == '(' or elemento in operadores:
+            pilha.append((indice, elemento))
+        else:
+            pilha.append((None, None))
+    if resolver(pilha) is False: return elementos
+    return [MULTIPLICACAO_FUNDIDA if indice in fundidas else elemento for indice, elemento in enumerate(elementos)]
+
+class _ProdutoHalf(float):
+    """
+    Produto marcado por marcar_fusoes(), calculado e gerado junto com o + ou - que o recebe
+    
+    O valor (float) é o produto arredondado, usado só nas mensagens; a conta
+    fundida usa os fatores.
+    """
+    def __new__(cls, fator1, fator2):
+        fatores_half = (float_to_half_ieee754(float(fator1)), float_to_half_ieee754(float(fator2)))
+        produto = super().__new__(cls, half_ieee754_to_float(mul_half_precision(*fatores_half)))
+        produto.fatores, produto.fatores_half = (fator1, fator2), fatores_half
+        return produto
+
+def operacao_fma_half(operador, operando1, operando2, file, perfil=None, laco=False):
+    """
+    Calcula a * b + c (ou a * b - c, c - a * b) com um único arredondamento e escreve o código
+    
+    Um dos operandos é o produto pendente (_ProdutoHalf). Se a multiplicação
+    e a soma tiverem, cada uma, uma redução de otimizar_operacao_half() que
+    dê o mesmo resultado fundido (inteiros de 16 bits, identidades...), as
+    reduções são usadas; senão, uma chamada a half_fma.
+    
+    Args:
+        operador (str): '+' ou '-'
+        operando1 (float): Primeiro operando (_ProdutoHalf ou número)
+        operando2 (float): Segundo operando (_ProdutoHalf ou número)
+        file (file): Arquivo de saída para código assembly (None: apenas calcula)
+        perfil (Perfilador): Perfilador opcional (--profile)
+        laco (bool): Corpo de um laço paramétrico: sempre half_fma, sem reduções
+        
+    Returns:
+        float: Resultado da operação fundida (fma_half_precision)
+    """
+    produto_primeiro = isinstance(operando1, _ProdutoHalf)
+    produto, parcela = (operando1, operando2) if produto_primeiro else (operando2, operando1)
+    (fator1, fator2), (fator1_half, fator2_half) = produto.fatores, produto.fatores_half
+    parcela_half = float_to_half_ieee754(float(parcela))
+    
+    # a * b - c = a * b + (-c) e c - a * b = (-a) * b + c
+    fma_fatores, fma_parcela = (fator1_half, fator2_half), parcela_half
+    if operador == '-' and produto_primeiro: fma_parcela ^= 0x8000
+    elif operador == '-': fma_fatores = (fator1_half ^ 0x8000, fator2_half)
+    resultado_half = fma_half_precision(*fma_fatores, fma_parcela)
+    resultado = half_ieee754_to_float(resultado_half)
+    
+    # Só o valor é necessário: nada a escolher
+    if file is None and perfil is None: return resultado
+    
+    # Reduções das duas operações com o mesmo resultado: sem nenhuma chamada (nem com
+    # operandos lidos da SRAM, --historico, que só são conhecidos no Arduino)
+    produto_half = float_to_half_ieee754(float(produto))
+    sram = any(isinstance(valor, _ValorSram) for valor in (fator1, fator2, parcela))
+    reducao_produto = None if laco or sram else otimizar_operacao_half('*', fator1, fator2, fator1_half,
+                                                                       fator2_half, produto_half)
+    operandos_half = (produto_half, parcela_half) if produto_primeiro else (parcela_half, produto_half)
+    reducao = reducao_produto and otimizar_operacao_half(operador, float(operando1), float(operando2),
+                                                        *operandos_half, resultado_half)
+    if reducao:
+        for (nome, descricao, codigo), (a, op, b) in ((reducao_produto, (fator1, '*', fator2)),
+                                                      (reducao, (float(operando1), operador, float(operando2)))):
+            if file is not None: file.write(f"""
+    ; {a} {op} {b} ({descricao})
+{codigo}""")
+            if perfil is not None: perfil.conta_operacao(op, nome)
+        if reducao[0] in REDUCOES_INTEIRAS: return _InteiroNativo(resultado)
+        return _ResultadoNoRegistrador(resultado) if reducao[0] in CALCULADAS_NO_ARDUINO else resultado
+    
+    if perfil is not None: perfil.conta_operacao(f"*{operador}", 'half_fma')
+    if file is not None:
+        texto = f"{fator1} * {fator2}"
+        texto = f"{texto} {operador} {parcela}" if produto_primeiro else f"{parcela} {operador} {texto}"
+        cargas = _carga_operando(16, fator1, fma_fatores[0], fma_fatores[0] != fator1_half) + \
+            _carga_operando(18, fator2, fma_fatores[1]) + \
+            _carga_operando(20, parcela, fma_parcela, fma_parcela != parcela_half)
+        file.write(f"""
+    ; {texto} (multiplicação e soma fundidas, half_fma)
+{cargas}    RCALL half_fma
+""")
+    return _ResultadoNoRegistrador(resultado)
+
+def resolve_subexpressao_ieee754(subexpressao, file, k, memoria, perfil=None, erros=None, numerico='half',
+                                 laco=False):
     """
     Resolve uma subexpressão usando IEEE 754 half-precision e escreve o código assembly correspondente
     
     Args:
         subexpressao (list): Lista de elementos da subexpressão
-        file (file): Arquivo de saída para código assembly
+        file (file): Arquivo de saída para código assembly (None: apenas calcula)
         k (list): Contador para rótulos únicos
         memoria (float): Valor atual armazenado na memória
+        perfil (Perfilador): Perfilador opcional (--profile)
+        erros (list): Lista que recebe as mensagens de erro (None: imprime)
+        numerico (str): Formato numérico: 'half', 'q8.8' ou 'q16.16' (--numerico)
+        laco (bool): Corpo de um laço paramétrico: sem as reduções que dependem dos operandos
         
     Returns:
         float: Resultado da subexpressão calculada
@@ -321,10 +1540,10 @@ def resolve_subexpressao_ieee754(subexpressao, file, k, memoria):
     pilha = []
     for elemento in subexpressao:
         # Verificar se é um operador
-        if elemento in {'+', '-', '*', '|', '/', '^', '%'}:
+        if elemento in {'+', '-', '*', '|', '/', '^', '%', MULTIPLICACAO_FUNDIDA}:
             # Verificar se há operandos suficientes
             if len(pilha) < 2:
-                print(f"Erro: Número insuficiente de operandos para o operador {elemento}")
+                reportar_erro(f"Erro: Número insuficiente de operandos para o operador {elemento}", erros)
                 return None
             # Obter os operandos
             operando2 = pilha.pop()
@@ -334,17 +1553,26 @@ def resolve_subexpressao_ieee754(subexpressao, file, k, memoria):
             if elemento == '/': 
                 # Verificar divisão por zero
                 if operando2 == 0:
-                    print(f"Erro: Divisão por zero ({operando1} / {operando2})")
+                    reportar_erro(f"Erro: Divisão por zero ({operando1} / {operando2})", erros)
+                    return None
+                if not (math.isfinite(operando1) and math.isfinite(operando2)):
+                    reportar_erro(f"Erro: Divisão inteira com operando não finito ({operando1} / {operando2})", erros)
                     return None
-                # Converter para inteiros
+                # Converter para inteiros (calculados no host mesmo para MEM/RES com --historico:
+                # a SRAM guarda half-precision e integer_divide recebe inteiros)
                 operando1_int = int(float(operando1))
                 operando2_int = int(float(operando2))
+                # Divisor entre -1 e 1 (como 0.25): vira 0 ao ser truncado
+                if operando2_int == 0:
+                    reportar_erro(f"Erro: Divisão por zero ({operando1} / {operando2}, divisor truncado para 0)", erros)
+                    return None
                 # Calcular resultado
                 resultado = operando1_int // operando2_int
                 pilha.append(float(resultado))
+                if perfil is not None: perfil.conta_operacao(elemento, 'integer_divide')
                 
                 # Gerar código Assembly para divisão inteira
-                file.write(f"""
+                if file is not None: file.write(f"""
     ; {operando1} / {operando2} (Divisão inteira)
     LDI R16, {operando1_int & 0xFF}
     LDI R17, {(operando1_int >> 8) & 0xFF}
@@ -352,11 +1580,23 @@ def resolve_subexpressao_ieee754(subexpressao, file, k, memoria):
     LDI R19, {(operando2_int >> 8) & 0xFF}
     RCALL integer_divide
 """)
+            # Multiplicação seguida de + ou -: calculada junto com a soma (half_fma)
+            elif elemento == MULTIPLICACAO_FUNDIDA:
+                pilha.append(_ProdutoHalf(operando1, operando2))
+            elif isinstance(operando1, _ProdutoHalf) or isinstance(operando2, _ProdutoHalf):
+                pilha.append(operacao_fma_half(elemento, operando1, operando2, file, perfil, laco))
+            # Outros operadores em ponto fixo
+            elif numerico != 'half':
+                resultado = operacao_ponto_fixo(elemento, operando1, operando2, file, numerico, perfil, erros)
+                if resultado is None: return None
+                pilha.append(resultado)
             # Outros operadores (half-precision)
             else:
                 # Converter para formato half-precision
+                if perfil is not None: inicio = time.perf_counter()
                 operando1_half = float_to_half_ieee754(float(operando1))
                 operando2_half = float_to_half_ieee754(float(operando2))
+                if perfil is not None: perfil.acumula('conversao', inicio)
                 
                 # Mapeamento de operadores para funções e comandos assembly
                 op_map = {
@@ -371,41 +1611,134 @@ def resolve_subexpressao_ieee754(subexpressao, file, k, memoria):
                 # Obter a função e o comando assembly correspondentes
                 func, asm_cmd = op_map[elemento]
                 
-                # Gerar código Assembly para a operação
-                file.write(f"""
-    ; {operando1} {elemento} {operando2} (IEEE 754 half-precision)
-    LDI R16, {operando1_half & 0xFF}
-    LDI R17, {(operando1_half >> 8) & 0xFF}
-    LDI R18, {operando2_half & 0xFF}
-    LDI R19, {(operando2_half >> 8) & 0xFF}
-    RCALL {asm_cmd}
-""")
                 # Calcular resultado
+                if perfil is not None: inicio = time.perf_counter()
                 resultado_half = func(operando1_half, operando2_half)
                 resultado = half_ieee754_to_float(resultado_half)
+                if perfil is not None: perfil.acumula('conversao', inicio)
+                
+                # Redução mais barata com o mesmo resultado (identidade, expoente, inteiros, cadeia);
+                # operandos lidos da SRAM (--historico) só são conhecidos no Arduino
+                sram = isinstance(operando1, _ValorSram) or isinstance(operando2, _ValorSram)
+                reducao = None if laco or sram else otimizar_operacao_half(elemento, operando1, operando2,
+                                                                           operando1_half, operando2_half,
+                                                                           resultado_half)
+                if reducao is not None:
+                    asm_cmd, descricao, codigo = reducao
+                    if file is not None: file.write(f"""
+    ; {operando1} {elemento} {operando2} ({descricao})
+{codigo}""")
+                # Gerar código Assembly para a operação
+                elif file is not None: file.write(f"""
+    ; {operando1} {elemento} {operando2} (IEEE 754 half-precision)
+{_carga_operando(16, operando1, operando1_half)}{_carga_operando(18, operando2, operando2_half)}    RCALL {asm_cmd}
+""")
+                if perfil is not None: perfil.conta_operacao(elemento, asm_cmd)
+                if reducao is not None and asm_cmd in REDUCOES_INTEIRAS: resultado = _InteiroNativo(resultado)
+                elif reducao is not None and asm_cmd in CALCULADAS_NO_ARDUINO:
+                    resultado = _ResultadoNoRegistrador(resultado)
                 pilha.append(resultado)
-        # Se não for um operador, empilhar como número
+        # Se não for um operador, empilhar como número (produtos pendentes, valores da SRAM e
+        # resultados em R17:R16 continuam marcados)
         else:
-            pilha.append(float(elemento))
+            try:
+                pilha.append(elemento if isinstance(elemento, (_ProdutoHalf, _ValorSram, _ResultadoNoRegistrador))
+                             else float(elemento))
+            except ValueError:
+                reportar_erro(f"Erro: Elemento inválido ({elemento})", erros)
+                return None
     
     # Verificar se a expressão é válida (deve ter exatamente um resultado na pilha)
     if len(pilha) != 1:
-        print(f"Erro: Subexpressão inválida, pilha final: {pilha}")
+        reportar_erro(f"Erro: Subexpressão inválida, pilha final: {pilha}", erros)
         return None
     return pilha[0]
 
-def adicionar_rotinas_ieee754(file):
+def operacao_ponto_fixo(operador, operando1, operando2, file, formato, perfil=None, erros=None):
     """
-    Adiciona as rotinas de manipulação IEEE 754 ao arquivo Assembly
+    Calcula uma operação em ponto fixo e escreve o código assembly correspondente
+    
+    Operandos e resultado fora do intervalo do formato são detectados aqui, na
+    geração, e reportados como erro (o Arduino não verifica estouro).
     
     Args:
-        file (file): Arquivo de saída para código assembly
+        operador (str): Operador ('+', '-', '*', '|', '^' ou '%')
+        operando1 (float): Primeiro operando
+        operando2 (float): Segundo operando
+        file (file): Arquivo de saída para código assembly (None: apenas calcula)
+        formato (str): 'q8.8' ou 'q16.16'
+        perfil (Perfilador): Perfilador opcional (--profile)
+        erros (list): Lista que recebe as mensagens de erro (None: imprime)
+        
+    Returns:
+        float: Resultado da operação (None em caso de erro)
     """
-    file.write("""
-;***********************************************************************************************
-; Rotinas para manipulação de números IEEE 754 half-precision (16 bits)
-;***********************************************************************************************
+    # Mapeamento de operadores para funções e sufixos das rotinas assembly
+    op_map = {
+        '+': (add_fixed_point, 'add'),
+        '-': (sub_fixed_point, 'subtract'),
+        '*': (mul_fixed_point, 'multiply'),
+        '|': (div_fixed_point, 'divide'),
+        '^': (power_fixed_point, 'power'),
+        '%': (mod_fixed_point, 'modulo')
+    }
+    func, sufixo = op_map[operador]
+    bits = sum(FORMATOS_PONTO_FIXO[formato])
+    asm_cmd = f"fixed{bits}_{sufixo}"
+    
+    # Converter para ponto fixo e calcular o resultado, verificando o intervalo
+    if perfil is not None: inicio = time.perf_counter()
+    try:
+        operando1_fixo = float_to_fixed_point(float(operando1), formato)
+        operando2_fixo = float_to_fixed_point(float(operando2), formato)
+        resultado_fixo = func(operando1_fixo, operando2_fixo, formato)
+    except ZeroDivisionError:
+        reportar_erro(f"Erro: Divisão por zero ({operando1} {operador} {operando2})", erros)
+        return None
+    except (OverflowError, ValueError) as erro:
+        reportar_erro(f"Erro: {operando1} {operador} {operando2} em {formato.upper()}: {erro}", erros)
+        return None
+    if perfil is not None:
+        perfil.acumula('conversao', inicio)
+        perfil.conta_operacao(operador, asm_cmd)
+    
+    # Gerar código Assembly para a operação (operandos em complemento de dois)
+    if file is not None:
+        registradores_b = 18 if bits == 16 else 20
+        carga = [f"    LDI R{16 + i}, {(operando1_fixo >> (8 * i)) & 0xFF}" for i in range(bits // 8)]
+        carga += [f"    LDI R{registradores_b + i}, {(operando2_fixo >> (8 * i)) & 0xFF}" for i in range(bits // 8)]
+        carga = "\n".join(carga)
+        file.write(f"""
+    ; {operando1} {operador} {operando2} (ponto fixo {formato.upper()})
+{carga}
+    RCALL {asm_cmd}
+""")
+    return fixed_point_to_float(resultado_fixo, formato)
+
+# Biblioteca de rotinas do Arduino, uma unidade por rotina. Cada unidade tem a
+# variante -Os (menor código) e, quando compensa, uma variante -O2 (mais rápida),
+# além das rotinas que ela chama. O ligador (ligar_rotinas) inclui no programa
+# apenas as unidades referenciadas pelo código gerado e as suas dependências.
+ROTINAS = {}
+
+def registrar_rotina(nome, codigo, dependencias=(), codigo_rapido=None):
+    """
+    Registra uma unidade da biblioteca de rotinas
+    
+    Args:
+        nome (str): Rótulo de entrada da rotina
+        codigo (str): Código Assembly da variante -Os (usada também em -O2 se não houver outra)
+        dependencias (tuple): Rotinas chamadas por esta
+        codigo_rapido (str): Código Assembly da variante -O2 (opcional)
+    """
+    ROTINAS[nome] = {
+        'Os': codigo,
+        'O2': codigo if codigo_rapido is None else codigo_rapido,
+        'dependencias': tuple(dependencias),
+    }
 
+# --- Rotinas IEEE 754 half-precision (16 bits): a em R17:R16, b em R19:R18, resultado em R17:R16 ---
+registrar_rotina('half_add', """
 half_add:
     ; Empilhar registradores
     PUSH R20
@@ -491,7 +1824,9 @@ result_ready:
     POP R21
     POP R20
     RET
+""")
 
+registrar_rotina('half_subtract', """
 half_subtract:
     ; Empilhar registradores
     PUSH R20
@@ -598,7 +1933,9 @@ sub_result_ready:
     POP R21
     POP R20
     RET
+""")
 
+registrar_rotina('half_multiply', """
 half_multiply:
     ; Empilhar registradores
     PUSH R20
@@ -641,7 +1978,426 @@ half_multiply:
     POP R21
     POP R20
     RET
+""")
+
+# a * b + c com um único arredondamento (c em R21:R20); referência: fma_half_precision
+registrar_rotina('half_fma', """
+half_fma:
+    ; Empilhar registradores (só R17:R16 volta alterado)
+    PUSH R0
+    PUSH R2
+    PUSH R3
+    PUSH R18
+    PUSH R19
+    PUSH R20
+    PUSH R21
+    PUSH R22
+    PUSH R23
+    PUSH R24
+    PUSH R25
+    PUSH R26
+    PUSH R27
+    PUSH R28
+    PUSH R29
+    PUSH R30
+    PUSH R31
+
+    ; Sinais: do produto (a xor b) em r2 e de c em r3
+    MOV R22, R17
+    EOR R22, R19
+    ANDI R22, 0x80
+    MOV R2, R22
+    MOV R22, R21
+    ANDI R22, 0x80
+    MOV R3, R22
+
+    ; Expoentes (campo de 5 bits); 31 é infinito ou NaN
+    MOV R30, R17
+    LSR R30
+    LSR R30
+    ANDI R30, 0x1F       ; r30 = expoente de a
+    MOV R31, R19
+    LSR R31
+    LSR R31
+    ANDI R31, 0x1F       ; r31 = expoente de b
+    MOV R28, R21
+    LSR R28
+    LSR R28
+    ANDI R28, 0x1F       ; r28 = expoente de c
+    CPI R30, 31
+    BREQ fma_especial
+    CPI R31, 31
+    BREQ fma_especial
+    CPI R28, 31
+    BREQ fma_especial
+    RJMP fma_finito
+
+fma_especial:
+    ; NaN em algum operando: NaN
+    CPI R30, 31
+    BRNE fma_especial_b
+    MOV R22, R17
+    ANDI R22, 0x03
+    OR R22, R16
+    BRNE fma_nan
+fma_especial_b:
+    CPI R31, 31
+    BRNE fma_especial_c
+    MOV R22, R19
+    ANDI R22, 0x03
+    OR R22, R18
+    BRNE fma_nan
+fma_especial_c:
+    CPI R28, 31
+    BRNE fma_especial_produto
+    MOV R22, R21
+    ANDI R22, 0x03
+    OR R22, R20
+    BRNE fma_nan
+fma_especial_produto:
+    ; Fator infinito: produto infinito (NaN se o outro fator for zero)
+    CPI R30, 31
+    BREQ fma_a_infinito
+    CPI R31, 31
+    BRNE fma_c_infinito  ; Produto finito: o resultado é c (infinito)
+    MOV R22, R17
+    ANDI R22, 0x7F
+    OR R22, R16
+    BREQ fma_nan         ; 0 * infinito
+    RJMP fma_produto_infinito
+fma_a_infinito:
+    MOV R22, R19
+    ANDI R22, 0x7F
+    OR R22, R18
+    BREQ fma_nan         ; infinito * 0
+fma_produto_infinito:
+    ; Produto infinito: NaN se c for infinito de sinal contrário
+    CPI R28, 31
+    BRNE fma_infinito
+    CP R2, R3
+    BRNE fma_nan
+fma_infinito:
+    LDI R17, 0x7C
+    OR R17, R2
+    CLR R16
+    RJMP fma_fim
+fma_c_infinito:
+    MOVW R16, R20
+    RJMP fma_fim
+fma_nan:
+    LDI R17, 0x7E
+    CLR R16
+    RJMP fma_fim
+
+fma_finito:
+    ; Mantissas com o bit implícito (desnormalizados: expoente 1, sem o bit)
+    ANDI R17, 0x03       ; r17:r16 = mantissa de a
+    TST R30
+    BREQ fma_a_desnormalizado
+    ORI R17, 0x04
+    RJMP fma_mantissa_b
+fma_a_desnormalizado:
+    INC R30
+fma_mantissa_b:
+    ANDI R19, 0x03       ; r19:r18 = mantissa de b
+    TST R31
+    BREQ fma_b_desnormalizado
+    ORI R19, 0x04
+    RJMP fma_mantissa_c
+fma_b_desnormalizado:
+    INC R31
+fma_mantissa_c:
+    ANDI R21, 0x03       ; r21:r20 = mantissa de c
+    TST R28
+    BREQ fma_c_desnormalizado
+    ORI R21, 0x04
+    RJMP fma_produto
+fma_c_desnormalizado:
+    INC R28
+
+fma_produto:
+    ; Produto exato das mantissas (até 22 bits) em r25:r22
+    MUL R16, R18
+    MOVW R22, R0
+    CLR R24
+    CLR R25
+    MUL R17, R18
+    ADD R23, R0
+    ADC R24, R1
+    MUL R16, R19
+    ADD R23, R0
+    ADC R24, R1
+    MUL R17, R19
+    ADD R24, R0
+    CLR R1
+    ; Valores: produto * 2^r30 e c * 2^r31
+    ADD R30, R31
+    SUBI R30, 50         ; r30 = ea + eb - 50
+    MOV R31, R28
+    SUBI R31, 25         ; r31 = ec - 25
+    MOVW R26, R20        ; r29:r26 = mantissa de c
+    CLR R28
+    CLR R29
+
+    ; Produto zero: o resultado é c (+0 se c também for zero)
+    MOV R18, R22
+    OR R18, R23
+    OR R18, R24
+    BRNE fma_normaliza_produto
+    MOV R18, R26
+    OR R18, R27
+    BREQ fma_zero
+    MOVW R22, R26
+    MOV R30, R31
+    MOV R2, R3
+    RJMP fma_normaliza
+
+fma_normaliza_produto:
+    ; Produto com o bit mais alto no bit 30 (o primeiro byte de uma vez: são até 22 bits)
+    MOV R25, R24
+    MOV R24, R23
+    MOV R23, R22
+    CLR R22
+    SUBI R30, 8
+fma_normaliza_produto_laco:
+    SBRC R25, 6
+    RJMP fma_normaliza_c
+    LSL R22
+    ROL R23
+    ROL R24
+    ROL R25
+    DEC R30
+    RJMP fma_normaliza_produto_laco
+
+fma_normaliza_c:
+    ; c zero: o resultado é o produto arredondado
+    MOV R18, R26
+    OR R18, R27
+    BREQ fma_normaliza
+    ; c com o bit mais alto no bit 30 (dois bytes de uma vez: são até 11 bits)
+    MOVW R28, R26
+    CLR R26
+    CLR R27
+    SUBI R31, 16
+fma_normaliza_c_laco:
+    SBRC R29, 6
+    RJMP fma_compara_expoentes
+    LSL R26
+    ROL R27
+    ROL R28
+    ROL R29
+    DEC R31
+    RJMP fma_normaliza_c_laco
+
+fma_compara_expoentes:
+    ; O de maior expoente fica em r25:r22 (expoente r30, sinal r2)
+    MOV R18, R30
+    SUB R18, R31         ; r18 = diferença dos expoentes
+    BRGE fma_limita_diferenca
+    MOVW R20, R22
+    MOVW R22, R26
+    MOVW R26, R20
+    MOVW R20, R24
+    MOVW R24, R28
+    MOVW R28, R20
+    MOV R30, R31
+    MOV R20, R2
+    MOV R2, R3
+    MOV R3, R20
+    NEG R18
+fma_limita_diferenca:
+    CPI R18, 32
+    BRLO fma_alinha
+    LDI R18, 32          ; Deslocamento maior que o número: só resta o bit perdido
+fma_alinha:
+    ; Deslocar o menor para a direita; r19 != 0 se algum bit 1 sair
+    CLR R19
+fma_alinha_byte:
+    CPI R18, 8
+    BRLO fma_alinha_bit
+    OR R19, R26
+    MOV R26, R27
+    MOV R27, R28
+    MOV R28, R29
+    CLR R29
+    SUBI R18, 8
+    RJMP fma_alinha_byte
+fma_alinha_bit:
+    TST R18
+    BREQ fma_soma
+    LSR R29
+    ROR R28
+    ROR R27
+    ROR R26
+    ADC R19, R1
+    DEC R18
+    RJMP fma_alinha_bit
+
+fma_soma:
+    CP R2, R3
+    BRNE fma_subtrai
+    ADD R22, R26
+    ADC R23, R27
+    ADC R24, R28
+    ADC R25, R29
+    RJMP fma_normaliza
+fma_subtrai:
+    ; Maior - menor - (bit perdido): o piso da diferença exata
+    CP R1, R19           ; Carry = 1 se r19 != 0
+    SBC R22, R26
+    SBC R23, R27
+    SBC R24, R28
+    SBC R25, R29
+    BRCC fma_diferenca
+    ; Mesmo expoente e c maior que o produto (ou o contrário): inverter
+    COM R22
+    COM R23
+    COM R24
+    COM R25
+    SUBI R22, 0xFF
+    SBCI R23, 0xFF
+    SBCI R24, 0xFF
+    SBCI R25, 0xFF
+    MOV R2, R3
+fma_diferenca:
+    MOV R18, R22
+    OR R18, R23
+    OR R18, R24
+    OR R18, R25
+    BRNE fma_normaliza
+fma_zero:
+    CLR R16              ; Soma exatamente zero: +0
+    CLR R17
+    RJMP fma_fim
+
+fma_normaliza:
+    ; Bit mais alto no bit 31
+    SBRC R25, 7
+    RJMP fma_expoente
+    LSL R22
+    ROL R23
+    ROL R24
+    ROL R25
+    DEC R30
+    RJMP fma_normaliza
+fma_expoente:
+    SUBI R30, -46        ; r30 = campo do expoente (2^(r30 + 31), bias 15)
+    CPI R30, 1
+    BRGE fma_arredonda
+    ; Desnormalizado: deslocar 1 - r30 bits (a partir de 12 não sobra nada)
+    LDI R18, 1
+    SUB R18, R30
+    CPI R18, 12
+    BRLO fma_desnormaliza
+    LDI R18, 12
+fma_desnormaliza:
+    LSR R25
+    ROR R24
+    DEC R18
+    BRNE fma_desnormaliza
+    LDI R30, 1
+fma_arredonda:
+    ; Mantissa de 11 bits (bits 31-21); o bit 20 (meio ulp) sai no carry e arredonda
+    MOVW R16, R24
+    LSR R17
+    ROR R16
+    LSR R17
+    ROR R16
+    LSR R17
+    ROR R16
+    LSR R17
+    ROR R16
+    LSR R17
+    ROR R16
+    ADC R16, R1
+    ADC R17, R1
+    ; Expoente somado à mantissa (o bit implícito já conta 1 no campo; o vai-um do arredondamento passa para o expoente)
+    DEC R30
+    LSL R30
+    LSL R30
+    ADD R17, R30
+    CPI R17, 0x7C
+    BRLO fma_sinal
+    LDI R17, 0x7C        ; Acima do maior finito: infinito
+    CLR R16
+fma_sinal:
+    OR R17, R2
+
+fma_fim:
+    ; Restaurar registradores
+    POP R31
+    POP R30
+    POP R29
+    POP R28
+    POP R27
+    POP R26
+    POP R25
+    POP R24
+    POP R23
+    POP R22
+    POP R21
+    POP R20
+    POP R19
+    POP R18
+    POP R3
+    POP R2
+    POP R0
+    RET
+""")
+
+# Inteiro de 16 bits com sinal em R17:R16 (exato em half-precision, ver operacao_int16) para half-precision
+registrar_rotina('int16_para_half', """
+int16_para_half:
+    ; Empilhar registradores (só R17:R16 volta alterado)
+    PUSH R18
+    PUSH R19
+    ; Zero tem os mesmos bits em half-precision
+    MOV R18, R16
+    OR R18, R17
+    BREQ int16_para_half_fim
+    ; Sinal em R19 e módulo em R17:R16 (-32768 continua 0x8000, o módulo sem sinal)
+    CLR R19
+    SBRS R17, 7
+    RJMP int16_para_half_normalizar
+    LDI R19, 0x80
+    COM R17
+    NEG R16
+    SBCI R17, 0xFF
+int16_para_half_normalizar:
+    ; Expoente com bias para o bit mais alto no bit 15 (15 + 15), decrementado a cada deslocamento
+    LDI R18, 30
+int16_para_half_desloca:
+    SBRC R17, 7
+    RJMP int16_para_half_mantissa
+    LSL R16
+    ROL R17
+    DEC R18
+    RJMP int16_para_half_desloca
+int16_para_half_mantissa:
+    ; Mantissa nos bits 9-0 (os bits descartados são zero: o inteiro é exato)
+    LSR R17
+    ROR R16
+    LSR R17
+    ROR R16
+    LSR R17
+    ROR R16
+    LSR R17
+    ROR R16
+    LSR R17
+    ROR R16
+    ANDI R17, 0x03       ; Retirar o bit implícito
+    ; Expoente nos bits 14-10 e sinal no bit 15
+    LSL R18
+    LSL R18
+    OR R17, R18
+    OR R17, R19
+int16_para_half_fim:
+    POP R19
+    POP R18
+    RET
+""")
 
+registrar_rotina('half_divide', """
 half_divide:
     ; Empilhar registradores
     PUSH R20
@@ -744,7 +2500,9 @@ half_div_by_zero:
     POP R21
     POP R20
     RET
+""")
 
+registrar_rotina('half_power', """
 half_power:
     ; Empilhar registradores
     PUSH R20
@@ -843,7 +2601,9 @@ power_nan:
     POP R21
     POP R20
     RET
+""")
 
+registrar_rotina('half_modulo', """
 half_modulo:
     ; Empilhar registradores
     PUSH R20
@@ -909,7 +2669,10 @@ mod_by_zero:
     POP R21
     POP R20
     RET
+""")
 
+# --- Rotinas comuns a todos os formatos numéricos ---
+registrar_rotina('integer_divide', """
 integer_divide:
     ; Empilhar registradores
     PUSH R20
@@ -950,9 +2713,9 @@ div_by_zero:
     POP R21
     POP R20
     RET
+""")
 
-;***********************************************************************************************
-
+registrar_rotina('uart_envia_byte', """
 ; Função para enviar um byte pela UART
 uart_envia_byte:
     LDS R17, UCSR0A
@@ -960,7 +2723,9 @@ uart_envia_byte:
     RJMP uart_envia_byte
     STS UDR0, R16
     RET
+""")
 
+registrar_rotina('delay_ms', """
 ; Função de delay em milissegundos
 delay_ms:
     PUSH R20
@@ -978,72 +2743,1703 @@ delay_ms_inner:
     RET
 """)
 
-def main():
-    """
-    Função principal que orquestra o fluxo do programa:
-    1. Lê o arquivo de entrada com expressões RPN
-    2. Gera código Assembly para Arduino
-    3. Exibe resultados e salva código Assembly em arquivo
-    """
-    # Verificar se o nome do arquivo foi fornecido
-    if len(sys.argv) != 2:
-        print("Uso: python rpn_calculator.py <arquivo>")
-        sys.exit(1)
-    
-    # Ler as expressões do arquivo
-    nomeArquivo = sys.argv[1].lower()
-    linhas = read_expressions_file(nomeArquivo)
+# --- Ponto fixo Q8.8 (16 bits com sinal, 8 bits de fração): a em R17:R16, b em R19:R18, resultado em R17:R16 ---
+registrar_rotina('fixed16_add', """
+fixed16_add:
+    ADD R16, R18
+    ADC R17, R19
+    RET
+""")
 
-    # Criar arquivo de código Assembly
-    with open('calculadora.asm', 'w') as file:
-        # Escrever cabeçalho e configuração inicial
-        file.write("""; Calculadora RPN - Código Assembly para ATmega328P (IEEE 754 Half-precision 16 bits)
-; Alunos: Gabriel Martins Vicente, Javier Agustin Aranibar González, Matheus Paul Lopuch, Rafael Bonfim Zacco
-;***********************************************************************************************
-.equ SPH, 0x3E    ; Stack Pointer High
-.equ SPL, 0x3D    ; Stack Pointer Low
-.equ UBRR0L, 0xC4 ; Baud Rate Register Low
-.equ UBRR0H, 0xC5 ; Baud Rate Regis ter High
-; 3 registradores (UCSR0A, UCSR0B e UCSR0C) são todos necessários para configurar e controlar a UART corretamente
-.equ UCSR0A, 0xC0 ; Control and Status Register A: Usado para verificar o status da UART, como a verificação de transmissão completa ou erro de paridade (bit 5: UDRE0)
-.equ UCSR0B, 0xC1 ; Control and Status Register B: Responsável pelo controle da habilitação da UART, como o habilitamento de transmissor (bit TXEN0)
-.equ UCSR0C, 0xC2 ; Control and Status Register C: Configurar o formato de dados da UART, como o número de bits por caractere, paridade e bits de stop
-.equ UDR0, 0xC6   ; Registrador de dados para a UART0 (1° porta UART do microcontrolador), é utilizado para enviar e receber dados através da comunicação serial (buffer)
-; Fórmula para definir o Universal Boud Rate Register (UBRR): UBRR = Fcpu / (16 * Baud Rate) -1
-; Para o ATmega328P seria: 16MHz / (16 * 9600) - 1 = 103
-;***********************************************************************************************
+registrar_rotina('fixed16_subtract', """
+fixed16_subtract:
+    SUB R16, R18
+    SBC R17, R19
+    RET
+""")
 
-.ORG 0x0000
-    RJMP reset
-    
-reset:
-    ; Configurar stack pointer
-    LDI R16, 0x08
-    OUT SPH, r16
-    LDI r16, 0xFF
-    OUT SPL, r16
-        
-        ; Configurar UART
-        LDI R16, 103
-        STS UBRR0L, r16
-        LDI R16, 0
-        STS UBRR0H, r16
-        LDI R16, 8
-        STS UCSR0B, r16
-        LDI R16, 6
-        STS UCSR0C, r16
-        
-        ; Delay inicial
-        LDI R20, 255
-    delay_init_loop: ; Delay para estabilizar
-    DEC R20
-    BRNE delay_init_loop
-    
-    ; Enviar mensagem inicial
-    LDI R16, 'C'
-    RCALL uart_envia_byte
-    LDI R16, 'a'
-    RCALL uart_envia_byte
+registrar_rotina('fixed16_multiply', """
+fixed16_multiply:
+    ; Produto de 32 bits com sinal em R23:R22:R21:R20 (nota de aplicação AVR201)
+    PUSH R20
+    PUSH R21
+    PUSH R22
+    PUSH R23
+    PUSH R24
+    CLR R24              ; Registrador zero
+    MULS R17, R19        ; ah * bh (com sinal)
+    MOVW R22, R0
+    MUL R16, R18         ; al * bl
+    MOVW R20, R0
+    MULSU R17, R18       ; ah * bl (com sinal x sem sinal)
+    SBC R23, R24         ; Extensão do sinal
+    ADD R21, R0
+    ADC R22, R1
+    ADC R23, R24
+    MULSU R19, R16       ; bh * al
+    SBC R23, R24
+    ADD R21, R0
+    ADC R22, R1
+    ADC R23, R24
+    ; Resultado = bytes centrais do produto (deslocamento de 8 bits)
+    MOV R16, R21
+    MOV R17, R22
+    CLR R1
+    POP R24
+    POP R23
+    POP R22
+    POP R21
+    POP R20
+    RET
+""")
+
+registrar_rotina('fixed16_udiv', """
+; Divisão sem sinal por subtrações sucessivas
+; Dividendo em R17:R16:R24 (deslocado a cada passo), divisor em R19:R18,
+; número de passos em R25; quociente em R17:R16:R24 e resto em R27:R26
+fixed16_udiv:
+    CLR R26
+    CLR R27
+fixed16_udiv_loop:
+    LSL R24
+    ROL R16
+    ROL R17
+    ROL R26
+    ROL R27
+    CP R26, R18
+    CPC R27, R19
+    BRLO fixed16_udiv_next
+    SUB R26, R18
+    SBC R27, R19
+    INC R24              ; Bit do quociente
+fixed16_udiv_next:
+    DEC R25
+    BRNE fixed16_udiv_loop
+    RET
+""", codigo_rapido="""
+; Divisão sem sinal por subtrações sucessivas, laço desenrolado 4 vezes
+; Dividendo em R17:R16:R24 (deslocado a cada passo), divisor em R19:R18,
+; número de passos em R25 (múltiplo de 4); quociente em R17:R16:R24 e resto em R27:R26
+fixed16_udiv:
+    CLR R26
+    CLR R27
+fixed16_udiv_loop:
+    LSL R24
+    ROL R16
+    ROL R17
+    ROL R26
+    ROL R27
+    CP R26, R18
+    CPC R27, R19
+    BRLO fixed16_udiv_next1
+    SUB R26, R18
+    SBC R27, R19
+    INC R24              ; Bit do quociente
+fixed16_udiv_next1:
+    LSL R24
+    ROL R16
+    ROL R17
+    ROL R26
+    ROL R27
+    CP R26, R18
+    CPC R27, R19
+    BRLO fixed16_udiv_next2
+    SUB R26, R18
+    SBC R27, R19
+    INC R24              ; Bit do quociente
+fixed16_udiv_next2:
+    LSL R24
+    ROL R16
+    ROL R17
+    ROL R26
+    ROL R27
+    CP R26, R18
+    CPC R27, R19
+    BRLO fixed16_udiv_next3
+    SUB R26, R18
+    SBC R27, R19
+    INC R24              ; Bit do quociente
+fixed16_udiv_next3:
+    LSL R24
+    ROL R16
+    ROL R17
+    ROL R26
+    ROL R27
+    CP R26, R18
+    CPC R27, R19
+    BRLO fixed16_udiv_next4
+    SUB R26, R18
+    SBC R27, R19
+    INC R24              ; Bit do quociente
+fixed16_udiv_next4:
+    SUBI R25, 4
+    BRNE fixed16_udiv_loop
+    RET
+""")
+
+registrar_rotina('fixed16_abs', """
+; Troca a e b pelos valores absolutos; R20 recebe os sinais (bit 7: a, bit 6: b)
+; e R21 o sinal do quociente (bit 7: sinais diferentes)
+fixed16_abs:
+    MOV R21, R17
+    EOR R21, R19
+    CLR R20
+    SBRS R17, 7
+    RJMP fixed16_abs_b
+    ORI R20, 0x80
+    COM R17
+    NEG R16
+    SBCI R17, 0xFF
+fixed16_abs_b:
+    SBRS R19, 7
+    RET
+    ORI R20, 0x40
+    COM R19
+    NEG R18
+    SBCI R19, 0xFF
+    RET
+""")
+
+registrar_rotina('fixed16_divide', """
+fixed16_divide:
+    PUSH R20
+    PUSH R21
+    PUSH R24
+    PUSH R25
+    PUSH R26
+    PUSH R27
+    RCALL fixed16_abs
+    CLR R24              ; Dividendo = |a| << 8
+    LDI R25, 24
+    RCALL fixed16_udiv
+    MOV R17, R16         ; Quociente (16 bits menos significativos)
+    MOV R16, R24
+    SBRS R21, 7          ; Sinais diferentes: resultado negativo
+    RJMP fixed16_divide_fim
+    COM R17
+    NEG R16
+    SBCI R17, 0xFF
+fixed16_divide_fim:
+    POP R27
+    POP R26
+    POP R25
+    POP R24
+    POP R21
+    POP R20
+    RET
+""", dependencias=('fixed16_abs', 'fixed16_udiv'))
+
+registrar_rotina('fixed16_modulo', """
+fixed16_modulo:
+    PUSH R20
+    PUSH R21
+    PUSH R24
+    PUSH R25
+    PUSH R26
+    PUSH R27
+    RCALL fixed16_abs
+    LDI R25, 16          ; Dividendo = |a|
+    RCALL fixed16_udiv
+    MOVW R16, R26        ; Resto de |a| / |b|
+    ; O resto truncado tem o sinal de a
+    SBRS R20, 7
+    RJMP fixed16_modulo_sinal
+    COM R17
+    NEG R16
+    SBCI R17, 0xFF
+fixed16_modulo_sinal:
+    ; Resto diferente de zero com sinal diferente do divisor: somar o divisor
+    MOV R24, R16
+    OR R24, R17
+    BREQ fixed16_modulo_fim
+    SBRS R21, 7
+    RJMP fixed16_modulo_fim
+    SBRC R20, 6          ; Divisor negativo?
+    RJMP fixed16_modulo_negativo
+    ADD R16, R18
+    ADC R17, R19
+    RJMP fixed16_modulo_fim
+fixed16_modulo_negativo:
+    SUB R16, R18         ; b = -|b|
+    SBC R17, R19
+fixed16_modulo_fim:
+    POP R27
+    POP R26
+    POP R25
+    POP R24
+    POP R21
+    POP R20
+    RET
+""", dependencias=('fixed16_abs', 'fixed16_udiv'))
+
+registrar_rotina('fixed16_power', """
+fixed16_power:
+    ; Multiplicações sucessivas; o expoente é a parte inteira de b (R19)
+    PUSH R25
+    PUSH R26
+    PUSH R27
+    MOVW R26, R16        ; Base
+    MOV R25, R19         ; Contador
+    LDI R16, 0x00        ; Resultado = 1.0
+    LDI R17, 0x01
+fixed16_power_loop:
+    TST R25
+    BREQ fixed16_power_fim
+    MOVW R18, R26
+    RCALL fixed16_multiply
+    DEC R25
+    RJMP fixed16_power_loop
+fixed16_power_fim:
+    POP R27
+    POP R26
+    POP R25
+    RET
+""", dependencias=('fixed16_multiply',))
+
+registrar_rotina('fixed16_floordiv', """
+; Divisão inteira (operador /): trunca a e b para inteiros e arredonda o quociente para baixo
+fixed16_floordiv:
+    SBRS R17, 7          ; a negativo com fração: a parte inteira (R17) sobe 1
+    RJMP fixed16_floordiv_b
+    TST R16
+    BREQ fixed16_floordiv_b
+    INC R17
+fixed16_floordiv_b:
+    CLR R16
+    SBRS R19, 7          ; O mesmo para b
+    RJMP fixed16_floordiv_div
+    TST R18
+    BREQ fixed16_floordiv_div
+    INC R19
+fixed16_floordiv_div:
+    CLR R18
+    RCALL fixed16_divide ; Quociente truncado: a fração restante nunca é menor que 1/256
+    CLR R16              ; Descartar a fração = arredondar para baixo (complemento de dois)
+    RET
+""", dependencias=('fixed16_divide',))
+
+# --- Ponto fixo Q16.16 (32 bits com sinal, 16 bits de fração): a em R19:R16, b em R23:R20, resultado em R19:R16 ---
+registrar_rotina('fixed32_add', """
+fixed32_add:
+    ADD R16, R20
+    ADC R17, R21
+    ADC R18, R22
+    ADC R19, R23
+    RET
+""")
+
+registrar_rotina('fixed32_subtract', """
+fixed32_subtract:
+    SUB R16, R20
+    SBC R17, R21
+    SBC R18, R22
+    SBC R19, R23
+    RET
+""")
+
+registrar_rotina('fixed32_multiply', """
+fixed32_multiply:
+    ; Multiplicação por somas e deslocamentos (32 passos, um por bit de b):
+    ; produto sem sinal de 64 bits em R29:R28:R25:R24:R23:R22:R21:R20
+    PUSH R24
+    PUSH R25
+    PUSH R26
+    PUSH R27
+    PUSH R28
+    PUSH R29
+    PUSH R30
+    MOVW R26, R20        ; b (16 bits menos significativos) para a correção do sinal
+    BST R23, 7           ; T = sinal de b
+    CLR R24
+    CLR R25
+    MOVW R28, R24
+    LDI R30, 32
+    LSR R23              ; Primeiro bit de b no carry
+    ROR R22
+    ROR R21
+    ROR R20
+fixed32_multiply_loop:
+    BRCC fixed32_multiply_shift
+    ADD R24, R16
+    ADC R25, R17
+    ADC R28, R18
+    ADC R29, R19
+fixed32_multiply_shift:
+    ROR R29
+    ROR R28
+    ROR R25
+    ROR R24
+    ROR R23
+    ROR R22
+    ROR R21
+    ROR R20
+    DEC R30
+    BRNE fixed32_multiply_loop
+    ; Correção do sinal: subtrair b << 32 se a < 0 e a << 32 se b < 0
+    SBRS R19, 7
+    RJMP fixed32_multiply_b
+    SUB R24, R26
+    SBC R25, R27
+fixed32_multiply_b:
+    BRTC fixed32_multiply_fim
+    SUB R24, R16
+    SBC R25, R17
+fixed32_multiply_fim:
+    ; Resultado = bytes 2 a 5 do produto (deslocamento de 16 bits)
+    MOVW R16, R22
+    MOVW R18, R24
+    POP R30
+    POP R29
+    POP R28
+    POP R27
+    POP R26
+    POP R25
+    POP R24
+    RET
+""", codigo_rapido="""
+fixed32_multiply:
+    ; Bytes 0 a 5 do produto sem sinal em R29:R24 (os bytes 6 e 7 não são usados)
+    PUSH R24
+    PUSH R25
+    PUSH R26
+    PUSH R27
+    PUSH R28
+    PUSH R29
+    PUSH R30
+    CLR R30              ; Registrador zero
+    MUL R16, R20         ; a0 * b0 -> bytes 0-1
+    MOVW R24, R0
+    MUL R17, R21         ; a1 * b1 -> bytes 2-3
+    MOVW R26, R0
+    MUL R18, R22         ; a2 * b2 -> bytes 4-5
+    MOVW R28, R0
+    MUL R16, R21         ; a0 * b1 -> byte 1
+    ADD R25, R0
+    ADC R26, R1
+    ADC R27, R30
+    ADC R28, R30
+    ADC R29, R30
+    MUL R17, R20         ; a1 * b0 -> byte 1
+    ADD R25, R0
+    ADC R26, R1
+    ADC R27, R30
+    ADC R28, R30
+    ADC R29, R30
+    MUL R16, R22         ; a0 * b2 -> byte 2
+    ADD R26, R0
+    ADC R27, R1
+    ADC R28, R30
+    ADC R29, R30
+    MUL R18, R20         ; a2 * b0 -> byte 2
+    ADD R26, R0
+    ADC R27, R1
+    ADC R28, R30
+    ADC R29, R30
+    MUL R16, R23         ; a0 * b3 -> byte 3
+    ADD R27, R0
+    ADC R28, R1
+    ADC R29, R30
+    MUL R17, R22         ; a1 * b2 -> byte 3
+    ADD R27, R0
+    ADC R28, R1
+    ADC R29, R30
+    MUL R18, R21         ; a2 * b1 -> byte 3
+    ADD R27, R0
+    ADC R28, R1
+    ADC R29, R30
+    MUL R19, R20         ; a3 * b0 -> byte 3
+    ADD R27, R0
+    ADC R28, R1
+    ADC R29, R30
+    MUL R17, R23         ; a1 * b3 -> byte 4
+    ADD R28, R0
+    ADC R29, R1
+    MUL R19, R21         ; a3 * b1 -> byte 4
+    ADD R28, R0
+    ADC R29, R1
+    MUL R18, R23         ; a2 * b3 -> byte 5
+    ADD R29, R0
+    MUL R19, R22         ; a3 * b2 -> byte 5
+    ADD R29, R0
+    ; Correção do sinal: subtrair b << 32 se a < 0 e a << 32 se b < 0
+    SBRS R19, 7
+    RJMP fixed32_multiply_b
+    SUB R28, R20
+    SBC R29, R21
+fixed32_multiply_b:
+    SBRS R23, 7
+    RJMP fixed32_multiply_fim
+    SUB R28, R16
+    SBC R29, R17
+fixed32_multiply_fim:
+    ; Resultado = bytes 2 a 5 do produto (deslocamento de 16 bits)
+    MOVW R16, R26
+    MOVW R18, R28
+    CLR R1
+    POP R30
+    POP R29
+    POP R28
+    POP R27
+    POP R26
+    POP R25
+    POP R24
+    RET
+""")
+
+registrar_rotina('fixed32_udiv', """
+; Divisão sem sinal por subtrações sucessivas
+; Dividendo em R19:R16:R25:R24 (deslocado a cada passo), divisor em R23:R20,
+; número de passos em R30; quociente em R19:R16:R25:R24 e resto em R29:R26
+fixed32_udiv:
+    CLR R26
+    CLR R27
+    MOVW R28, R26
+fixed32_udiv_loop:
+    LSL R24
+    ROL R25
+    ROL R16
+    ROL R17
+    ROL R18
+    ROL R19
+    ROL R26
+    ROL R27
+    ROL R28
+    ROL R29
+    CP R26, R20
+    CPC R27, R21
+    CPC R28, R22
+    CPC R29, R23
+    BRLO fixed32_udiv_next
+    SUB R26, R20
+    SBC R27, R21
+    SBC R28, R22
+    SBC R29, R23
+    INC R24              ; Bit do quociente
+fixed32_udiv_next:
+    DEC R30
+    BRNE fixed32_udiv_loop
+    RET
+""", codigo_rapido="""
+; Divisão sem sinal por subtrações sucessivas, laço desenrolado 4 vezes
+; Dividendo em R19:R16:R25:R24 (deslocado a cada passo), divisor em R23:R20,
+; número de passos em R30 (múltiplo de 4); quociente em R19:R16:R25:R24 e resto em R29:R26
+fixed32_udiv:
+    CLR R26
+    CLR R27
+    MOVW R28, R26
+fixed32_udiv_loop:
+    LSL R24
+    ROL R25
+    ROL R16
+    ROL R17
+    ROL R18
+    ROL R19
+    ROL R26
+    ROL R27
+    ROL R28
+    ROL R29
+    CP R26, R20
+    CPC R27, R21
+    CPC R28, R22
+    CPC R29, R23
+    BRLO fixed32_udiv_next1
+    SUB R26, R20
+    SBC R27, R21
+    SBC R28, R22
+    SBC R29, R23
+    INC R24              ; Bit do quociente
+fixed32_udiv_next1:
+    LSL R24
+    ROL R25
+    ROL R16
+    ROL R17
+    ROL R18
+    ROL R19
+    ROL R26
+    ROL R27
+    ROL R28
+    ROL R29
+    CP R26, R20
+    CPC R27, R21
+    CPC R28, R22
+    CPC R29, R23
+    BRLO fixed32_udiv_next2
+    SUB R26, R20
+    SBC R27, R21
+    SBC R28, R22
+    SBC R29, R23
+    INC R24              ; Bit do quociente
+fixed32_udiv_next2:
+    LSL R24
+    ROL R25
+    ROL R16
+    ROL R17
+    ROL R18
+    ROL R19
+    ROL R26
+    ROL R27
+    ROL R28
+    ROL R29
+    CP R26, R20
+    CPC R27, R21
+    CPC R28, R22
+    CPC R29, R23
+    BRLO fixed32_udiv_next3
+    SUB R26, R20
+    SBC R27, R21
+    SBC R28, R22
+    SBC R29, R23
+    INC R24              ; Bit do quociente
+fixed32_udiv_next3:
+    LSL R24
+    ROL R25
+    ROL R16
+    ROL R17
+    ROL R18
+    ROL R19
+    ROL R26
+    ROL R27
+    ROL R28
+    ROL R29
+    CP R26, R20
+    CPC R27, R21
+    CPC R28, R22
+    CPC R29, R23
+    BRLO fixed32_udiv_next4
+    SUB R26, R20
+    SBC R27, R21
+    SBC R28, R22
+    SBC R29, R23
+    INC R24              ; Bit do quociente
+fixed32_udiv_next4:
+    SUBI R30, 4
+    BRNE fixed32_udiv_loop
+    RET
+""")
+
+registrar_rotina('fixed32_abs', """
+; Troca a e b pelos valores absolutos; R31 recebe os sinais
+; (bit 7: sinais diferentes, bit 6: a negativo, bit 5: b negativo)
+fixed32_abs:
+    MOV R31, R19
+    EOR R31, R23
+    ANDI R31, 0x80
+    SBRS R19, 7
+    RJMP fixed32_abs_b
+    ORI R31, 0x40
+    COM R19
+    COM R18
+    COM R17
+    NEG R16
+    SBCI R17, 0xFF
+    SBCI R18, 0xFF
+    SBCI R19, 0xFF
+fixed32_abs_b:
+    SBRS R23, 7
+    RET
+    ORI R31, 0x20
+    COM R23
+    COM R22
+    COM R21
+    NEG R20
+    SBCI R21, 0xFF
+    SBCI R22, 0xFF
+    SBCI R23, 0xFF
+    RET
+""")
+
+registrar_rotina('fixed32_divide', """
+fixed32_divide:
+    PUSH R24
+    PUSH R25
+    PUSH R26
+    PUSH R27
+    PUSH R28
+    PUSH R29
+    PUSH R30
+    PUSH R31
+    RCALL fixed32_abs
+    CLR R24              ; Dividendo = |a| << 16
+    CLR R25
+    LDI R30, 48
+    RCALL fixed32_udiv
+    MOVW R18, R16        ; Quociente (32 bits menos significativos)
+    MOVW R16, R24
+    SBRS R31, 7          ; Sinais diferentes: resultado negativo
+    RJMP fixed32_divide_fim
+    COM R19
+    COM R18
+    COM R17
+    NEG R16
+    SBCI R17, 0xFF
+    SBCI R18, 0xFF
+    SBCI R19, 0xFF
+fixed32_divide_fim:
+    POP R31
+    POP R30
+    POP R29
+    POP R28
+    POP R27
+    POP R26
+    POP R25
+    POP R24
+    RET
+""", dependencias=('fixed32_abs', 'fixed32_udiv'))
+
+registrar_rotina('fixed32_modulo', """
+fixed32_modulo:
+    PUSH R24
+    PUSH R25
+    PUSH R26
+    PUSH R27
+    PUSH R28
+    PUSH R29
+    PUSH R30
+    PUSH R31
+    RCALL fixed32_abs
+    LDI R30, 32          ; Dividendo = |a|
+    RCALL fixed32_udiv
+    MOVW R16, R26        ; Resto de |a| / |b|
+    MOVW R18, R28
+    ; O resto truncado tem o sinal de a
+    SBRS R31, 6
+    RJMP fixed32_modulo_sinal
+    COM R19
+    COM R18
+    COM R17
+    NEG R16
+    SBCI R17, 0xFF
+    SBCI R18, 0xFF
+    SBCI R19, 0xFF
+fixed32_modulo_sinal:
+    ; Resto diferente de zero com sinal diferente do divisor: somar o divisor
+    MOV R24, R16
+    OR R24, R17
+    OR R24, R18
+    OR R24, R19
+    BREQ fixed32_modulo_fim
+    SBRS R31, 7
+    RJMP fixed32_modulo_fim
+    SBRC R31, 5          ; Divisor negativo?
+    RJMP fixed32_modulo_negativo
+    ADD R16, R20
+    ADC R17, R21
+    ADC R18, R22
+    ADC R19, R23
+    RJMP fixed32_modulo_fim
+fixed32_modulo_negativo:
+    SUB R16, R20         ; b = -|b|
+    SBC R17, R21
+    SBC R18, R22
+    SBC R19, R23
+fixed32_modulo_fim:
+    POP R31
+    POP R30
+    POP R29
+    POP R28
+    POP R27
+    POP R26
+    POP R25
+    POP R24
+    RET
+""", dependencias=('fixed32_abs', 'fixed32_udiv'))
+
+registrar_rotina('fixed32_power', """
+fixed32_power:
+    ; Multiplicações sucessivas; o expoente é a parte inteira de b (R23:R22)
+    PUSH R24
+    PUSH R25
+    PUSH R26
+    PUSH R27
+    PUSH R28
+    PUSH R29
+    MOVW R26, R16        ; Base
+    MOVW R28, R18
+    MOVW R24, R22        ; Contador
+    LDI R16, 0x00        ; Resultado = 1.0
+    LDI R17, 0x00
+    LDI R18, 0x01
+    LDI R19, 0x00
+fixed32_power_loop:
+    SBIW R24, 1
+    BRCS fixed32_power_fim
+    MOVW R20, R26
+    MOVW R22, R28
+    RCALL fixed32_multiply
+    RJMP fixed32_power_loop
+fixed32_power_fim:
+    POP R29
+    POP R28
+    POP R27
+    POP R26
+    POP R25
+    POP R24
+    RET
+""", dependencias=('fixed32_multiply',))
+
+registrar_rotina('fixed32_floordiv', """
+; Divisão inteira (operador /): trunca a e b para inteiros e arredonda o quociente para baixo
+fixed32_floordiv:
+    SBRS R19, 7          ; a negativo com fração: a parte inteira (R19:R18) sobe 1
+    RJMP fixed32_floordiv_b
+    CPI R16, 0
+    BRNE fixed32_floordiv_inc_a
+    CPI R17, 0
+    BREQ fixed32_floordiv_b
+fixed32_floordiv_inc_a:
+    SUBI R18, lo8(-1)
+    SBCI R19, hi8(-1)
+fixed32_floordiv_b:
+    CLR R16
+    CLR R17
+    SBRS R23, 7          ; O mesmo para b
+    RJMP fixed32_floordiv_div
+    CPI R20, 0
+    BRNE fixed32_floordiv_inc_b
+    CPI R21, 0
+    BREQ fixed32_floordiv_div
+fixed32_floordiv_inc_b:
+    SUBI R22, lo8(-1)
+    SBCI R23, hi8(-1)
+fixed32_floordiv_div:
+    CLR R20
+    CLR R21
+    RCALL fixed32_divide ; Quociente truncado: a fração restante nunca é menor que 1/65536
+    CLR R16              ; Descartar a fração = arredondar para baixo (complemento de dois)
+    CLR R17
+    RET
+""", dependencias=('fixed32_divide',))
+
+# --- Envio da contagem de ciclos do Timer1 (--ciclos): " c=XXXX" com '!' se houve estouro ---
+registrar_rotina('uart_envia_ciclos', """
+uart_envia_ciclos:
+    LDI R16, ' '
+    RCALL uart_envia_byte
+    LDI R16, 'c'
+    RCALL uart_envia_byte
+    LDI R16, '='
+    RCALL uart_envia_byte
+    MOV R16, R3
+    RCALL uart_envia_hex8   ; Byte alto
+    MOV R16, R2
+    RCALL uart_envia_hex8   ; Byte baixo
+    SBRS R4, 0              ; Houve estouro do Timer1?
+    RET
+    LDI R16, '!'
+    RJMP uart_envia_byte
+""", dependencias=('uart_envia_byte', 'uart_envia_hex8'))
+
+registrar_rotina('uart_envia_hex8', """
+; Envia R16 como dois dígitos hexadecimais
+uart_envia_hex8:
+    PUSH R16
+    SWAP R16                ; Nibble alto primeiro
+    RCALL uart_envia_nibble
+    POP R16
+uart_envia_nibble:
+    ANDI R16, 0x0F
+    CPI R16, 10
+    BRLO nibble_digito
+    SUBI R16, -7            ; 'A' - '0' - 10
+nibble_digito:
+    SUBI R16, -48           ; + '0'
+    RJMP uart_envia_byte
+""", dependencias=('uart_envia_byte',))
+
+# --- Envio de um texto guardado na flash (laços paramétricos), uma variante por instrução de leitura ---
+for _leitura in ('LPM', 'ELPM'):
+    registrar_rotina(f'uart_envia_flash_{_leitura.lower()}', f"""
+; Envia o texto terminado em 0 apontado por Z (Z fica logo depois do 0)
+uart_envia_flash_{_leitura.lower()}:
+    {_leitura} R16, Z+
+    TST R16
+    BREQ uart_envia_flash_{_leitura.lower()}_fim
+    RCALL uart_envia_byte
+    RJMP uart_envia_flash_{_leitura.lower()}
+uart_envia_flash_{_leitura.lower()}_fim:
+    RET
+""", dependencias=('uart_envia_byte',))
+
+# --- Impressão de um half-precision no Arduino: o mesmo texto de texto_half_ieee754 ---
+registrar_rotina('uart_envia_half', """
+; Envia o texto decimal mais curto do half-precision em R17:R16 (inteiros por extenso)
+; Fração e margens (meio ULP) em unidades de 2^-25: F em R21:R18, margem acima em R15:R12,
+; margem abaixo em R11:R8; R26 = bit 0: mantissa par, bit 1: potência de 2, bits 2/3: baixo/alto
+uart_envia_half:
+    PUSH R0
+    PUSH R1
+    PUSH R8
+    PUSH R9
+    PUSH R10
+    PUSH R11
+    PUSH R12
+    PUSH R13
+    PUSH R14
+    PUSH R15
+    PUSH R18
+    PUSH R19
+    PUSH R20
+    PUSH R21
+    PUSH R22
+    PUSH R23
+    PUSH R24
+    PUSH R25
+    PUSH R26
+    PUSH R27
+    PUSH R30
+    PUSH R31
+    MOVW R24, R16        ; R16/R17 ficam livres para uart_envia_byte
+    MOV R23, R25         ; Expoente
+    LSR R23
+    LSR R23
+    ANDI R23, 0x1F
+    MOVW R26, R24        ; Mantissa
+    ANDI R27, 0x03
+    CPI R23, 31
+    BRNE uart_envia_half_finito
+    MOV R22, R26         ; Expoente 31: infinito ou NaN
+    OR R22, R27
+    BREQ uart_envia_half_inf
+    LDI R16, 'n'
+    RCALL uart_envia_byte
+    LDI R16, 'a'
+    RCALL uart_envia_byte
+    LDI R16, 'n'
+    RCALL uart_envia_byte
+    RJMP uart_envia_half_fim
+uart_envia_half_inf:
+    SBRS R25, 7
+    RJMP uart_envia_half_inf_texto
+    LDI R16, '-'
+    RCALL uart_envia_byte
+uart_envia_half_inf_texto:
+    LDI R16, 'i'
+    RCALL uart_envia_byte
+    LDI R16, 'n'
+    RCALL uart_envia_byte
+    LDI R16, 'f'
+    RCALL uart_envia_byte
+    RJMP uart_envia_half_fim
+uart_envia_half_finito:
+    MOV R22, R23         ; Zero (com qualquer sinal): "0"
+    OR R22, R26
+    OR R22, R27
+    BRNE uart_envia_half_sinal
+    LDI R16, '0'
+    RCALL uart_envia_byte
+    RJMP uart_envia_half_fim
+uart_envia_half_sinal:
+    SBRS R25, 7
+    RJMP uart_envia_half_flags
+    LDI R16, '-'
+    RCALL uart_envia_byte
+uart_envia_half_flags:
+    CLR R24
+    SBRS R26, 0
+    ORI R24, 0x01        ; Mantissa par
+    CPI R23, 2
+    BRLO uart_envia_half_significando
+    MOV R22, R26
+    OR R22, R27
+    BRNE uart_envia_half_significando
+    ORI R24, 0x02        ; Potência de 2: o ULP abaixo é a metade
+uart_envia_half_significando:
+    TST R23
+    BRNE uart_envia_half_normal
+    LDI R23, 1           ; Desnormalizado: e = 1, sem o bit implícito
+    RJMP uart_envia_half_partes
+uart_envia_half_normal:
+    ORI R27, 0x04        ; Bit implícito
+uart_envia_half_partes:
+    MOVW R18, R26
+    CPI R23, 25
+    BRLO uart_envia_half_inteiro
+    SUBI R23, 25         ; e >= 25: valor inteiro = significando << (e - 25)
+uart_envia_half_desloca:
+    TST R23
+    BREQ uart_envia_half_ultimo_inteiro
+    LSL R18
+    ROL R19
+    DEC R23
+    RJMP uart_envia_half_desloca
+uart_envia_half_ultimo_inteiro:
+    RCALL uart_envia_half_decimal
+    RJMP uart_envia_half_fim
+uart_envia_half_inteiro:
+    LDI R22, 25          ; Parte inteira = significando >> (25 - e)
+    SUB R22, R23
+uart_envia_half_inteiro_loop:
+    LSR R19
+    ROR R18
+    DEC R22
+    BRNE uart_envia_half_inteiro_loop
+    PUSH R23
+    RCALL uart_envia_half_decimal
+    POP R23
+    MOVW R18, R26        ; Fração = (significando << e) & (2^25 - 1)
+    CLR R20
+    CLR R21
+    MOV R22, R23
+uart_envia_half_fracao_loop:
+    LSL R18
+    ROL R19
+    ROL R20
+    ROL R21
+    DEC R22
+    BRNE uart_envia_half_fracao_loop
+    ANDI R21, 0x01
+    MOV R22, R18
+    OR R22, R19
+    OR R22, R20
+    OR R22, R21
+    BRNE uart_envia_half_ponto
+    RJMP uart_envia_half_fim
+uart_envia_half_ponto:
+    MOV R26, R24         ; Flags
+    LDI R16, '.'
+    RCALL uart_envia_byte
+    MOV R27, R23         ; Margem acima = 2^(e - 1)
+    LDI R22, 1
+    CLR R23
+    CLR R24
+    CLR R25
+uart_envia_half_margem:
+    DEC R27
+    BREQ uart_envia_half_margem_fim
+    LSL R22
+    ROL R23
+    ROL R24
+    ROL R25
+    RJMP uart_envia_half_margem
+uart_envia_half_margem_fim:
+    MOVW R12, R22
+    MOVW R14, R24
+    SBRS R26, 1          ; Margem abaixo = margem acima (ou a metade)
+    RJMP uart_envia_half_margem_abaixo
+    LSR R25
+    ROR R24
+    ROR R23
+    ROR R22
+uart_envia_half_margem_abaixo:
+    MOVW R8, R22
+    MOVW R10, R24
+    CLR R31
+uart_envia_half_digito:
+    LDI R30, 18          ; Fração, margem acima e margem abaixo * 10
+    RCALL uart_envia_half_x10
+    LDI R30, 12
+    RCALL uart_envia_half_x10
+    LDI R30, 8
+    RCALL uart_envia_half_x10
+    MOV R27, R21         ; Dígito = fração >> 25
+    LSR R27
+    ANDI R21, 0x01
+    ANDI R26, 0x03
+    MOVW R22, R8         ; Baixo: fração < margem abaixo (+ 1 se par)
+    MOVW R24, R10
+    SBRS R26, 0
+    RJMP uart_envia_half_baixo
+    SUBI R22, 0xFF
+    SBCI R23, 0xFF
+    SBCI R24, 0xFF
+    SBCI R25, 0xFF
+uart_envia_half_baixo:
+    CP R18, R22
+    CPC R19, R23
+    CPC R20, R24
+    CPC R21, R25
+    BRCC uart_envia_half_alto
+    ORI R26, 0x04
+uart_envia_half_alto:
+    MOVW R22, R18        ; Alto: fração + margem acima (- 1 se ímpar) >= 2^25
+    MOVW R24, R20
+    ADD R22, R12
+    ADC R23, R13
+    ADC R24, R14
+    ADC R25, R15
+    SBRC R26, 0
+    RJMP uart_envia_half_alto_compara
+    SUBI R22, 1
+    SBCI R23, 0
+    SBCI R24, 0
+    SBCI R25, 0
+uart_envia_half_alto_compara:
+    CPI R25, 2
+    BRLO uart_envia_half_decide
+    ORI R26, 0x08
+uart_envia_half_decide:
+    SBRC R26, 2
+    RJMP uart_envia_half_tem_baixo
+    SBRC R26, 3
+    RJMP uart_envia_half_arredonda
+    MOV R16, R27         ; Nenhuma margem alcançada: o dígito fica e a geração continua
+    SUBI R16, -48
+    RCALL uart_envia_byte
+    RJMP uart_envia_half_digito
+uart_envia_half_tem_baixo:
+    SBRS R26, 3
+    RJMP uart_envia_half_ultimo
+    TST R21              ; As duas: o dígito mais próximo (2F < 2^25: fica)
+    BREQ uart_envia_half_ultimo
+    MOV R22, R18
+    OR R22, R19
+    OR R22, R20
+    BRNE uart_envia_half_arredonda
+    SBRS R27, 0          ; Empate: fica o dígito par
+    RJMP uart_envia_half_ultimo
+uart_envia_half_arredonda:
+    INC R27
+uart_envia_half_ultimo:
+    MOV R16, R27
+    SUBI R16, -48
+    RCALL uart_envia_byte
+uart_envia_half_fim:
+    POP R31
+    POP R30
+    POP R27
+    POP R26
+    POP R25
+    POP R24
+    POP R23
+    POP R22
+    POP R21
+    POP R20
+    POP R19
+    POP R18
+    POP R15
+    POP R14
+    POP R13
+    POP R12
+    POP R11
+    POP R10
+    POP R9
+    POP R8
+    POP R1
+    POP R0
+    RET
+
+; Multiplica por 10 o número de 32 bits nos registradores a partir de R(Z)
+uart_envia_half_x10:
+    LDI R17, 10
+    CLR R16              ; Vai-um
+    LDI R22, 4
+uart_envia_half_x10_loop:
+    LD R0, Z
+    MUL R0, R17
+    ADD R0, R16
+    CLR R16
+    ADC R1, R16
+    ST Z+, R0
+    MOV R16, R1
+    DEC R22
+    BRNE uart_envia_half_x10_loop
+    RET
+
+; Envia R19:R18 em decimal, sem zeros à esquerda
+uart_envia_half_decimal:
+    CLT                  ; T: algum dígito já enviado
+    LDI R22, lo8(10000)
+    LDI R23, hi8(10000)
+    RCALL uart_envia_half_casa
+    LDI R22, lo8(1000)
+    LDI R23, hi8(1000)
+    RCALL uart_envia_half_casa
+    LDI R22, 100
+    LDI R23, 0
+    RCALL uart_envia_half_casa
+    LDI R22, 10
+    LDI R23, 0
+    RCALL uart_envia_half_casa
+    MOV R16, R18
+    SUBI R16, -48
+    RJMP uart_envia_byte
+uart_envia_half_casa:
+    LDI R16, '0'
+uart_envia_half_casa_loop:
+    CP R18, R22
+    CPC R19, R23
+    BRLO uart_envia_half_casa_fim
+    SUB R18, R22
+    SBC R19, R23
+    INC R16
+    SET
+    RJMP uart_envia_half_casa_loop
+uart_envia_half_casa_fim:
+    BRTC uart_envia_half_casa_zero
+    RJMP uart_envia_byte
+uart_envia_half_casa_zero:
+    RET
+""", dependencias=('uart_envia_byte',))
+
+# Chamadas a rotinas no código gerado (referências resolvidas pelo ligador)
+PADRAO_CHAMADA = re.compile(r'\b(?:RCALL|RJMP|CALL|JMP)\s+(\w+)')
+
+class _SaidaLigacao:
+    """
+    Envolve o arquivo de saída registrando os rótulos chamados pelo código escrito
+    """
+    def __init__(self, destino):
+        self.destino = destino
+        self.referencias = set()
+
+    def write(self, texto):
+        self.referencias.update(PADRAO_CHAMADA.findall(texto))
+        self.destino.write(texto)
+
+def ligar_rotinas(file, referencias, otimizacao='Os'):
+    """
+    Escreve no programa as rotinas usadas pelo código gerado (ligador)
+    
+    Parte das rotinas referenciadas e inclui as dependências declaradas de cada
+    uma; as rotinas da biblioteca que não forem alcançadas ficam de fora.
+    
+    Args:
+        file (file): Arquivo de saída para código assembly
+        referencias (iterable): Rótulos chamados pelo código gerado
+        otimizacao (str): Variante das rotinas: 'Os' (tamanho) ou 'O2' (velocidade)
+        
+    Returns:
+        list: Rotinas incluídas, na ordem da biblioteca
+    """
+    incluidas = set()
+    pendentes = [nome for nome in referencias if nome in ROTINAS]
+    while pendentes:
+        nome = pendentes.pop()
+        if nome not in incluidas:
+            incluidas.add(nome)
+            pendentes.extend(ROTINAS[nome]['dependencias'])
+    ordem = [nome for nome in ROTINAS if nome in incluidas]
+    file.write(f"""
+;***********************************************************************************************
+; Rotinas ligadas (-{otimizacao}): {', '.join(ordem)}
+;***********************************************************************************************
+""")
+    for nome in ordem:
+        file.write(ROTINAS[nome][otimizacao])
+    return ordem
+
+# Microcontroladores suportados (--alvo): memórias e periféricos de cada um.
+# 'uarts' traz, para cada porta, os endereços de UCSRnA, UCSRnB, UCSRnC, UBRRnL, UBRRnH e UDRn.
+ALVOS = {
+    'atmega328p': {
+        'nome': 'ATmega328P',         # Arduino Uno
+        'arquitetura': 'avr5',        # Emulação do avr-ld
+        'flash': 32 * 1024,
+        'bootloader': 512,            # optiboot
+        'ram_inicio': 0x0100,         # 2 KB de SRAM
+        'ram_fim': 0x08FF,
+        'chamadas_longas': False,     # RCALL enquanto o programa couber no alcance relativo
+        'leitura_flash': 'LPM',
+        'uarts': ((0xC0, 0xC1, 0xC2, 0xC4, 0xC5, 0xC6),),
+    },
+    'atmega2560': {
+        'nome': 'ATmega2560',         # Arduino Mega
+        'arquitetura': 'avr6',
+        'flash': 256 * 1024,
+        'bootloader': 8 * 1024,       # stk500v2
+        'ram_inicio': 0x0200,         # 8 KB de SRAM
+        'ram_fim': 0x21FF,
+        'chamadas_longas': True,      # CALL/JMP alcançam toda a flash
+        'leitura_flash': 'ELPM',      # Tabelas acima de 64 KB: RAMPZ:Z
+        'uarts': ((0xC0, 0xC1, 0xC2, 0xC4, 0xC5, 0xC6),
+                  (0xC8, 0xC9, 0xCA, 0xCC, 0xCD, 0xCE),
+                  (0xD0, 0xD1, 0xD2, 0xD4, 0xD5, 0xD6),
+                  (0x130, 0x131, 0x132, 0x134, 0x135, 0x136)),
+    },
+}
+
+def limite_flash(alvo='atmega328p'):
+    """
+    Memória de programa disponível para a calculadora (flash menos o bootloader)
+    
+    Args:
+        alvo (str): Microcontrolador (chave de ALVOS)
+        
+    Returns:
+        int: Bytes disponíveis
+    """
+    return ALVOS[alvo]['flash'] - ALVOS[alvo]['bootloader']
+
+# Memória de programa do ATmega328P menos os 512 bytes do bootloader do Arduino Uno
+LIMITE_FLASH = limite_flash('atmega328p')
+
+# RCALL/RJMP alcançam ±2K palavras: um programa menor que isso não precisa de CALL
+ALCANCE_RCALL = 4 * 1024
+
+# Instruções de duas palavras (4 bytes); as demais ocupam uma palavra
+INSTRUCOES_4_BYTES = {'LDS', 'STS', 'JMP', 'CALL'}
+
+def estimar_bytes(texto, chamadas_longas=False):
+    """
+    Estima os bytes de flash ocupados por um trecho Assembly
+    
+    Conta as instruções (2 bytes, ou 4 para LDS/STS/JMP/CALL) e os dados de
+    .byte, ignorando comentários, rótulos e as demais diretivas.
+    
+    Args:
+        texto (str): Código Assembly
+        chamadas_longas (bool): Conta cada RCALL como CALL (ver ajustar_chamadas)
+        
+    Returns:
+        int: Bytes de memória de programa
+    """
+    total = 0
+    for linha in texto.splitlines():
+        linha = re.sub(r"'.'", "0", linha).split(';')[0]
+        linha = re.sub(r'^\s*\w+:', '', linha).strip()
+        if linha.lower().startswith('.byte'): total += len(linha[5:].split(','))
+        if not linha or linha.startswith('.'): continue
+        instrucao = linha.split()[0].upper()
+        total += 4 if instrucao in INSTRUCOES_4_BYTES or (chamadas_longas and instrucao == 'RCALL') else 2
+    return total
+
+def usa_chamadas_longas(tamanho, alvo='atmega328p'):
+    """
+    Indica se um programa precisa de CALL em vez de RCALL
+    
+    Args:
+        tamanho (int): Bytes estimados do programa (com RCALL)
+        alvo (str): Microcontrolador (chave de ALVOS)
+        
+    Returns:
+        bool: True se as chamadas devem ser absolutas
+    """
+    return ALVOS[alvo]['chamadas_longas'] or tamanho > ALCANCE_RCALL
+
+def ajustar_chamadas(texto, alvo='atmega328p'):
+    """
+    Troca RCALL por CALL quando uma chamada relativa pode não alcançar a rotina
+    
+    O código é gerado com RCALL (1 palavra, 3 ciclos). No ATmega2560, ou em um
+    programa maior que o alcance do RCALL, todas as chamadas viram CALL
+    (2 palavras, 4 ciclos; 5 ciclos no ATmega2560). Os RJMP são todos locais
+    (dentro da mesma rotina) e continuam relativos.
+    
+    Args:
+        texto (str): Programa Assembly completo
+        alvo (str): Microcontrolador (chave de ALVOS)
+        
+    Returns:
+        str: Programa com as chamadas ajustadas
+    """
+    if not usa_chamadas_longas(estimar_bytes(texto), alvo):
+        return texto
+    return re.sub(r'^(\s*)RCALL\b', r'\1CALL', texto, flags=re.MULTILINE)
+
+def apontar_flash(file, rotulo, alvo='atmega328p'):
+    """
+    Escreve o código que aponta Z (e RAMPZ, no ATmega2560) para uma tabela na flash
+    
+    Args:
+        file (file): Arquivo de saída para código assembly
+        rotulo (str): Rótulo da tabela
+        alvo (str): Microcontrolador (chave de ALVOS)
+        
+    Returns:
+        str: Instrução de leitura da tabela ('LPM' ou 'ELPM')
+    """
+    instrucao = ALVOS[alvo]['leitura_flash']
+    if instrucao == 'ELPM':
+        file.write(f"""    LDI R30, hh8({rotulo})
+    OUT RAMPZ, R30
+""")
+    file.write(f"""    LDI R30, lo8({rotulo})
+    LDI R31, hi8({rotulo})
+""")
+    return instrucao
+
+def modelo_laco(corpos, leitura='LPM'):
+    """
+    Junta o código de cada volta de um laço paramétrico em um único corpo
+    
+    As voltas devem ter as mesmas linhas, a menos dos comentários e dos valores
+    carregados com LDI: cada LDI que muda de uma volta para outra passa a ler o
+    próximo byte da tabela do laço (LPM/ELPM Rd, Z+) e os comentários que mudam
+    são retirados.
+    
+    Args:
+        corpos (list): Código de cada volta
+        leitura (str): Instrução de leitura da flash ('LPM' ou 'ELPM', ver apontar_flash)
+        
+    Returns:
+        tuple: (corpo do laço, bytes de cada LDI trocado, um por volta), ou None se os códigos diferirem
+    """
+    voltas = [corpo.splitlines() for corpo in corpos]
+    if any(len(linhas) != len(voltas[0]) for linhas in voltas): return None
+    corpo, colunas = [], []
+    for linhas in zip(*voltas):
+        if all(linha == linhas[0] for linha in linhas):
+            corpo.append(linhas[0])
+        elif not all(linha.lstrip().startswith(';') for linha in linhas):
+            cargas = [re.fullmatch(r'(\s*)LDI (R\d+), (\d+)', linha) for linha in linhas]
+            if not all(cargas) or len({carga[2] for carga in cargas}) != 1: return None
+            corpo.append(f"{cargas[0][1]}{leitura} {cargas[0][2]}, Z+")
+            colunas.append([int(carga[3]) for carga in cargas])
+    return "\n".join(corpo) + "\n", colunas
+
+# Bytes do fim da SRAM deixados para a pilha no modo --historico
+RESERVA_PILHA = 256
+
+class HistoricoSram:
+    """
+    Histórico de resultados na SRAM do Arduino (--historico)
+
+    MEM ocupa os 2 primeiros bytes da SRAM e, logo depois, um anel guarda os
+    últimos resultados em half-precision: o resultado j (na ordem da sessão)
+    fica na posição j % posicoes, então (N RES) com N até o tamanho do anel
+    ainda está lá. Como as linhas são geradas em ordem, as posições já são
+    conhecidas na geração e as leituras e escritas usam endereços fixos: Y
+    aponta para o início do histórico (LDD/STD Y+q, 2 bytes por acesso, até a
+    31ª posição) e o resto, assim como os corpos dos laços paramétricos (que
+    usam Y como contador e leem da tabela os endereços que mudam), usa X.
+
+    Um (N RES) copia no anel o resultado referenciado, mas quem lê a cópia lê
+    o original enquanto ele não for sobrescrito (fonte). Cada escrita é
+    marcada com a sua chave ('resultado j' ou 'MEM'); as que nenhuma linha lê
+    (como a maioria dessas cópias) são retiradas no fim da geração
+    (remover_nao_lidas).
+    """
+    __slots__ = ('alvo', 'inicio', 'posicoes', 'lidas', 'origens')
+
+    def __init__(self, expressoes, alvo='atmega328p'):
+        """
+        Args:
+            expressoes (iterable): Expressões do arquivo (o anel tem o maior N de (N RES), no mínimo 1)
+            alvo (str): Microcontrolador (chave de ALVOS)
+        """
+        maior = 1
+        for expressao in expressoes:
+            try:
+                linhas = expandir_parametrica(expressao) if 'para' in expressao else [expressao]
+            except ValueError:
+                linhas = [expressao]
+            for linha in linhas:
+                for n in re.findall(r'\(\s*(\d+)\s+RES\s*\)', linha):
+                    maior = max(maior, int(n))
+        perfil_alvo = ALVOS[alvo]
+        capacidade = (perfil_alvo['ram_fim'] + 1 - perfil_alvo['ram_inicio'] - RESERVA_PILHA) // 2 - 1
+        self.alvo = alvo
+        self.inicio = perfil_alvo['ram_inicio']
+        self.posicoes = min(maior, capacidade)  # Referências mais distantes continuam como constantes
+        self.lidas = set()
+        self.origens = {}  # Resultado copiado por (N RES) -> resultado original
+
+    @property
+    def endereco_memoria(self):
+        """
+        Endereço de MEM na SRAM
+        """
+        return self.inicio
+
+    def endereco(self, indice):
+        """
+        Endereço na SRAM da posição do anel que guarda um resultado
+
+        Args:
+            indice (int): Índice do resultado na sessão (-1: RES antes de qualquer resultado, zerado)
+
+        Returns:
+            int: Endereço do byte baixo
+        """
+        return self.inicio + 2 + 2 * (indice % self.posicoes)
+
+    def fonte(self, indice, total):
+        """
+        Resultado cuja posição no anel é lida para obter outro
+
+        Args:
+            indice (int): Resultado lido
+            total (int): Resultados da sessão até agora
+
+        Returns:
+            int: O original de que o resultado é cópia, se ainda estiver no anel; senão o próprio índice
+        """
+        origem = self.origens.get(indice, indice)
+        return origem if total - origem <= self.posicoes else indice
+
+    def ler(self, chave):
+        """
+        Registra que uma linha lê o valor guardado com a chave
+        """
+        self.lidas.add(chave)
+
+    def base(self, laco=False):
+        """
+        Endereço apontado por Y (None no corpo de um laço paramétrico, onde Y conta as voltas)
+        """
+        return None if laco else self.inicio
+
+    def carga(self, registrador, endereco, laco=False):
+        """
+        Código que lê um valor do histórico para um par de registradores (ver _carga_sram)
+        """
+        return _carga_sram(registrador, endereco, self.base(laco))
+
+    def guardar(self, file, chave, endereco, carga, laco=False):
+        """
+        Escreve o código que guarda R17:R16 na SRAM (retirado se ninguém ler a chave)
+
+        Args:
+            file (file): Arquivo de saída para código assembly
+            chave (str): 'resultado j' ou 'MEM'
+            endereco (int): Endereço do byte baixo na SRAM
+            carga (str): Código que coloca o valor em R17:R16
+            laco (bool): Corpo de um laço paramétrico (sem Y)
+        """
+        file.write(f"""
+    ; Histórico: guardar {chave}
+{carga}{_guarda_sram(endereco, self.base(laco))}""")
+
+    def guardar_valor(self, file, chave, endereco, valor, laco=False):
+        """
+        Guarda o resultado de uma linha logo depois do cálculo (ver guardar)
+
+        O resultado calculado pelo código em R17:R16 é guardado como está; um
+        MEM ou RES sem operação é lido da SRAM, e os demais valores (números
+        sem operação e os resultados das rotinas fora de CALCULADAS_NO_ARDUINO)
+        são carregados como constantes.
+
+        Args:
+            file (file): Arquivo de saída para código assembly
+            chave (str): 'resultado j'
+            endereco (int): Endereço do byte baixo na SRAM
+            valor (float): Resultado (_ResultadoNoRegistrador, _ValorSram ou número)
+            laco (bool): Corpo de um laço paramétrico (sem Y)
+        """
+        if isinstance(valor, _ResultadoNoRegistrador):
+            carga = ""
+        elif isinstance(valor, _ValorSram):
+            carga = self.carga(16, valor.endereco, laco)
+        else:
+            carga = _carga(16, float_to_half_ieee754(valor))
+        self.guardar(file, chave, endereco, carga, laco)
+
+    def apontar_y(self, file):
+        """
+        Escreve o código que aponta Y para o início do histórico
+        """
+        file.write(f"""    LDI R28, {self.inicio & 0xFF}       ; Y = histórico (MEM e anel)
+    LDI R29, {self.inicio >> 8}
+""")
+
+    def remover_nao_lidas(self, texto):
+        """
+        Retira do programa as escritas no histórico que nenhuma linha lê
+
+        Nos laços paramétricos a marca (comentário) some junto com os demais
+        comentários que mudam de uma volta para outra, e a escrita fica.
+
+        Args:
+            texto (str): Programa Assembly
+
+        Returns:
+            str: Programa sem as escritas desnecessárias
+        """
+        return re.sub(r"\n    ; Histórico: guardar (.+)\n(?:.*\n)*?    ST(?:D Y\+\d+| X), R17\n",
+                      lambda escrita: escrita[0] if escrita[1] in self.lidas else "", texto)
+
+    def escrever_inicio(self, file, memoria, resultados):
+        """
+        Escreve o código que prepara o histórico no início de uma imagem
+
+        A região é zerada; se o estado inicial tiver valores (imagens depois da
+        primeira), MEM e os últimos resultados são copiados de uma tabela na flash.
+
+        Args:
+            file (file): Arquivo de saída para código assembly
+            memoria (float): MEM no início da imagem
+            resultados (list): Resultados da sessão até o início da imagem
+        """
+        valores = [0] * (self.posicoes + 1)
+        valores[0] = float_to_half_ieee754(float(memoria))
+        for indice in range(max(0, len(resultados) - self.posicoes), len(resultados)):
+            valores[1 + indice % self.posicoes] = float_to_half_ieee754(float(resultados[indice]))
+        n_bytes = 2 * len(valores)
+        file.write(f"""
+    ; Histórico em SRAM (--historico): MEM em 0x{self.inicio:04X} e os últimos {self.posicoes} resultados a seguir
+""")
+        if any(valores):
+            dados = [byte for valor in valores for byte in (valor & 0xFF, valor >> 8)]
+            file.write(f"""    {'RJMP' if n_bytes < ALCANCE_RCALL else 'JMP'} historico_inicio
+historico_tabela:
+""")
+            for i in range(0, n_bytes, 16):
+                file.write(f"    .byte {', '.join(map(str, dados[i:i + 16]))}\n")
+            file.write("historico_inicio:\n")
+            leitura = apontar_flash(file, 'historico_tabela', self.alvo)
+        file.write(f"""    LDI R26, {self.inicio & 0xFF}       ; X = início do histórico
+    LDI R27, {self.inicio >> 8}
+    LDI R24, {n_bytes & 0xFF}       ; R25:R24 = bytes
+    LDI R25, {n_bytes >> 8}
+""")
+        file.write(f"""historico_prepara:
+    {leitura} R16, Z+
+""" if any(valores) else """    CLR R16
+historico_prepara:
+""")
+        file.write("""    ST X+, R16
+    SBIW R24, 1
+    BRNE historico_prepara
+""")
+        self.apontar_y(file)
+
+# Pares que guardam as constantes residentes (--constantes): R0:R1 são do MUL e R2-R4 do
+# --ciclos; nenhuma rotina usa R5-R7 e uart_envia_half preserva R8-R15
+REGISTRADORES_CONSTANTES = (6, 8, 10, 12, 14)
+
+# Comentário escrito depois do cabeçalho, trocado pela carga das constantes residentes
+MARCA_CONSTANTES = "    ; Constantes residentes\n"
+
+def fixar_constantes(texto):
+    """
+    Deixa as constantes de 16 bits mais repetidas em registradores (--constantes)
+
+    Cada operando é carregado com um par LDI Rn / LDI Rn+1 (n par, 4 bytes).
+    Os valores carregados mais vezes pelas linhas do programa passam a ser
+    carregados uma única vez, no lugar de MARCA_CONSTANTES, em um dos pares de
+    REGISTRADORES_CONSTANTES (LDI, LDI e MOVW: 6 bytes), e cada par LDI com
+    esse valor vira um MOVW (2 bytes, 1 ciclo em vez de 2). Só entram os
+    valores que diminuem o programa (4 cargas ou mais), dos mais carregados
+    para os menos carregados.
+
+    Args:
+        texto (str): Programa com MARCA_CONSTANTES (as linhas vão dela até loop_end)
+
+    Returns:
+        tuple: (programa, constantes residentes em ordem de registrador, bytes economizados)
+    """
+    inicio = texto.index(MARCA_CONSTANTES)
+    fim = texto.index("\nloop_end:", inicio)
+    linhas = texto[inicio + len(MARCA_CONSTANTES):fim].split("\n")
+    carga = re.compile(r'(\s*)LDI R(\d+), (\d+)')
+    pares = []  # (linha do LDI do byte baixo, valor)
+    i = 0
+    while i < len(linhas) - 1:
+        baixo, alto = carga.fullmatch(linhas[i]), carga.fullmatch(linhas[i + 1])
+        if baixo and alto and int(baixo[2]) % 2 == 0 and int(alto[2]) == int(baixo[2]) + 1:
+            pares.append((i, int(baixo[3]) | int(alto[3]) << 8))
+            i += 2
+        else:
+            i += 1
+    usos = Counter(valor for _, valor in pares)
+    constantes = [valor for valor, n in usos.most_common(len(REGISTRADORES_CONSTANTES)) if n > 3]
+    registradores = dict(zip(constantes, REGISTRADORES_CONSTANTES))
+    for i, valor in pares:
+        if valor in registradores:
+            baixo = carga.fullmatch(linhas[i])
+            linhas[i] = f"{baixo[1]}MOVW R{baixo[2]}, R{registradores[valor]}"
+            linhas[i + 1] = None
+    preparo = "".join(f"{_carga(16, valor)}    MOVW R{registradores[valor]}, R16\n" for valor in constantes)
+    if preparo:
+        preparo = f"    ; Constantes residentes (--constantes): {len(constantes)} valores mais carregados\n{preparo}"
+    economia = sum(2 * usos[valor] - 6 for valor in constantes)
+    corpo = "\n".join(linha for linha in linhas if linha is not None)
+    return texto[:inicio] + preparo + corpo + texto[fim:], constantes, economia
+
+def tamanho_rotinas(referencias, otimizacao='Os', chamadas_longas=False):
+    """
+    Bytes ocupados pelas rotinas que o ligador incluiria para as referências
+    
+    Args:
+        referencias (iterable): Rótulos chamados pelo código gerado
+        otimizacao (str): Variante das rotinas: 'Os' (tamanho) ou 'O2' (velocidade)
+        chamadas_longas (bool): Conta cada RCALL como CALL
+        
+    Returns:
+        int: Bytes de memória de programa
+    """
+    saida = io.StringIO()
+    ligar_rotinas(saida, referencias, otimizacao)
+    return estimar_bytes(saida.getvalue(), chamadas_longas)
+
+def adicionar_cabecalho(file, ciclos=False, numerico='half', alvo='atmega328p', uart=0):
+    """
+    Escreve o cabeçalho do arquivo Assembly: definições de registradores,
+    configuração do stack pointer e da UART e a mensagem inicial
+    
+    Args:
+        file (file): Arquivo de saída para código assembly
+        ciclos (bool): Configura o Timer1 para a contagem de ciclos (--ciclos)
+        numerico (str): Formato numérico: 'half', 'q8.8' ou 'q16.16' (--numerico)
+        alvo (str): Microcontrolador (chave de ALVOS, --alvo)
+        uart (int): Porta serial usada para os resultados (--uart)
+    """
+    perfil_alvo = ALVOS[alvo]
+    ucsra, ucsrb, ucsrc, ubrrl, ubrrh, udr = perfil_alvo['uarts'][uart]
+    descricao = "IEEE 754 Half-precision 16 bits" if numerico == 'half' else f"ponto fixo {numerico.upper()}"
+    file.write(f"; Calculadora RPN - Código Assembly para {perfil_alvo['nome']} ({descricao})\n")
+    file.write(f"""; Alunos: Gabriel Martins Vicente, Javier Agustin Aranibar González, Matheus Paul Lopuch, Rafael Bonfim Zacco
+;***********************************************************************************************
+.equ SPH, 0x3E    ; Stack Pointer High
+.equ SPL, 0x3D    ; Stack Pointer Low
+""")
+    if perfil_alvo['leitura_flash'] == 'ELPM':
+        file.write(""".equ RAMPZ, 0x3B  ; Byte alto (bits 16-17) do endereço de flash lido com ELPM
+""")
+    if uart != 0:
+        file.write(f"""; Resultados pela UART{uart} (--uart {uart}): UBRR0x, UCSR0x e UDR0 abaixo recebem os endereços da UART{uart}
+""")
+    file.write(f""".equ UBRR0L, 0x{ubrrl:02X} ; Baud Rate Register Low
+.equ UBRR0H, 0x{ubrrh:02X} ; Baud Rate Regis ter High
+; 3 registradores (UCSR0A, UCSR0B e UCSR0C) são todos necessários para configurar e controlar a UART corretamente
+.equ UCSR0A, 0x{ucsra:02X} ; Control and Status Register A: Usado para verificar o status da UART, como a verificação de transmissão completa ou erro de paridade (bit 5: UDRE0)
+.equ UCSR0B, 0x{ucsrb:02X} ; Control and Status Register B: Responsável pelo controle da habilitação da UART, como o habilitamento de transmissor (bit TXEN0)
+.equ UCSR0C, 0x{ucsrc:02X} ; Control and Status Register C: Configurar o formato de dados da UART, como o número de bits por caractere, paridade e bits de stop
+.equ UDR0, 0x{udr:02X}   ; Registrador de dados para a UART0 (1° porta UART do microcontrolador), é utilizado para enviar e receber dados através da comunicação serial (buffer)
+; Fórmula para definir o Universal Boud Rate Register (UBRR): UBRR = Fcpu / (16 * Baud Rate) -1
+; Para o {perfil_alvo['nome']} seria: 16MHz / (16 * 9600) - 1 = 103
+;***********************************************************************************************
+""")
+    if ciclos:
+        file.write("""
+; Timer1 (16 bits) usado para contar os ciclos de cada expressão (--ciclos)
+.equ TCCR1A, 0x80 ; Timer/Counter1 Control Register A
+.equ TCCR1B, 0x81 ; Timer/Counter1 Control Register B (bits CS12:CS10 = prescaler)
+.equ TCNT1L, 0x84 ; Contador do Timer1 (byte baixo)
+.equ TCNT1H, 0x85 ; Contador do Timer1 (byte alto)
+.equ TIFR1, 0x16  ; Timer1 Interrupt Flag Register (endereço de I/O, bit 0: TOV1 = estouro)
+;***********************************************************************************************""")
+    file.write(f"""
+.ORG 0x0000
+    RJMP reset
+    
+reset:
+    ; Configurar stack pointer
+    LDI R16, 0x{perfil_alvo['ram_fim'] >> 8:02X}
+    OUT SPH, r16
+    LDI r16, 0x{perfil_alvo['ram_fim'] & 0xFF:02X}
+    OUT SPL, r16
+        
+        ; Configurar UART
+        LDI R16, 103
+        STS UBRR0L, r16
+        LDI R16, 0
+        STS UBRR0H, r16
+        LDI R16, 8
+        STS UCSR0B, r16
+        LDI R16, 6
+        STS UCSR0C, r16
+        
+""")
+    if ciclos:
+        file.write("""        ; Configurar Timer1: modo normal, clock sem prescaler (1 contagem = 1 ciclo)
+        LDI R16, 0
+        STS TCCR1A, r16
+        LDI R16, 1
+        STS TCCR1B, r16
+        
+""")
+    file.write("""        ; Delay inicial
+        LDI R20, 255
+    delay_init_loop: ; Delay para estabilizar
+    DEC R20
+    BRNE delay_init_loop
+    
+    ; Enviar mensagem inicial
+    LDI R16, 'C'
+    RCALL uart_envia_byte
+    LDI R16, 'a'
+    RCALL uart_envia_byte
     LDI R16, 'l'
     RCALL uart_envia_byte
     LDI R16, 'c'
@@ -1081,69 +4477,1118 @@ reset:
     LDI R16, 10
     RCALL uart_envia_byte
     
-main:
 """)
+    if ciclos:
+        # Medir um bloco vazio para o host descontar o custo da própria medição
+        file.write("""    ; Calibração da medição de ciclos (bloco vazio)
+    LDI R16, 'c'
+    RCALL uart_envia_byte
+    LDI R16, 'a'
+    RCALL uart_envia_byte
+    LDI R16, 'l'
+    RCALL uart_envia_byte""")
+        file.write(INICIO_CICLOS)
+        file.write(FIM_CICLOS)
+        file.write("""
+    RCALL uart_envia_ciclos
+    LDI R16, 13
+    RCALL uart_envia_byte
+    LDI R16, 10
+    RCALL uart_envia_byte
+    
+""")
+    file.write("""main:
+""")
+
+class CacheFragmentos:
+    """
+    Cache em disco (SQLite) do resultado e do fragmento Assembly de cada linha
+    
+    As chaves incluem a versão do gerador, então uma alteração no código invalida
+    o cache inteiro. Os fragmentos já consultados ficam também em memória, o que
+    deixa as regenerações do modo --watch rápidas.
+    """
+    def __init__(self, pasta='.rpn_cache'):
+        """
+        Args:
+            pasta (str): Pasta onde fica o banco do cache
+        """
+        os.makedirs(pasta, exist_ok=True)
+        self.conexao = sqlite3.connect(os.path.join(pasta, 'fragmentos.sqlite3'))
+        self.conexao.execute("CREATE TABLE IF NOT EXISTS fragmentos (chave TEXT PRIMARY KEY, dados TEXT)")
+        self.memoria = {}  # Fragmentos já lidos ou gerados nesta execução
+        self.acertos = 0
+        self.falhas = 0
+
+    def chave(self, *partes):
+        """
+        Calcula a chave de um fragmento
+        
+        Args:
+            *partes: Texto da linha e valores do estado de que ela depende
+            
+        Returns:
+            str: Hash SHA-256 (hexadecimal)
+        """
+        texto = json.dumps([versao_gerador()] + [repr(p) for p in partes])
+        return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+    def obter(self, chave):
+        """
+        Procura um fragmento no cache
         
-        # Inicializar variáveis de estado
-        memoria = 0
-        ultimo_resultado = 0
-        k = [0]  # Contador para rótulos únicos (usando lista para ser modificável nas funções)
-        resultados = []
+        Args:
+            chave (str): Chave do fragmento
+            
+        Returns:
+            dict: Dados guardados (None se não estiver no cache)
+        """
+        dados = self.memoria.get(chave)
+        if dados is None:
+            linha = self.conexao.execute("SELECT dados FROM fragmentos WHERE chave = ?", (chave,)).fetchone()
+            if linha is not None:
+                dados = self.memoria[chave] = json.loads(linha[0])
+        if dados is None:
+            self.falhas += 1
+        else:
+            self.acertos += 1
+        return dados
+
+    def guardar(self, chave, dados):
+        """
+        Guarda um fragmento no cache (gravado em disco por salvar())
         
-        # Processar cada expressão
-        for i, expressao in enumerate(linhas):
-            expressao_original = expressao
-            expressao_calculo = expressao
+        Args:
+            chave (str): Chave do fragmento
+            dados (dict): Fragmento Assembly, resultado e efeito da linha no estado
+        """
+        self.memoria[chave] = dados
+        self.conexao.execute("INSERT OR REPLACE INTO fragmentos VALUES (?, ?)", (chave, json.dumps(dados)))
+
+    def salvar(self):
+        """
+        Grava em disco os fragmentos novos
+        """
+        self.conexao.commit()
+
+    def fechar(self):
+        """
+        Grava os fragmentos pendentes e fecha o banco
+        """
+        self.conexao.commit()
+        self.conexao.close()
+
+class Calculadora:
+    """
+    Sessão de avaliação RPN com estado próprio
+    
+    Guarda a memória (MEM), o último resultado (RES), o histórico usado por
+    (N RES) e o contador de rótulos. Não usa variáveis globais nem escreve em
+    disco, então várias sessões podem ser usadas ao mesmo tempo (inclusive em
+    threads diferentes, uma sessão por thread). A geração de código é opcional:
+    evaluate() e evaluate_many() apenas calculam, generate() escreve o programa
+    Assembly completo no stream indicado.
+    
+    Os erros de processamento ficam em `erros` em vez de serem impressos.
+    """
+    __slots__ = ('memoria', 'ultimo_resultado', 'resultados', 'linha', 'k', 'perfil', 'ciclos', 'erros', 'cache',
+                 'numerico', 'otimizacao', 'alvo', 'uart', 'historico', 'sram', 'constantes', 'fma')
+
+    def __init__(self, perfil=None, ciclos=False, cache=None, numerico='half', otimizacao='Os', alvo='atmega328p',
+                 uart=0, historico=False, constantes=False, fma=False):
+        """
+        Args:
+            perfil (Perfilador): Perfilador opcional (--profile)
+            ciclos (bool): Mede com o Timer1 os ciclos de cada expressão (--ciclos)
+            cache (CacheFragmentos): Cache opcional dos fragmentos de cada linha (--cache)
+            numerico (str): Formato numérico: 'half', 'q8.8' ou 'q16.16' (--numerico)
+            otimizacao (str): Variante das rotinas ligadas: 'Os' (tamanho) ou 'O2' (velocidade)
+            alvo (str): Microcontrolador: 'atmega328p' (Uno) ou 'atmega2560' (Mega) (--alvo)
+            uart (int): Porta serial dos resultados (0 a 3 no ATmega2560) (--uart)
+            historico (bool): Guarda MEM e os últimos resultados na SRAM do Arduino (--historico, só half)
+            constantes (bool): Deixa as constantes mais carregadas em registradores (--constantes)
+            fma (bool): Funde multiplicações seguidas de + ou - em half_fma (--fma, só half)
             
-            # Processar referências a resultados anteriores (n RES)
-            match_res = re.search(r'\(\s*(\d+)\s+RES\s*\)', expressao_calculo)
-            if match_res:
-                n = int(match_res.group(1))
-                indice_anterior = i - n
-                if 0 <= indice_anterior < len(resultados):
-                    valor_anterior = resultados[indice_anterior]
-                    expressao_calculo = f"({valor_anterior})"
-                else:
-                    print(f"Erro: Referência inválida - linha {indice_anterior+1} não existe")
-                    continue
+        Raises:
+            ValueError: Se o formato numérico, a otimização, o alvo ou a UART não existirem,
+                        ou se o histórico ou a fusão forem pedidos em ponto fixo
+        """
+        if numerico != 'half' and numerico not in FORMATOS_PONTO_FIXO:
+            raise ValueError(f"formato numérico desconhecido: {numerico}")
+        if otimizacao not in ('Os', 'O2'):
+            raise ValueError(f"otimização desconhecida: {otimizacao}")
+        if alvo not in ALVOS:
+            raise ValueError(f"microcontrolador desconhecido: {alvo}")
+        if not 0 <= uart < len(ALVOS[alvo]['uarts']):
+            raise ValueError(f"o {ALVOS[alvo]['nome']} não tem a UART{uart}")
+        if historico and numerico != 'half':
+            raise ValueError("o histórico em SRAM só existe no formato half")
+        if fma and numerico != 'half':
+            raise ValueError("a multiplicação e soma fundidas só existem no formato half")
+        self.numerico = numerico
+        self.otimizacao = otimizacao
+        self.alvo = alvo
+        self.uart = uart
+        self.perfil = perfil
+        self.ciclos = ciclos
+        self.cache = cache
+        self.historico = historico
+        self.sram = None      # HistoricoSram da geração em andamento (--historico)
+        self.constantes = constantes
+        self.fma = fma
+        self.reset()
+
+    def reset(self):
+        """
+        Volta ao estado inicial (memória e resultados zerados)
+        """
+        self.memoria = 0
+        self.ultimo_resultado = 0
+        self.resultados = []  # Resultados das linhas processadas com sucesso
+        self.linha = 0        # Índice da próxima linha (usado por N RES)
+        self.k = [0]          # Contador para rótulos únicos (usando lista para ser modificável nas funções)
+        self.erros = []
+
+    def _processar(self, expressao, file):
+        """
+        Processa uma linha, atualizando o estado da sessão
+        
+        Args:
+            expressao (str): Expressão RPN
+            file (file): Arquivo de saída para código assembly (None: apenas calcula)
             
-            # Processar armazenamento em memória (n MEM)
-            match_mem = re.search(r'\(\s*(\d+\.?\d*)\s+MEM\s*\)', expressao_calculo)
-            if match_mem:
-                memoria = float(match_mem.group(1))
-                expressao_calculo = f"({memoria})"
+        Returns:
+            float: Resultado da expressão (None em caso de erro)
+        """
+        # Com o histórico em SRAM o código depende da posição no anel: sem cache
+        if file is not None and self.cache is not None and self.sram is None:
+            return self._processar_com_cache(expressao, file)
+        return self._calcular(expressao, file, self.perfil if file is not None else None)
+
+    def _processar_linha(self, expressao, file):
+        """
+        Processa uma linha do arquivo, que pode ser uma expressão paramétrica
+        
+        Args:
+            expressao (str): Expressão RPN
+            file (file): Arquivo de saída para código assembly (None: apenas calcula)
+            
+        Returns:
+            list: Resultado de cada expressão da linha (None para as que tiveram erro)
+        """
+        if 'para' in expressao:
+            resultados = self._processar_parametrica(expressao, file)
+            if resultados is not None: return resultados
+        return [self._processar(expressao, file)]
+
+    def _processar_parametrica(self, expressao, file):
+        """
+        Processa uma expressão paramétrica (ver interpretar_parametrica)
+        
+        Os resultados e o estado da sessão são os mesmos das expressões de cada
+        valor escritas uma por linha. Na geração de código, os valores viram um
+        único laço (_gerar_laco); se ele não for possível, as expressões são
+        geradas uma a uma.
+        
+        Args:
+            expressao (str): Linha com a expressão e a declaração da variável
+            file (file): Arquivo de saída para código assembly (None: apenas calcula)
+            
+        Returns:
+            list: Resultado de cada valor (None para os que tiveram erro), ou None se a linha não for paramétrica
+        """
+        try:
+            parametrica = interpretar_parametrica(expressao)
+        except ValueError as erro:
+            self.linha += 1
+            self.erros.append(f"Erro: {erro}")
+            return [None]
+        if parametrica is None: return None
+        expressao_base, variavel, valores = parametrica
+        padrao = re.compile(_padrao_variavel(variavel))
+        linhas = [padrao.sub(lambda _: valor, expressao_base) for valor in valores]
+        if file is not None and len(valores) > 1:
+            resultados = self._gerar_laco(expressao, padrao.split(expressao_base), variavel, valores, linhas, file)
+            if resultados is not None: return resultados
+        return [self._processar(linha, file) for linha in linhas]
+
+    def _gerar_laco(self, expressao, partes, variavel, valores, linhas, file):
+        """
+        Gera uma expressão paramétrica como um único corpo em laço
+        
+        Cada valor é calculado no host como uma linha comum, mas sem as reduções
+        que dependem dos operandos (modo laço de resolve), para que todas as
+        voltas tenham o mesmo código. O laço lê da flash, a cada volta, o texto
+        do valor para o eco, os operandos que mudam e o texto do resultado; Z
+        percorre a tabela e Y conta as voltas (as rotinas preservam os dois; com
+        --historico, Y volta a apontar para o histórico depois do laço).
+        A flash deixa de crescer com o código de uma linha por valor e passa a
+        crescer só com a tabela (alguns bytes por valor).
+        
+        Args:
+            expressao (str): Linha original (para o comentário e o perfil)
+            partes (list): Texto da expressão entre as ocorrências da variável
+            variavel (str): Nome da variável
+            valores (list): Texto de cada valor
+            linhas (list): Expressão de cada valor
+            file (file): Arquivo de saída para código assembly
+            
+        Returns:
+            list: Resultado de cada valor, ou None se algum valor falhar ou gerar outro código
+                  (o estado da sessão volta ao de antes)
+        """
+        estado = (self.memoria, self.ultimo_resultado, len(self.resultados), self.linha, self.k[0], len(self.erros))
+        perfil = Perfilador() if self.perfil is not None else None
+        leitura = ALVOS[self.alvo]['leitura_flash']
+        resultados, corpos = [], []
+        for linha in linhas:
+            self.k[0] = estado[4]
+            corpo = io.StringIO()
+            resultado = self._calcular(linha, corpo, perfil if not corpos else None, laco=True)
+            if resultado is None: break
+            resultados.append(resultado)
+            corpos.append(corpo.getvalue())
+        modelo = modelo_laco(corpos, leitura) if len(corpos) == len(linhas) else None
+        if modelo is None:
+            self.memoria, self.ultimo_resultado, n_resultados, self.linha, self.k[0], n_erros = estado
+            del self.resultados[n_resultados:]
+            del self.erros[n_erros:]
+            return None
+        corpo, colunas = modelo
+        
+        # Tabela: por valor, o eco da variável, os operandos que mudam e o texto do resultado
+        tabela = []
+        for indice, valor in enumerate(valores):
+            dados = list((texto_eco(valor) + '\0').encode('latin-1')) * (len(partes) - 1)
+            dados += [coluna[indice] for coluna in colunas]
+            dados += list((formatar_resultado(resultados[indice], self.numerico) + '\0').encode('latin-1'))
+            tabela.append(dados)
+        n_bytes = sum(map(len, tabela))
+        
+        if self.perfil is not None: bytes_antes = file.bytes
+        self.k[0] += 1
+        rotulo = f"laco_parametrico_{self.k[0]}"
+        envia_texto = f"uart_envia_flash_{leitura.lower()}"
+        file.write(f"""
+    ; Calculando: {expressao}
+    ; {len(valores)} valores em laço: eco de {variavel}, operandos e resultados lidos da tabela
+    {'RJMP' if n_bytes < ALCANCE_RCALL else 'JMP'} {rotulo}_inicio
+{rotulo}_tabela:
+""")
+        for valor, dados in zip(valores, tabela):
+            file.write(f"    .byte {', '.join(map(str, dados))}  ; {variavel} = {valor}\n")
+        if n_bytes % 2: file.write("    .byte 0  ; Alinhamento da próxima instrução\n")
+        file.write(f"{rotulo}_inicio:\n")
+        apontar_flash(file, f"{rotulo}_tabela", self.alvo)
+        file.write(f"""    LDI R28, {len(valores) & 0xFF}       ; Y = voltas restantes
+    LDI R29, {len(valores) >> 8}
+{rotulo}:
+""")
+        # Eco da expressão, com o valor da volta no lugar de cada ocorrência da variável
+        for indice, parte in enumerate(partes):
+            if indice: file.write(f"""
+    RCALL {envia_texto}  ; {variavel}
+""")
+            for char in texto_eco(parte):
+                file.write(f"""
+    LDI R16, '{char}'
+    RCALL uart_envia_byte
+""")
+        file.write(corpo)
+        escrever_envio_resultado(file, f"""
+    RCALL {envia_texto}
+""", self.ciclos)
+        volta = 'RJMP' if estimar_bytes(corpo, True) < ALCANCE_RCALL - 64 else 'JMP'
+        file.write(f"""
+    ; Próxima volta
+    SBIW R28, 1
+    BREQ {rotulo}_fim
+    {volta} {rotulo}
+{rotulo}_fim:
+""")
+        if self.sram is not None: self.sram.apontar_y(file)
+        if self.perfil is not None:
+            self.perfil.registra_linha(expressao, file.bytes - bytes_antes)
+            self.perfil.operadores.update(perfil.operadores)
+            self.perfil.rotinas.update(perfil.rotinas)
+            for fase, segundos in perfil.tempos.items():
+                self.perfil.tempos[fase] += segundos
+        return resultados
+
+    def _processar_com_cache(self, expressao, file):
+        """
+        Processa uma linha reaproveitando o fragmento guardado no cache
+        
+        A chave combina o texto da linha com todo o estado de que ela depende
+        (MEM, último resultado, valor referenciado por N RES e opções, inclusive
+        o alvo), então
+        uma mudança em uma linha anterior que altere esse estado gera outra chave.
+        
+        Args:
+            expressao (str): Expressão RPN
+            file (file): Arquivo de saída para código assembly
+            
+        Returns:
+            float: Resultado da expressão (None em caso de erro)
+        """
+        referencia = None
+        match_res = re.search(r'\(\s*(\d+)\s+RES\s*\)', expressao)
+        if match_res:
+            indice_anterior = self.linha - int(match_res.group(1))
+            referencia = self.resultados[indice_anterior] if 0 <= indice_anterior < len(self.resultados) else 'invalida'
+        chave = self.cache.chave(expressao, self.memoria, self.ultimo_resultado, referencia, self.ciclos, self.numerico,
+                                 self.alvo, self.fma)
+        
+        dados = self.cache.obter(chave)
+        if dados is None:
+            # Fragmento novo: gerar em memória e guardar
+            fragmento = io.StringIO()
+            k_antes, n_erros = self.k[0], len(self.erros)
+            resultado = self._calcular(expressao, fragmento, None)
+            dados = {'asm': fragmento.getvalue(), 'resultado': resultado, 'memoria': self.memoria,
+                     'k': self.k[0] - k_antes, 'erros': self.erros[n_erros:]}
+            self.cache.guardar(chave, dados)
+        else:
+            # Fragmento reaproveitado: aplicar ao estado o efeito da linha
+            self.linha += 1
+            self.k[0] += dados['k']
+            self.memoria = dados['memoria']
+            self.erros.extend(dados['erros'])
+            if dados['resultado'] is not None:
+                self.resultados.append(dados['resultado'])
+                self.ultimo_resultado = dados['resultado']
+        
+        file.write(dados['asm'])
+        if self.perfil is not None: self.perfil.registra_linha(expressao, len(dados['asm'].encode('utf-8')))
+        return dados['resultado']
+
+    def _calcular(self, expressao, file, perfil, laco=False):
+        """
+        Calcula uma linha (e gera seu código, se houver arquivo de saída)
+        
+        Args:
+            expressao (str): Expressão RPN
+            file (file): Arquivo de saída para código assembly (None: apenas calcula)
+            perfil (Perfilador): Perfilador opcional (--profile)
+            laco (bool): Gera só o cálculo, como uma volta de um laço paramétrico
+                         (o eco e o envio do resultado ficam com o laço)
             
+        Returns:
+            float: Resultado da expressão (None em caso de erro)
+        """
+        i = self.linha
+        self.linha += 1
+        expressao_original = expressao
+        expressao_calculo = expressao
+        if perfil is not None and not laco: bytes_antes = file.bytes
+        sram = self.sram if file is not None else None
+        referencia = None  # Resultado lido do histórico em SRAM por (n RES) (--historico)
+        
+        # Processar referências a resultados anteriores (n RES)
+        match_res = re.search(r'\(\s*(\d+)\s+RES\s*\)', expressao_calculo)
+        if match_res:
+            n = int(match_res.group(1))
+            indice_anterior = i - n
+            if 0 <= indice_anterior < len(self.resultados):
+                valor_anterior = self.resultados[indice_anterior]
+                expressao_calculo = f"({valor_anterior})"
+                # Infinito ou NaN não é lido do histórico: segue o caminho padrão, que o recusa
+                if sram is not None and n <= sram.posicoes and math.isfinite(valor_anterior):
+                    referencia = indice_anterior
+            else:
+                self.erros.append(f"Erro: Referência inválida - linha {indice_anterior+1} não existe")
+                return None
+        
+        # Processar armazenamento em memória (n MEM)
+        match_mem = re.search(r'\(\s*(\d+\.?\d*)\s+MEM\s*\)', expressao_calculo)
+        if match_mem:
+            self.memoria = float(match_mem.group(1))
+            expressao_calculo = f"({self.memoria})"
+        
+        if file is not None and not laco:
             # Escrever código para enviar a expressão original
             file.write(f"\n    ; Calculando: {expressao_original}\n")
             
             # Enviar cada caractere da expressão original
-            for char in expressao_original:
-                if char in "()+-*/^%|" or char.isdigit() or char == '.' or char == ' ' or char in "RESM":
-                    file.write(f"""
+            for char in texto_eco(expressao_original):
+                file.write(f"""
     LDI R16, '{char}'
     RCALL uart_envia_byte
 """)
 
+        # Histórico em SRAM: registrar o que a linha lê (MEM, RES ou o resultado referenciado)
+        historico = None
+        if sram is not None:
+            total = len(self.resultados)
+            if referencia is not None:
+                origem = sram.origens.get(referencia, referencia)
+                referencia = sram.fonte(referencia, total)
+                sram.ler(f"resultado {referencia}")
+            anterior = sram.fonte(total - 1, total)
+            if re.search(r'\bMEM\b', expressao_calculo): sram.ler('MEM')
+            if re.search(r'\bRES\b', expressao_calculo): sram.ler(f"resultado {anterior}")
+            historico = (sram.endereco_memoria, sram.endereco(anterior), sram.base(laco))
+            # RES infinito ou NaN: calculado como sem o histórico, que o recusa
+            if re.search(r'\bRES\b', expressao_calculo) and not math.isfinite(self.ultimo_resultado): historico = None
+        
+        if referencia is not None and half_ieee754_to_float(float_to_half_ieee754(valor_anterior)) == valor_anterior:
+            # Valor exato em half-precision: lido do histórico e impresso pelo próprio Arduino
+            resultado = valor_anterior
+            if self.ciclos: file.write(INICIO_CICLOS + FIM_CICLOS)
+            if not laco: escrever_envio_resultado(file, f"""
+    ; {resultado} lido do histórico (SRAM)
+{sram.carga(16, sram.endereco(referencia))}    RCALL uart_envia_half
+""", self.ciclos)
+        else:
+            # Histórico em SRAM: o resultado calculado é guardado antes de ser impresso
+            guardar = None
+            if sram is not None and referencia is None:
+                guardar = lambda file, valor: sram.guardar_valor(file, f"resultado {total}", sram.endereco(total),
+                                                                 valor, laco)
             # Resolver a expressão e gerar código assembly
-            resultado = resolve(expressao_calculo, memoria, ultimo_resultado, file, k)
-            if resultado is None:
-                print(f"Erro ao processar a expressão {expressao_original}")
-                continue
-                
-            # Armazenar resultado para uso posterior
-            resultados.append(resultado)
-            ultimo_resultado = resultado
+            resultado = resolve(expressao_calculo, self.memoria, self.ultimo_resultado, file, self.k,
+                                perfil, self.ciclos and file is not None, self.erros, self.numerico, laco, historico,
+                                self.fma, guardar)
         
-        # Adicionar rotinas utilitárias
-        file.write("""
+        # Guardar no histórico MEM (n MEM) e, em (n RES), a cópia do resultado referenciado
+        if sram is not None and resultado is not None:
+            if match_mem:
+                sram.guardar(file, 'MEM', sram.endereco_memoria, _carga(16, float_to_half_ieee754(self.memoria)), laco)
+            if referencia is not None:
+                sram.origens[total] = origem
+                sram.guardar(file, f"resultado {total}", sram.endereco(total),
+                             sram.carga(16, sram.endereco(referencia), laco), laco)
+            else:
+                sram.origens.pop(total, None)
+        if perfil is not None and not laco: perfil.registra_linha(expressao_original, file.bytes - bytes_antes)
+        if resultado is None:
+            self.erros.append(f"Erro ao processar a expressão {expressao_original}")
+            return None
+            
+        # Armazenar resultado para uso posterior
+        self.resultados.append(resultado)
+        self.ultimo_resultado = resultado
+        return resultado
+
+    def evaluate(self, expressao):
+        """
+        Calcula uma expressão sem gerar código
+        
+        Args:
+            expressao (str): Expressão RPN
+            
+        Returns:
+            float: Resultado da expressão (None em caso de erro, ver `erros`); para uma
+                   expressão paramétrica, lista com o resultado de cada valor
+        """
+        expressao = expressao.strip()
+        resultados = self._processar_parametrica(expressao, None) if 'para' in expressao else None
+        return self._processar(expressao, None) if resultados is None else resultados
+
+    def evaluate_many(self, expressoes):
+        """
+        Calcula várias expressões em sequência, sem gerar código
+        
+        Args:
+            expressoes (iterable): Expressões RPN (linhas vazias são ignoradas)
+            
+        Returns:
+            list: Resultado de cada expressão (None para as que tiveram erro); uma
+                  expressão paramétrica traz um resultado por valor
+        """
+        return [resultado for e in expressoes if e.strip() for resultado in self._processar_linha(e.strip(), None)]
+
+    def evaluate_file(self, filename):
+        """
+        Calcula as expressões de um arquivo sem gerar código, lendo-o por mmap
+        
+        As linhas só com números e operadores são separadas em elementos direto
+        do arquivo mapeado, sem criar uma str por linha; as demais (MEM, RES,
+        outros textos) passam pelo mesmo caminho de evaluate(). Os resultados
+        são os mesmos de evaluate_many() sobre as linhas do arquivo.
+        
+        Args:
+            filename (str): Arquivo de expressões
+            
+        Yields:
+            float: Resultado de cada linha não vazia (None para as que tiveram erro)
+            
+        Raises:
+            OSError: Se o arquivo não puder ser aberto
+        """
+        with ArquivoMapeado(filename) as arquivo:
+            for numero, elementos in arquivo.linhas():
+                if ELEMENTO_ESPECIAL in elementos:
+                    linha = arquivo.texto(numero)
+                    if linha: yield from self._processar_linha(linha, None)
+                    continue
+                self.linha += 1
+                resultado = resolve_elementos(elementos, self.memoria, None, self.k,
+                                              erros=self.erros, numerico=self.numerico, fma=self.fma)
+                if resultado is None:
+                    self.erros.append(f"Erro ao processar a expressão {arquivo.texto(numero)}")
+                else:
+                    self.resultados.append(resultado)
+                    self.ultimo_resultado = resultado
+                yield resultado
+
+    def generate(self, expressoes, target):
+        """
+        Gera o programa Assembly completo para as expressões
+        
+        Args:
+            expressoes (iterable): Expressões RPN (linhas vazias são ignoradas)
+            target (file): Stream de saída para o código assembly
+            
+        Returns:
+            list: Resultado de cada expressão (None para as que tiveram erro); uma
+                  expressão paramétrica traz um resultado por valor
+        """
+        # Registrar as rotinas chamadas pelo código gerado (para o ligador); o programa
+        # fica em memória até se saber o tamanho final, que decide entre RCALL e CALL
+        programa = io.StringIO()
+        ligacao = _SaidaLigacao(programa)
+        saida = _SaidaMedida(ligacao, self.perfil) if self.perfil is not None else ligacao
+        
+        # Escrever cabeçalho e configuração inicial
+        adicionar_cabecalho(saida, self.ciclos, self.numerico, self.alvo, self.uart)
+        if self.constantes: saida.write(MARCA_CONSTANTES)
+        
+        # Histórico em SRAM: o anel tem o tamanho do maior (N RES) do arquivo
+        if self.historico:
+            expressoes = [e.strip() for e in expressoes if e.strip()]
+            self.sram = HistoricoSram(expressoes, self.alvo)
+            self.sram.escrever_inicio(saida, self.memoria, self.resultados)
+        
+        # Processar cada expressão
+        resultados = [resultado for e in expressoes if e.strip()
+                      for resultado in self._processar_linha(e.strip(), saida)]
+        
+        saida.write("""
+    ; Loop infinito
+loop_end:
+    RJMP loop_end
+""")
+        # Adicionar apenas as rotinas usadas (e as suas dependências)
+        ligar_rotinas(saida, ligacao.referencias, self.otimizacao)
+        texto = programa.getvalue()
+        if self.sram is not None:
+            texto = self.sram.remover_nao_lidas(texto)
+            self.sram = None
+        if self.constantes: texto = fixar_constantes(texto)[0]
+        target.write(ajustar_chamadas(texto, self.alvo))
+        if self.cache is not None: self.cache.salvar()
+        return resultados
+
+    def generate_imagens(self, expressoes, limite=None):
+        """
+        Gera o programa dividido no menor número de imagens que cabem na flash
+        
+        O tamanho de cada linha é estimado a partir do seu trecho Assembly e as
+        linhas são distribuídas em ordem, enchendo cada imagem antes de abrir a
+        próxima (cabeçalho e rotinas ligadas incluídos na conta). MEM e RES são
+        calculados no host, então o estado passa de uma imagem para a outra
+        continuando a mesma sessão: os valores iniciais de cada imagem já vêm
+        embutidos no código das suas linhas e são anotados no início dela (com
+        --historico, cada imagem também copia para a SRAM MEM e os últimos
+        resultados). Com --constantes, cada imagem escolhe as suas constantes
+        residentes depois de montada, o que só a diminui. Uma entrada que cabe
+        em uma imagem gera exatamente o mesmo programa que generate().
+        
+        Args:
+            expressoes (iterable): Expressões RPN (linhas vazias são ignoradas)
+            limite (int): Bytes de flash disponíveis em cada imagem (None: flash do alvo menos o bootloader)
+            
+        Returns:
+            list: Uma entrada por imagem: asm, linhas (números das expressões), bytes,
+                  memoria e ultimo_resultado no início da imagem (e, com --constantes,
+                  constantes residentes e bytes economizados com elas)
+        """
+        cabecalho = io.StringIO()
+        ligacao = _SaidaLigacao(cabecalho)
+        adicionar_cabecalho(_SaidaMedida(ligacao, self.perfil) if self.perfil is not None else ligacao,
+                            self.ciclos, self.numerico, self.alvo, self.uart)
+        if limite is None: limite = limite_flash(self.alvo)
+        referencias_cabecalho = ligacao.referencias
+        fim = """
     ; Loop infinito
 loop_end:
     RJMP loop_end
+"""
+        # Tamanhos contados com RCALL e com CALL: a imagem usa CALL se passar do alcance do RCALL
+        base = [estimar_bytes(cabecalho.getvalue(), longas) + estimar_bytes(fim, longas) for longas in (False, True)]
+        tamanhos = {}  # Bytes das rotinas ligadas, por conjunto de referências
+        
+        def bytes_imagem(bytes_linhas, referencias):
+            chave = frozenset(nome for nome in referencias if nome in ROTINAS)
+            if chave not in tamanhos:
+                tamanhos[chave] = [tamanho_rotinas(chave, self.otimizacao, longas) for longas in (False, True)]
+            curto, longo = (base[i] + bytes_linhas[i] + tamanhos[chave][i] for i in (0, 1))
+            return longo if usa_chamadas_longas(curto, self.alvo) else curto
+        
+        if self.historico:
+            expressoes = [e.strip() for e in expressoes if e.strip()]
+            self.sram = HistoricoSram(expressoes, self.alvo)
+        
+        def nova_imagem(memoria, ultimo_resultado, n_resultados):
+            # Com o histórico em SRAM, a imagem começa preparando-o com o estado do início dela
+            inicio = io.StringIO()
+            if self.sram is not None: self.sram.escrever_inicio(inicio, memoria, self.resultados[:n_resultados])
+            inicio = inicio.getvalue()
+            return {'fragmentos': [inicio] if inicio else [], 'linhas': [], 'referencias': set(referencias_cabecalho),
+                    'bytes_linhas': [estimar_bytes(inicio, longas) for longas in (False, True)],
+                    'memoria': memoria, 'ultimo_resultado': ultimo_resultado}
+        
+        imagens, atual = [], None
+        for numero, expressao in enumerate((e.strip() for e in expressoes if e.strip()), start=1):
+            memoria, ultimo_resultado, n_resultados = self.memoria, self.ultimo_resultado, len(self.resultados)
+            fragmento = io.StringIO()
+            ligacao = _SaidaLigacao(fragmento)
+            self._processar_linha(expressao,
+                                  _SaidaMedida(ligacao, self.perfil) if self.perfil is not None else ligacao)
+            texto = fragmento.getvalue()
+            tamanho = [estimar_bytes(texto, longas) for longas in (False, True)]
+            # A linha não cabe na imagem atual: fechar e começar outra
+            if atual is not None:
+                bytes_linhas = [a + b for a, b in zip(atual['bytes_linhas'], tamanho)]
+                if bytes_imagem(bytes_linhas, atual['referencias'] | ligacao.referencias) > limite:
+                    imagens.append(atual)
+                    atual = None
+            if atual is None:
+                atual = nova_imagem(memoria, ultimo_resultado, n_resultados)
+            atual['fragmentos'].append(texto)
+            atual['linhas'].append(numero)
+            atual['referencias'] |= ligacao.referencias
+            atual['bytes_linhas'] = [a + b for a, b in zip(atual['bytes_linhas'], tamanho)]
+        if atual is not None or not imagens:
+            imagens.append(atual or nova_imagem(self.memoria, self.ultimo_resultado, len(self.resultados)))
+        if self.cache is not None: self.cache.salvar()
+        
+        # Montar cada imagem: cabeçalho, estado inicial, linhas, laço final e rotinas
+        for indice, imagem in enumerate(imagens, start=1):
+            saida = io.StringIO()
+            saida.write(cabecalho.getvalue())
+            if self.constantes: saida.write(MARCA_CONSTANTES)
+            if len(imagens) > 1:
+                saida.write(f"""
+    ; Imagem {indice} de {len(imagens)}: linhas {imagem['linhas'][0]} a {imagem['linhas'][-1]}
+    ; Estado inicial (calculado no host): MEM = {imagem['memoria']}, RES = {imagem['ultimo_resultado']}
 """)
-        # Adicionar rotinas para operações IEEE 754 half-precision
-        adicionar_rotinas_ieee754(file)
+            for texto in imagem.pop('fragmentos'):
+                saida.write(texto)
+            saida.write(fim)
+            ligar_rotinas(saida, imagem.pop('referencias'), self.otimizacao)
+            texto = saida.getvalue() if self.sram is None else self.sram.remover_nao_lidas(saida.getvalue())
+            if self.constantes: texto, imagem['constantes'], imagem['economia'] = fixar_constantes(texto)
+            imagem['asm'] = ajustar_chamadas(texto, self.alvo)
+            imagem['bytes'] = estimar_bytes(imagem['asm'])
+            del imagem['bytes_linhas']
+        self.sram = None
+        return imagens
+
+def gerar_calculadora(linhas, file, perfil=None, ciclos=False, cache=None, numerico='half', otimizacao='Os',
+                      alvo='atmega328p', uart=0, historico=False, constantes=False, fma=False):
+    """
+    Gera o programa Assembly completo para uma lista de expressões,
+    imprimindo as mensagens de erro (comportamento da linha de comando)
+    
+    Args:
+        linhas (list): Expressões RPN (uma por linha)
+        file (file): Arquivo de saída para código assembly
+        perfil (Perfilador): Perfilador opcional (--profile)
+        ciclos (bool): Mede com o Timer1 os ciclos de cada expressão (--ciclos)
+        cache (CacheFragmentos): Cache opcional dos fragmentos de cada linha (--cache)
+        numerico (str): Formato numérico: 'half', 'q8.8' ou 'q16.16' (--numerico)
+        otimizacao (str): Variante das rotinas ligadas: 'Os' (tamanho) ou 'O2' (velocidade)
+        alvo (str): Microcontrolador: 'atmega328p' ou 'atmega2560' (--alvo)
+        uart (int): Porta serial dos resultados (--uart)
+        historico (bool): Guarda MEM e os últimos resultados na SRAM do Arduino (--historico)
+        constantes (bool): Deixa as constantes mais carregadas em registradores (--constantes)
+        fma (bool): Funde multiplicações seguidas de + ou - em half_fma (--fma)
+        
+    Returns:
+        list: Resultado de cada linha (None para as linhas com erro)
+    """
+    calculadora = Calculadora(perfil, ciclos, cache, numerico, otimizacao, alvo, uart, historico, constantes, fma)
+    resultados = calculadora.generate(linhas, file)
+    for mensagem in calculadora.erros:
+        print(mensagem)
+    return resultados
+
+def gravar_imagens(imagens, nome='calculadora.asm'):
+    """
+    Grava as imagens geradas por Calculadora.generate_imagens
+    
+    Uma única imagem vai para o próprio `nome`; várias são numeradas
+    (calculadora_1.asm, calculadora_2.asm, ...).
+    
+    Args:
+        imagens (list): Imagens geradas
+        nome (str): Nome do arquivo de saída
+        
+    Returns:
+        list: Nome do arquivo de cada imagem
+    """
+    base, extensao = os.path.splitext(nome)
+    nomes = [nome] if len(imagens) == 1 else [f"{base}_{i}{extensao}" for i in range(1, len(imagens) + 1)]
+    for arquivo, imagem in zip(nomes, imagens):
+        with open(arquivo, 'w') as saida:
+            saida.write(imagem['asm'])
+    return nomes
+
+def formatar_manifesto(imagens, nomes, limite=LIMITE_FLASH):
+    """
+    Formata a lista de imagens: arquivo, linhas, tamanho estimado e estado inicial
+    
+    Args:
+        imagens (list): Imagens geradas
+        nomes (list): Arquivo de cada imagem
+        limite (int): Bytes de flash disponíveis em cada imagem
+        
+    Returns:
+        str: Manifesto pronto para impressão
+    """
+    saida = [f"Entrada maior que a flash ({limite} bytes): dividida em {len(imagens)} imagens", "",
+             f"{'Imagem':<7} {'Arquivo':<20} {'Linhas':<13} {'Bytes':>6}  {'MEM inicial':<12} RES inicial"]
+    for indice, (nome, imagem) in enumerate(zip(nomes, imagens), start=1):
+        linhas = f"{imagem['linhas'][0]}-{imagem['linhas'][-1]}"
+        marca = "  (não cabe: linha maior que a flash)" if imagem['bytes'] > limite else ""
+        saida.append(f"{indice:<7} {nome:<20} {linhas:<13} {imagem['bytes']:>6}  {imagem['memoria']!s:<12} "
+                     f"{imagem['ultimo_resultado']}{marca}")
+    return "\n".join(saida)
+
+def versao_gerador():
+    """
+    Identifica a versão do gerador pelo hash do próprio código-fonte
     
-    print("Arquivo Calculadora.asm gerado com sucesso!")
+    Qualquer alteração neste arquivo muda a versão e invalida os resultados
+    guardados pelo modo em lote.
+    
+    Returns:
+        str: Hash SHA-256 (hexadecimal) deste arquivo
+    """
+    global _VERSAO_GERADOR
+    if _VERSAO_GERADOR is None:
+        with open(__file__, 'rb') as fonte:
+            _VERSAO_GERADOR = hashlib.sha256(fonte.read()).hexdigest()
+    return _VERSAO_GERADOR
+
+_VERSAO_GERADOR = None
+
+def gerar_arquivo(entrada, destino, ciclos=False, numerico='half', otimizacao='Os', alvo='atmega328p', uart=0,
+                  historico=False, constantes=False, fma=False):
+    """
+    Gera o Assembly de um arquivo de expressões (executada nos processos do modo em lote)
+    
+    Args:
+        entrada (str): Arquivo de expressões
+        destino (str): Arquivo .asm a ser gerado
+        ciclos (bool): Mede com o Timer1 os ciclos de cada expressão (--ciclos)
+        numerico (str): Formato numérico: 'half', 'q8.8' ou 'q16.16' (--numerico)
+        otimizacao (str): Variante das rotinas ligadas: 'Os' (tamanho) ou 'O2' (velocidade)
+        alvo (str): Microcontrolador: 'atmega328p' ou 'atmega2560' (--alvo)
+        uart (int): Porta serial dos resultados (--uart)
+        historico (bool): Guarda MEM e os últimos resultados na SRAM do Arduino (--historico)
+        constantes (bool): Deixa as constantes mais carregadas em registradores (--constantes)
+        fma (bool): Funde multiplicações seguidas de + ou - em half_fma (--fma)
+        
+    Returns:
+        dict: Linhas, bytes gerados, tempo gasto e mensagens de erro
+    """
+    inicio = time.perf_counter()
+    try:
+        with open(entrada, 'r') as arquivo:
+            linhas = [line.strip() for line in arquivo if line.strip()]
+        calculadora = Calculadora(ciclos=ciclos, numerico=numerico, otimizacao=otimizacao, alvo=alvo, uart=uart,
+                                  historico=historico, constantes=constantes, fma=fma)
+        temporario = destino + '.tmp'
+        with open(temporario, 'w') as file:
+            calculadora.generate(linhas, file)
+        os.replace(temporario, destino)  # Não deixar um .asm pela metade em caso de falha
+        erros = calculadora.erros
+        tamanho = os.path.getsize(destino)
+    except (OSError, ValueError) as erro:
+        return {'linhas': 0, 'bytes': 0, 'tempo': time.perf_counter() - inicio,
+                'erros': [f"Erro: {erro}"], 'falhou': True}
+    return {'linhas': len(linhas), 'bytes': tamanho, 'tempo': time.perf_counter() - inicio, 'erros': erros, 'falhou': False}
+
+def processar_lote(pasta, saida, trabalhadores=None, ciclos=False, numerico='half', otimizacao='Os',
+                   alvo='atmega328p', uart=0, historico=False, constantes=False, fma=False):
+    """
+    Gera um .asm para cada arquivo .txt da pasta, em processos paralelos
+    
+    Os arquivos cujo conteúdo (e versão do gerador/opções) não mudou desde a
+    última execução são pulados, usando os hashes guardados em <saida>/.hashes.json.
+    
+    Args:
+        pasta (str): Pasta com os arquivos de expressões (*.txt)
+        saida (str): Pasta onde os .asm são gravados (um por entrada, mesmo nome)
+        trabalhadores (int): Número de processos (None: número de CPUs)
+        ciclos (bool): Mede com o Timer1 os ciclos de cada expressão (--ciclos)
+        numerico (str): Formato numérico: 'half', 'q8.8' ou 'q16.16' (--numerico)
+        otimizacao (str): Variante das rotinas ligadas: 'Os' (tamanho) ou 'O2' (velocidade)
+        alvo (str): Microcontrolador: 'atmega328p' ou 'atmega2560' (--alvo)
+        uart (int): Porta serial dos resultados (--uart)
+        historico (bool): Guarda MEM e os últimos resultados na SRAM do Arduino (--historico)
+        constantes (bool): Deixa as constantes mais carregadas em registradores (--constantes)
+        fma (bool): Funde multiplicações seguidas de + ou - em half_fma (--fma)
+        
+    Returns:
+        list: Resumo de cada arquivo (nome, situação, linhas, bytes, tempo, erros)
+    """
+    os.makedirs(saida, exist_ok=True)
+    caminho_hashes = os.path.join(saida, '.hashes.json')
+    try:
+        with open(caminho_hashes, 'r') as arquivo:
+            hashes = json.load(arquivo)
+    except (OSError, ValueError):
+        hashes = {}
+    
+    # Separar as entradas que precisam ser geradas de novo
+    resumo = []
+    pendentes = {}
+    for nome in sorted(os.listdir(pasta)):
+        entrada = os.path.join(pasta, nome)
+        if not nome.endswith('.txt') or not os.path.isfile(entrada):
+            continue
+        destino = os.path.join(saida, os.path.splitext(nome)[0] + '.asm')
+        with open(entrada, 'rb') as arquivo:
+            conteudo = arquivo.read()
+        opcoes = (f"|{versao_gerador()}|ciclos={ciclos}|numerico={numerico}|{otimizacao}|{alvo}|uart={uart}"
+                  f"|historico={historico}|constantes={constantes}|fma={fma}")
+        chave = hashlib.sha256(conteudo + opcoes.encode()).hexdigest()
+        if hashes.get(nome) == chave and os.path.exists(destino):
+            resumo.append({'nome': nome, 'situacao': 'inalterado', 'linhas': None,
+                           'bytes': os.path.getsize(destino), 'tempo': 0.0, 'erros': []})
+            continue
+        pendentes[nome] = (entrada, destino, chave)
+    
+    # Gerar as entradas alteradas em paralelo
+    with ProcessPoolExecutor(max_workers=trabalhadores) as executor:
+        tarefas = {nome: executor.submit(gerar_arquivo, entrada, destino, ciclos, numerico, otimizacao, alvo, uart,
+                                         historico, constantes, fma)
+                   for nome, (entrada, destino, _) in pendentes.items()}
+        for nome, tarefa in tarefas.items():
+            dados = tarefa.result()
+            situacao = 'falhou' if dados.pop('falhou') else 'gerado'
+            resumo.append({'nome': nome, 'situacao': situacao, **dados})
+            if situacao == 'gerado':
+                hashes[nome] = pendentes[nome][2]
+            else:
+                hashes.pop(nome, None)
+    
+    with open(caminho_hashes, 'w') as arquivo:
+        json.dump(hashes, arquivo, indent=2)
+    resumo.sort(key=lambda item: item['nome'])
+    return resumo
+
+def formatar_resumo_lote(resumo):
+    """
+    Formata o resumo do modo em lote como tabela
+    
+    Args:
+        resumo (list): Resumo retornado por processar_lote
+        
+    Returns:
+        str: Tabela pronta para impressão
+    """
+    saida = [f"{'Arquivo':<24} {'Situação':<11} {'Linhas':>7} {'Bytes':>9} {'Tempo (ms)':>11} {'Erros':>6}"]
+    for item in resumo:
+        linhas = '-' if item['linhas'] is None else item['linhas']
+        saida.append(f"{item['nome']:<24} {item['situacao']:<11} {linhas:>7} {item['bytes']:>9} "
+                     f"{item['tempo'] * 1000:>11.1f} {len(item['erros']):>6}")
+    total_bytes = sum(item['bytes'] for item in resumo)
+    total_tempo = sum(item['tempo'] for item in resumo)
+    gerados = sum(1 for item in resumo if item['situacao'] == 'gerado')
+    pulados = sum(1 for item in resumo if item['situacao'] == 'inalterado')
+    falhas = sum(1 for item in resumo if item['situacao'] == 'falhou')
+    saida.append(f"Total: {len(resumo)} arquivos ({gerados} gerados, {pulados} inalterados, {falhas} com falha), "
+                 f"{total_bytes} bytes, {total_tempo * 1000:.1f} ms de geração")
+    for item in resumo:
+        for mensagem in item['erros']:
+            saida.append(f"{item['nome']}: {mensagem}")
+    return "\n".join(saida)
+
+def gerar_arquivo_com_cache(nome, destino, cache, ciclos=False, numerico='half', otimizacao='Os', alvo='atmega328p',
+                            uart=0, historico=False, constantes=False, fma=False):
+    """
+    Gera o Assembly de um arquivo reaproveitando os fragmentos do cache
+    
+    Args:
+        nome (str): Arquivo de expressões
+        destino (str): Arquivo .asm a ser gerado
+        cache (CacheFragmentos): Cache de fragmentos
+        ciclos (bool): Mede com o Timer1 os ciclos de cada expressão (--ciclos)
+        numerico (str): Formato numérico: 'half', 'q8.8' ou 'q16.16' (--numerico)
+        otimizacao (str): Variante das rotinas ligadas: 'Os' (tamanho) ou 'O2' (velocidade)
+        alvo (str): Microcontrolador: 'atmega328p' ou 'atmega2560' (--alvo)
+        uart (int): Porta serial dos resultados (--uart)
+        historico (bool): Guarda MEM e os últimos resultados na SRAM do Arduino (--historico; sem cache)
+        constantes (bool): Deixa as constantes mais carregadas em registradores (--constantes)
+        fma (bool): Funde multiplicações seguidas de + ou - em half_fma (--fma)
+        
+    Returns:
+        Calculadora: Sessão usada (com os erros da geração)
+    """
+    with open(nome, 'r') as arquivo:
+        linhas = [line.strip() for line in arquivo if line.strip()]
+    calculadora = Calculadora(ciclos=ciclos, cache=cache, numerico=numerico, otimizacao=otimizacao, alvo=alvo, uart=uart,
+                              historico=historico, constantes=constantes, fma=fma)
+    saida = io.StringIO()
+    calculadora.generate(linhas, saida)
+    temporario = destino + '.tmp'
+    with open(temporario, 'w') as file:
+        file.write(saida.getvalue())
+    os.replace(temporario, destino)
+    return calculadora
+
+def observar_arquivo(nome, destino, cache, ciclos=False, intervalo=0.1, numerico='half', otimizacao='Os',
+                     alvo='atmega328p', uart=0, historico=False, constantes=False, fma=False):
+    """
+    Regenera o Assembly sempre que o arquivo de expressões mudar (--watch)
+    
+    Só as linhas novas ou afetadas por uma mudança (inclusive por um MEM/RES
+    anterior) são recalculadas; as demais vêm do cache.
+    
+    Args:
+        nome (str): Arquivo de expressões
+        destino (str): Arquivo .asm a ser gerado
+        cache (CacheFragmentos): Cache de fragmentos
+        ciclos (bool): Mede com o Timer1 os ciclos de cada expressão (--ciclos)
+        intervalo (float): Intervalo entre as verificações do arquivo (segundos)
+        numerico (str): Formato numérico: 'half', 'q8.8' ou 'q16.16' (--numerico)
+        otimizacao (str): Variante das rotinas ligadas: 'Os' (tamanho) ou 'O2' (velocidade)
+        alvo (str): Microcontrolador: 'atmega328p' ou 'atmega2560' (--alvo)
+        uart (int): Porta serial dos resultados (--uart)
+        historico (bool): Guarda MEM e os últimos resultados na SRAM do Arduino (--historico)
+        constantes (bool): Deixa as constantes mais carregadas em registradores (--constantes)
+        fma (bool): Funde multiplicações seguidas de + ou - em half_fma (--fma)
+    """
+    print(f"Observando '{nome}' (Ctrl+C para sair)")
+    assinatura = None
+    try:
+        while True:
+            try:
+                estado = os.stat(nome)
+                nova = (estado.st_mtime_ns, estado.st_size)
+            except FileNotFoundError:
+                nova = None
+            if nova is not None and nova != assinatura:
+                assinatura = nova
+                acertos, falhas = cache.acertos, cache.falhas
+                inicio = time.perf_counter()
+                calculadora = gerar_arquivo_com_cache(nome, destino, cache, ciclos, numerico, otimizacao, alvo, uart,
+                                                      historico, constantes, fma)
+                decorrido = (time.perf_counter() - inicio) * 1000
+                for mensagem in calculadora.erros:
+                    print(mensagem)
+                print(f"{destino} regenerado em {decorrido:.1f} ms "
+                      f"({cache.acertos - acertos} linhas do cache, {cache.falhas - falhas} recalculadas)")
+            time.sleep(intervalo)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cache.fechar()
+
+def main():
+    """
+    Função principal que orquestra o fluxo do programa:
+    1. Lê o arquivo de entrada com expressões RPN
+    2. Gera código Assembly para Arduino
+    3. Exibe resultados e salva código Assembly em arquivo
+    """
+    # Interpretar a linha de comando
+    parser = argparse.ArgumentParser(description="Calculadora RPN para Arduino (IEEE 754 half-precision)")
+    parser.add_argument('arquivo', nargs='?', help="arquivo de texto com expressões RPN (uma por linha)")
+    parser.add_argument('--profile', nargs='?', const='tabela', choices=['tabela', 'json'],
+                        help="mede o tempo de cada fase e conta operações (saída em tabela ou JSON)")
+    parser.add_argument('--ciclos', action='store_true',
+                        help="mede no Arduino (Timer1) os ciclos de cada expressão e envia junto com o resultado")
+    parser.add_argument('--numerico', default='half', choices=['half'] + list(FORMATOS_PONTO_FIXO),
+                        help="formato dos números no Arduino: half (IEEE 754, padrão), q8.8 ou q16.16 (ponto fixo)")
+    parser.add_argument('-O', dest='otimizacao', choices=['s', '2'], default='s',
+                        help="variante das rotinas: -Os (menor código, padrão) ou -O2 (mais rápida)")
+    parser.add_argument('--batch', metavar='PASTA', help="gera um .asm para cada arquivo .txt da pasta")
+    parser.add_argument('--out', default='build', help="pasta de saída do modo em lote (padrão: build)")
+    parser.add_argument('-j', type=int, default=None, help="número de processos do modo em lote (padrão: CPUs)")
+    parser.add_argument('--cache', nargs='?', const='.rpn_cache', metavar='PASTA',
+                        help="reaproveita o fragmento de cada linha inalterada (padrão: .rpn_cache)")
+    parser.add_argument('--alvo', default='atmega328p', choices=list(ALVOS),
+                        help="microcontrolador: atmega328p (Arduino Uno, padrão) ou atmega2560 (Arduino Mega)")
+    parser.add_argument('--uart', type=int, default=0, help="porta serial dos resultados (0 a 3 no atmega2560; padrão 0)")
+    parser.add_argument('--flash', type=int, default=None, metavar='BYTES',
+                        help="memória de programa de cada imagem; entradas maiores são divididas "
+                             f"(padrão: flash do alvo menos o bootloader, {LIMITE_FLASH} no atmega328p)")
+    parser.add_argument('--historico', action='store_true',
+                        help="guarda MEM e os últimos resultados na SRAM do Arduino: MEM, RES e (N RES) viram "
+                             "leituras da SRAM (só no formato half)")
+    parser.add_argument('--constantes', action='store_true',
+                        help="carrega uma única vez as constantes mais repetidas em registradores e troca as "
+                             "outras cargas delas por MOVW (programa menor)")
+    parser.add_argument('--fma', action='store_true',
+                        help="calcula cada multiplicação seguida de + ou - com um só arredondamento (half_fma; "
+                             "só no formato half, o resultado pode diferir do padrão)")
+    parser.add_argument('--watch', action='store_true',
+                        help="regenera o calculadora.asm sempre que o arquivo de expressões mudar (usa o cache)")
+    args = parser.parse_args()
+    otimizacao = 'O' + args.otimizacao
+    if not 0 <= args.uart < len(ALVOS[args.alvo]['uarts']):
+        parser.error(f"o {ALVOS[args.alvo]['nome']} não tem a UART{args.uart}")
+    if args.historico and args.numerico != 'half':
+        parser.error("--historico só existe no formato half")
+    if args.fma and args.numerico != 'half':
+        parser.error("--fma só existe no formato half")
+    limite = args.flash if args.flash is not None else limite_flash(args.alvo)
+    
+    # Modo em lote: vários arquivos, um .asm por entrada
+    if args.batch:
+        if not os.path.isdir(args.batch):
+            print(f"Erro: Pasta '{args.batch}' não encontrada.")
+            sys.exit(1)
+        resumo = processar_lote(args.batch, args.out, args.j, args.ciclos, args.numerico, otimizacao, args.alvo, args.uart,
+                                args.historico, args.constantes, args.fma)
+        print(formatar_resumo_lote(resumo))
+        if any(item['situacao'] == 'falhou' for item in resumo): sys.exit(1)
+        return
+    if args.arquivo is None:
+        parser.error("informe o arquivo de expressões ou --batch PASTA")
+    perfil = Perfilador() if args.profile else None
+    
+    # Ler as expressões do arquivo
+    nomeArquivo = args.arquivo.lower()
+    
+    # Modo observação: regenerar a cada alteração usando o cache de fragmentos
+    if args.watch:
+        if not os.path.exists(nomeArquivo):
+            print(f"Erro: Arquivo '{nomeArquivo}' não encontrado.")
+            sys.exit(1)
+        observar_arquivo(nomeArquivo, 'calculadora.asm', CacheFragmentos(args.cache or '.rpn_cache'), args.ciclos,
+                         numerico=args.numerico, otimizacao=otimizacao, alvo=args.alvo, uart=args.uart,
+                         historico=args.historico, constantes=args.constantes, fma=args.fma)
+        return
+
+    if perfil is not None: inicio = time.perf_counter()
+    linhas = read_expressions_file(nomeArquivo)
+    if perfil is not None: perfil.acumula('leitura', inicio)
+
+    # Criar arquivo de código Assembly
+    cache = CacheFragmentos(args.cache) if args.cache else None
+    calculadora = Calculadora(perfil, args.ciclos, cache, args.numerico, otimizacao, args.alvo, args.uart, args.historico,
+                              args.constantes, args.fma)
+    imagens = calculadora.generate_imagens(linhas, limite)
+    for mensagem in calculadora.erros:
+        print(mensagem)
+    nomes = gravar_imagens(imagens)
+    if cache is not None: cache.fechar()
+    
+    if len(imagens) == 1:
+        print("Arquivo Calculadora.asm gerado com sucesso!")
+    else:
+        print(formatar_manifesto(imagens, nomes, limite))
+    if args.constantes:
+        print(f"Constantes residentes: {sum(len(imagem['constantes']) for imagem in imagens)} valores em registradores, "
+              f"{sum(imagem['economia'] for imagem in imagens)} bytes a menos")
+    if perfil is not None: print(perfil.relatorio(args.profile))
 
 if __name__ == "__main__":
     main()
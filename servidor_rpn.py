@@ -0,0 +1,352 @@
+"""
+Servidor de avaliação RPN (modo daemon)
+
+Mantém a calculadora carregada em processos de trabalho e recebe lotes de
+expressões por TCP ou por socket Unix, evitando iniciar um interpretador Python
+e reescrever o calculadora.asm a cada arquivo.
+
+Protocolo: uma mensagem JSON por linha, nos dois sentidos.
+    Pedido:   {"id": 1, "expressoes": ["(2 3 +)", ...], "asm": false, "hex": false, "numerico": "half",
+              "otimizacao": "Os", "alvo": "atmega328p"}
+    Resposta: {"id": 1, "resultados": [[5.0], [2.0, 4.0, 6.0], ...], "mensagens": [...], "asm": "...", "hex": "..."}
+
+Os resultados vêm agrupados por expressão do pedido: uma lista por linha, com
+um valor por valor da variável nas expressões paramétricas e vazia nas linhas
+em branco.
+
+Uso:
+    python servidor_rpn.py servir [--host 127.0.0.1] [--porta 8765] [--unix caminho] [-j N]
+    python servidor_rpn.py cliente teste1.txt [--asm] [--hex] [--alvo atmega2560] [--otimizacao O2]
+"""
+import io         # Para gerar o Assembly em memória
+import os         # Para o número de CPUs e arquivos temporários
+import sys        # Para mensagens de erro e código de saída
+import json       # Para o protocolo de mensagens
+import shutil     # Para localizar o avr-as
+import asyncio    # Para atender várias conexões ao mesmo tempo
+import argparse   # Para interpretar as opções da linha de comando
+import tempfile   # Para montar o HEX em um diretório temporário
+import subprocess # Para chamar avr-as/avr-ld/avr-objcopy
+from concurrent.futures import ProcessPoolExecutor # Processos que mantêm a calculadora carregada
+
+import rpn_final
+
+LIMITE_MENSAGEM = 64 * 1024 * 1024  # Tamanho máximo de uma linha do protocolo (bytes)
+
+def montar_hex(asm, alvo='atmega328p'):
+    """
+    Monta o código Assembly e retorna o arquivo Intel HEX
+
+    Args:
+        asm (str): Código Assembly gerado
+        alvo (str): Microcontrolador (chave de rpn_final.ALVOS)
+
+    Returns:
+        str: Conteúdo do arquivo .hex
+
+    Raises:
+        RuntimeError: Se o toolchain AVR não estiver instalado ou a montagem falhar
+    """
+    if shutil.which('avr-as') is None:
+        raise RuntimeError("toolchain AVR (avr-as/avr-ld/avr-objcopy) não encontrado")
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'calculadora')
+        with open(caminho + '.asm', 'w') as arquivo:
+            arquivo.write(asm)
+        comandos = [
+            ['avr-as', f'-mmcu={alvo}', '-o', caminho + '.o', caminho + '.asm'],
+            ['avr-ld', '-m', rpn_final.ALVOS[alvo]['arquitetura'], '-o', caminho + '.elf', caminho + '.o'],
+            ['avr-objcopy', '-O', 'ihex', caminho + '.elf', caminho + '.hex'],
+        ]
+        for comando in comandos:
+            processo = subprocess.run(comando, capture_output=True, text=True)
+            if processo.returncode != 0:
+                raise RuntimeError(f"{comando[0]} falhou: {processo.stderr.strip()}")
+        with open(caminho + '.hex', 'r') as arquivo:
+            return arquivo.read()
+
+def expandir_linha(expressao):
+    """
+    Expressões calculadas para uma linha do lote (uma por valor da variável, se paramétrica)
+
+    Args:
+        expressao (str): Linha do lote
+
+    Returns:
+        list: Expressões da linha (vazia para linhas em branco); uma declaração
+              paramétrica inválida conta como uma expressão, que terá erro
+    """
+    expressao = expressao.strip()
+    if not expressao: return []
+    try:
+        return rpn_final.expandir_parametrica(expressao) or [expressao]
+    except ValueError:
+        return [expressao]
+
+def agrupar_resultados(expressoes, resultados):
+    """
+    Separa os resultados da calculadora (uma lista só) pelas linhas do lote
+
+    Args:
+        expressoes (list): Linhas do lote
+        resultados (list): Resultado de cada expressão calculada, na ordem
+
+    Returns:
+        list: Uma lista de resultados por linha
+    """
+    grupos, inicio = [], 0
+    for expressao in expressoes:
+        quantidade = len(expandir_linha(expressao))
+        grupos.append(resultados[inicio:inicio + quantidade])
+        inicio += quantidade
+    return grupos
+
+def avaliar_lote(expressoes, gerar_asm=False, gerar_hex=False, numerico='half', otimizacao='Os', alvo='atmega328p'):
+    """
+    Avalia um lote de expressões (executada dentro de um processo de trabalho)
+
+    Args:
+        expressoes (list): Expressões RPN (uma por linha)
+        gerar_asm (bool): Inclui o código Assembly na resposta
+        gerar_hex (bool): Inclui o arquivo HEX na resposta (requer o toolchain AVR)
+        numerico (str): Formato numérico: 'half', 'q8.8' ou 'q16.16'
+        otimizacao (str): Variante das rotinas ligadas: 'Os' ou 'O2'
+        alvo (str): Microcontrolador: 'atmega328p' ou 'atmega2560'
+
+    Returns:
+        dict: Resultados agrupados por expressão, mensagens da calculadora e, se pedido, Assembly/HEX
+
+    Raises:
+        ValueError: Se o formato numérico, a otimização ou o alvo não existirem
+    """
+    calculadora = rpn_final.Calculadora(numerico=numerico, otimizacao=otimizacao, alvo=alvo)
+    if not (gerar_asm or gerar_hex):
+        resultados = calculadora.evaluate_many(expressoes)
+        return {'resultados': agrupar_resultados(expressoes, resultados), 'mensagens': calculadora.erros}
+    saida = io.StringIO()
+    resultados = calculadora.generate(expressoes, saida)
+    resposta = {'resultados': agrupar_resultados(expressoes, resultados), 'mensagens': calculadora.erros}
+    if gerar_asm:
+        resposta['asm'] = saida.getvalue()
+    if gerar_hex:
+        try:
+            resposta['hex'] = montar_hex(saida.getvalue(), alvo)
+        except RuntimeError as erro:
+            resposta['erro'] = str(erro)
+    return resposta
+
+class ServidorRPN:
+    """
+    Servidor asyncio que distribui os pedidos entre processos de trabalho
+
+    O número de pedidos em andamento é limitado por um semáforo: quando o limite
+    é atingido, o servidor para de ler novas mensagens das conexões e o próprio
+    TCP segura os clientes (contrapressão), sem acumular pedidos em memória.
+    """
+    def __init__(self, trabalhadores=None, max_pendentes=None):
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.trabalhadores)
+        self.pendentes = asyncio.Semaphore(max_pendentes or 2 * self.trabalhadores)
+
+    async def _processar(self, pedido, escritor, trava):
+        """
+        Executa um pedido no pool e envia a resposta
+        """
+        try:
+            laco = asyncio.get_running_loop()
+            resposta = await laco.run_in_executor(
+                self.executor, avaliar_lote,
+                pedido.get('expressoes', []), bool(pedido.get('asm')), bool(pedido.get('hex')),
+                pedido.get('numerico', 'half'), pedido.get('otimizacao', 'Os'), pedido.get('alvo', 'atmega328p'))
+        except Exception as erro:
+            resposta = {'erro': f"falha ao avaliar o lote: {erro}"}
+        finally:
+            self.pendentes.release()
+        resposta['id'] = pedido.get('id')
+        await self._enviar(escritor, trava, resposta)
+
+    async def _enviar(self, escritor, trava, mensagem):
+        """
+        Escreve uma mensagem na conexão respeitando o buffer de saída
+        """
+        async with trava:
+            escritor.write(json.dumps(mensagem).encode('utf-8') + b'\n')
+            await escritor.drain()
+
+    async def atender(self, leitor, escritor):
+        """
+        Atende uma conexão: os pedidos são processados em paralelo e cada
+        resposta leva o mesmo "id" do pedido correspondente
+        """
+        trava = asyncio.Lock()
+        tarefas = set()
+        try:
+            while True:
+                try:
+                    linha = await leitor.readline()
+                except ValueError:
+                    await self._enviar(escritor, trava, {'id': None, 'erro': "mensagem maior que o limite"})
+                    break
+                if not linha:
+                    break
+                try:
+                    pedido = json.loads(linha)
+                    if not isinstance(pedido, dict) or not isinstance(pedido.get('expressoes', []), list):
+                        raise ValueError("o pedido deve ser um objeto com a lista 'expressoes'")
+                except ValueError as erro:
+                    await self._enviar(escritor, trava, {'id': None, 'erro': f"pedido inválido: {erro}"})
+                    continue
+                # Contrapressão: não ler o próximo pedido enquanto o servidor estiver cheio
+                await self.pendentes.acquire()
+                tarefa = asyncio.create_task(self._processar(pedido, escritor, trava))
+                tarefas.add(tarefa)
+                tarefa.add_done_callback(tarefas.discard)
+            if tarefas:
+                await asyncio.gather(*tarefas, return_exceptions=True)
+        except ConnectionError:
+            pass  # Cliente desconectou
+        finally:
+            escritor.close()
+
+    async def servir(self, host='127.0.0.1', porta=8765, caminho_unix=None):
+        """
+        Inicia o servidor e atende conexões até ser interrompido
+
+        Args:
+            host (str): Endereço TCP
+            porta (int): Porta TCP
+            caminho_unix (str): Caminho do socket Unix (substitui host/porta)
+        """
+        # Aquecer os processos de trabalho antes de aceitar conexões
+        laco = asyncio.get_running_loop()
+        await asyncio.gather(*(laco.run_in_executor(self.executor, avaliar_lote, ['(1 1 +)'])
+                               for _ in range(self.trabalhadores)))
+        if caminho_unix:
+            servidor = await asyncio.start_unix_server(self.atender, path=caminho_unix, limit=LIMITE_MENSAGEM)
+            print(f"Servidor RPN ouvindo em {caminho_unix} ({self.trabalhadores} processos)")
+        else:
+            servidor = await asyncio.start_server(self.atender, host, porta, limit=LIMITE_MENSAGEM)
+            print(f"Servidor RPN ouvindo em {host}:{porta} ({self.trabalhadores} processos)")
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+
+async def abrir_conexao(host='127.0.0.1', porta=8765, caminho_unix=None):
+    """
+    Abre uma conexão com o servidor
+
+    Returns:
+        tuple: (StreamReader, StreamWriter)
+    """
+    if caminho_unix:
+        return await asyncio.open_unix_connection(caminho_unix, limit=LIMITE_MENSAGEM)
+    return await asyncio.open_connection(host, porta, limit=LIMITE_MENSAGEM)
+
+async def enviar_lotes(lotes, host='127.0.0.1', porta=8765, caminho_unix=None, asm=False, hex=False,
+                       numerico='half', otimizacao='Os', alvo='atmega328p'):
+    """
+    Envia vários lotes pela mesma conexão e aguarda todas as respostas
+
+    Os pedidos são enviados em sequência sem esperar as respostas, que podem
+    chegar fora de ordem e são associadas pelo "id".
+
+    Args:
+        lotes (list): Lista de listas de expressões
+        host (str): Endereço TCP do servidor
+        porta (int): Porta TCP do servidor
+        caminho_unix (str): Caminho do socket Unix (substitui host/porta)
+        asm (bool): Pede o código Assembly
+        hex (bool): Pede o arquivo HEX
+        numerico (str): Formato numérico: 'half', 'q8.8' ou 'q16.16'
+        otimizacao (str): Variante das rotinas ligadas: 'Os' ou 'O2'
+        alvo (str): Microcontrolador: 'atmega328p' ou 'atmega2560'
+
+    Returns:
+        list: Respostas na mesma ordem dos lotes
+    """
+    leitor, escritor = await abrir_conexao(host, porta, caminho_unix)
+    try:
+        for indice, expressoes in enumerate(lotes):
+            pedido = {'id': indice, 'expressoes': list(expressoes), 'asm': asm, 'hex': hex, 'numerico': numerico,
+                      'otimizacao': otimizacao, 'alvo': alvo}
+            escritor.write(json.dumps(pedido).encode('utf-8') + b'\n')
+            await escritor.drain()
+        respostas = [None] * len(lotes)
+        for _ in lotes:
+            linha = await leitor.readline()
+            if not linha:
+                raise ConnectionError("conexão encerrada pelo servidor")
+            resposta = json.loads(linha)
+            if resposta.get('id') is None:
+                raise RuntimeError(resposta.get('erro', "resposta sem id"))
+            respostas[resposta['id']] = resposta
+        return respostas
+    finally:
+        escritor.close()
+        await escritor.wait_closed()
+
+def main():
+    """
+    Função principal: inicia o servidor ou envia um arquivo como cliente
+    """
+    parser = argparse.ArgumentParser(description="Servidor de avaliação da calculadora RPN")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    for nome in ('servir', 'cliente'):
+        sub = comandos.add_parser(nome)
+        sub.add_argument('--host', default='127.0.0.1', help="endereço TCP (padrão 127.0.0.1)")
+        sub.add_argument('--porta', type=int, default=8765, help="porta TCP (padrão 8765)")
+        sub.add_argument('--unix', help="usa um socket Unix no caminho indicado")
+        if nome == 'servir':
+            sub.add_argument('-j', type=int, default=None, help="número de processos de trabalho")
+            sub.add_argument('--max-pendentes', type=int, default=None,
+                             help="pedidos em andamento antes de aplicar contrapressão")
+        else:
+            sub.add_argument('arquivos', nargs='+', help="arquivos de expressões (um lote por arquivo)")
+            sub.add_argument('--asm', action='store_true', help="grava o Assembly de cada lote (<arquivo>.asm)")
+            sub.add_argument('--hex', action='store_true', help="grava o HEX de cada lote (<arquivo>.hex)")
+            sub.add_argument('--numerico', default='half', choices=['half'] + list(rpn_final.FORMATOS_PONTO_FIXO),
+                             help="formato dos números no Arduino (padrão half)")
+            sub.add_argument('--otimizacao', default='Os', choices=['Os', 'O2'],
+                             help="variante das rotinas: Os (menor código, padrão) ou O2 (mais rápida)")
+            sub.add_argument('--alvo', default='atmega328p', choices=list(rpn_final.ALVOS),
+                             help="microcontrolador: atmega328p (Arduino Uno, padrão) ou atmega2560 (Arduino Mega)")
+    args = parser.parse_args()
+
+    if args.comando == 'servir':
+        servidor = ServidorRPN(args.j, args.max_pendentes)
+        try:
+            asyncio.run(servidor.servir(args.host, args.porta, args.unix))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    lotes = [rpn_final.read_expressions_file(nome) for nome in args.arquivos]
+    respostas = asyncio.run(enviar_lotes(lotes, args.host, args.porta, args.unix, args.asm, args.hex,
+                                         args.numerico, args.otimizacao, args.alvo))
+    for nome, expressoes, resposta in zip(args.arquivos, lotes, respostas):
+        print(f"== {nome}")
+        for expressao, grupo in zip(expressoes, resposta.get('resultados', [])):
+            expandidas = expandir_linha(expressao)
+            if expandidas == [expressao]:
+                print(f"{expressao} = {grupo[0] if grupo else None}")
+                continue
+            # Expressão paramétrica: um resultado por valor, abaixo da linha
+            print(expressao)
+            for expandida, resultado in zip(expandidas, grupo):
+                print(f"    {expandida} = {resultado}")
+        for mensagem in resposta.get('mensagens', []):
+            print(mensagem)
+        if 'erro' in resposta:
+            print(f"Erro: {resposta['erro']}", file=sys.stderr)
+        base = os.path.splitext(nome)[0]
+        if 'asm' in resposta:
+            with open(base + '.asm', 'w') as arquivo:
+                arquivo.write(resposta['asm'])
+        if 'hex' in resposta:
+            with open(base + '.hex', 'w') as arquivo:
+                arquivo.write(resposta['hex'])
+
+if __name__ == "__main__":
+    main()
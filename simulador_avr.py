@@ -0,0 +1,1077 @@
+"""
+Simulador do ATmega328P (subconjunto) para o Assembly gerado pela calculadora
+
+Monta o código no dialeto usado pelo avr-as (rótulos com endereço em bytes,
+.equ, .org, .byte/.word, lo8()/hi8()/pm()) e executa instrução por instrução,
+contando os ciclos de acordo com o datasheet. A UART0 grava os bytes enviados
+em `saida_uart` e o Timer1 (modo normal, sem prescaler) acompanha os ciclos.
+
+Usado para testar as rotinas Assembly sem o Arduino e para comparar o custo
+em ciclos das alternativas de geração de código.
+
+Uso:
+    python simulador_avr.py calculadora.asm [--sem-delay]
+"""
+import re       # Para interpretar as linhas do Assembly
+import ast      # Para avaliar as expressões dos operandos com segurança
+import sys      # Para mensagens de erro e código de saída
+import argparse # Para interpretar as opções da linha de comando
+from collections import deque # Fila dos bytes recebidos pela UART
+
+class ErroMontagem(Exception):
+    """Erro ao montar o código Assembly"""
+
+class ErroSimulacao(Exception):
+    """Erro durante a execução (instrução inválida, limite de ciclos, ...)"""
+
+# Instruções que ocupam duas palavras (32 bits) na memória de programa
+INSTRUCOES_LONGAS = {'JMP', 'CALL', 'LDS', 'STS'}
+
+# Apelidos dos registradores de ponteiro
+APELIDOS = {'XL': 26, 'XH': 27, 'YL': 28, 'YH': 29, 'ZL': 30, 'ZH': 31}
+
+# Funções aceitas nas expressões dos operandos (padrão do avr-as)
+FUNCOES = {
+    'lo8': lambda x: x & 0xFF,
+    'hi8': lambda x: (x >> 8) & 0xFF,
+    'hh8': lambda x: (x >> 16) & 0xFF,
+    'hlo8': lambda x: (x >> 16) & 0xFF,
+    'pm': lambda x: x >> 1,
+    'pm_lo8': lambda x: (x >> 1) & 0xFF,
+    'pm_hi8': lambda x: (x >> 9) & 0xFF,
+    'pm_hh8': lambda x: (x >> 17) & 0xFF,
+}
+
+def _remover_comentario(linha):
+    """
+    Remove o comentário (';' fora de literais de caractere ou string)
+    """
+    i = 0
+    while i < len(linha):
+        c = linha[i]
+        if c == '"':
+            fim = linha.find('"', i + 1)
+            i = len(linha) if fim < 0 else fim + 1
+            continue
+        if c == "'":
+            # Literal de caractere: 'c' ou 'c (formato do GNU as)
+            i += 3 if i + 2 < len(linha) and linha[i + 2] == "'" else 2
+            continue
+        if c == ';':
+            return linha[:i]
+        i += 1
+    return linha
+
+def _dividir_operandos(texto):
+    """
+    Separa os operandos por vírgula, respeitando literais ('c', ',' e "strings")
+    """
+    operandos, atual, i = [], '', 0
+    while i < len(texto):
+        c = texto[i]
+        if c == "'" and i + 1 < len(texto):
+            fim = i + 3 if i + 2 < len(texto) and texto[i + 2] == "'" else i + 2
+            atual += texto[i:fim]
+            i = fim
+            continue
+        if c == '"':
+            fim = texto.index('"', i + 1) + 1
+            atual += texto[i:fim]
+            i = fim
+            continue
+        if c == ',':
+            operandos.append(atual.strip())
+            atual = ''
+        else:
+            atual += c
+        i += 1
+    if atual.strip():
+        operandos.append(atual.strip())
+    return operandos
+
+def avaliar_expressao(texto, simbolos):
+    """
+    Avalia a expressão de um operando (números, 'c', símbolos, lo8()/hi8()/pm(), + - * / << >> & | ^ ~)
+
+    Args:
+        texto (str): Expressão
+        simbolos (dict): Valores de .equ e rótulos (endereços em bytes)
+
+    Returns:
+        int: Valor da expressão
+
+    Raises:
+        ErroMontagem: Se a expressão for inválida ou usar um símbolo desconhecido
+    """
+    convertido = re.sub(r"'(.)'?", lambda m: str(ord(m.group(1))), texto)
+    try:
+        arvore = ast.parse(convertido, mode='eval')
+    except SyntaxError:
+        raise ErroMontagem(f"expressão inválida: {texto}")
+
+    def valor(no):
+        if isinstance(no, ast.Expression):
+            return valor(no.body)
+        if isinstance(no, ast.Constant) and isinstance(no.value, int):
+            return no.value
+        if isinstance(no, ast.Name):
+            if no.id in simbolos:
+                return simbolos[no.id]
+            raise ErroMontagem(f"símbolo desconhecido: {no.id}")
+        if isinstance(no, ast.UnaryOp):
+            v = valor(no.operand)
+            if isinstance(no.op, ast.USub): return -v
+            if isinstance(no.op, ast.UAdd): return v
+            if isinstance(no.op, ast.Invert): return ~v
+        if isinstance(no, ast.BinOp):
+            a, b = valor(no.left), valor(no.right)
+            operacoes = {ast.Add: lambda: a + b, ast.Sub: lambda: a - b, ast.Mult: lambda: a * b,
+                         ast.Div: lambda: a // b, ast.FloorDiv: lambda: a // b, ast.LShift: lambda: a << b,
+                         ast.RShift: lambda: a >> b, ast.BitAnd: lambda: a & b, ast.BitOr: lambda: a | b,
+                         ast.BitXor: lambda: a ^ b, ast.Mod: lambda: a % b}
+            if type(no.op) in operacoes:
+                return operacoes[type(no.op)]()
+        if isinstance(no, ast.Call) and isinstance(no.func, ast.Name) and no.func.id in FUNCOES and len(no.args) == 1:
+            return FUNCOES[no.func.id](valor(no.args[0]))
+        raise ErroMontagem(f"expressão não suportada: {texto}")
+
+    return valor(arvore)
+
+class Programa:
+    """
+    Resultado da montagem: instruções por endereço de palavra, memória de
+    programa (para LPM) e tabela de símbolos
+    """
+    def __init__(self):
+        self.instrucoes = {}        # Endereço (palavras) -> (mnemônico, operandos, linha)
+        self.flash = bytearray()    # Conteúdo de .byte/.word (para LPM)
+        self.simbolos = {}          # Rótulos (bytes) e constantes .equ
+        self.tamanho = 0            # Bytes ocupados na memória de programa
+
+    def endereco(self, rotulo):
+        """
+        Retorna o endereço (em palavras) de um rótulo
+        """
+        return self.simbolos[rotulo] >> 1
+
+def _registrador(texto, definicoes):
+    """
+    Converte 'R16', 'r16', 'ZL' ou um nome de .def para o número do registrador (ou None)
+    """
+    texto = definicoes.get(texto, texto)
+    achou = re.fullmatch(r'[Rr](\d{1,2})', texto)
+    if achou and int(achou.group(1)) < 32:
+        return int(achou.group(1))
+    return APELIDOS.get(texto.upper())
+
+def _ponteiro(texto):
+    """
+    Interpreta operandos de ponteiro: X, X+, -X, Y+q, Z+q
+
+    Returns:
+        tuple: (registrador base, modo, deslocamento) ou None
+            modo: 0 = sem alteração, 1 = pós-incremento, 2 = pré-decremento
+    """
+    texto = texto.replace(' ', '').upper()
+    bases = {'X': 26, 'Y': 28, 'Z': 30}
+    if texto in bases:
+        return (bases[texto], 0, 0)
+    if len(texto) == 2 and texto[0] in bases and texto[1] == '+':
+        return (bases[texto[0]], 1, 0)
+    if len(texto) == 2 and texto[0] == '-' and texto[1] in bases:
+        return (bases[texto[1]], 2, 0)
+    return None
+
+def montar(texto):
+    """
+    Monta o código Assembly em duas passagens
+
+    Args:
+        texto (str): Código Assembly
+
+    Returns:
+        Programa: Programa montado
+
+    Raises:
+        ErroMontagem: Em caso de erro de sintaxe ou símbolo desconhecido
+    """
+    programa = Programa()
+    simbolos = programa.simbolos
+    definicoes = {}  # .def NOME = Rn
+    linhas = []
+
+    # Primeira passagem: endereços dos rótulos e constantes
+    posicao = 0  # Em bytes
+    for numero, bruta in enumerate(texto.splitlines(), 1):
+        linha = _remover_comentario(bruta).strip()
+        while True:
+            achou = re.match(r'^([A-Za-z_.$][\w.$]*)\s*:(.*)$', linha)
+            if not achou:
+                break
+            simbolos[achou.group(1)] = posicao
+            linha = achou.group(2).strip()
+        if not linha:
+            continue
+        partes = linha.split(None, 1)
+        nome = partes[0]
+        resto = partes[1] if len(partes) > 1 else ''
+        if nome.startswith('.'):
+            diretiva = nome.lower()
+            if diretiva in ('.equ', '.set'):
+                simbolo, expressao = [p.strip() for p in resto.split(',', 1)]
+                simbolos[simbolo] = avaliar_expressao(expressao, simbolos)
+                continue
+            if diretiva == '.def':
+                simbolo, registrador = [p.strip() for p in resto.split('=', 1)]
+                definicoes[simbolo] = registrador
+                continue
+            if diretiva == '.org':
+                posicao = avaliar_expressao(resto, simbolos)
+                continue
+            if diretiva in ('.balign', '.align', '.p2align'):
+                n = avaliar_expressao(resto.split(',')[0], simbolos)
+                alinhamento = n if diretiva == '.balign' else 1 << n
+                posicao = (posicao + alinhamento - 1) // alinhamento * alinhamento
+                continue
+            if diretiva in ('.byte', '.db', '.word', '.dw', '.ascii', '.asciz', '.string'):
+                linhas.append((numero, posicao, diretiva, resto))
+                posicao += _tamanho_dados(diretiva, resto)
+                continue
+            continue  # .section, .text, .global, .include, ... (ignoradas)
+        mnemonico = nome.upper()
+        linhas.append((numero, posicao, mnemonico, resto))
+        posicao += 4 if mnemonico in INSTRUCOES_LONGAS else 2
+
+    # Segunda passagem: operandos
+    for numero, posicao, mnemonico, resto in linhas:
+        try:
+            if mnemonico.startswith('.'):
+                dados = _dados(mnemonico, resto, simbolos)
+                if len(programa.flash) < posicao + len(dados):
+                    programa.flash.extend(bytes(posicao + len(dados) - len(programa.flash)))
+                programa.flash[posicao:posicao + len(dados)] = dados
+                programa.tamanho = max(programa.tamanho, posicao + len(dados))
+                continue
+            operandos = []
+            for operando in _dividir_operandos(resto):
+                registrador = _registrador(operando, definicoes)
+                if registrador is not None:
+                    operandos.append(registrador)
+                    continue
+                ponteiro = _ponteiro(operando)
+                if ponteiro is not None:
+                    operandos.append(ponteiro)
+                    continue
+                deslocamento = re.fullmatch(r'\s*([YZyz])\s*\+\s*(.+)', operando)
+                if deslocamento and mnemonico in ('LDD', 'STD'):
+                    base = 28 if deslocamento.group(1).upper() == 'Y' else 30
+                    operandos.append((base, 0, avaliar_expressao(deslocamento.group(2), simbolos)))
+                    continue
+                operandos.append(avaliar_expressao(operando, simbolos))
+            if mnemonico not in EXECUTORES:
+                raise ErroMontagem(f"instrução não suportada: {mnemonico}")
+            programa.instrucoes[posicao >> 1] = (mnemonico, operandos, numero)
+            programa.tamanho = max(programa.tamanho, posicao + (4 if mnemonico in INSTRUCOES_LONGAS else 2))
+        except ErroMontagem as erro:
+            raise ErroMontagem(f"linha {numero}: {erro}")
+    return programa
+
+def _tamanho_dados(diretiva, resto):
+    """
+    Bytes ocupados por uma diretiva de dados (primeira passagem)
+    """
+    if diretiva in ('.ascii', '.asciz', '.string'):
+        texto = ast.literal_eval(resto.strip())
+        return len(texto.encode('latin-1')) + (0 if diretiva == '.ascii' else 1)
+    itens = _dividir_operandos(resto)
+    total = 0
+    for item in itens:
+        if item.startswith('"'):
+            total += len(ast.literal_eval(item).encode('latin-1'))
+        else:
+            total += 2 if diretiva in ('.word', '.dw') else 1
+    return total
+
+def _dados(diretiva, resto, simbolos):
+    """
+    Bytes de uma diretiva de dados (segunda passagem)
+    """
+    if diretiva in ('.ascii', '.asciz', '.string'):
+        texto = ast.literal_eval(resto.strip()).encode('latin-1')
+        return texto if diretiva == '.ascii' else texto + b'\0'
+    dados = bytearray()
+    for item in _dividir_operandos(resto):
+        if item.startswith('"'):
+            dados.extend(ast.literal_eval(item).encode('latin-1'))
+        elif diretiva in ('.word', '.dw'):
+            valor = avaliar_expressao(item, simbolos) & 0xFFFF
+            dados.extend((valor & 0xFF, valor >> 8))
+        else:
+            dados.append(avaliar_expressao(item, simbolos) & 0xFF)
+    return bytes(dados)
+
+# Endereços (espaço de dados) dos periféricos simulados
+SREG = 0x5F
+SPL = 0x5D
+SPH = 0x5E
+RAMPZ = 0x5B
+TIFR1 = 0x36
+TCCR1B = 0x81
+TCNT1L = 0x84
+TCNT1H = 0x85
+
+# UARTs: (UCSRnA, UDRn)
+UARTS_ATMEGA328P = ((0xC0, 0xC6),)
+UARTS_ATMEGA2560 = ((0xC0, 0xC6), (0xC8, 0xCE), (0xD0, 0xD6), (0x130, 0x136))
+
+# Interrupções de recepção das UARTs: (UCSRnB, endereço do vetor em palavras)
+VETORES_RX_ATMEGA328P = ((0xC1, 0x24),)
+VETORES_RX_ATMEGA2560 = ((0xC1, 0x32), (0xC9, 0x48), (0xD1, 0x66), (0x131, 0x6C))
+
+# Argumentos do Simulador para cada microcontrolador (--mcu)
+MICROCONTROLADORES = {
+    'atmega328p': {},
+    'atmega2560': {'ram_fim': 0x21FF, 'pc_22bits': True, 'uarts': UARTS_ATMEGA2560, 'vetores_rx': VETORES_RX_ATMEGA2560},
+}
+
+class Simulador:
+    """
+    Executa um Programa montado contando ciclos
+
+    Args:
+        programa (Programa): Programa montado por montar()
+        ram_fim (int): Último endereço da SRAM (0x8FF no ATmega328P, 0x21FF no ATmega2560)
+        entrada (bytes): Bytes já disponíveis na UART desde o início (leitura de UDRn)
+        atalhos (iterable): Rótulos cujas chamadas são ignoradas (ex.: 'delay_ms')
+        pc_22bits (bool): Endereço de retorno com 3 bytes (ATmega2560)
+        uarts (tuple): Pares (UCSRnA, UDRn) das UARTs simuladas
+        vetores_rx (tuple): Pares (UCSRnB, vetor) da interrupção de recepção (bit RXCIEn)
+    """
+    def __init__(self, programa, ram_fim=0x8FF, entrada=b'', atalhos=(), pc_22bits=False, uarts=UARTS_ATMEGA328P,
+                 vetores_rx=VETORES_RX_ATMEGA328P):
+        self.programa = programa
+        self.r = [0] * 32
+        self.mem = bytearray(ram_fim + 1)
+        self.ram_fim = ram_fim
+        self.pc = 0
+        self.ciclos = 0
+        self.C = self.Z = self.N = self.V = self.S = self.H = self.T = self.I = 0
+        self.saida_uart = bytearray()
+        self.ciclos_uart = []  # Ciclo em que cada byte de saida_uart foi escrito
+        self.entrada = deque((0, byte) for byte in entrada)  # (ciclo de chegada, byte)
+        self.vetores_rx = vetores_rx
+        self.atalhos = {programa.endereco(r) for r in atalhos if r in programa.simbolos}
+        self.pc_22bits = pc_22bits
+        self.uarts_status = {a for a, _ in uarts}
+        self.uarts_dados = {d for _, d in uarts}
+        self.parado = False
+        # Timer1
+        self._timer_base = 0        # Valor do contador no ciclo _timer_ciclo
+        self._timer_ciclo = 0
+        self._timer_ligado = False
+        self._timer_temp = 0        # Registrador temporário de 16 bits
+        self._tov_limpo_em = 0      # Ciclo em que o TOV1 foi limpo
+        self.sp = ram_fim
+
+    # --- Memória de dados e periféricos -------------------------------------------------------
+
+    @property
+    def sp(self):
+        return self.mem[SPL] | (self.mem[SPH] << 8)
+
+    @sp.setter
+    def sp(self, valor):
+        self.mem[SPL] = valor & 0xFF
+        self.mem[SPH] = (valor >> 8) & 0xFF
+
+    def _contador(self):
+        decorrido = self.ciclos - self._timer_ciclo if self._timer_ligado else 0
+        return self._timer_base + decorrido
+
+    def ler(self, endereco):
+        """
+        Lê um byte do espaço de dados (registradores, I/O e SRAM)
+        """
+        if endereco < 32:
+            return self.r[endereco]
+        if endereco == SREG:
+            return (self.C | self.Z << 1 | self.N << 2 | self.V << 3 | self.S << 4 | self.H << 5
+                    | self.T << 6 | self.I << 7)
+        if endereco in self.uarts_status:
+            return 0x20 | (0x80 if self._recebido() else 0)  # UDRE sempre livre, RXC se houver entrada
+        if endereco in self.uarts_dados:
+            return self.entrada.popleft()[1] if self._recebido() else 0
+        if endereco == TCNT1L:
+            valor = self._contador()
+            self._timer_temp = (valor >> 8) & 0xFF
+            return valor & 0xFF
+        if endereco == TCNT1H:
+            return self._timer_temp
+        if endereco == TIFR1:
+            estouro = self._timer_ligado and self._contador() > 0xFFFF and self._tov_limpo_em <= self.ciclos
+            return self.mem[TIFR1] | (1 if estouro else 0)
+        if endereco > self.ram_fim:
+            raise ErroSimulacao(f"leitura fora da memória: 0x{endereco:04X}")
+        return self.mem[endereco]
+
+    def escrever(self, endereco, valor):
+        """
+        Escreve um byte no espaço de dados
+        """
+        valor &= 0xFF
+        if endereco < 32:
+            self.r[endereco] = valor
+            return
+        if endereco == SREG:
+            self.C, self.Z, self.N, self.V = valor & 1, valor >> 1 & 1, valor >> 2 & 1, valor >> 3 & 1
+            self.S, self.H, self.T, self.I = valor >> 4 & 1, valor >> 5 & 1, valor >> 6 & 1, valor >> 7 & 1
+            return
+        if endereco in self.uarts_dados:
+            self.saida_uart.append(valor)
+            self.ciclos_uart.append(self.ciclos)
+            return
+        if endereco == TCCR1B:
+            self._timer_base = self._contador() & 0xFFFF
+            self._timer_ciclo = self.ciclos
+            self._timer_ligado = (valor & 0x07) == 1
+        if endereco == TCNT1H:
+            self._timer_temp = valor
+            return
+        if endereco == TCNT1L:
+            self._timer_base = (self._timer_temp << 8) | valor
+            self._timer_ciclo = self.ciclos + 1  # A escrita vale a partir do próximo ciclo
+            return
+        if endereco == TIFR1:
+            if valor & 1:
+                self._timer_base = self._contador() & 0xFFFF
+                self._timer_ciclo = self.ciclos
+            return
+        if endereco > self.ram_fim:
+            raise ErroSimulacao(f"escrita fora da memória: 0x{endereco:04X}")
+        self.mem[endereco] = valor
+
+    def _recebido(self):
+        """
+        Indica se há um byte da UART já recebido (que chegou até o ciclo atual)
+        """
+        return bool(self.entrada) and self.entrada[0][0] <= self.ciclos
+
+    def receber(self, dados, ciclos_por_byte=0):
+        """
+        Coloca bytes na entrada da UART
+
+        Args:
+            dados (bytes): Bytes enviados pelo host
+            ciclos_por_byte (int): Intervalo entre as chegadas (0: chegam todos de uma vez);
+                a 115200 baud e 16 MHz, um byte (10 bits) leva 1389 ciclos
+        """
+        chegada = max(self.ciclos, self.entrada[-1][0] if self.entrada else 0)
+        for byte in dados:
+            chegada += ciclos_por_byte
+            self.entrada.append((chegada, byte))
+
+    def empilhar(self, valor):
+        sp = self.sp
+        self.mem[sp] = valor & 0xFF
+        self.sp = sp - 1
+
+    def desempilhar(self):
+        sp = self.sp + 1
+        self.sp = sp
+        return self.mem[sp]
+
+    def _empilhar_pc(self, endereco):
+        self.empilhar(endereco & 0xFF)
+        self.empilhar((endereco >> 8) & 0xFF)
+        if self.pc_22bits:
+            self.empilhar((endereco >> 16) & 0xFF)
+
+    def _desempilhar_pc(self):
+        endereco = 0
+        if self.pc_22bits:
+            endereco = self.desempilhar() << 16
+        endereco |= self.desempilhar() << 8
+        return endereco | self.desempilhar()
+
+    # --- Execução -----------------------------------------------------------------------------
+
+    def passo(self):
+        """
+        Executa uma instrução
+        """
+        instrucao = self.programa.instrucoes.get(self.pc)
+        if instrucao is None:
+            raise ErroSimulacao(f"sem instrução no endereço 0x{self.pc * 2:04X}")
+        mnemonico, operandos, _ = instrucao
+        self.ciclos += EXECUTORES[mnemonico](self, operandos)
+        if self.I and self._recebido():
+            self._interromper_rx()
+
+    def _interromper_rx(self):
+        """
+        Desvia para o vetor de recepção da primeira UART com a interrupção habilitada
+        """
+        for controle, vetor in self.vetores_rx:
+            if self.mem[controle] & 0x80:  # RXCIEn
+                self._empilhar_pc(self.pc)
+                self.pc = vetor
+                self.I = 0
+                self.ciclos += 5 if self.pc_22bits else 4
+                return
+
+    def executar_ate(self, condicao, max_ciclos=50_000_000):
+        """
+        Executa até que a condição seja verdadeira (ex.: bytes suficientes em saida_uart)
+
+        Args:
+            condicao (callable): Função sem argumentos verificada após cada instrução
+            max_ciclos (int): Limite de ciclos a partir do ciclo atual
+
+        Returns:
+            int: Ciclos executados
+        """
+        inicio = self.ciclos
+        while not condicao():
+            self.passo()
+            if self.ciclos - inicio > max_ciclos:
+                raise ErroSimulacao(f"limite de {max_ciclos} ciclos atingido (PC 0x{self.pc * 2:04X})")
+        return self.ciclos - inicio
+
+    def executar(self, max_ciclos=50_000_000):
+        """
+        Executa até o laço final (RJMP para si mesmo) ou até o limite de ciclos
+
+        Returns:
+            int: Ciclos executados
+        """
+        while not self.parado:
+            self.passo()
+            if self.ciclos > max_ciclos:
+                raise ErroSimulacao(f"limite de {max_ciclos} ciclos atingido (PC 0x{self.pc * 2:04X})")
+        return self.ciclos
+
+    def chamar(self, rotina, registradores=None, max_ciclos=1_000_000):
+        """
+        Chama uma rotina diretamente e executa até o RET correspondente
+
+        Args:
+            rotina (str): Rótulo da rotina
+            registradores (dict): Valores iniciais {número: valor}
+            max_ciclos (int): Limite de ciclos
+
+        Returns:
+            int: Ciclos gastos pela rotina (incluindo RCALL e RET)
+        """
+        for numero, valor in (registradores or {}).items():
+            self.r[numero] = valor & 0xFF
+        sentinela = 0x3FFFFF if self.pc_22bits else 0xFFFF
+        self._empilhar_pc(sentinela)
+        self.pc = self.programa.endereco(rotina)
+        inicio = self.ciclos
+        self.ciclos += 3  # RCALL
+        while self.pc != sentinela:
+            self.passo()
+            if self.ciclos - inicio > max_ciclos:
+                raise ErroSimulacao(f"rotina {rotina} excedeu {max_ciclos} ciclos")
+        return self.ciclos - inicio
+
+    def _pular(self):
+        """
+        Pula a próxima instrução (1 ou 2 palavras); retorna os ciclos extras
+        """
+        proxima = self.programa.instrucoes.get(self.pc + 1)
+        tamanho = 2 if proxima and proxima[0] in INSTRUCOES_LONGAS else 1
+        self.pc += 1 + tamanho
+        return tamanho + 1
+
+# --- Semântica das instruções ------------------------------------------------------------------
+# Cada executor recebe (simulador, operandos), atualiza o PC e retorna os ciclos gastos.
+
+def _flags_logica(s, r):
+    s.V = 0
+    s.N = r >> 7
+    s.S = s.N
+    s.Z = int(r == 0)
+
+def _somar(s, a, b, c):
+    r = (a + b + c) & 0xFF
+    s.H = int((a & 0xF) + (b & 0xF) + c > 0xF)
+    s.C = int(a + b + c > 0xFF)
+    s.V = int(((a ^ r) & (b ^ r) & 0x80) != 0)
+    s.N = r >> 7
+    s.S = s.N ^ s.V
+    s.Z = int(r == 0)
+    return r
+
+def _subtrair(s, a, b, c, manter_z=False):
+    r = (a - b - c) & 0xFF
+    s.H = int((a & 0xF) - (b & 0xF) - c < 0)
+    s.C = int(a - b - c < 0)
+    s.V = int(((a ^ b) & (a ^ r) & 0x80) != 0)
+    s.N = r >> 7
+    s.S = s.N ^ s.V
+    s.Z = (s.Z & int(r == 0)) if manter_z else int(r == 0)
+    return r
+
+def _reg2(funcao):
+    """Instrução com dois registradores (Rd, Rr)"""
+    def executor(s, o):
+        resultado = funcao(s, s.r[o[0]], s.r[o[1]])
+        if resultado is not None:
+            s.r[o[0]] = resultado
+        s.pc += 1
+        return 1
+    return executor
+
+def _reg_imediato(funcao):
+    """Instrução com registrador e constante (Rd, K)"""
+    def executor(s, o):
+        resultado = funcao(s, s.r[o[0]], o[1] & 0xFF)
+        if resultado is not None:
+            s.r[o[0]] = resultado
+        s.pc += 1
+        return 1
+    return executor
+
+def _reg1(funcao):
+    """Instrução com um registrador (Rd)"""
+    def executor(s, o):
+        resultado = funcao(s, s.r[o[0]])
+        if resultado is not None:
+            s.r[o[0]] = resultado
+        s.pc += 1
+        return 1
+    return executor
+
+def _e(s, a, b):
+    r = a & b
+    _flags_logica(s, r)
+    return r
+
+def _ou(s, a, b):
+    r = a | b
+    _flags_logica(s, r)
+    return r
+
+def _xou(s, a, b):
+    r = a ^ b
+    _flags_logica(s, r)
+    return r
+
+def _com(s, a):
+    r = ~a & 0xFF
+    _flags_logica(s, r)
+    s.C = 1
+    return r
+
+def _neg(s, a):
+    r = (-a) & 0xFF
+    s.H = ((r >> 3) | (a >> 3)) & 1
+    s.C = int(r != 0)
+    s.V = int(r == 0x80)
+    s.N = r >> 7
+    s.S = s.N ^ s.V
+    s.Z = int(r == 0)
+    return r
+
+def _inc(s, a):
+    r = (a + 1) & 0xFF
+    s.V = int(r == 0x80)
+    s.N = r >> 7
+    s.S = s.N ^ s.V
+    s.Z = int(r == 0)
+    return r
+
+def _dec(s, a):
+    r = (a - 1) & 0xFF
+    s.V = int(r == 0x7F)
+    s.N = r >> 7
+    s.S = s.N ^ s.V
+    s.Z = int(r == 0)
+    return r
+
+def _deslocamento(s, r, carry):
+    s.C = carry
+    s.N = r >> 7
+    s.V = s.N ^ s.C
+    s.S = s.N ^ s.V
+    s.Z = int(r == 0)
+    return r
+
+def _lsr(s, a):
+    return _deslocamento(s, a >> 1, a & 1)
+
+def _ror(s, a):
+    return _deslocamento(s, (a >> 1) | (s.C << 7), a & 1)
+
+def _asr(s, a):
+    return _deslocamento(s, (a >> 1) | (a & 0x80), a & 1)
+
+def _tst(s, a):
+    _flags_logica(s, a)
+
+def _mul(modo):
+    def executor(s, o):
+        a, b = s.r[o[0]], s.r[o[1]]
+        if modo in ('s', 'su') and a & 0x80: a -= 256
+        if modo == 's' and b & 0x80: b -= 256
+        r = (a * b) & 0xFFFF
+        s.r[0], s.r[1] = r & 0xFF, r >> 8
+        s.C = r >> 15
+        s.Z = int(r == 0)
+        s.pc += 1
+        return 2
+    return executor
+
+def _palavra(s, o, sinal):
+    d = o[0]
+    w = s.r[d] | (s.r[d + 1] << 8)
+    rh = s.r[d + 1]
+    r = (w + sinal * o[1]) & 0xFFFF
+    r15 = r >> 15
+    if sinal > 0:
+        s.V = int(not (rh >> 7) and r15)
+        s.C = int(not r15 and (rh >> 7))
+    else:
+        s.V = int((rh >> 7) and not r15)
+        s.C = int(r15 and not (rh >> 7))
+    s.N = r15
+    s.S = s.N ^ s.V
+    s.Z = int(r == 0)
+    s.r[d], s.r[d + 1] = r & 0xFF, r >> 8
+    s.pc += 1
+    return 2
+
+def _desvio(condicao):
+    def executor(s, o):
+        if condicao(s):
+            s.pc = o[0] >> 1
+            return 2
+        s.pc += 1
+        return 1
+    return executor
+
+def _rjmp(s, o):
+    destino = o[0] >> 1
+    if destino == s.pc:
+        s.parado = True  # Laço infinito final
+    s.pc = destino
+    return 2
+
+def _jmp(s, o):
+    destino = o[0] >> 1
+    if destino == s.pc:
+        s.parado = True
+    s.pc = destino
+    return 3
+
+def _chamada(tamanho, ciclos):
+    def executor(s, o):
+        destino = o[0] >> 1
+        if destino in s.atalhos:
+            s.pc += tamanho
+            return ciclos + 4  # Chamada ignorada: conta apenas CALL + RET
+        s._empilhar_pc(s.pc + tamanho)
+        s.pc = destino
+        return ciclos + (1 if s.pc_22bits else 0)
+    return executor
+
+def _icall(s, o):
+    s._empilhar_pc(s.pc + 1)
+    s.pc = s.r[30] | (s.r[31] << 8)
+    return 4 if s.pc_22bits else 3
+
+def _ijmp(s, o):
+    s.pc = s.r[30] | (s.r[31] << 8)
+    return 2
+
+def _ret(s, o):
+    s.pc = s._desempilhar_pc()
+    return 5 if s.pc_22bits else 4
+
+def _reti(s, o):
+    s.I = 1
+    return _ret(s, o)
+
+def _pular_se(condicao):
+    def executor(s, o):
+        if condicao(s, o):
+            return s._pular()
+        s.pc += 1
+        return 1
+    return executor
+
+def _endereco_ponteiro(s, ponteiro):
+    base, modo, deslocamento = ponteiro
+    valor = s.r[base] | (s.r[base + 1] << 8)
+    if modo == 2:
+        valor = (valor - 1) & 0xFFFF
+        s.r[base], s.r[base + 1] = valor & 0xFF, valor >> 8
+        return valor
+    if modo == 1:
+        novo = (valor + 1) & 0xFFFF
+        s.r[base], s.r[base + 1] = novo & 0xFF, novo >> 8
+    return valor + deslocamento
+
+def _ld(s, o):
+    s.r[o[0]] = s.ler(_endereco_ponteiro(s, o[1]))
+    s.pc += 1
+    return 2
+
+def _st(s, o):
+    s.escrever(_endereco_ponteiro(s, o[0]), s.r[o[1]])
+    s.pc += 1
+    return 2
+
+def _lpm(estendido):
+    def executor(s, o):
+        if not o:
+            o = (0, (30, 0, 0))
+        z = s.r[30] | (s.r[31] << 8)
+        if estendido:
+            z |= s.mem[RAMPZ] << 16
+        s.r[o[0]] = s.programa.flash[z] if z < len(s.programa.flash) else 0xFF
+        if o[1][1] == 1:
+            z += 1
+            s.r[30], s.r[31] = z & 0xFF, (z >> 8) & 0xFF
+            if estendido:
+                s.mem[RAMPZ] = (z >> 16) & 0xFF
+        s.pc += 1
+        return 3
+    return executor
+
+def _lds(s, o):
+    s.r[o[0]] = s.ler(o[1])
+    s.pc += 2
+    return 2
+
+def _sts(s, o):
+    s.escrever(o[0], s.r[o[1]])
+    s.pc += 2
+    return 2
+
+def _in(s, o):
+    s.r[o[0]] = s.ler(o[1] + 0x20)
+    s.pc += 1
+    return 1
+
+def _out(s, o):
+    s.escrever(o[0] + 0x20, s.r[o[1]])
+    s.pc += 1
+    return 1
+
+def _push(s, o):
+    s.empilhar(s.r[o[0]])
+    s.pc += 1
+    return 2
+
+def _pop(s, o):
+    s.r[o[0]] = s.desempilhar()
+    s.pc += 1
+    return 2
+
+def _movw(s, o):
+    s.r[o[0]], s.r[o[0] + 1] = s.r[o[1]], s.r[o[1] + 1]
+    s.pc += 1
+    return 1
+
+def _flag(nome, valor):
+    def executor(s, o):
+        setattr(s, nome, valor)
+        s.pc += 1
+        return 1
+    return executor
+
+def _bst(s, o):
+    s.T = (s.r[o[0]] >> o[1]) & 1
+    s.pc += 1
+    return 1
+
+def _bld(s, o):
+    s.r[o[0]] = (s.r[o[0]] & ~(1 << o[1]) & 0xFF) | (s.T << o[1])
+    s.pc += 1
+    return 1
+
+def _sbi_cbi(ligar):
+    def executor(s, o):
+        valor = s.ler(o[0] + 0x20)
+        valor = valor | (1 << o[1]) if ligar else valor & ~(1 << o[1])
+        s.escrever(o[0] + 0x20, valor)
+        s.pc += 1
+        return 2
+    return executor
+
+def _nop(s, o):
+    s.pc += 1
+    return 1
+
+def _ldi(s, o):
+    s.r[o[0]] = o[1] & 0xFF
+    s.pc += 1
+    return 1
+
+def _mov(s, o):
+    s.r[o[0]] = s.r[o[1]]
+    s.pc += 1
+    return 1
+
+def _swap(s, o):
+    a = s.r[o[0]]
+    s.r[o[0]] = ((a << 4) | (a >> 4)) & 0xFF
+    s.pc += 1
+    return 1
+
+def _clr(s, o):
+    s.r[o[0]] = 0
+    _flags_logica(s, 0)
+    s.pc += 1
+    return 1
+
+def _ser(s, o):
+    s.r[o[0]] = 0xFF
+    s.pc += 1
+    return 1
+
+def _cp_cpc_cpi(com_carry, imediato):
+    def executor(s, o):
+        b = o[1] & 0xFF if imediato else s.r[o[1]]
+        _subtrair(s, s.r[o[0]], b, s.C if com_carry else 0, manter_z=com_carry)
+        s.pc += 1
+        return 1
+    return executor
+
+EXECUTORES = {
+    'ADD': _reg2(lambda s, a, b: _somar(s, a, b, 0)),
+    'ADC': _reg2(lambda s, a, b: _somar(s, a, b, s.C)),
+    'SUB': _reg2(lambda s, a, b: _subtrair(s, a, b, 0)),
+    'SBC': _reg2(lambda s, a, b: _subtrair(s, a, b, s.C, manter_z=True)),
+    'SUBI': _reg_imediato(lambda s, a, k: _subtrair(s, a, k, 0)),
+    'SBCI': _reg_imediato(lambda s, a, k: _subtrair(s, a, k, s.C, manter_z=True)),
+    'AND': _reg2(_e),
+    'ANDI': _reg_imediato(_e),
+    'CBR': _reg_imediato(lambda s, a, k: _e(s, a, ~k & 0xFF)),
+    'OR': _reg2(_ou),
+    'ORI': _reg_imediato(_ou),
+    'SBR': _reg_imediato(_ou),
+    'EOR': _reg2(_xou),
+    'COM': _reg1(_com),
+    'NEG': _reg1(_neg),
+    'INC': _reg1(_inc),
+    'DEC': _reg1(_dec),
+    'TST': _reg1(_tst),
+    'CLR': _clr,
+    'SER': _ser,
+    'LSL': _reg1(lambda s, a: _somar(s, a, a, 0)),
+    'ROL': _reg1(lambda s, a: _somar(s, a, a, s.C)),
+    'LSR': _reg1(_lsr),
+    'ROR': _reg1(_ror),
+    'ASR': _reg1(_asr),
+    'SWAP': _swap,
+    'MOV': _mov,
+    'MOVW': _movw,
+    'LDI': _ldi,
+    'CP': _cp_cpc_cpi(False, False),
+    'CPC': _cp_cpc_cpi(True, False),
+    'CPI': _cp_cpc_cpi(False, True),
+    'CPSE': _pular_se(lambda s, o: s.r[o[0]] == s.r[o[1]]),
+    'SBRC': _pular_se(lambda s, o: not (s.r[o[0]] >> o[1]) & 1),
+    'SBRS': _pular_se(lambda s, o: (s.r[o[0]] >> o[1]) & 1),
+    'SBIC': _pular_se(lambda s, o: not (s.ler(o[0] + 0x20) >> o[1]) & 1),
+    'SBIS': _pular_se(lambda s, o: (s.ler(o[0] + 0x20) >> o[1]) & 1),
+    'MUL': _mul('u'),
+    'MULS': _mul('s'),
+    'MULSU': _mul('su'),
+    'ADIW': lambda s, o: _palavra(s, o, 1),
+    'SBIW': lambda s, o: _palavra(s, o, -1),
+    'RJMP': _rjmp,
+    'JMP': _jmp,
+    'IJMP': _ijmp,
+    'RCALL': _chamada(1, 3),
+    'CALL': _chamada(2, 4),
+    'ICALL': _icall,
+    'RET': _ret,
+    'RETI': _reti,
+    'BREQ': _desvio(lambda s: s.Z),
+    'BRNE': _desvio(lambda s: not s.Z),
+    'BRCS': _desvio(lambda s: s.C),
+    'BRLO': _desvio(lambda s: s.C),
+    'BRCC': _desvio(lambda s: not s.C),
+    'BRSH': _desvio(lambda s: not s.C),
+    'BRMI': _desvio(lambda s: s.N),
+    'BRPL': _desvio(lambda s: not s.N),
+    'BRGE': _desvio(lambda s: not s.S),
+    'BRLT': _desvio(lambda s: s.S),
+    'BRVS': _desvio(lambda s: s.V),
+    'BRVC': _desvio(lambda s: not s.V),
+    'BRTS': _desvio(lambda s: s.T),
+    'BRTC': _desvio(lambda s: not s.T),
+    'BRHS': _desvio(lambda s: s.H),
+    'BRHC': _desvio(lambda s: not s.H),
+    'LD': _ld,
+    'LDD': _ld,
+    'ST': _st,
+    'STD': _st,
+    'LPM': _lpm(False),
+    'ELPM': _lpm(True),
+    'LDS': _lds,
+    'STS': _sts,
+    'IN': _in,
+    'OUT': _out,
+    'PUSH': _push,
+    'POP': _pop,
+    'SEC': _flag('C', 1),
+    'CLC': _flag('C', 0),
+    'SEZ': _flag('Z', 1),
+    'CLZ': _flag('Z', 0),
+    'SET': _flag('T', 1),
+    'CLT': _flag('T', 0),
+    'SEI': _flag('I', 1),
+    'CLI': _flag('I', 0),
+    'BST': _bst,
+    'BLD': _bld,
+    'SBI': _sbi_cbi(True),
+    'CBI': _sbi_cbi(False),
+    'NOP': _nop,
+}
+
+def simular(texto, atalhos=('delay_ms',), max_ciclos=50_000_000, **opcoes):
+    """
+    Monta e executa um programa completo
+
+    Args:
+        texto (str): Código Assembly
+        atalhos (iterable): Rótulos cujas chamadas são ignoradas (padrão: delay_ms)
+        max_ciclos (int): Limite de ciclos
+        **opcoes: Demais argumentos de Simulador
+
+    Returns:
+        Simulador: Simulador após a execução (saida_uart, ciclos, ...)
+    """
+    simulador = Simulador(montar(texto), atalhos=atalhos, **opcoes)
+    simulador.executar(max_ciclos)
+    return simulador
+
+def main():
+    """
+    Função principal: executa um arquivo .asm e mostra a saída da UART
+    """
+    parser = argparse.ArgumentParser(description="Simulador do ATmega328P para o Assembly da calculadora")
+    parser.add_argument('arquivo', help="arquivo .asm")
+    parser.add_argument('--sem-delay', action='store_true', help="ignora as chamadas a delay_ms")
+    parser.add_argument('--max-ciclos', type=int, default=500_000_000, help="limite de ciclos")
+    parser.add_argument('--mcu', default='atmega328p', choices=list(MICROCONTROLADORES),
+                        help="microcontrolador simulado (padrão: atmega328p)")
+    args = parser.parse_args()
+    with open(args.arquivo, 'r') as arquivo:
+        texto = arquivo.read()
+    try:
+        simulador = simular(texto, ('delay_ms',) if args.sem_delay else (), args.max_ciclos,
+                            **MICROCONTROLADORES[args.mcu])
+    except (ErroMontagem, ErroSimulacao) as erro:
+        print(f"Erro: {erro}")
+        sys.exit(1)
+    print(simulador.saida_uart.decode('latin-1'), end='')
+    print(f"\n[{simulador.ciclos} ciclos, {simulador.programa.tamanho} bytes de programa]")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Configuração dos testes: os módulos do projeto ficam na raiz do repositório
+"""
+import os   # Para o caminho da raiz do repositório
+import sys  # Para incluir a raiz no caminho de importação
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
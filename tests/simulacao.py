@@ -0,0 +1,126 @@
+"""
+Execução dos programas gerados no simulador, para os testes diferenciais
+
+Os resultados impressos pela calculadora são textos calculados no host; para
+conferir o que o Arduino calcula, o rastro guarda R19:R18 e R17:R16 no início
+do envio de cada resultado (resultado da linha em R17:R16) e na entrada das
+rotinas half-precision (operandos).
+
+Os testes que sorteiam as linhas rodam em cada microcontrolador com algumas
+sementes fixas (por_alvo_e_semente), e as operações sorteadas são filtradas
+pela redução que o gerador escolhe para elas (sortear_operacoes).
+"""
+import io # Para capturar o Assembly gerado
+import random # Para sortear as linhas
+from decimal import Decimal # Para escrever cada half-precision exatamente
+
+import pytest
+
+import rpn_final
+from simulador_avr import montar, Simulador, MICROCONTROLADORES
+
+MARCA_RESULTADO = "\n    ; Enviar resultado\n"
+ROTINAS_HALF = {nome for nome in rpn_final.ROTINAS if nome.startswith('half_')}
+ALVOS = list(rpn_final.ALVOS)
+FUNCOES_HALF = {'+': rpn_final.add_half_precision, '-': rpn_final.sub_half_precision,
+                '*': rpn_final.mul_half_precision, '|': rpn_final.div_half_precision,
+                '^': rpn_final.power_half_precision}
+
+def por_alvo_e_semente(*sementes):
+    """
+    Parametriza um teste com cada microcontrolador (mcu) e cada semente do sorteio (semente)
+    """
+    def parametrizar(teste):
+        return pytest.mark.parametrize('mcu', ALVOS)(pytest.mark.parametrize('semente', sementes)(teste))
+    return parametrizar
+
+def texto_half(h):
+    """
+    Texto decimal exato de um half-precision (sem notação científica)
+    """
+    return format(Decimal(rpn_final.half_ieee754_to_float(h)), 'f')
+
+def reducao(operador, a, b):
+    """
+    Redução escolhida pelo gerador para uma operação half-precision
+
+    Returns:
+        tuple: (nome da redução, ou None para a rotina, e resultado em half-precision)
+    """
+    resultado = FUNCOES_HALF[operador](a, b)
+    escolhida = rpn_final.otimizar_operacao_half(operador, rpn_final.half_ieee754_to_float(a),
+                                                 rpn_final.half_ieee754_to_float(b), a, b, resultado)
+    return escolhida and escolhida[0], resultado
+
+def sortear_operacoes(semente, quantidade, sortear_operacao, reducoes):
+    """
+    Linhas (a b op) sorteadas cuja redução está entre as pedidas
+
+    Args:
+        semente (int): Semente do sorteio
+        quantidade (int): Número de linhas
+        sortear_operacao (callable): Recebe o random.Random e devolve (operador, a, b), em half-precision
+        reducoes (set): Reduções aceitas
+
+    Returns:
+        list: (linha, redução, resultado em half-precision esperado em R17:R16)
+    """
+    sorteio = random.Random(semente)
+    linhas = []
+    while len(linhas) < quantidade:
+        operador, a, b = sortear_operacao(sorteio)
+        nome, resultado = reducao(operador, a, b)
+        if nome in reducoes: linhas.append((f"({texto_half(a)} {texto_half(b)} {operador})", nome, resultado))
+    return linhas
+
+def gerar(linhas, **opcoes):
+    """
+    Gera o programa de uma lista de linhas
+
+    Returns:
+        tuple: (Assembly, resultados, mensagens de erro)
+    """
+    saida = io.StringIO()
+    calculadora = rpn_final.Calculadora(**opcoes)
+    resultados = calculadora.generate(linhas, saida)
+    return saida.getvalue(), resultados, calculadora.erros
+
+def executar(asm, mcu='atmega328p', max_ciclos=20_000_000, sram=None):
+    """
+    Executa o programa com a SRAM cheia de lixo (0x5A)
+
+    Args:
+        asm (str): Programa gerado
+        mcu (str): Microcontrolador simulado
+        max_ciclos (int): Limite de ciclos
+        sram (list): Recebe uma cópia da SRAM em cada envio de resultado (None: não copia)
+
+    Returns:
+        tuple: (texto enviado depois do cabeçalho, rastro), com o rastro como
+               lista de (ponto, (R16, R17, R18, R19)); o ponto é 'resultado' ou
+               o nome da rotina half-precision chamada
+    """
+    partes = asm.split(MARCA_RESULTADO)
+    marcado = ''.join(f"{parte}\nrastro_resultado_{i}:{MARCA_RESULTADO}" for i, parte in enumerate(partes[:-1]))
+    programa = montar(marcado + partes[-1])
+    pontos = {endereco >> 1: 'resultado' if rotulo.startswith('rastro_resultado_') else rotulo
+              for rotulo, endereco in programa.simbolos.items()
+              if rotulo.startswith('rastro_resultado_') or rotulo in ROTINAS_HALF}
+    simulador = Simulador(programa, atalhos=('delay_ms',), **MICROCONTROLADORES[mcu])
+    for endereco in range(rpn_final.ALVOS[mcu]['ram_inicio'], rpn_final.ALVOS[mcu]['ram_fim'] - 300):
+        simulador.mem[endereco] = 0x5A
+    rastro = []
+    while not simulador.parado:
+        simulador.passo()
+        if simulador.pc in pontos:
+            rastro.append((pontos[simulador.pc], tuple(simulador.r[16:20])))
+            if sram is not None and pontos[simulador.pc] == 'resultado': sram.append(bytes(simulador.mem))
+        if simulador.ciclos > max_ciclos: raise AssertionError(f"limite de {max_ciclos} ciclos atingido")
+    texto = simulador.saida_uart.decode('latin-1').split('\r\n\r\n', 1)[1]
+    return texto, rastro
+
+def resultados_no_arduino(rastro):
+    """
+    Valor de 16 bits em R17:R16 no envio de cada resultado
+    """
+    return [r16 | (r17 << 8) for ponto, (r16, r17, _, _) in rastro if ponto == 'resultado']
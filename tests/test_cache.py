@@ -0,0 +1,35 @@
+"""
+Testes do cache de fragmentos (--cache)
+"""
+import io # Para gerar o Assembly em memória
+
+import rpn_final
+
+EXPRESSOES = ['(2 3 +)', '(1.5 RES *)', '(1 RES)']
+
+def gerar(cache, alvo='atmega328p'):
+    saida = io.StringIO()
+    rpn_final.Calculadora(cache=cache, alvo=alvo).generate(EXPRESSOES, saida)
+    return saida.getvalue()
+
+def test_fragmentos_reaproveitados(tmp_path):
+    cache = rpn_final.CacheFragmentos(str(tmp_path))
+    try:
+        primeiro = gerar(cache)
+        assert (cache.acertos, cache.falhas) == (0, 3)
+        assert gerar(cache) == primeiro
+        assert cache.acertos == 3
+        # Sem cache, o programa é o mesmo
+        assert gerar(None) == primeiro
+    finally:
+        cache.fechar()
+
+def test_chave_inclui_o_alvo(tmp_path):
+    cache = rpn_final.CacheFragmentos(str(tmp_path))
+    try:
+        gerar(cache, 'atmega328p')
+        acertos = cache.acertos
+        assert gerar(cache, 'atmega2560') == gerar(None, 'atmega2560')
+        assert cache.acertos == acertos
+    finally:
+        cache.fechar()
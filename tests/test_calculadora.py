@@ -0,0 +1,45 @@
+"""
+Testes da sessão de avaliação (Calculadora)
+"""
+import pytest
+
+import rpn_final
+import servidor_rpn
+
+@pytest.mark.parametrize('expressao', ['(1 0 /)', '(1 0.25 /)', '(7 -0.5 /)', '((1 0 |) 2 /)', '(2 (1 0 |) /)',
+                                       '((0 0 |) 2 /)'])
+def test_divisao_inteira_invalida_vai_para_erros(expressao):
+    calculadora = rpn_final.Calculadora()
+    assert calculadora.evaluate(expressao) is None
+    assert calculadora.erros[-1] == f"Erro ao processar a expressão {expressao}"
+    # A sessão continua utilizável depois do erro
+    assert calculadora.evaluate('(7 2 /)') == 3.0
+
+def test_erros_na_leitura_por_mmap(tmp_path):
+    arquivo = tmp_path / 'expressoes.txt'
+    arquivo.write_text('(1 0.25 /)\n(9 2 /)\n')
+    calculadora = rpn_final.Calculadora()
+    assert list(calculadora.evaluate_file(str(arquivo))) == [None, 4.0]
+    assert any('divisor truncado' in mensagem for mensagem in calculadora.erros)
+
+MALFORMADAS = ['(1.2.3 1 +)', '((1 2 +)', '(1 2 +', '. 1 +']
+
+@pytest.mark.parametrize('expressao', MALFORMADAS)
+def test_expressao_malformada_vai_para_erros(expressao):
+    calculadora = rpn_final.Calculadora()
+    assert calculadora.evaluate(expressao) is None
+    assert calculadora.erros[-1] == f"Erro ao processar a expressão {expressao}"
+    assert calculadora.evaluate('(1 2 +)') == 3.0
+
+def test_expressoes_malformadas_em_lote(tmp_path):
+    linhas = MALFORMADAS + ['(1 2 +)']
+    esperado = [None] * len(MALFORMADAS) + [3.0]
+    assert rpn_final.Calculadora().evaluate_many(linhas) == esperado
+    arquivo = tmp_path / 'expressoes.txt'
+    arquivo.write_text('\n'.join(linhas) + '\n')
+    assert list(rpn_final.Calculadora().evaluate_file(str(arquivo))) == esperado
+    # Um lote do servidor com linhas malformadas ainda responde as demais
+    for gerar_asm in (False, True):
+        resposta = servidor_rpn.avaliar_lote(linhas, gerar_asm=gerar_asm)
+        assert resposta['resultados'] == [[valor] for valor in esperado]
+        assert len([m for m in resposta['mensagens'] if m.startswith('Erro ao processar')]) == len(MALFORMADAS)
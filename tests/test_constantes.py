@@ -0,0 +1,71 @@
+"""
+Testes das constantes em registradores (--constantes) e da troca de RCALL por CALL no simulador
+"""
+import re # Para contar as cargas com MOVW
+
+import pytest
+
+import rpn_final
+from simulador_avr import montar
+from simulacao import gerar, executar
+
+def sessao(quantidade):
+    """
+    Linhas que repetem poucos valores (candidatos a constantes)
+    """
+    return [f"({i % 4 + 1.5} {i % 3 * 1.25 + 0.5} {'+*|'[i % 3]})" for i in range(quantidade)]
+
+def movw(asm):
+    return len(re.findall(r'MOVW R1[6-9], R([68]|1[024])\b', asm))
+
+@pytest.mark.parametrize('opcoes, linhas', [
+    ({}, sessao(30)),
+    ({'alvo': 'atmega2560'}, sessao(30)),
+    ({'numerico': 'q8.8'}, [f"({i % 5 + 0.5} {i % 3 + 1.25} {'+*'[i % 2]})" for i in range(30)]),
+    ({'numerico': 'q16.16'}, [f"({i % 5 + 100.5} {i % 3 + 1.25} {'+*'[i % 2]})" for i in range(30)]),
+    ({'historico': True}, sessao(20) + ['(3 RES)', '(RES 2.75 +)', '(x 2.75 *) para x = 1..6', '(150 MEM)', '(MEM 2.75 *)']),
+])
+def test_mesmos_registradores_com_e_sem_constantes(opcoes, linhas):
+    mcu = opcoes.get('alvo', 'atmega328p')
+    asm, resultados, erros = gerar(linhas, **opcoes)
+    asm_constantes, resultados_constantes, erros_constantes = gerar(linhas, constantes=True, **opcoes)
+    assert movw(asm) == 0 and movw(asm_constantes) > 0
+    assert (resultados, erros) == (resultados_constantes, erros_constantes)
+    # Mesmo texto e os mesmos operandos/resultados em cada ponto do rastro
+    assert executar(asm, mcu) == executar(asm_constantes, mcu)
+
+def alcance_relativo(programa):
+    """
+    Indica se todo RCALL/RJMP alcança o destino (±2K palavras)
+    """
+    return all(-2048 <= (operandos[0] >> 1) - (pc + 1) <= 2047
+               for pc, (mnemonico, operandos, _) in programa.instrucoes.items() if mnemonico in ('RCALL', 'RJMP'))
+
+def no_limite_do_rcall():
+    """
+    Primeira sessão que usa CALL sem --constantes e volta a caber no alcance do RCALL com elas
+    """
+    for quantidade in range(30, 60):
+        for extra in ('(1 2 +)', '(1.5)', '(2.5 2)'):
+            linhas = sessao(quantidade) + [extra]
+            asm, asm_constantes = gerar(linhas)[0], gerar(linhas, constantes=True)[0]
+            if 'RCALL' not in asm and 'RCALL' in asm_constantes:
+                return linhas, asm, asm_constantes
+    raise AssertionError("nenhuma sessão no limite do alcance do RCALL")
+
+def test_troca_de_rcall_por_call_no_limite():
+    linhas, asm, asm_constantes = no_limite_do_rcall()
+    assert alcance_relativo(montar(asm)) and alcance_relativo(montar(asm_constantes))
+    texto = executar(asm)[0]
+    assert texto == executar(asm_constantes)[0]
+    assert texto == executar(gerar(linhas, alvo='atmega2560')[0], 'atmega2560')[0]
+
+def test_programa_maior_que_o_alcance_do_rcall():
+    linhas = sessao(90)
+    asm = gerar(linhas)[0]
+    programa = montar(asm)
+    assert programa.tamanho > 2 * rpn_final.ALCANCE_RCALL
+    assert alcance_relativo(programa)
+    # Sem a troca por CALL, as rotinas do fim ficariam fora do alcance
+    assert not alcance_relativo(montar(re.sub(r'^(\s*)CALL\b', r'\1RCALL', asm, flags=re.MULTILINE)))
+    assert executar(asm)[0] == executar(gerar(linhas, alvo='atmega2560')[0], 'atmega2560')[0]
@@ -0,0 +1,93 @@
+"""
+Testes da multiplicação e soma fundidas (--fma): referência exata e saída padrão
+"""
+import io     # Para capturar o Assembly gerado
+import random # Para sortear os operandos
+from fractions import Fraction # Para a conta exata da referência
+
+import pytest
+
+import rpn_final
+from simulador_avr import montar, Simulador
+
+MAIOR_FINITO = 65504
+
+def arredondar_half(valor):
+    """
+    Arredonda um valor exato para half-precision (mais próximo, empates longe do zero)
+    """
+    if valor == 0: return 0x0000
+    sinal, valor = (0x8000, -valor) if valor < 0 else (0, valor)
+    # Expoente do valor (limitado ao dos desnormalizados) e tamanho do último bit da mantissa
+    expoente = valor.numerator.bit_length() - valor.denominator.bit_length()
+    if Fraction(2) ** expoente > valor: expoente -= 1
+    unidade = Fraction(2) ** (max(expoente, -14) - 10)
+    arredondado = int(valor / unidade + Fraction(1, 2)) * unidade
+    if arredondado > MAIOR_FINITO: return sinal | 0x7C00
+    if arredondado == 0: return sinal
+    return sinal | rpn_final.float_to_half_ieee754(float(arredondado))
+
+def exato(h):
+    return Fraction(rpn_final.half_ieee754_to_float(h))
+
+def finito_aleatorio(sorteio):
+    while True:
+        h = sorteio.randrange(0x10000)
+        if (h >> 10) & 0x1F != 31: return h
+
+def trincas():
+    sorteio = random.Random(42)
+    casos = [tuple(finito_aleatorio(sorteio) for _ in range(3)) for _ in range(5000)]
+    # Cancelamento: c perto de -(a * b), onde o arredondamento único mais difere
+    for _ in range(2000):
+        a, b = finito_aleatorio(sorteio), finito_aleatorio(sorteio)
+        c = rpn_final.mul_half_precision(a, b) ^ 0x8000
+        casos.append((a, b, (c + sorteio.choice((-1, 0, 1))) & 0xFFFF))
+    # Desnormalizados, zeros com sinal e extremos
+    especiais = [0x0000, 0x8000, 0x0001, 0x8001, 0x03FF, 0x0400, 0x3C00, 0xBC00, 0x7BFF, 0xFBFF]
+    casos += [(a, b, c) for a in especiais for b in especiais for c in especiais]
+    return [caso for caso in casos if (caso[2] >> 10) & 0x1F != 31]
+
+def test_referencia_exata():
+    for a, b, c in trincas():
+        esperado = arredondar_half(exato(a) * exato(b) + exato(c))
+        assert rpn_final.fma_half_precision(a, b, c) == esperado, (hex(a), hex(b), hex(c))
+
+def test_rotina_half_fma_no_simulador():
+    texto = io.StringIO()
+    rpn_final.adicionar_cabecalho(texto)
+    rpn_final.ligar_rotinas(texto, ['half_fma', 'uart_envia_byte'])
+    simulador = Simulador(montar(texto.getvalue()))
+    for a, b, c in trincas()[::20]:
+        simulador.chamar('half_fma', {16: a, 17: a >> 8, 18: b, 19: b >> 8, 20: c, 21: c >> 8})
+        obtido = simulador.r[16] | (simulador.r[17] << 8)
+        assert obtido == rpn_final.fma_half_precision(a, b, c), (hex(a), hex(b), hex(c))
+
+# Fatores cujo produto é arredondado: fundido e separado dão resultados diferentes
+FATORES = [('1.0009765625', '1.0009765625', '-1'), ('3.0029296875', '1.3330078125', '-4'),
+           ('0.1', '0.3', '0.7'), ('2.5', '1.25', '3')]
+
+@pytest.mark.parametrize('a, b, c', FATORES)
+def test_padrao_sem_fusao(a, b, c):
+    linha = f"(({a} {b} *) {c} +)" if not c.startswith('-') else f"(({a} {b} *) {c[1:]} -)"
+    saida = io.StringIO()
+    resultados = rpn_final.Calculadora().generate([linha], saida)
+    assert 'half_fma' not in saida.getvalue()
+    ha, hb = (rpn_final.float_to_half_ieee754(float(x)) for x in (a, b))
+    produto = rpn_final.mul_half_precision(ha, hb)
+    hc = rpn_final.float_to_half_ieee754(float(c))
+    esperado = rpn_final.add_half_precision(produto, hc)
+    assert resultados == [rpn_final.half_ieee754_to_float(esperado)]
+
+@pytest.mark.parametrize('a, b, c', FATORES)
+def test_fusao_com_fma(a, b, c):
+    linha = f"(({a} {b} *) {c} +)" if not c.startswith('-') else f"(({a} {b} *) {c[1:]} -)"
+    saida = io.StringIO()
+    resultados = rpn_final.Calculadora(fma=True).generate([linha], saida)
+    assert 'RCALL half_fma' in saida.getvalue()
+    ha, hb, hc = (rpn_final.float_to_half_ieee754(float(x)) for x in (a, b, c))
+    assert resultados == [rpn_final.half_ieee754_to_float(rpn_final.fma_half_precision(ha, hb, hc))]
+
+def test_fma_so_no_formato_half():
+    with pytest.raises(ValueError):
+        rpn_final.Calculadora(numerico='q8.8', fma=True)
@@ -0,0 +1,97 @@
+"""
+Testes do histórico em SRAM (--historico): mesma saída do modo padrão
+"""
+import random # Para sortear as linhas
+
+import pytest
+
+import rpn_final
+from simulacao import gerar, executar, resultados_no_arduino, por_alvo_e_semente, ALVOS
+
+def comparar(linhas, mcu='atmega328p'):
+    """
+    Gera as linhas com e sem --historico e confere resultados, mensagens e saída no simulador
+    """
+    saidas = []
+    for historico in (False, True):
+        asm, resultados, erros = gerar(linhas, alvo=mcu, historico=historico)
+        saidas.append((repr(resultados), erros, executar(asm, mcu)[0]))
+    assert saidas[0] == saidas[1]
+    return saidas[1]
+
+# Resultados infinitos e NaN referenciados por (N RES) e RES, também nos laços
+NAO_FINITOS = [
+    ['(2 20 ^)', '(1 RES)', '(2 RES)', '(3 RES)'],
+    ['(2 20 ^)', '(RES 1 +)', '(2 3 RES +)', '((RES 2 *) x +) para x = 1..3', '(3 RES)'],
+    ['(300 300 *)', '(1 RES)', '(RES 2 +)', '(MEM)', '(2 RES)'],
+    ['(1.5 2 *)', '(2 20 ^)', '(1 RES)', '(3 RES)', '(RES 1 +)', '(x RES) para x = 1..3'],
+]
+
+@pytest.mark.parametrize('linhas', NAO_FINITOS)
+def test_referencia_nao_finita_segue_o_caminho_padrao(linhas):
+    resultados, erros, saida = comparar(linhas)
+    assert erros
+    # O valor infinito só aparece nas linhas que o calculam
+    assert saida.count('= inf') == sum(linha == '(2 20 ^)' for linha in linhas)
+
+def sortear_linhas(semente, quantidade=40):
+    """
+    Sessão com MEM, RES e (N RES) até N = maior, para encher e dar voltas no anel
+    """
+    sorteio = random.Random(semente)
+    maior = sorteio.choice([3, 8, 40])
+    linhas = [f"({sorteio.uniform(1, 20):.2f} {sorteio.randint(1, 9)} +)" for _ in range(3)]
+    modelos = [
+        lambda: f"({sorteio.uniform(1, 20):.2f} {sorteio.randint(1, 9)} {sorteio.choice('+*|')})",
+        lambda: f"({sorteio.randint(1, maior)} RES)",
+        lambda: f"(RES {sorteio.uniform(1, 3):.1f} {sorteio.choice('*+|')})",
+        lambda: f"({sorteio.randint(100, 200)} MEM)",
+        lambda: "(MEM RES)",
+        lambda: f"((MEM {sorteio.randint(2, 5)} *) RES +)",
+        lambda: f"((RES 2 *) x +) para x = 1..{sorteio.randint(2, 4)}",
+        lambda: f"(x RES) para x = 1..{sorteio.randint(2, 3)}",
+        lambda: "(MEM)",
+    ]
+    pesos = [25, 25, 10, 5, 5, 5, 5, 5, 5]
+    linhas += [sorteio.choices(modelos, pesos)[0]() for _ in range(quantidade)]
+    return linhas + [f"({maior} RES)"]
+
+@por_alvo_e_semente(1, 2, 3)
+def test_anel_igual_ao_modo_padrao(semente, mcu):
+    linhas = sortear_linhas(semente)
+    _, _, saida = comparar(linhas, mcu)
+    # Os (N RES) são impressos pelo Arduino a partir do anel
+    assert 'CALL uart_envia_half\n' in gerar(linhas, alvo=mcu, historico=True)[0]
+    # Dividido em imagens, cada uma começa com o estado em que a anterior terminou
+    imagens = rpn_final.Calculadora(alvo=mcu, historico=True).generate_imagens(linhas, 2500)
+    assert len(imagens) > 1
+    assert ''.join(executar(imagem['asm'], mcu)[0] for imagem in imagens) == saida
+
+def test_anel_sobrescrito():
+    # Anel de 2 posições: (2 RES) lê a posição mais antiga, logo antes de ser sobrescrita
+    linhas = ['(1.5 2 +)', '(2.25 4 *)', '(2 RES)', '(2 RES)', '(7.5 3 |)', '(2 RES)', '(1 RES)', '(RES 1 +)']
+    _, erros, saida = comparar(linhas)
+    assert not erros
+    assert saida.splitlines()[2:4] == ['(2 RES)= 3.5', '(2 RES)= 9']
+
+# Resultados calculados no Arduino (inteiros, expoente, identidade, half_fma) e um RES lido da SRAM,
+# todos lidos de novo por (6 RES): as escritas no anel ficam no programa
+CALCULADOS = ['(3 4 +)', '(1.5 4 *)', '(-6 3 ^)', '(2.5 1 *)', '((1.5 2.25 *) 0.5 +)', '(RES)']
+
+@pytest.mark.parametrize('mcu', ALVOS)
+def test_anel_guarda_o_registrador(mcu):
+    linhas = CALCULADOS + ['(6 RES)'] * len(CALCULADOS)
+    asm, resultados, erros = gerar(linhas, alvo=mcu, historico=True, fma=True)
+    assert not erros
+    sram = []
+    _, rastro = executar(asm, mcu, sram=sram)
+    registradores = resultados_no_arduino(rastro)
+    historico = rpn_final.HistoricoSram(linhas, mcu)
+    for j, valor in enumerate(resultados[:len(CALCULADOS)]):
+        assert f"guardar resultado {j}" in asm
+        # Guardado direto de R17:R16, sem carregar o valor do host
+        assert f"guardar resultado {j}\n    LDI R16" not in asm
+        endereco = historico.endereco(j)
+        # No envio da linha, o anel já tem o valor de R17:R16, o mesmo do host
+        assert sram[j][endereco] | (sram[j][endereco + 1] << 8) == registradores[j]
+        assert registradores[j] == rpn_final.float_to_half_ieee754(valor)
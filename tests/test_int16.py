@@ -0,0 +1,53 @@
+"""
+Testes das operações com inteiros nativos de 16 bits: resultado calculado no simulador
+"""
+import io # Para montar só a rotina de conversão
+
+import rpn_final
+from simulador_avr import montar, Simulador
+from simulacao import gerar, executar, resultados_no_arduino, por_alvo_e_semente, sortear_operacoes
+
+NATIVAS = {'int16_add', 'int16_subtract', 'int16_multiply'}
+
+def operacao_inteira(sorteio):
+    """
+    Operação com inteiros pequenos, exatos em half-precision
+    """
+    operador = sorteio.choice('+-*')
+    limite = 180 if operador == '*' else 2000
+    return operador, *(rpn_final.float_to_half_ieee754(sorteio.randint(-limite, limite)) for _ in range(2))
+
+@por_alvo_e_semente(1, 2)
+def test_operacoes_nativas_no_simulador(semente, mcu):
+    linhas = sortear_operacoes(semente, 40, operacao_inteira, NATIVAS)
+    asm, resultados, erros = gerar([linha for linha, _, _ in linhas], alvo=mcu)
+    assert not erros
+    assert asm.count('(inteiros de 16 bits)') == len(linhas)
+    _, rastro = executar(asm, mcu)
+    # Convertido para half-precision antes do envio
+    assert resultados_no_arduino(rastro) == [esperado for _, _, esperado in linhas]
+    assert resultados == [rpn_final.half_ieee754_to_float(esperado) for _, _, esperado in linhas]
+
+def test_subexpressoes_inteiras_encadeadas():
+    # Cada operação carrega os operandos já calculados: a externa também é nativa
+    linhas = ['((7 9 *) 100 -)', '((300 25 +) (12 11 *) -)', '(((3 4 *) 5 *) -7 *)']
+    asm, resultados, _ = gerar(linhas)
+    _, rastro = executar(asm)
+    assert resultados == [-37.0, 193.0, -420.0]
+    assert resultados_no_arduino(rastro) == [0xD0A0, 0x5A08, 0xDE90]
+    assert not [ponto for ponto, _ in rastro if ponto != 'resultado']
+    # Só o resultado da linha é convertido: as operações externas carregam os operandos
+    assert asm.count('RCALL int16_para_half') == len(linhas)
+
+def test_conversao_para_half():
+    texto = io.StringIO()
+    rpn_final.adicionar_cabecalho(texto)
+    rpn_final.ligar_rotinas(texto, ['int16_para_half', 'uart_envia_byte'])
+    simulador = Simulador(montar(texto.getvalue()))
+    # Todo inteiro de 16 bits exato em half-precision (o que operacao_int16 aceita)
+    for valor in range(-32768, 32768):
+        if float(rpn_final.half_ieee754_to_float(rpn_final.float_to_half_ieee754(valor))) != valor: continue
+        simulador.r[18], simulador.r[19] = 0x12, 0x34
+        simulador.chamar('int16_para_half', {16: valor, 17: valor >> 8})
+        assert simulador.r[16] | (simulador.r[17] << 8) == rpn_final.float_to_half_ieee754(valor), valor
+        assert (simulador.r[18], simulador.r[19]) == (0x12, 0x34)
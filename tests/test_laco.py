@@ -0,0 +1,46 @@
+"""
+Testes dos laços paramétricos: tabelas lidas com LPM/ELPM no simulador
+"""
+import pytest
+
+import rpn_final
+from simulacao import gerar, executar, ALVOS
+
+# Corpo com uma operação: cada volta chama a rotina com os operandos lidos da tabela
+PARAMETRICAS = [
+    '(x 3 *) para x = 1..12',
+    '(2.5 x +) para x = 0,5..4 passo 0,25',
+    '(x x *) para x em 1,5 -2 7 0,1 30',
+    '(x 0,75 |) para x = -3..3',
+    '(x 1,5 ^) para x = 1..3 passo 0,5',
+]
+# Corpo com mais de uma operação: só o texto é comparado
+COMPOSTAS = ['((x 2 *) 1 +) para x = 1..5', '((x 0,5 +) (x 3 *) |) para x em 2 4 8']
+
+def operandos(linha):
+    """
+    Operandos half-precision de uma expressão (a b op), como a rotina os recebe
+    """
+    a, b, _ = linha.strip('()').split()
+    return tuple(rpn_final.float_to_half_ieee754(float(valor.replace(',', '.'))) for valor in (a, b))
+
+@pytest.mark.parametrize('mcu', ALVOS)
+def test_laco_igual_as_linhas_desenroladas(mcu):
+    desenroladas = [e for linha in PARAMETRICAS + COMPOSTAS for e in rpn_final.expandir_parametrica(linha)]
+    asm, resultados, erros = gerar(PARAMETRICAS + COMPOSTAS, alvo=mcu)
+    assert not erros
+    assert asm.count('valores em laço') == len(PARAMETRICAS + COMPOSTAS)
+    # Tabelas lidas com ELPM no ATmega2560 (RAMPZ), LPM no ATmega328P
+    assert ('ELPM R17, Z+' in asm) == (mcu == 'atmega2560')
+    texto, _ = executar(asm, mcu)
+    asm_desenrolado, resultados_desenrolados, _ = gerar(desenroladas, alvo=mcu)
+    assert resultados == resultados_desenrolados
+    assert texto == executar(asm_desenrolado, mcu)[0]
+
+@pytest.mark.parametrize('mcu', ALVOS)
+def test_operandos_lidos_da_tabela(mcu):
+    asm, _, _ = gerar(PARAMETRICAS, alvo=mcu)
+    _, rastro = executar(asm, mcu)
+    chamadas = [(r16 | (r17 << 8), r18 | (r19 << 8)) for ponto, (r16, r17, r18, r19) in rastro if ponto != 'resultado']
+    esperado = [operandos(e) for linha in PARAMETRICAS for e in rpn_final.expandir_parametrica(linha)]
+    assert chamadas == esperado
@@ -0,0 +1,17 @@
+"""
+Testes do modo em lote (--batch)
+"""
+import rpn_final
+
+def test_lote_pula_entradas_inalteradas(tmp_path):
+    pasta, saida = tmp_path / 'entradas', tmp_path / 'build'
+    pasta.mkdir()
+    (pasta / 'a.txt').write_text('(2 3 +)\n(4 5 *)\n')
+    primeiro = rpn_final.processar_lote(str(pasta), str(saida), trabalhadores=1)
+    assert [item['situacao'] for item in primeiro] == ['gerado']
+    assert (saida / 'a.asm').exists()
+    segundo = rpn_final.processar_lote(str(pasta), str(saida), trabalhadores=1)
+    assert [item['situacao'] for item in segundo] == ['inalterado']
+    # Outra opção de geração muda a chave e gera de novo
+    terceiro = rpn_final.processar_lote(str(pasta), str(saida), trabalhadores=1, alvo='atmega2560')
+    assert [item['situacao'] for item in terceiro] == ['gerado']
@@ -0,0 +1,50 @@
+"""
+Testes do perfilador (--profile): ganchos de Perfilador e _SaidaMedida
+"""
+import io   # Para capturar o Assembly gerado
+import json # Para conferir o relatório em JSON
+
+import rpn_final
+
+EXPRESSOES = ['(2 3 +)', '((1.5 2 *) 4 |)', '(1.5 2.5 *)']
+
+def gerar_com_perfil():
+    perfil = rpn_final.Perfilador()
+    saida = io.StringIO()
+    resultados = rpn_final.Calculadora(perfil=perfil).generate(EXPRESSOES, saida)
+    return perfil, saida.getvalue(), resultados
+
+def test_contagem_por_operador_e_rotina():
+    perfil, _, resultados = gerar_com_perfil()
+    assert resultados == [5.0, 0.75, 3.75]
+    assert perfil.operadores == {'+': 1, '*': 2, '|': 1}
+    # Uma rotina (ou redução) por operação
+    assert sum(perfil.rotinas.values()) == 4
+    assert perfil.rotinas['half_multiply'] == 1
+
+def test_tempo_de_cada_fase():
+    perfil, _, _ = gerar_com_perfil()
+    assert set(perfil.tempos) == set(rpn_final.Perfilador.FASES)
+    # generate() recebe as linhas prontas: a leitura do arquivo não é medida
+    assert perfil.tempos['leitura'] == 0.0
+    for fase in ('parse', 'conversao', 'escrita'):
+        assert perfil.tempos[fase] > 0.0
+
+def test_bytes_por_linha():
+    perfil, asm, _ = gerar_com_perfil()
+    assert [expressao for expressao, _ in perfil.bytes_por_linha] == EXPRESSOES
+    assert all(n > 0 for _, n in perfil.bytes_por_linha)
+    # O cabeçalho e as rotinas ligadas não entram na conta das linhas
+    assert sum(n for _, n in perfil.bytes_por_linha) < len(asm.encode('utf-8'))
+    resumo = json.loads(perfil.relatorio('json'))
+    assert resumo['linhas'] == 3
+    assert resumo['bytes_total'] == sum(n for _, n in perfil.bytes_por_linha)
+
+def test_saida_medida_conta_bytes_e_escrita():
+    perfil = rpn_final.Perfilador()
+    destino = io.StringIO()
+    saida = rpn_final._SaidaMedida(destino, perfil)
+    saida.write("    LDI R16, 1 ; ção\n")
+    assert destino.getvalue() == "    LDI R16, 1 ; ção\n"
+    assert saida.bytes == len("    LDI R16, 1 ; ção\n".encode('utf-8'))
+    assert perfil.tempos['escrita'] > 0.0
@@ -0,0 +1,45 @@
+"""
+Testes das reduções de operações half-precision: resultado calculado no simulador
+
+As operações com inteiros nativos de 16 bits estão em test_int16.py.
+"""
+import rpn_final
+from simulacao import gerar, executar, resultados_no_arduino, por_alvo_e_semente, sortear_operacoes
+
+# Reduções feitas só com instruções, sem inteiros (cadeia_half chama half_multiply)
+REDUCOES_HALF = {'identidade', 'ajuste_expoente'}
+
+def sortear_operando(sorteio):
+    escolha = sorteio.random()
+    if escolha < 0.3: return sorteio.choice([0x0000, 0x3C00, 0x4000, 0x4400, 0x3800, 0x3400, 0x5800, 0x2C00])
+    if escolha < 0.5: return rpn_final.float_to_half_ieee754(sorteio.randint(-12, 12))
+    # Normalizado entre 2^-6 e 2^8, com qualquer mantissa e sinal
+    return sorteio.choice([0, 0x8000]) | (sorteio.randint(9, 23) << 10) | sorteio.randrange(0x400)
+
+def operacao_half(sorteio):
+    """
+    Operação com operandos quaisquer; na potência, expoente inteiro pequeno (ou 1)
+    """
+    operador = sorteio.choice('+-*|^')
+    a = sortear_operando(sorteio)
+    b = rpn_final.float_to_half_ieee754(sorteio.randint(2, 5)) if operador == '^' else sortear_operando(sorteio)
+    if operador == '^' and sorteio.random() < 0.5: b = 0x3C00
+    return operador, a, b
+
+@por_alvo_e_semente(3, 4)
+def test_reducoes_no_simulador(semente, mcu):
+    linhas = sortear_operacoes(semente, 40, operacao_half, REDUCOES_HALF)
+    assert {nome for _, nome, _ in linhas} == REDUCOES_HALF
+    asm, _, erros = gerar([linha for linha, _, _ in linhas], alvo=mcu)
+    assert not erros
+    _, rastro = executar(asm, mcu)
+    # Nenhuma rotina chamada: todo resultado sai das instruções da redução
+    assert {ponto for ponto, _ in rastro} == {'resultado'}
+    assert resultados_no_arduino(rastro) == [esperado for _, _, esperado in linhas]
+
+def test_potencia_inteira_por_quadrados():
+    linhas = ['(3 5 ^)', '(-6 3 ^)', '(2 14 ^)', '(12 3 ^)']
+    asm, resultados, _ = gerar(linhas)
+    assert asm.count('quadrado e multiplicação, inteiros de 16 bits') == len(linhas)
+    _, rastro = executar(asm)
+    assert resultados_no_arduino(rastro) == [rpn_final.float_to_half_ieee754(valor) for valor in resultados]
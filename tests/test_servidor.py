@@ -0,0 +1,37 @@
+"""
+Testes do servidor de avaliação (servidor_rpn)
+"""
+import os # Para criar o .hex no lugar do avr-objcopy
+
+import servidor_rpn
+
+def test_avaliar_lote_usa_o_alvo():
+    resposta = servidor_rpn.avaliar_lote(['(2 3 +)'], gerar_asm=True, alvo='atmega2560', otimizacao='O2')
+    assert resposta['resultados'] == [[5.0]]
+    assert 'ATmega2560' in resposta['asm'].splitlines()[0]
+    assert 'Rotinas ligadas (-O2)' in resposta['asm']
+
+def test_resultados_agrupados_por_linha():
+    expressoes = ['(2 3 +)', '(x 2 *) para x = 1..3', '', '(1 0 /)', '(x 1 +) para x = 1..2 passo 0', '(x x *) para x em 2 3']
+    esperado = [[5.0], [2.0, 4.0, 6.0], [], [None], [None], [4.0, 9.0]]
+    assert servidor_rpn.avaliar_lote(expressoes)['resultados'] == esperado
+    # Na geração de código o intervalo vira um laço, com os mesmos resultados
+    assert servidor_rpn.avaliar_lote(expressoes, gerar_asm=True)['resultados'] == esperado
+
+def test_montar_hex_usa_o_mcu_do_alvo(monkeypatch):
+    comandos = []
+    class Processo:
+        returncode = 0
+        stderr = ''
+    def executar(comando, **_):
+        comandos.append(comando)
+        if comando[0] == 'avr-objcopy':
+            with open(comando[-1], 'w') as arquivo:
+                arquivo.write(':00000001FF\n')
+        return Processo()
+    monkeypatch.setattr(servidor_rpn.shutil, 'which', lambda _: '/usr/bin/avr-as')
+    monkeypatch.setattr(servidor_rpn.subprocess, 'run', executar)
+    assert servidor_rpn.montar_hex('    NOP\n', 'atmega2560') == ':00000001FF\n'
+    assert '-mmcu=atmega2560' in comandos[0]
+    assert comandos[1][:3] == ['avr-ld', '-m', 'avr6']
+    assert os.path.basename(comandos[2][-1]) == 'calculadora.hex'
@@ -0,0 +1,28 @@
+"""
+Testes da máquina virtual (vm_rpn): firmware executado no simulador contra o cálculo no host
+"""
+import os # Para localizar os arquivos de teste do repositório
+
+import pytest
+
+import rpn_final
+import vm_rpn
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.mark.parametrize('numerico', vm_rpn.FORMATOS_VM)
+@pytest.mark.parametrize('arquivo', ['teste1.txt', 'teste3.txt'])
+def test_vm_confere_com_o_host(numerico, arquivo):
+    transporte = vm_rpn.TransporteSimulado(numerico)
+    vm_rpn.ler_identificacao(transporte, numerico)
+    linhas = vm_rpn.executar_lote(transporte,
+                                  rpn_final.read_expressions_file(os.path.join(RAIZ, arquivo)), numerico)
+    executadas = [linha for linha in linhas if linha['erro'] is None]
+    assert executadas
+    assert all(linha['confere'] for linha in executadas), [l for l in executadas if not l['confere']]
+
+def test_vm_recusa_half():
+    with pytest.raises(ValueError):
+        vm_rpn.CompiladorVM('half')
+    with pytest.raises(ValueError):
+        vm_rpn.gerar_firmware(None, 'half')
@@ -0,0 +1,368 @@
+"""
+Verificação exaustiva das operações binárias em half-precision
+
+Confere, para cada operador (+ - * | % ^), todos os 2^32 pares de operandos
+half-precision (ou uma amostra regular, com --passo) contra um oráculo
+IEEE 754: a operação calculada em float64 e arredondada uma única vez para
+half-precision (para o mais próximo, empates para o par). Em +, -, *, | e %
+o float64 tem bits de sobra para que esse seja o resultado correto; em ^ é o
+pow() da biblioteca C arredondado.
+
+Backends conferidos:
+- python: as funções *_half_precision de rpn_final, que calculam os
+  resultados enviados pelo programa gerado.
+- simulador: as rotinas half_* do Arduino, executadas no simulador_avr.py
+  (bem mais lento: por padrão, um valor a cada 64 de cada operando).
+
+O primeiro operando é dividido em fatias distribuídas entre processos. Com o
+numpy instalado, o oráculo e a comparação de cada linha de pares são
+vetorizados (float64 convertido para float16 pelo numpy); sem ele, o
+oráculo usa o formato 'e' (half-precision) do módulo struct, um par de cada
+vez. O relatório traz, por operador e backend, o histograma do erro em ULPs
+(distância entre o resultado e o oráculo na sequência ordenada dos valores
+half-precision), as divergências de NaN e os piores casos. Um resultado é
+idêntico ao oráculo se tiver os mesmos bits ou se os dois forem NaN (o
+conteúdo do NaN não importa); só os idênticos entram na posição 0 do
+histograma, e os zeros com o sinal trocado (0 ULP) são contados à parte.
+
+Uso:
+    python verificar_half.py [--operador + '*' ...] [--backend python simulador] [--passo N] [-j N]
+                             [--exemplos 10] [-Os|-O2] [--sem-numpy] [--json]
+"""
+import io       # Para gerar as rotinas Assembly em memória
+import os       # Para o número de CPUs
+import json     # Para exportar o relatório em JSON
+import math     # Para infinitos e NaN do oráculo
+import time     # Para medir o tempo de cada verificação
+import heapq    # Para guardar só os piores casos
+import struct   # Para o oráculo sem numpy (formato 'e')
+import operator # Para as operações do oráculo
+import argparse # Para interpretar as opções da linha de comando
+from itertools import repeat # Para chamar as funções Python com o mesmo primeiro operando
+from concurrent.futures import ProcessPoolExecutor, as_completed # Para dividir as fatias entre processos
+
+try:
+    import numpy  # Oráculo e comparação vetorizados (opcional)
+except ImportError:
+    numpy = None
+
+import rpn_final
+from simulador_avr import montar, Simulador, ErroSimulacao
+from comparar_numericos import HALF
+
+BACKENDS = ('python', 'simulador')
+PASSO_PADRAO = {'python': 1, 'simulador': 64}  # O simulador faz ~15 mil chamadas/s por processo
+LIMITE_CICLOS = 10_000  # Rotina considerada travada (as que terminam gastam no máximo ~1.300 ciclos)
+FATIAS_POR_PROCESSO = 8  # Fatias menores equilibram melhor a carga entre os processos
+
+# Histograma: índice k = número de bits do erro em ULPs (0: idênticos, 1, 2-3, 4-7, ..., até 16 bits)
+# e uma última posição para as divergências de NaN (só um dos dois é NaN)
+INDICE_NAN = 17
+ROTULOS_HISTOGRAMA = ['0', '1'] + [f"{1 << (k - 1)}-{(1 << k) - 1}" for k in range(2, INDICE_NAN)] + ['NaN']
+
+# Valor (float) de cada padrão de 16 bits, decodificado com o formato 'e'
+VALORES_HALF = struct.unpack('<65536e', struct.pack('<65536H', *range(0x10000)))
+_EMPACOTAR_HALF = struct.Struct('<e').pack
+_LER_16_BITS = struct.Struct('<H').unpack
+
+def _dividir(a, b):
+    """
+    Divisão IEEE 754 (divisão por zero: infinito com sinal, ou NaN em 0/0)
+    """
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a == 0 or a != a: return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+def _resto(a, b):
+    """
+    Resto com o sinal do divisor, como o % do Python (NaN para divisor zero)
+    """
+    try:
+        return a % b
+    except ZeroDivisionError:
+        return math.nan
+
+def _potencia(a, b):
+    """
+    Potência com a semântica do pow() da biblioteca C (infinito em vez de exceção)
+    """
+    impar = b.is_integer() and b % 2 == 1
+    try:
+        return math.pow(a, b)
+    except OverflowError:
+        return -math.inf if a < 0 and impar else math.inf
+    except ValueError:
+        if a == 0: return math.copysign(math.inf, a) if impar else math.inf
+        return math.nan  # Base negativa com expoente não inteiro
+
+# Oráculo de cada operador: função escalar (struct) e ufunc do numpy equivalente
+ORACULO = {
+    '+': (operator.add, 'add'),
+    '-': (operator.sub, 'subtract'),
+    '*': (operator.mul, 'multiply'),
+    '|': (_dividir, 'divide'),
+    '%': (_resto, 'remainder'),
+    '^': (_potencia, 'power'),
+}
+
+def para_half(valor):
+    """
+    Arredonda um float para half-precision (empates para o par) com o formato 'e'
+
+    Args:
+        valor (float): Valor exato (float64)
+
+    Returns:
+        int: Padrão de 16 bits (infinito se o valor arredondado passar do maior finito)
+    """
+    try:
+        return _LER_16_BITS(_EMPACOTAR_HALF(valor))[0]
+    except OverflowError:
+        return 0xFC00 if valor < 0 else 0x7C00
+
+def _nan(h):
+    return h & 0x7C00 == 0x7C00 and h & 0x3FF != 0
+
+def erro_ulp(obtido, esperado):
+    """
+    Distância em ULPs entre dois half-precision
+
+    Os padrões são colocados em ordem (negativos espelhados), então valores
+    vizinhos distam 1, +0 e -0 distam 0 e o maior finito dista 1 do infinito.
+
+    Args:
+        obtido (int): Resultado conferido
+        esperado (int): Resultado do oráculo
+
+    Returns:
+        int: Distância em ULPs (0 se os dois forem NaN), ou None se só um deles for NaN
+    """
+    nan_obtido, nan_esperado = _nan(obtido), _nan(esperado)
+    if nan_obtido or nan_esperado:
+        return 0 if nan_obtido and nan_esperado else None
+    ordem = lambda h: -(h & 0x7FFF) if h & 0x8000 else h
+    return abs(ordem(obtido) - ordem(esperado))
+
+def _calcular_linha(backend, operador, a, valores_b, estado):
+    """
+    Resultados de um backend para o primeiro operando `a` e cada segundo operando
+
+    Returns:
+        list: Padrão de 16 bits de cada resultado (None se a rotina travou)
+    """
+    func, rotina = HALF[operador]
+    if backend == 'python':
+        return list(map(func, repeat(a), valores_b))
+    resultados = []
+    for b in valores_b:
+        try:
+            estado['simulador'].chamar(rotina, {16: a, 17: a >> 8, 18: b, 19: b >> 8}, LIMITE_CICLOS)
+            registradores = estado['simulador'].r
+            resultados.append(registradores[16] | (registradores[17] << 8))
+        except ErroSimulacao:
+            resultados.append(None)
+            estado['simulador'] = Simulador(estado['programa'])  # Pilha e registradores da chamada interrompida
+    return resultados
+
+def verificar_fatia(operador, backend, valores_a, passo, exemplos=10, otimizacao='Os', vetorizado=True):
+    """
+    Confere os pares de uma fatia do primeiro operando (executada nos processos de trabalho)
+
+    Args:
+        operador (str): Operador ('+', '-', '*', '|', '%' ou '^')
+        backend (str): 'python' ou 'simulador'
+        valores_a (range): Valores do primeiro operando
+        passo (int): Intervalo entre os valores do segundo operando
+        exemplos (int): Piores casos guardados
+        otimizacao (str): Variante das rotinas do simulador: 'Os' ou 'O2'
+        vetorizado (bool): Usa o numpy no oráculo e na comparação (se instalado)
+
+    Returns:
+        dict: Pares, idênticos (mesmos bits ou os dois NaN), zeros com o sinal trocado,
+              histograma, rotinas travadas e piores casos
+    """
+    valores_b = range(0, 0x10000, passo)
+    estado = {}
+    if backend == 'simulador':
+        texto = io.StringIO()
+        rpn_final.adicionar_cabecalho(texto)
+        rpn_final.ligar_rotinas(texto, [HALF[operador][1], 'uart_envia_byte'], otimizacao)
+        estado['programa'] = montar(texto.getvalue())
+        estado['simulador'] = Simulador(estado['programa'])
+    escalar, nome_ufunc = ORACULO[operador]
+    vetorizado = vetorizado and numpy is not None
+    if vetorizado:
+        ufunc = getattr(numpy, nome_ufunc)
+        floats_b = numpy.array(valores_b, dtype=numpy.uint16).view(numpy.float16).astype(numpy.float64)
+        ordem = lambda h: numpy.where(h & 0x8000, -(h & 0x7FFF), h)
+    else:
+        floats_b = [VALORES_HALF[b] for b in valores_b]
+
+    histograma = [0] * (INDICE_NAN + 1)
+    pares = identicos = zeros = falhas = 0
+    piores = []  # Heap mínimo de (erro, -a, -b, obtido, esperado); NaN conta como o maior erro
+    for a in valores_a:
+        obtidos = _calcular_linha(backend, operador, a, valores_b, estado)
+        fa = VALORES_HALF[a]
+        if vetorizado:
+            with numpy.errstate(all='ignore'):
+                esperados = ufunc(fa, floats_b).astype(numpy.float16).view(numpy.uint16).astype(numpy.int64)
+            obtidos = numpy.array([-1 if h is None else h for h in obtidos] if backend == 'simulador' else obtidos,
+                                  dtype=numpy.int64)
+            validos = obtidos >= 0
+            falhas += int(numpy.count_nonzero(~validos))
+            nan_obtido = (obtidos & 0x7C00 == 0x7C00) & (obtidos & 0x3FF != 0) & validos
+            nan_esperado = (esperados & 0x7C00 == 0x7C00) & (esperados & 0x3FF != 0)
+            erros = numpy.abs(ordem(obtidos) - ordem(esperados))
+            iguais = (obtidos == esperados) | (nan_obtido & nan_esperado)
+            erros[iguais] = 0
+            indices = numpy.frexp(erros)[1]
+            indices[nan_obtido != nan_esperado] = INDICE_NAN
+            # Zeros com o sinal trocado: 0 ULP, fora do histograma
+            trocados = (erros == 0) & ~iguais & validos
+            indices = indices[validos & ~trocados]
+            histograma = [h + n for h, n in zip(histograma, numpy.bincount(indices, minlength=INDICE_NAN + 1).tolist())]
+            pares += int(numpy.count_nonzero(validos))
+            identicos += int(numpy.count_nonzero(iguais & validos))
+            zeros += int(numpy.count_nonzero(trocados))
+            chaves = numpy.where(nan_obtido != nan_esperado, 1 << INDICE_NAN, erros)
+            candidatos = numpy.flatnonzero((chaves > 0) & validos)
+            for j in candidatos[numpy.argsort(-chaves[candidatos], kind='stable')[:exemplos]]:
+                caso = (int(chaves[j]), -a, -valores_b[j], int(obtidos[j]), int(esperados[j]))
+                if len(piores) < exemplos: heapq.heappush(piores, caso)
+                elif caso > piores[0]: heapq.heapreplace(piores, caso)
+            continue
+        for b, fb, obtido in zip(valores_b, floats_b, obtidos):
+            if obtido is None:
+                falhas += 1
+                continue
+            pares += 1
+            esperado = para_half(escalar(fa, fb))
+            if obtido == esperado or (_nan(obtido) and _nan(esperado)):
+                identicos += 1
+                histograma[0] += 1
+                continue
+            erro = erro_ulp(obtido, esperado)
+            if erro == 0:  # Zeros de sinais diferentes
+                zeros += 1
+                continue
+            histograma[INDICE_NAN if erro is None else erro.bit_length()] += 1
+            caso = (1 << INDICE_NAN if erro is None else erro, -a, -b, obtido, esperado)
+            if len(piores) < exemplos: heapq.heappush(piores, caso)
+            elif caso > piores[0]: heapq.heapreplace(piores, caso)
+    return {'pares': pares, 'identicos': identicos, 'zeros': zeros, 'histograma': histograma, 'falhas': falhas,
+            'piores': piores}
+
+def verificar(operadores=tuple(HALF), backends=('python',), passo=None, trabalhadores=None, exemplos=10,
+              otimizacao='Os', vetorizado=True):
+    """
+    Confere os operadores em cada backend, dividindo o primeiro operando entre processos
+
+    Args:
+        operadores (iterable): Operadores a conferir
+        backends (iterable): 'python' e/ou 'simulador'
+        passo (int): Intervalo entre os valores de cada operando (None: PASSO_PADRAO do backend)
+        trabalhadores (int): Número de processos (None: número de CPUs)
+        exemplos (int): Piores casos listados por operador
+        otimizacao (str): Variante das rotinas do simulador: 'Os' ou 'O2'
+        vetorizado (bool): Usa o numpy no oráculo e na comparação (se instalado)
+
+    Returns:
+        list: Um dicionário por operador e backend: pares, idênticos, zeros com o sinal
+              trocado, histograma, rotinas travadas, piores casos e tempo
+    """
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    verificacoes = []
+    with ProcessPoolExecutor(max_workers=trabalhadores) as executor:
+        for operador in operadores:
+            for backend in backends:
+                passo_backend = passo or PASSO_PADRAO[backend]
+                valores_a = range(0, 0x10000, passo_backend)
+                n_fatias = min(len(valores_a), FATIAS_POR_PROCESSO * trabalhadores)
+                inicio = time.perf_counter()
+                # Fatias intercaladas: regiões lentas (NaN, rotinas que travam) ficam espalhadas
+                tarefas = [executor.submit(verificar_fatia, operador, backend, valores_a[i::n_fatias], passo_backend,
+                                           exemplos, otimizacao, vetorizado) for i in range(n_fatias)]
+                total = {'operador': operador, 'backend': backend, 'passo': passo_backend, 'pares': 0,
+                         'identicos': 0, 'zeros': 0, 'histograma': [0] * (INDICE_NAN + 1), 'falhas': 0}
+                piores = []
+                for tarefa in as_completed(tarefas):
+                    fatia = tarefa.result()
+                    for chave in ('pares', 'identicos', 'zeros', 'falhas'):
+                        total[chave] += fatia[chave]
+                    total['histograma'] = [a + b for a, b in zip(total['histograma'], fatia['histograma'])]
+                    piores.extend(fatia['piores'])
+                total['tempo'] = time.perf_counter() - inicio
+                total['piores'] = [{'a': -a, 'b': -b, 'obtido': obtido, 'esperado': esperado,
+                                    'ulp': None if erro == 1 << INDICE_NAN else erro}
+                                   for erro, a, b, obtido, esperado in heapq.nlargest(exemplos, piores)]
+                verificacoes.append(total)
+    return verificacoes
+
+def formatar_verificacao(verificacoes):
+    """
+    Formata as verificações: resumo, histograma de ULPs e piores casos de cada operador
+
+    Args:
+        verificacoes (list): Resultado de verificar()
+
+    Returns:
+        str: Relatório pronto para impressão
+    """
+    def half(h):
+        return f"0x{h:04X} ({rpn_final.texto_half_ieee754(h)})"
+
+    saida = []
+    for verificacao in verificacoes:
+        pares = verificacao['pares'] or 1
+        vazao = verificacao['pares'] / verificacao['tempo'] / 1e6 if verificacao['tempo'] else 0
+        saida.append(f"{verificacao['operador']} ({verificacao['backend']}, passo {verificacao['passo']}): "
+                     f"{verificacao['pares']} pares em {verificacao['tempo']:.1f} s ({vazao:.2f} M pares/s), "
+                     f"{verificacao['identicos'] / pares * 100:.4f}% idênticos ao oráculo (mesmos bits ou NaN)")
+        if verificacao['falhas']:
+            saida.append(f"  Rotina travada (mais de {LIMITE_CICLOS} ciclos) em {verificacao['falhas']} pares")
+        saida.append(f"  {'ULPs':<12} {'Pares':>12} {'%':>9}")
+        # Zeros com o sinal trocado logo depois dos idênticos
+        linhas = list(zip(ROTULOS_HISTOGRAMA, verificacao['histograma']))
+        linhas.insert(1, ('0 (±0)', verificacao['zeros']))
+        for rotulo, n in linhas:
+            if n: saida.append(f"  {rotulo:<12} {n:>12} {n / pares * 100:>9.4f}")
+        for caso in verificacao['piores']:
+            erro = 'NaN' if caso['ulp'] is None else f"{caso['ulp']} ULP"
+            saida.append(f"  {half(caso['a'])} {verificacao['operador']} {half(caso['b'])} = {half(caso['obtido'])}, "
+                         f"esperado {half(caso['esperado'])} ({erro})")
+        saida.append("")
+    return "\n".join(saida)
+
+def main():
+    """
+    Função principal: confere os operadores pedidos e imprime o relatório
+    """
+    parser = argparse.ArgumentParser(description="Confere as operações half-precision com um oráculo IEEE 754")
+    parser.add_argument('--operador', nargs='+', choices=list(HALF), default=list(HALF),
+                        help="operadores conferidos (padrão: todos)")
+    parser.add_argument('--backend', nargs='+', choices=BACKENDS, default=['python'],
+                        help="python (funções do gerador, padrão) e/ou simulador (rotinas do Arduino)")
+    parser.add_argument('--passo', type=int,
+                        help="confere um valor a cada PASSO de cada operando (padrão: 1 no python, 64 no simulador)")
+    parser.add_argument('-j', type=int, dest='trabalhadores', help="número de processos (padrão: número de CPUs)")
+    parser.add_argument('--exemplos', type=int, default=10, help="piores casos listados por operador (padrão 10)")
+    parser.add_argument('-O', dest='otimizacao', choices=['s', '2'], default='s',
+                        help="variante das rotinas do simulador: -Os (padrão) ou -O2")
+    parser.add_argument('--sem-numpy', action='store_true', help="usa o oráculo do struct mesmo com o numpy instalado")
+    parser.add_argument('--json', action='store_true', help="exporta o relatório em JSON")
+    args = parser.parse_args()
+
+    verificacoes = verificar(args.operador, args.backend, args.passo, args.trabalhadores, args.exemplos,
+                             'O' + args.otimizacao, not args.sem_numpy)
+    if args.json:
+        for verificacao in verificacoes:
+            verificacao['histograma'] = dict(zip(ROTULOS_HISTOGRAMA, verificacao['histograma']))
+        print(json.dumps(verificacoes, indent=2, ensure_ascii=False))
+    else:
+        print(formatar_verificacao(verificacoes))
+
+if __name__ == "__main__":
+    main()
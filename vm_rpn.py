@@ -0,0 +1,756 @@
+"""
+Máquina virtual RPN para o Arduino (firmware fixo + envio de bytecode pela serial)
+
+Em vez de desenrolar cada expressão em Assembly (o que limita o número de
+linhas aos 32 KB de flash e exige regravar o Arduino a cada arquivo), o
+firmware gerado aqui contém uma máquina de pilha com as rotinas dos operadores.
+O host compila cada linha para bytecode, envia pela UART e lê o resultado de
+volta; trocar as expressões não exige regravar nada.
+
+Bytecode (um byte de operação, seguido dos argumentos):
+    0x01 PUSH v      empilha v (LARGURA bytes, little-endian, no formato numérico)
+    0x02 ADD   0x03 SUB   0x04 MUL   0x05 DIV (|)   0x06 IDIV (/)   0x07 MOD   0x08 POW
+    0x09 MEM         empilha a memória
+    0x0A MEM_STORE   guarda o topo na memória (sem desempilhar)
+    0x0B RES k       empilha o resultado de k linhas atrás (1 = último, k <= 64)
+    0x0C FIM         desempilha o resultado, guarda no histórico e envia
+    0x0D RESET       esvazia a pilha e zera a memória e o histórico
+
+Respostas: um quadro de 1 + LARGURA bytes por FIM (0x00 seguido do valor) ou
+por operação inválida (0xFF seguido do código recebido). Ao iniciar, o
+firmware envia "RPNVM" e 5 bytes: versão, formato, largura, profundidade do
+histórico e capacidade do buffer de recepção.
+
+O buffer de recepção (anel de 256 bytes preenchido pela interrupção da UART)
+permite ao host manter vários comandos em trânsito: o envio usa créditos,
+sem ultrapassar a capacidade do buffer com bytes ainda não confirmados.
+
+Uso:
+    python vm_rpn.py firmware [--numerico q16.16] [--baud 115200] [-Os|-O2] [-o vm_rpn.asm]
+    python vm_rpn.py enviar teste1.txt (--porta COM3 | --simulador) [--numerico q16.16]
+"""
+import io       # Para gerar o firmware em memória
+import re       # Para extrair os elementos das expressões
+import sys      # Para mensagens de erro e código de saída
+import time     # Para medir a vazão do envio
+import argparse # Para interpretar as opções da linha de comando
+from collections import deque # Comandos enviados aguardando resposta
+
+try:
+    import serial # pyserial, opcional: apenas para falar com o Arduino
+except ImportError:
+    serial = None
+
+import rpn_final
+
+VERSAO_VM = 1
+
+# Códigos das operações do bytecode
+OP_PUSH = 0x01
+OP_ADD = 0x02
+OP_SUB = 0x03
+OP_MUL = 0x04
+OP_DIV = 0x05
+OP_IDIV = 0x06
+OP_MOD = 0x07
+OP_POW = 0x08
+OP_MEM = 0x09
+OP_MEM_STORE = 0x0A
+OP_RES = 0x0B
+OP_FIM = 0x0C
+OP_RESET = 0x0D
+
+# Operador RPN -> (operação do bytecode, sufixo da rotina de ponto fixo, rotina half-precision)
+OPERADORES_VM = {
+    '+': (OP_ADD, 'add', 'half_add'),
+    '-': (OP_SUB, 'subtract', 'half_subtract'),
+    '*': (OP_MUL, 'multiply', 'half_multiply'),
+    '|': (OP_DIV, 'divide', 'half_divide'),
+    '/': (OP_IDIV, 'floordiv', None),
+    '%': (OP_MOD, 'modulo', 'half_modulo'),
+    '^': (OP_POW, 'power', 'half_power'),
+}
+
+# Código do formato numérico informado pelo firmware
+CODIGOS_FORMATO = {'half': 0, 'q8.8': 1, 'q16.16': 2}
+
+# Formatos aceitos pela VM. O half fica de fora enquanto as rotinas half_* do Arduino não
+# calcularem o resultado (no calculadora.asm o valor vem do host; ver verificar_half.py)
+FORMATOS_VM = tuple(rpn_final.FORMATOS_PONTO_FIXO)
+
+PROFUNDIDADE_HISTORICO = 64 # Resultados guardados para RES k (potência de 2)
+PROFUNDIDADE_PILHA = 32     # Valores na pilha da VM (verificado na compilação)
+CAPACIDADE_RX = 255         # Bytes do anel de recepção que podem estar pendentes
+STATUS_OK = 0x00
+STATUS_INVALIDO = 0xFF
+
+def largura_formato(numerico):
+    """
+    Bytes de um valor no formato numérico
+
+    Args:
+        numerico (str): 'half', 'q8.8' ou 'q16.16'
+
+    Returns:
+        int: 2 ou 4
+    """
+    if numerico == 'half':
+        return 2
+    return sum(rpn_final.FORMATOS_PONTO_FIXO[numerico]) // 8
+
+def rotina_operador(operador, numerico):
+    """
+    Rotina Assembly que executa um operador no formato numérico (None se não houver)
+    """
+    _, sufixo, rotina_half = OPERADORES_VM[operador]
+    if numerico == 'half':
+        return rotina_half
+    return f"fixed{largura_formato(numerico) * 8}_{sufixo}"
+
+def gerar_firmware(file, numerico='q16.16', baud=115200, otimizacao='Os'):
+    """
+    Escreve o firmware da máquina virtual (programa Assembly completo)
+
+    Args:
+        file (file): Arquivo de saída para código assembly
+        numerico (str): Formato numérico: 'q8.8' ou 'q16.16' (FORMATOS_VM)
+        baud (int): Velocidade da UART (com U2X0, 16 MHz)
+        otimizacao (str): Variante das rotinas ligadas: 'Os' (tamanho) ou 'O2' (velocidade)
+
+    Returns:
+        list: Rotinas incluídas pelo ligador
+
+    Raises:
+        ValueError: Se o formato numérico não for aceito pela VM (FORMATOS_VM)
+    """
+    if numerico not in FORMATOS_VM:
+        raise ValueError(f"formato numérico não disponível na VM: {numerico}")
+    largura = largura_formato(numerico)
+    ubrr = round(16_000_000 / (8 * baud)) - 1
+    ligacao = rpn_final._SaidaLigacao(file)
+    # Registradores do valor: a a partir de R16, b a partir de R18 (16 bits) ou R20 (32 bits)
+    reg_a = [16 + i for i in range(largura)]
+    reg_b = [(18 if largura == 2 else 20) + i for i in range(largura)]
+    reg_envio = [20 + i for i in range(largura)] if largura == 2 else [24 + i for i in range(largura)]
+
+    def empilhar(registradores):
+        return "\n".join(f"    PUSH R{r}" for r in registradores)
+
+    def desempilhar(registradores):
+        return "\n".join(f"    POP R{r}" for r in reversed(registradores))
+
+    ligacao.write(f"""; Calculadora RPN - máquina virtual para ATmega328P ({numerico.upper() if numerico != 'half' else 'IEEE 754 half-precision'})
+; Recebe bytecode pela UART ({baud} baud) e devolve um quadro de {1 + largura} bytes por expressão
+;***********************************************************************************************
+.equ SPH, 0x3E    ; Stack Pointer High
+.equ SPL, 0x3D    ; Stack Pointer Low
+.equ SREG, 0x3F   ; Status Register
+.equ UBRR0L, 0xC4 ; Baud Rate Register Low
+.equ UBRR0H, 0xC5 ; Baud Rate Register High
+.equ UCSR0A, 0xC0 ; Control and Status Register A (bit 1: U2X0, bit 5: UDRE0, bit 7: RXC0)
+.equ UCSR0B, 0xC1 ; Control and Status Register B (RXCIE0, RXEN0, TXEN0)
+.equ UCSR0C, 0xC2 ; Control and Status Register C (formato: 8 bits, sem paridade, 1 stop)
+.equ UDR0, 0xC6   ; Registrador de dados da UART0
+; Mapa da SRAM
+.equ VM_RX, 0x0100          ; Anel de recepção (256 bytes alinhados: o índice é um byte)
+.equ VM_RX_CABECA, 0x0200   ; Próxima posição escrita pela interrupção
+.equ VM_RX_CAUDA, 0x0201    ; Próxima posição lida pela VM
+.equ VM_HIST_POS, 0x0202    ; Próxima posição do histórico
+.equ VM_MEM, 0x0204         ; Memória (MEM)
+.equ VM_HIST, 0x0300        ; Histórico de resultados ({PROFUNDIDADE_HISTORICO} x {largura} bytes)
+.equ VM_PILHA, 0x08FF       ; Pilha da VM = pilha do processador (cresce para baixo)
+.equ VM_N_OPERACOES, {OP_RESET}
+;***********************************************************************************************
+
+.ORG 0x0000
+    RJMP reset
+.ORG 0x0048                 ; Vetor USART_RX (palavra 0x24)
+    RJMP vm_recebe
+
+reset:
+    ; Configurar stack pointer
+    LDI R16, hi8(VM_PILHA)
+    OUT SPH, R16
+    LDI R16, lo8(VM_PILHA)
+    OUT SPL, R16
+
+    ; Zerar índices, memória e histórico (0x0200 a 0x03FF)
+    LDI R26, lo8(VM_RX_CABECA)
+    LDI R27, hi8(VM_RX_CABECA)
+    CLR R16
+reset_zera:
+    ST X+, R16
+    CPI R27, 0x04
+    BRNE reset_zera
+
+    ; Configurar UART: velocidade dobrada (U2X0), recepção com interrupção e transmissão
+    LDI R16, {ubrr & 0xFF}
+    STS UBRR0L, R16
+    LDI R16, {ubrr >> 8}
+    STS UBRR0H, R16
+    LDI R16, 2
+    STS UCSR0A, R16
+    LDI R16, 0x98
+    STS UCSR0B, R16
+    LDI R16, 6
+    STS UCSR0C, R16
+    SEI
+
+    ; Identificação: "RPNVM", versão, formato, largura, histórico e capacidade do buffer
+""")
+    for byte in b"RPNVM" + bytes([VERSAO_VM, CODIGOS_FORMATO[numerico], largura, PROFUNDIDADE_HISTORICO,
+                                   CAPACIDADE_RX]):
+        ligacao.write(f"""    LDI R16, {byte}
+    RCALL uart_envia_byte
+""")
+    ligacao.write(f"""
+;***********************************************************************************************
+; Laço principal: lê uma operação e desvia pela tabela vm_tabela
+;***********************************************************************************************
+vm_laco:
+    RCALL vm_le_byte
+    MOV R25, R24
+    DEC R25
+    CPI R25, VM_N_OPERACOES
+    BRLO vm_despacha
+    RJMP vm_invalido
+vm_despacha:
+    LDI R30, lo8(vm_tabela)
+    LDI R31, hi8(vm_tabela)
+    LSL R25
+    ADD R30, R25
+    LDI R25, 0
+    ADC R31, R25
+    LPM R26, Z+
+    LPM R27, Z
+    MOVW R30, R26
+    IJMP
+
+; Operação binária: b e a saem da pilha, a rotina em Z calcula e o resultado volta para a pilha
+vm_binaria:
+{desempilhar(reg_b)}
+{desempilhar(reg_a)}
+    ICALL
+{empilhar(reg_a)}
+    RJMP vm_laco
+
+vm_push:
+""")
+    for r in reg_a:
+        ligacao.write(f"""    RCALL vm_le_byte
+    MOV R{r}, R24
+""")
+    ligacao.write(f"""{empilhar(reg_a)}
+    RJMP vm_laco
+
+vm_mem:
+""" + "\n".join(f"    LDS R{r}, VM_MEM + {i}" for i, r in enumerate(reg_a)) + f"""
+{empilhar(reg_a)}
+    RJMP vm_laco
+
+vm_mem_store:
+{desempilhar(reg_a)}
+""" + "\n".join(f"    STS VM_MEM + {i}, R{r}" for i, r in enumerate(reg_a)) + f"""
+{empilhar(reg_a)}
+    RJMP vm_laco
+
+; Endereço de uma posição do histórico: X = VM_HIST + posição * largura (posição em R25)
+vm_endereco_hist:
+    ANDI R25, {PROFUNDIDADE_HISTORICO - 1}
+""" + "    LSL R25\n" * (largura // 2) + f"""    MOV R26, R25
+    LDI R27, hi8(VM_HIST)
+    RET
+
+vm_res:
+    RCALL vm_le_byte
+    LDS R25, VM_HIST_POS
+    SUB R25, R24
+    RCALL vm_endereco_hist
+""" + "\n".join(f"    LD R{r}, X+" for r in reg_a) + f"""
+{empilhar(reg_a)}
+    RJMP vm_laco
+
+vm_fim:
+{desempilhar(reg_a)}
+    LDS R25, VM_HIST_POS
+    MOV R24, R25
+    INC R24
+    STS VM_HIST_POS, R24
+    RCALL vm_endereco_hist
+""" + "\n".join(f"    ST X+, R{r}" for r in reg_a) + "\n" +
+        "\n".join(f"    MOV R{e}, R{r}" for e, r in zip(reg_envio, reg_a)) + f"""
+    LDI R16, {STATUS_OK}
+    RCALL uart_envia_byte
+""" + "".join(f"""    MOV R16, R{e}
+    RCALL uart_envia_byte
+""" for e in reg_envio) + f"""    RJMP vm_laco
+
+; Operação desconhecida: responde 0xFF e o código recebido e esvazia a pilha
+vm_invalido:
+    MOV R20, R24
+    LDI R16, {STATUS_INVALIDO}
+    RCALL uart_envia_byte
+    MOV R16, R20
+    RCALL uart_envia_byte
+""" + f"""    LDI R16, 0
+    RCALL uart_envia_byte
+""" * (largura - 1) + f"""    RJMP vm_esvazia_pilha
+
+vm_reset:
+    LDI R26, lo8(VM_HIST_POS)
+    LDI R27, hi8(VM_HIST_POS)
+    CLR R16
+vm_reset_zera:
+    ST X+, R16
+    CPI R27, 0x04
+    BRNE vm_reset_zera
+vm_esvazia_pilha:
+    CLI
+    LDI R16, hi8(VM_PILHA)
+    OUT SPH, R16
+    LDI R16, lo8(VM_PILHA)
+    OUT SPL, R16
+    SEI
+    RJMP vm_laco
+""")
+    # Uma entrada para cada operação binária: carrega a rotina em Z e segue para vm_binaria
+    rotinas = []
+    for operador, (codigo, _, _) in OPERADORES_VM.items():
+        rotina = rotina_operador(operador, numerico)
+        if rotina is None:
+            continue
+        rotinas.append(rotina)
+        ligacao.write(f"""
+vm_op_{codigo:02x}: ; {operador}
+    LDI R30, pm_lo8({rotina})
+    LDI R31, pm_hi8({rotina})
+    RJMP vm_binaria
+""")
+    destinos = {OP_PUSH: 'vm_push', OP_MEM: 'vm_mem', OP_MEM_STORE: 'vm_mem_store', OP_RES: 'vm_res',
+                OP_FIM: 'vm_fim', OP_RESET: 'vm_reset'}
+    for operador, (codigo, _, _) in OPERADORES_VM.items():
+        destinos[codigo] = f"vm_op_{codigo:02x}" if rotina_operador(operador, numerico) else 'vm_invalido'
+    ligacao.write("""
+;***********************************************************************************************
+; Recepção: a interrupção da UART guarda o byte no anel; vm_le_byte espera e retira (resultado em R24)
+;***********************************************************************************************
+vm_recebe:
+    PUSH R16
+    IN R16, SREG
+    PUSH R16
+    PUSH R26
+    PUSH R27
+    LDS R16, UDR0
+    LDS R26, VM_RX_CABECA
+    LDI R27, hi8(VM_RX)
+    ST X, R16
+    INC R26
+    STS VM_RX_CABECA, R26
+    POP R27
+    POP R26
+    POP R16
+    OUT SREG, R16
+    POP R16
+    RETI
+
+vm_le_byte:
+    LDS R26, VM_RX_CAUDA
+vm_le_byte_espera:
+    LDS R27, VM_RX_CABECA
+    CP R26, R27
+    BREQ vm_le_byte_espera
+    LDI R27, hi8(VM_RX)
+    LD R24, X
+    INC R26
+    STS VM_RX_CAUDA, R26
+    RET
+
+; Tabela de desvio (endereços em palavras, da operação 0x01 em diante)
+vm_tabela:
+""")
+    for codigo in range(OP_PUSH, OP_RESET + 1):
+        ligacao.write(f"    .word pm({destinos[codigo]})\n")
+    return rpn_final.ligar_rotinas(ligacao, ligacao.referencias | set(rotinas), otimizacao)
+
+class ErroCompilacao(Exception):
+    """Expressão que não pode ser executada pela máquina virtual"""
+
+class CompiladorVM:
+    """
+    Compila as linhas RPN para o bytecode da máquina virtual
+
+    Mantém o mesmo estado da Calculadora (MEM, histórico de resultados e índice
+    da linha, usado por N RES) e calcula no host, com as funções de referência
+    do formato, o valor que o Arduino deve devolver para cada linha. As linhas
+    com erro não são enviadas e não alteram o estado.
+    """
+    def __init__(self, numerico='q16.16'):
+        """
+        Args:
+            numerico (str): Formato numérico: 'q8.8' ou 'q16.16' (FORMATOS_VM)
+
+        Raises:
+            ValueError: Se o formato numérico não for aceito pela VM (FORMATOS_VM)
+        """
+        if numerico not in FORMATOS_VM:
+            raise ValueError(f"formato numérico não disponível na VM: {numerico}")
+        self.numerico = numerico
+        self.largura = largura_formato(numerico)
+        self.reset()
+
+    def reset(self):
+        """
+        Volta ao estado inicial (o mesmo do Arduino após a operação RESET)
+        """
+        self.memoria = 0        # Valor bruto no formato
+        self.resultados = []    # Valores brutos das linhas compiladas com sucesso
+        self.linha = 0          # Índice da próxima linha (usado por N RES)
+
+    def converter(self, valor):
+        """
+        Converte um número para o valor bruto do formato
+
+        Raises:
+            ErroCompilacao: Se o número não for representável
+        """
+        if self.numerico == 'half':
+            return rpn_final.float_to_half_ieee754(valor)
+        try:
+            return rpn_final.float_to_fixed_point(valor, self.numerico)
+        except OverflowError as erro:
+            raise ErroCompilacao(f"{valor} em {self.numerico.upper()}: {erro}")
+
+    def para_float(self, bruto):
+        """
+        Converte um valor bruto do formato (como recebido do Arduino) para float
+        """
+        if self.numerico == 'half':
+            return rpn_final.half_ieee754_to_float(bruto & 0xFFFF)
+        bits = self.largura * 8
+        bruto &= (1 << bits) - 1
+        if bruto >> (bits - 1):
+            bruto -= 1 << bits
+        return rpn_final.fixed_point_to_float(bruto, self.numerico)
+
+    def calcular(self, operador, a, b):
+        """
+        Executa um operador sobre valores brutos com as funções de referência do formato
+
+        Raises:
+            ErroCompilacao: Divisão por zero, estouro ou operador sem rotina no formato
+        """
+        if self.numerico == 'half':
+            funcoes = {'+': rpn_final.add_half_precision, '-': rpn_final.sub_half_precision,
+                       '*': rpn_final.mul_half_precision, '|': rpn_final.div_half_precision,
+                       '%': rpn_final.mod_half_precision, '^': rpn_final.power_half_precision}
+            if operador not in funcoes:
+                raise ErroCompilacao(f"operador {operador} não disponível na VM em half-precision")
+            return funcoes[operador](a, b)
+        funcoes = {'+': rpn_final.add_fixed_point, '-': rpn_final.sub_fixed_point,
+                   '*': rpn_final.mul_fixed_point, '|': rpn_final.div_fixed_point,
+                   '/': rpn_final.floordiv_fixed_point, '%': rpn_final.mod_fixed_point,
+                   '^': rpn_final.power_fixed_point}
+        try:
+            return funcoes[operador](a, b, self.numerico)
+        except ZeroDivisionError:
+            raise ErroCompilacao(f"Divisão por zero ({self.para_float(a)} {operador} {self.para_float(b)})")
+        except (OverflowError, ValueError) as erro:
+            raise ErroCompilacao(f"{self.para_float(a)} {operador} {self.para_float(b)} "
+                                 f"em {self.numerico.upper()}: {erro}")
+
+    def push(self, bruto):
+        """
+        Bytecode de PUSH para um valor bruto
+        """
+        return bytes([OP_PUSH]) + (bruto & ((1 << (8 * self.largura)) - 1)).to_bytes(self.largura, 'little')
+
+    def compilar(self, expressao):
+        """
+        Compila uma linha e calcula o valor esperado
+
+        Args:
+            expressao (str): Expressão RPN
+
+        Returns:
+            tuple: (bytecode, valor bruto esperado)
+
+        Raises:
+            ErroCompilacao: Se a linha tiver erro (o estado não é alterado, exceto o índice da linha)
+        """
+        i = self.linha
+        self.linha += 1
+        memoria = self.memoria
+
+        # Referência a resultados anteriores (n RES): a linha inteira vira RES k
+        match_res = re.search(r'\(\s*(\d+)\s+RES\s*\)', expressao)
+        match_mem = re.search(r'\(\s*(\d+\.?\d*)\s+MEM\s*\)', expressao)
+        if match_res:
+            indice_anterior = i - int(match_res.group(1))
+            if not 0 <= indice_anterior < len(self.resultados):
+                raise ErroCompilacao(f"Erro: Referência inválida - linha {indice_anterior+1} não existe")
+            distancia = len(self.resultados) - indice_anterior
+            if distancia > PROFUNDIDADE_HISTORICO:
+                raise ErroCompilacao(f"Erro: RES além dos {PROFUNDIDADE_HISTORICO} resultados guardados na VM")
+            codigo = bytes([OP_RES, distancia])
+            valor = self.resultados[indice_anterior]
+        # Armazenamento em memória (n MEM): a linha inteira vira PUSH n, MEM_STORE
+        elif match_mem:
+            valor = memoria = self.converter(float(match_mem.group(1)))
+            codigo = self.push(valor) + bytes([OP_MEM_STORE])
+        else:
+            codigo, valor = self._compilar_rpn(expressao)
+
+        self.memoria = memoria
+        self.resultados.append(valor)
+        return codigo + bytes([OP_FIM]), valor
+
+    def _compilar_rpn(self, expressao):
+        """
+        Compila uma expressão RPN (com parênteses, MEM e RES) para bytecode
+
+        Returns:
+            tuple: (bytecode, valor bruto esperado)
+        """
+        if re.search(r'\(\s*MEM\s+RES\s*\)', expressao):
+            expressao = expressao.replace('(MEM RES)', '(MEM RES +)')
+        expressao = expressao.replace(',', '.')
+        elementos = re.findall(r'-?[\d.]+|\bMEM\b|\bRES\b|[()+\-*^/%|]', expressao)
+
+        codigo = bytearray()
+        pilha = []      # Valores brutos (simulação da pilha da VM)
+        grupos = [0]    # Valores empilhados em cada nível de parênteses
+        for elemento in elementos:
+            if elemento == '(':
+                grupos.append(0)
+                continue
+            if elemento == ')':
+                if len(grupos) == 1:
+                    raise ErroCompilacao("Erro: Parênteses desbalanceados")
+                if grupos.pop() != 1:
+                    raise ErroCompilacao(f"Erro: Subexpressão inválida em {expressao}")
+                grupos[-1] += 1
+                continue
+            if elemento in OPERADORES_VM:
+                if grupos[-1] < 2:
+                    raise ErroCompilacao(f"Erro: Número insuficiente de operandos para o operador {elemento}")
+                b, a = pilha.pop(), pilha.pop()
+                pilha.append(self.calcular(elemento, a, b))
+                codigo.append(OPERADORES_VM[elemento][0])
+                grupos[-1] -= 1
+                continue
+            if elemento == 'MEM':
+                pilha.append(self.memoria)
+                codigo.append(OP_MEM)
+            elif elemento == 'RES':
+                if self.resultados:
+                    pilha.append(self.resultados[-1])
+                    codigo += bytes([OP_RES, 1])
+                else:
+                    pilha.append(self.converter(0.0))
+                    codigo += self.push(pilha[-1])
+            else:
+                try:
+                    numero = float(elemento)
+                except ValueError:
+                    raise ErroCompilacao(f"Erro: Número inválido {elemento}")
+                pilha.append(self.converter(numero))
+                codigo += self.push(pilha[-1])
+            grupos[-1] += 1
+            if len(pilha) > PROFUNDIDADE_PILHA:
+                raise ErroCompilacao(f"Erro: Expressão usa mais de {PROFUNDIDADE_PILHA} valores na pilha da VM")
+        if len(grupos) != 1:
+            raise ErroCompilacao("Erro: Parênteses desbalanceados")
+        if len(pilha) != 1:
+            raise ErroCompilacao(f"Erro: Subexpressão inválida em {expressao}")
+        return bytes(codigo), pilha[0]
+
+class TransporteSerial:
+    """
+    Conexão com o Arduino pela porta serial (requer pyserial)
+    """
+    def __init__(self, porta, baud=115200, timeout=5.0):
+        if serial is None:
+            raise RuntimeError("pyserial não está instalado (pip install pyserial)")
+        self.conexao = serial.Serial(porta, baud, timeout=timeout)
+
+    def enviar(self, dados):
+        self.conexao.write(dados)
+
+    def receber(self, n):
+        dados = self.conexao.read(n)
+        if len(dados) < n:
+            raise TimeoutError(f"esperados {n} bytes, recebidos {len(dados)}")
+        return dados
+
+    def fechar(self):
+        self.conexao.close()
+
+class TransporteSimulado:
+    """
+    Executa o firmware no simulador (simulador_avr.py), sem o Arduino
+
+    Os bytes enviados chegam à UART no ritmo da velocidade configurada
+    (10 bits por byte), então os ciclos gastos medem a vazão que o Arduino
+    teria com a mesma velocidade.
+    """
+    def __init__(self, numerico='q16.16', baud=115200, otimizacao='Os'):
+        from simulador_avr import montar, Simulador
+        texto = io.StringIO()
+        gerar_firmware(texto, numerico, baud, otimizacao)
+        self.simulador = Simulador(montar(texto.getvalue()))
+        self.ciclos_por_byte = round(16_000_000 * 10 / baud)
+        self.lidos = 0
+
+    def enviar(self, dados):
+        self.simulador.receber(dados, self.ciclos_por_byte)
+
+    def receber(self, n):
+        saida = self.simulador.saida_uart
+        self.simulador.executar_ate(lambda: len(saida) >= self.lidos + n)
+        dados = bytes(saida[self.lidos:self.lidos + n])
+        self.lidos += n
+        return dados
+
+    def fechar(self):
+        pass
+
+def ler_identificacao(transporte, numerico):
+    """
+    Lê a identificação enviada pelo firmware ao iniciar e confere o formato
+
+    Returns:
+        int: Capacidade do buffer de recepção (bytes)
+
+    Raises:
+        RuntimeError: Se o firmware não for a VM ou usar outro formato
+    """
+    identificacao = transporte.receber(10)
+    if identificacao[:5] != b"RPNVM" or identificacao[5] != VERSAO_VM:
+        raise RuntimeError(f"identificação inesperada: {identificacao!r}")
+    if identificacao[6] != CODIGOS_FORMATO[numerico] or identificacao[7] != largura_formato(numerico):
+        raise RuntimeError(f"o firmware não usa o formato {numerico}")
+    return identificacao[9]
+
+def executar_lote(transporte, expressoes, numerico='q16.16', janela=None):
+    """
+    Compila e envia as expressões, lendo os resultados do Arduino
+
+    O envio usa créditos: os bytes de comandos ainda sem resposta nunca passam
+    da janela (por padrão a capacidade do buffer de recepção do firmware), então
+    o Arduino nunca perde bytes e a serial fica ocupada o tempo todo.
+
+    Args:
+        transporte: TransporteSerial ou TransporteSimulado (já identificado)
+        expressoes (iterable): Expressões RPN (linhas vazias são ignoradas)
+        numerico (str): Formato numérico do firmware
+        janela (int): Bytes em trânsito permitidos (padrão CAPACIDADE_RX)
+
+    Returns:
+        list: Um dicionário por linha: expressao, esperado, obtido, confere, erro
+    """
+    janela = janela or CAPACIDADE_RX
+    compilador = CompiladorVM(numerico)
+    quadro = 1 + compilador.largura
+    linhas, pendentes, em_transito = [], deque(), 0
+
+    def receber_resposta():
+        nonlocal em_transito
+        linha, tamanho = pendentes.popleft()
+        em_transito -= tamanho
+        resposta = transporte.receber(quadro)
+        if resposta[0] != STATUS_OK:
+            linha['erro'] = f"Erro: operação inválida 0x{resposta[1]:02X} recebida pelo Arduino"
+            return
+        obtido = int.from_bytes(resposta[1:], 'little')
+        linha['obtido'] = compilador.para_float(obtido)
+        linha['confere'] = obtido == linha.pop('bruto') & ((1 << (8 * compilador.largura)) - 1)
+
+    for expressao in expressoes:
+        expressao = expressao.strip()
+        if not expressao:
+            continue
+        linha = {'expressao': expressao, 'esperado': None, 'obtido': None, 'confere': False, 'erro': None}
+        linhas.append(linha)
+        memoria = compilador.memoria
+        try:
+            codigo, bruto = compilador.compilar(expressao)
+        except ErroCompilacao as erro:
+            linha['erro'] = str(erro)
+            continue
+        if len(codigo) > janela:
+            linha['erro'] = f"Erro: bytecode com {len(codigo)} bytes não cabe na janela de {janela} bytes"
+            compilador.resultados.pop()
+            compilador.memoria = memoria
+            continue
+        linha['esperado'] = compilador.para_float(bruto)
+        linha['bruto'] = bruto
+        while em_transito + len(codigo) > janela:
+            receber_resposta()
+        transporte.enviar(codigo)
+        pendentes.append((linha, len(codigo)))
+        em_transito += len(codigo)
+    while pendentes:
+        receber_resposta()
+    return linhas
+
+def main():
+    """
+    Função principal: gera o firmware ou envia um arquivo de expressões
+    """
+    parser = argparse.ArgumentParser(description="Máquina virtual RPN para o Arduino")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    for nome in ('firmware', 'enviar'):
+        sub = comandos.add_parser(nome)
+        sub.add_argument('--numerico', default='q16.16', choices=list(FORMATOS_VM),
+                         help="formato dos números na VM (padrão q16.16)")
+        sub.add_argument('--baud', type=int, default=115200, help="velocidade da UART (padrão 115200)")
+        sub.add_argument('-O', dest='otimizacao', choices=['s', '2'], default='s',
+                         help="variante das rotinas: -Os (padrão) ou -O2")
+        if nome == 'firmware':
+            sub.add_argument('-o', dest='saida', default='vm_rpn.asm', help="arquivo gerado (padrão vm_rpn.asm)")
+        else:
+            sub.add_argument('arquivo', help="arquivo de expressões")
+            destino = sub.add_mutually_exclusive_group(required=True)
+            destino.add_argument('--porta', help="porta serial do Arduino (ex.: COM3, /dev/ttyACM0)")
+            destino.add_argument('--simulador', action='store_true', help="executa o firmware no simulador")
+    args = parser.parse_args()
+    otimizacao = 'O' + args.otimizacao
+
+    if args.comando == 'firmware':
+        with open(args.saida, 'w') as saida:
+            rotinas = gerar_firmware(saida, args.numerico, args.baud, otimizacao)
+        print(f"Firmware gerado em {args.saida} ({len(rotinas)} rotinas ligadas)")
+        return
+
+    if args.simulador:
+        transporte = TransporteSimulado(args.numerico, args.baud, otimizacao)
+    else:
+        transporte = TransporteSerial(args.porta, args.baud)
+    try:
+        ler_identificacao(transporte, args.numerico)
+        inicio = time.perf_counter()
+        linhas = executar_lote(transporte, rpn_final.read_expressions_file(args.arquivo), args.numerico)
+        duracao = time.perf_counter() - inicio
+    finally:
+        transporte.fechar()
+
+    divergentes = 0
+    for linha in linhas:
+        if linha['erro']:
+            print(f"{linha['expressao']}: {linha['erro']}")
+            continue
+        marca = "" if linha['confere'] else f"  (esperado {linha['esperado']:g})"
+        divergentes += not linha['confere']
+        print(f"{linha['expressao']} = {linha['obtido']:g}{marca}")
+    if args.simulador:
+        segundos = transporte.simulador.ciclos / 16_000_000
+        print(f"{len(linhas)} linhas em {transporte.simulador.ciclos} ciclos "
+              f"({segundos * 1000:.1f} ms a 16 MHz, {len(linhas) / segundos:.0f} linhas/s)")
+    else:
+        print(f"{len(linhas)} linhas em {duracao * 1000:.1f} ms ({len(linhas) / duracao:.0f} linhas/s)")
+    if divergentes:
+        print(f"{divergentes} resultados diferentes do esperado", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()